@@ -91,6 +91,27 @@ get_action(Timepoint, CommunityID, GenerationID, AgentID, Success, Action):-
 	).
 get_action(_, _, _, _, "Failed to find an action for this agent", false).
 
+/**
+ * get_actions(++Timepoint:int, ++CommunityID:int, ++GenerationID:int, ++AgentIDs:list, -ActionResults:list) is nondet
+ *
+ * Get the action for each of the given agents, recording whether getting each action was successful or not.
+ *
+ * @arg Timepoint The timepoint at which to get the action commitments at
+ * @arg CommunityID The community the agents belong to
+ * @arg GenerationID The generation of the community the agents belong to
+ * @arg AgentIDs The ids of the agents
+ * @arg ActionResults A list of dictionaries containing the agent id, whether getting their action was successful and the action (or error message)
+ */
+
+get_actions(_, _, _, [], []):- !.
+get_actions(Timepoint, CommunityID, GenerationID, [AgentID|AgentIDs], [ActionResult|ActionResults]):-
+	get_action(Timepoint, CommunityID, GenerationID, AgentID, Success, Action),
+	( Success == true ->
+		ActionResult = actionresult{player: AgentID, success: true, action: Action} ;
+		ActionResult = actionresult{player: AgentID, success: false, message: Success}
+	),
+	get_actions(Timepoint, CommunityID, GenerationID, AgentIDs, ActionResults).
+
 
 /**
  * agent_action(++Timepoint:int, ++CommunityID:int, ++GenerationID:int, ++AgentID:int, -Success:atom, -Action:dict) is nondet
@@ -74,6 +74,44 @@ new_agent(DictIn, "No such generation for this community"):-
 new_agent(DictIn, "Incorrect input, should contain the fields: donor_strategy, non_donor_strategy, trust_model, options, community, generation and player"):-
 	\+ _{donor_strategy: _, non_donor_strategy: _, trust_model: _, options: _, community: _, generation: _, player: _} :< DictIn, !.
 
+/**
+ * new_agents(++CommunityID:int, ++GenerationID:int, ++Strategies:list, -AgentResults:list) is nondet
+ *
+ * Create all the agents of a generation at once from the count of each strategy, numbering the agents from 0 in the order of the strategies,
+ * recording whether creating each agent was successful or not.
+ *
+ * @arg CommunityID The community the agents belong to
+ * @arg GenerationID The generation of the community the agents belong to
+ * @arg Strategies A list of dictionaries of each strategy (+options) and the count of agents to create with it
+ * @arg AgentResults A list of dictionaries containing the agent id and whether creating the agent was successful (or an error message)
+ */
+
+new_agents(CommunityID, GenerationID, Strategies, AgentResults):-
+	new_agents(CommunityID, GenerationID, Strategies, 0, AgentResults).
+
+new_agents(_, _, [], _, []):- !.
+new_agents(CommunityID, GenerationID, [Strategy|Strategies], FirstID, AgentResults):-
+	get_dict(count, Strategy, Count),
+	del_dict(count, Strategy, _, Agent),
+	LastID is FirstID + Count - 1,
+	findall(AgentResult,
+		( between(FirstID, LastID, AgentID),
+		  put_dict(_{community: CommunityID, generation: GenerationID, player: AgentID}, Agent, DictIn),
+		  new_agent_result(DictIn, AgentID, AgentResult)
+		),
+		StrategyResults),
+	NextID is FirstID + Count,
+	new_agents(CommunityID, GenerationID, Strategies, NextID, OtherResults),
+	append(StrategyResults, OtherResults, AgentResults).
+
+% Create an agent, recording whether it was successful
+new_agent_result(DictIn, AgentID, AgentResult):-
+	( new_agent(DictIn, Success) -> true ; Success = "Failed to create this agent" ),
+	( Success == true ->
+		AgentResult = agentresult{player: AgentID, success: true} ;
+		AgentResult = agentresult{player: AgentID, success: false, message: Success}
+	).
+
 /**
  * retract_agents(++ID:int) is nondet
  *
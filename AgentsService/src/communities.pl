@@ -11,6 +11,7 @@
  */
 
 :- dynamic community/1, generation/2, id_gap/1, id/1.
+:- dynamic observed_at/2, happens_at/2, action_commitment/5.
 :- multifile community/1, generation/2.
 ?- ['./agents'].
 :- use_module(library(error), [existence_error/2]).
@@ -23,13 +24,14 @@ new_community(ID):-
 /**
  * retract_community(++DictIn:dict, -Success:atom) is semidet
  *
- * Retracts a community and all it's agents and generations from the system, the community id is stored in the dict.
+ * Retracts a community and all it's agents, generations and their beliefs from the system, the community id is stored in the dict.
  *
  * @arg DictIn Contains the id of the community to delete.
  */
 
 retract_community(ID, Success):-
 	community(ID), !,
+	retract_beliefs(ID, _),
 	retract_agents(ID),
 	retract_generations(ID),
 	retract(community(ID)),
@@ -126,3 +128,51 @@ new_generation(DictIn, Success):-
  */
 retract_generations(ID):-
 	forall(generation(community(ID), GenID), (retract(generation(community(ID), GenID)))).
+
+/**
+ * retract_generation(++CommunityID:int, ++GenerationID:int, -Success:atom) is det
+ *
+ * Retract a generation of a community, and all it's agents and their beliefs, from the system.
+ *
+ * @arg CommunityID The id of the community the generation belongs to
+ * @arg GenerationID The id of the generation to retract
+ * @arg Success True if the generation was retracted, error message if not
+ */
+retract_generation(CommunityID, GenerationID, Success):-
+	generation(community(CommunityID), GenerationID), !,
+	retract_beliefs(CommunityID, GenerationID),
+	retractall(agent(_, community(CommunityID), generation(community(CommunityID), GenerationID), _)),
+	retract(generation(community(CommunityID), GenerationID)),
+	Success = true.
+retract_generation(_, _, Success):-
+	Success = "No generation with this ID in this community to retract".
+
+/**
+ * belief_fluent(?Name:atom) is nondet
+ *
+ * The fluents revised by the agents percepts, mvfcec stores each as Name(Fluent=Value, Interval).
+ *
+ * @arg Name The name of the fluent
+ */
+belief_fluent(interaction_timepoints).
+belief_fluent(standing).
+belief_fluent(image_score).
+belief_fluent(percept_count).
+belief_fluent(veritability_rating).
+
+/**
+ * retract_beliefs(++CommunityID:int, ?GenerationID:int) is det
+ *
+ * Retract the percepts, the events and fluents mvfcec revised from them and the action commitments of the agents in a generation,
+ * or of every generation in the community if the generation id is unbound.
+ *
+ * @arg CommunityID The id of the community the agents belong to
+ * @arg GenerationID The id of the generation the agents belong to
+ */
+retract_beliefs(CommunityID, GenerationID):-
+	Agent = agent(_, community(CommunityID), generation(community(CommunityID), GenerationID), _),
+	forall(member(Event, [did(Agent, _, _, _), said(Agent, _, _, _), interaction(Agent, _)]),
+		( retractall(observed_at(Event, _)), retractall(happens_at(Event, _)) )),
+	forall(belief_fluent(Name),
+		( Fluent =.. [Name, Agent, _], CompiledFluent =.. [Name, Fluent=_, _], retractall(CompiledFluent) )),
+	retractall(action_commitment(_, CommunityID, GenerationID, _, _)).
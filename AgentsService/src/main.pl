@@ -58,11 +58,13 @@ http:location(belief, root(belief), []).
 :- http_handler(root(community), community, []).
 :- http_handler(root(generation), generation, []).
 :- http_handler(root(agent), agent, []).
+:- http_handler(agent(group), agent_group, []).
 :- http_handler(percept_action(interaction), percept_action_interaction, []).
 :- http_handler(percept_action(gossip), percept_action_gossip, []).
 :- http_handler(percept_action(group), percept_action_group, []).
 :- http_handler(percept(interaction), percept_interaction, []).
 :- http_handler(root(action), action, []).
+:- http_handler(root(step), step, []).
 :- http_handler(belief(donor), belief_donor, []).
 :- http_handler(belief(recipient), belief_recipient, []).
 :- http_handler(belief(interaction), belief_interaction, []).
@@ -115,9 +117,9 @@ community(Request) :-
 /**
  * generation(++Request:list) is nondet
  *
- * The handler to create a new generation in the service,
+ * The handler to create a new generation in the service, or delete one and all it's agents and their beliefs,
  * fails if not passed the correct parameters as stipulated in the api docs,
- * responds unsuccessful to the client if the passed community doesn't exist or the generation for this community already exists.
+ * responds unsuccessful to the client if the passed community doesn't exist or the generation for this community already exists (or doesn't exist when deleting).
  * @arg Request The request object passed from the HTTP request
  */
 generation(Request) :-
@@ -133,6 +135,21 @@ generation(Request) :-
                          }, [status(404)])
     ).
 
+generation(Request) :-
+    member(method(delete), Request), !,
+    http_parameters(Request, [ community(Community, [ optional(false) ]), generation(Generation, [ optional(false) ])]),
+    atom_number(Community, CommunityID),
+    atom_number(Generation, GenerationID),
+    retract_generation(CommunityID, GenerationID, Success),
+    (   Success==true
+    ->  reply_json(return{data: data{community: CommunityID, generation: GenerationID}, status:200, success:Success})
+    ;   reply_json(return{ data: data{community: CommunityID, generation: GenerationID},
+                           message:Success,
+                           status:404,
+                           success:false
+                         }, [status(404)])
+    ).
+
 /**
  * agent(++Request:list) is nondet
  *
@@ -154,6 +171,29 @@ agent(Request) :-
                          }, [status(404)])
     ).
 
+/**
+ * agent_group(++Request:list) is nondet
+ *
+ * The handler to create all the agents of a generation in one request from the count of each strategy, numbering the agents from 0 in the order of the strategies,
+ * fails if not passed the correct parameters as stipulated in the api docs,
+ * responds with whether each agent was created (or the error message for it).
+ * @arg Request The request object passed from the HTTP request
+ */
+agent_group(Request) :-
+    member(method(post), Request), !,
+    http_read_json_dict(Request, DictIn),
+    new_agents(DictIn.community,
+               DictIn.generation,
+               DictIn.strategies,
+               AgentResults),
+    reply_json(return{ data:data{ community:DictIn.community,
+                                  generation:DictIn.generation
+                                },
+                       players:AgentResults,
+                       status:200,
+                       success:true
+                     }).
+
 /**
  * percept_interaction(++Request:list) is nondet
  *
@@ -454,4 +494,37 @@ action(Request) :-
                            status:404,
                            success:false
                          }, [status(404)])
-    ).
\ No newline at end of file
+    ).
+
+/**
+ * step(++Request:list) is nondet
+ *
+ * The handler to run a whole timepoint of a generation in one request: the donor-recipient pair for the timepoint,
+ * the group of action and/or gossip percepts from the previous timepoint and then the action commitments of the listed agents,
+ * fails if not passed the correct parameters as stipulated in the api docs,
+ * responds with whether the interaction and each percept were added and the action (or error message) for each agent.
+ * @arg Request The request object passed from the HTTP request
+ */
+step(Request) :-
+    member(method(post), Request), !,
+    http_read_json_dict(Request, DictIn),
+    (   get_dict(interaction, DictIn, Interaction)
+    ->  add_new_interaction_percept(Interaction, InteractionSuccess)
+    ;   InteractionSuccess = true
+    ),
+    add_percepts(DictIn.percepts, PerceptSuccessList),
+    get_actions(DictIn.timepoint,
+                DictIn.community,
+                DictIn.generation,
+                DictIn.players,
+                ActionResults),
+    reply_json(return{ actions:ActionResults,
+                       data:data{ community:DictIn.community,
+                                  generation:DictIn.generation,
+                                  timepoint:DictIn.timepoint
+                                },
+                       interaction:InteractionSuccess,
+                       percepts:PerceptSuccessList,
+                       status:200,
+                       success:true
+                     }).
@@ -25,6 +25,7 @@
  * @arg SuccessList A list of whether the adding of each percept was successful or not
  */
 
+add_percepts([], []):- !.
 add_percepts([Percept], SuccessList):-
 	Type = Percept.type,
 	( Type == "action/interaction" -> 
@@ -34,6 +34,23 @@ def create_app(config_class=Config):
 
     app.redis = Redis.from_url(app.config['REDIS_URL'])
     app.task_queue = rq.Queue('nature_engine_tasks', connection=app.redis, default_timeout=300000)
+    if app.config['AGENTS_BACKEND'] == 'local':
+        # Run the agents' minds in this process rather than in the agents service
+        from app.indir_rec.local_agents_logic import LocalAgentsBackend
+        app.agents_client = LocalAgentsBackend()
+    else:
+        from app.indir_rec.agents_client_logic import AgentsClient
+        client_settings = {'pool_size': app.config['AGENTS_POOL_SIZE'],
+                           'connect_timeout': app.config['AGENTS_CONNECT_TIMEOUT'],
+                           'read_timeout': app.config['AGENTS_READ_TIMEOUT'], 'retries': app.config['AGENTS_RETRIES'],
+                           'backoff_factor': app.config['AGENTS_BACKOFF_FACTOR']}
+        if len(app.config['AGENTS_URLS']) > 1:
+            # Share communities out between the agents services
+            from app.indir_rec.sharding_logic import ShardedAgentsClient
+            app.agents_client = ShardedAgentsClient(app.config['AGENTS_URLS'], app.config['AGENTS_DRAINING'],
+                                                    app.config['AGENTS_HEALTH_INTERVAL'], **client_settings)
+        else:
+            app.agents_client = AgentsClient(app.config['AGENTS_URL'], **client_settings)
 
     db.init_app(app)
     migrate.init_app(app, db)
@@ -4,7 +4,7 @@ __author__ = "James King"
 
 from enum import Enum
 from abc import ABC, abstractmethod
-from typing import List, NoReturn
+from typing import List, NoReturn, Tuple
 
 
 class ActionType(Enum):
@@ -29,7 +29,11 @@ class GossipContent(Enum):
 
 
 class Action(ABC):
-    """A abstract class base for the representation of any action produced by a player"""
+    """A abstract class base for the representation of any action produced by a player, actions are equal when they
+    are of the same type with the same content"""
+
+    # Long games hold many actions, so they keep no instance dictionary
+    __slots__ = ('_timepoint', '_actor', '_generation', '_reason')
 
     def __init__(self, timepoint: int, actor: int, generation: int, reason: str):
         """
@@ -48,6 +52,20 @@ class Action(ABC):
         self._generation = generation
         self._reason: str = reason
 
+    def __eq__(self, other):
+        return type(self) is type(other) and self._fields() == other._fields()
+
+    def __hash__(self):
+        return hash((type(self), self._timepoint, self._actor, self._generation))
+
+    def _fields(self) -> Tuple:
+        """
+        The content of the action, compared to tell whether two actions are equal
+        :return: The content of the action
+        :rtype: Tuple
+        """
+        return self._timepoint, self._actor, self._generation, self._reason
+
     @property
     @abstractmethod
     def type(self) -> ActionType:
@@ -97,6 +115,8 @@ class Action(ABC):
 class IdleAction(Action):
     """An idle action committed by a player in which the player is inactive"""
 
+    __slots__ = ()
+
     def __init__(self, timepoint: int, actor: int, generation: int, reason: str):
         """
         Create the idle action and it's relevant data, including the call to the super with the relevant data
@@ -125,6 +145,8 @@ class GossipAction(Action):
     """An action where the actor has gossipped to the recipient either positive or negative gossip about the about
     agent, fits the SAGL"""
 
+    __slots__ = ('_gossiper', '_about', '_recipient', '_gossip')
+
     def __init__(self, timepoint: int, gossiper: int, generation: int, reason: str, about: int, recipient: int,
                  gossip: GossipContent):
         """
@@ -150,6 +172,9 @@ class GossipAction(Action):
         self._recipient: int = recipient
         self._gossip: GossipContent = gossip
 
+    def _fields(self) -> Tuple:
+        return super(GossipAction, self)._fields() + (self._about, self._recipient, self._gossip)
+
     @property
     def type(self) -> ActionType:
         """
@@ -199,6 +224,8 @@ class GossipAction(Action):
 class InteractionAction(Action):
     """An action committed to by a donor of a donor-recipient interaction pair"""
 
+    __slots__ = ('_donor', '_recipient', '_action', '_onlookers')
+
     def __init__(self, timepoint: int, donor: int, generation: int, reason: str, recipient: int,
                  action: InteractionContent, onlookers: List[int] = None):
         """
@@ -224,6 +251,9 @@ class InteractionAction(Action):
         self._action: InteractionContent = action
         self._onlookers: List[int] = onlookers if onlookers is not None else []
 
+    def _fields(self) -> Tuple:
+        return super(InteractionAction, self)._fields() + (self._recipient, self._action, tuple(self._onlookers))
+
     @property
     def type(self) -> ActionType:
         """
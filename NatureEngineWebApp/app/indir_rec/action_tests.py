@@ -31,6 +31,16 @@ class IdleTests(unittest.TestCase):
         # Test that the action returns the type IDLE
         self.assertEqual(ActionType.IDLE, self.action.type, "Should be the IDLE type")
 
+    def test_equality(self):
+        # Actions of the same type and content should be equal, and keep no instance dictionary
+        same = IdleAction(self.timepoint, self.actor, self.generation, "reason")
+        self.assertEqual(self.action, same)
+        self.assertEqual(hash(self.action), hash(same))
+        self.assertNotEqual(self.action, IdleAction(self.timepoint, self.actor, self.generation, "other reason"))
+        self.assertNotEqual(self.action, InteractionAction(self.timepoint, self.actor, self.generation, "reason", 0,
+                                                           InteractionContent.COOPERATE))
+        self.assertFalse(hasattr(self.action, '__dict__'))
+
 
 class GossipTests(unittest.TestCase):
     """Test the GossipAction class"""
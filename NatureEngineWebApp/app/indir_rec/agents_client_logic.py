@@ -0,0 +1,513 @@
+"""agents_client_logic.py: Module for the client used to communicate with the agents service, holding a pool of
+keep-alive connections to the service, and the interface shared by every backend the agents' minds can run on"""
+
+__author__ = "James King"
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, NoReturn
+import asyncio
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .indir_rec_config import Config
+
+
+class AgentsServiceException(Exception):
+    """An error has occurred when communicating with the agents service"""
+
+    def __init__(self, message, status: int = None):
+        super().__init__("Error communicating with agents service: " + message)
+        # The error status the agents service replied with, None if it couldn't be reached
+        self.status: int = status
+
+
+class AgentsBackend(ABC):
+    """The interface the environment uses to reach the agents' minds. Responses take the form of the agents service's
+    JSON responses, and a failure the agents service would reply to with an error status raises an
+    AgentsServiceException."""
+
+    @abstractmethod
+    def close(self) -> NoReturn:
+        """
+        Release any resources held by the backend
+        :return: NoReturn
+        """
+        raise NotImplementedError
+
+    @property
+    def seeded(self) -> bool:
+        """
+        Get whether the random choices of the agents' minds are determined by a seed, so a seeded game through the
+        backend plays the same way each run
+        :return: True if the agents' choices are seeded
+        :rtype: bool
+        """
+        return False
+
+    @abstractmethod
+    def get_strategies(self) -> List[Dict]:
+        """
+        Get the strategies available in the backend
+        :return: The strategies, each with a donor strategy, non donor strategy, trust model, description and options
+        :rtype: List[Dict]
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_community(self) -> Dict:
+        """
+        Create a new community
+        :return: The response, including the id of the community
+        :rtype: Dict
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_generation(self, community: int, generation: int) -> Dict:
+        """
+        Create a new generation of a community
+        :param community: The id of the community the generation belongs to
+        :type community: int
+        :param generation: The id of the generation
+        :type generation: int
+        :return: The response
+        :rtype: Dict
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_community(self, community: int) -> Dict:
+        """
+        Delete a community, releasing its generations, agents and their beliefs
+        :param community: The id of the community
+        :type community: int
+        :return: The response
+        :rtype: Dict
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_generation(self, community: int, generation: int) -> Dict:
+        """
+        Delete a generation of a community, releasing its agents and their beliefs
+        :param community: The id of the community the generation belongs to
+        :type community: int
+        :param generation: The id of the generation
+        :type generation: int
+        :return: The response
+        :rtype: Dict
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_agent(self, agent: Dict) -> Dict:
+        """
+        Create a new agent
+        :param agent: The agent's strategy, community, generation and id
+        :type agent: Dict
+        :return: The response
+        :rtype: Dict
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_agents(self, community: int, generation: int, strategies: List[Dict]) -> Dict:
+        """
+        Create all the agents of a generation at once, numbered from 0 in the order of the strategies
+        :param community: The id of the community the agents belong to
+        :type community: int
+        :param generation: The id of the generation the agents belong to
+        :type generation: int
+        :param strategies: Each strategy of the generation with the count of agents to create with it
+        :type strategies: List[Dict]
+        :return: The response, with the success (or error message) of creating each agent
+        :rtype: Dict
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def send_interaction(self, interaction: Dict) -> Dict:
+        """
+        Send the percept of the donor-recipient pair for a timepoint
+        :param interaction: The interaction percept
+        :type interaction: Dict
+        :return: The response
+        :rtype: Dict
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def send_percepts(self, percepts: List[Dict]) -> Dict:
+        """
+        Send a group of action and/or gossip percepts
+        :param percepts: The percepts to send
+        :type percepts: List[Dict]
+        :return: The response, with the success of each percept
+        :rtype: Dict
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_action(self, community: int, generation: int, player: int, timepoint: int) -> Dict:
+        """
+        Get the action an agent commits to at a timepoint
+        :param community: The id of the community the agent belongs to
+        :type community: int
+        :param generation: The id of the generation the agent belongs to
+        :type generation: int
+        :param player: The id of the agent
+        :type player: int
+        :param timepoint: The timepoint at which the agent decides
+        :type timepoint: int
+        :return: The response, with the action
+        :rtype: Dict
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def step(self, step: Dict) -> Dict:
+        """
+        Run a timepoint of a generation in a single call
+        :param step: The donor-recipient pair, percepts and players of the step
+        :type step: Dict
+        :return: The response, with the success of the interaction and each percept and each player's action
+        :rtype: Dict
+        """
+        raise NotImplementedError
+
+
+class AgentsClient(AgentsBackend):
+    """A client for the agents service that reuses connections from a pool of keep-alive connections. One client
+    should be shared by everything in a simulation (or web worker) that talks to the agents service."""
+
+    def __init__(self, agents_url: str = None, pool_size: int = None, connect_timeout: float = None,
+                 read_timeout: float = None, retries: int = None, backoff_factor: float = None):
+        """
+        Set up the session and connection pool to the agents service, any parameter not passed defaults to the config
+        :param agents_url: The url of the agents service
+        :type agents_url: str
+        :param pool_size: The maximum number of connections to keep alive in the pool
+        :type pool_size: int
+        :param connect_timeout: The number of seconds to wait to connect to the agents service
+        :type connect_timeout: float
+        :param read_timeout: The number of seconds to wait for the agents service to respond
+        :type read_timeout: float
+        :param retries: The number of times to retry a request that failed to connect, or that only reads the
+         strategies and failed with a read or gateway error
+        :type retries: int
+        :param backoff_factor: The factor of the exponential backoff between retries
+        :type backoff_factor: float
+        """
+        self._agents_url: str = agents_url if agents_url is not None else Config.AGENTS_URL
+        self._timeout = (connect_timeout if connect_timeout is not None else Config.AGENTS_CONNECT_TIMEOUT,
+                         read_timeout if read_timeout is not None else Config.AGENTS_READ_TIMEOUT)
+        pool_size = pool_size if pool_size is not None else Config.AGENTS_POOL_SIZE
+        retries = retries if retries is not None else Config.AGENTS_RETRIES
+        backoff_factor = backoff_factor if backoff_factor is not None else Config.AGENTS_BACKOFF_FACTOR
+        # The agents service is stateful, even getting an action commits the agent to it, so a request that may have
+        # reached the service is only retried on read errors and gateway errors when it reads the strategies
+        retry = Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=backoff_factor,
+                      raise_on_status=False)
+        read_only_retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                                backoff_factor=backoff_factor, status_forcelist=(502, 503, 504), raise_on_status=False)
+        self._session = requests.Session()
+        self._session.mount(self._agents_url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                                          max_retries=retry))
+        self._session.mount(self._agents_url + 'strategy', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                                                       max_retries=read_only_retry))
+
+    @property
+    def agents_url(self) -> str:
+        """
+        Get the url of the agents service this client communicates with
+        :return: The url of the agents service
+        :rtype: str
+        """
+        return self._agents_url
+
+    def close(self) -> NoReturn:
+        """
+        Close all the connections in the pool
+        :return: NoReturn
+        """
+        self._session.close()
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict:
+        """
+        Send a request to the agents service using a pooled connection
+        :param method: The HTTP method of the request
+        :type method: str
+        :param path: The path of the endpoint relative to the agents service url
+        :type path: str
+        :param kwargs: The json body or query params of the request
+        :return: The JSON body of the response
+        :rtype: Dict
+        """
+        try:
+            response = self._session.request(method, self._agents_url + path, timeout=self._timeout, **kwargs)
+        except requests.RequestException as e:
+            raise AgentsServiceException(str(e))
+        if response.status_code != 200:
+            message = "bad status code " + str(response.status_code)
+            try:
+                message += ": " + str(response.json()['message'])
+            except (ValueError, KeyError):
+                pass
+            raise AgentsServiceException(message, response.status_code)
+        return response.json()
+
+    def get_strategies(self) -> List[Dict]:
+        """
+        Get the strategies available in the agents service
+        :return: The strategies, each with a donor strategy, non donor strategy, trust model, description and options
+        :rtype: List[Dict]
+        """
+        return self._request("GET", 'strategy')['strategies']
+
+    def create_community(self) -> Dict:
+        """
+        Create a new community in the agents service
+        :return: The response of the agents service, including the id of the community
+        :rtype: Dict
+        """
+        return self._request("POST", 'community')
+
+    def create_generation(self, community: int, generation: int) -> Dict:
+        """
+        Create a new generation of a community in the agents service
+        :param community: The id of the community the generation belongs to
+        :type community: int
+        :param generation: The id of the generation
+        :type generation: int
+        :return: The response of the agents service
+        :rtype: Dict
+        """
+        return self._request("POST", 'generation', json={"community": community, "generation": generation})
+
+    def delete_community(self, community: int) -> Dict:
+        """
+        Delete a community in the agents service, releasing its generations, agents and their beliefs
+        :param community: The id of the community
+        :type community: int
+        :return: The response of the agents service
+        :rtype: Dict
+        """
+        return self._request("DELETE", 'community', params={"community": community})
+
+    def delete_generation(self, community: int, generation: int) -> Dict:
+        """
+        Delete a generation of a community in the agents service, releasing its agents and their beliefs
+        :param community: The id of the community the generation belongs to
+        :type community: int
+        :param generation: The id of the generation
+        :type generation: int
+        :return: The response of the agents service
+        :rtype: Dict
+        """
+        return self._request("DELETE", 'generation', params={"community": community, "generation": generation})
+
+    def create_agent(self, agent: Dict) -> Dict:
+        """
+        Create a new agent in the agents service
+        :param agent: The agent's strategy, community, generation and id
+        :type agent: Dict
+        :return: The response of the agents service
+        :rtype: Dict
+        """
+        return self._request("POST", 'agent', json=agent)
+
+    def create_agents(self, community: int, generation: int, strategies: List[Dict]) -> Dict:
+        """
+        Create all the agents of a generation in the agents service in a single request, numbered from 0 in the order
+        of the strategies
+        :param community: The id of the community the agents belong to
+        :type community: int
+        :param generation: The id of the generation the agents belong to
+        :type generation: int
+        :param strategies: Each strategy of the generation with the count of agents to create with it
+        :type strategies: List[Dict]
+        :return: The response of the agents service, with the success (or error message) of creating each agent
+        :rtype: Dict
+        """
+        return self._request("POST", 'agent/group', json={"community": community, "generation": generation,
+                                                          "strategies": strategies})
+
+    def send_interaction(self, interaction: Dict) -> Dict:
+        """
+        Send the percept of the donor-recipient pair for a timepoint
+        :param interaction: The interaction percept
+        :type interaction: Dict
+        :return: The response of the agents service
+        :rtype: Dict
+        """
+        return self._request("POST", 'percept/interaction', json=interaction)
+
+    def send_percepts(self, percepts: List[Dict]) -> Dict:
+        """
+        Send a group of action and/or gossip percepts
+        :param percepts: The percepts to send
+        :type percepts: List[Dict]
+        :return: The response of the agents service, with the success of each percept
+        :rtype: Dict
+        """
+        return self._request("POST", 'percept/action/group', json={'percepts': percepts})
+
+    def get_action(self, community: int, generation: int, player: int, timepoint: int) -> Dict:
+        """
+        Get the action an agent commits to at a timepoint
+        :param community: The id of the community the agent belongs to
+        :type community: int
+        :param generation: The id of the generation the agent belongs to
+        :type generation: int
+        :param player: The id of the agent
+        :type player: int
+        :param timepoint: The timepoint at which the agent decides
+        :type timepoint: int
+        :return: The response of the agents service, with the action
+        :rtype: Dict
+        """
+        return self._request("GET", 'action', params={"timepoint": timepoint, "community": community,
+                                                      "generation": generation, "player": player})
+
+    def step(self, step: Dict) -> Dict:
+        """
+        Run a timepoint of a generation in a single request
+        :param step: The donor-recipient pair, percepts and players of the step
+        :type step: Dict
+        :return: The response of the agents service, with the success of the interaction and each percept and each
+         player's action
+        :rtype: Dict
+        """
+        return self._request("POST", 'step', json=step)
+
+
+class AsyncAgentsClient:
+    """An asynchronous client for the agents service, for sending many requests concurrently. The number of requests
+    in flight at once is capped, and connections are kept alive in a pool of the same size. Must be opened inside the
+    event loop it is used in, either with open and close or as an async context manager."""
+
+    def __init__(self, agents_url: str = None, concurrency: int = None, connect_timeout: float = None,
+                 read_timeout: float = None):
+        """
+        Set up the settings of the client, any parameter not passed defaults to the config
+        :param agents_url: The url of the agents service
+        :type agents_url: str
+        :param concurrency: The maximum number of requests to have in flight at once
+        :type concurrency: int
+        :param connect_timeout: The number of seconds to wait to connect to the agents service
+        :type connect_timeout: float
+        :param read_timeout: The number of seconds to wait for the agents service to respond
+        :type read_timeout: float
+        """
+        self._agents_url: str = agents_url if agents_url is not None else Config.AGENTS_URL
+        self._concurrency: int = concurrency if concurrency is not None else Config.AGENTS_CONCURRENCY
+        self._timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout if connect_timeout is not None else Config.AGENTS_CONNECT_TIMEOUT,
+            sock_read=read_timeout if read_timeout is not None else Config.AGENTS_READ_TIMEOUT)
+        self._session: aiohttp.ClientSession = None
+        self._semaphore: asyncio.Semaphore = None
+
+    @property
+    def agents_url(self) -> str:
+        """
+        Get the url of the agents service this client communicates with
+        :return: The url of the agents service
+        :rtype: str
+        """
+        return self._agents_url
+
+    async def open(self) -> NoReturn:
+        """
+        Open the session and connection pool in the running event loop
+        :return: NoReturn
+        """
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self._concurrency),
+                                              timeout=self._timeout)
+
+    async def close(self) -> NoReturn:
+        """
+        Close the session and all the connections in the pool
+        :return: NoReturn
+        """
+        await self._session.close()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict:
+        """
+        Send a request to the agents service, waiting for a free slot if the concurrency cap has been reached
+        :param method: The HTTP method of the request
+        :type method: str
+        :param path: The path of the endpoint relative to the agents service url
+        :type path: str
+        :param kwargs: The json body or query params of the request
+        :return: The JSON body of the response
+        :rtype: Dict
+        """
+        async with self._semaphore:
+            try:
+                async with self._session.request(method, self._agents_url + path, **kwargs) as response:
+                    body = await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                raise AgentsServiceException(str(e) or type(e).__name__)
+        if response.status != 200:
+            message = "bad status code " + str(response.status)
+            if isinstance(body, dict) and 'message' in body:
+                message += ": " + str(body['message'])
+            raise AgentsServiceException(message, response.status)
+        return body
+
+    async def send_interaction(self, interaction: Dict) -> Dict:
+        """
+        Send the percept of the donor-recipient pair for a timepoint
+        :param interaction: The interaction percept
+        :type interaction: Dict
+        :return: The response of the agents service
+        :rtype: Dict
+        """
+        return await self._request("POST", 'percept/interaction', json=interaction)
+
+    async def send_percepts(self, percepts: List[Dict]) -> Dict:
+        """
+        Send a group of action and/or gossip percepts
+        :param percepts: The percepts to send
+        :type percepts: List[Dict]
+        :return: The response of the agents service, with the success of each percept
+        :rtype: Dict
+        """
+        return await self._request("POST", 'percept/action/group', json={'percepts': percepts})
+
+    async def get_action(self, community: int, generation: int, player: int, timepoint: int) -> Dict:
+        """
+        Get the action an agent commits to at a timepoint
+        :param community: The id of the community the agent belongs to
+        :type community: int
+        :param generation: The id of the generation the agent belongs to
+        :type generation: int
+        :param player: The id of the agent
+        :type player: int
+        :param timepoint: The timepoint at which the agent decides
+        :type timepoint: int
+        :return: The response of the agents service, with the action
+        :rtype: Dict
+        """
+        return await self._request("GET", 'action', params={"timepoint": timepoint, "community": community,
+                                                            "generation": generation, "player": player})
+
+    async def step(self, step: Dict) -> Dict:
+        """
+        Run a timepoint of a generation in a single request
+        :param step: The donor-recipient pair, percepts and players of the step
+        :type step: Dict
+        :return: The response of the agents service, with the success of the interaction and each percept and each
+         player's action
+        :rtype: Dict
+        """
+        return await self._request("POST", 'step', json=step)
@@ -0,0 +1,81 @@
+"""agents_client_tests.py: Tests for the functionality of the agents_client_logic.py module"""
+
+__author__ = "James King"
+
+import time
+import unittest
+from .agents_client_logic import AgentsClient, AgentsServiceException
+from .mock_agents_service import MockAgentsService
+from .generation_logic import Generation
+from .strategy_logic import Strategy
+
+
+class AgentsClientTest(unittest.TestCase):
+    """Test the AgentsClient class against the mock agents service"""
+
+    def setUp(self):
+        self.service = MockAgentsService()
+        self.service.start()
+        self.client = AgentsClient(self.service.url, pool_size=2, retries=0)
+
+    def tearDown(self):
+        self.client.close()
+        self.service.stop()
+
+    def test_create_community(self):
+        # Creating a community should reply with its id
+        response = self.client.create_community()
+        self.assertTrue(response['success'])
+        self.assertEqual(0, response['id'])
+        self.assertEqual(1, self.client.create_community()['id'])
+
+    def test_bad_status_code(self):
+        # A response with a bad status code should raise an exception including the message of the service
+        community = self.client.create_community()['id']
+        with self.assertRaises(AgentsServiceException) as context:
+            self.client.create_agent({"donor_strategy": "Defector", "non_donor_strategy": "Lazy",
+                                      "trust_model": "Void", "options": [], "community": community,
+                                      "generation": 0, "player": 0})
+        self.assertIn("No such generation for this community", str(context.exception))
+
+    def test_failed_connection(self):
+        # Failing to connect to the service should raise an exception
+        client = AgentsClient('http://127.0.0.1:1/', retries=0, connect_timeout=1)
+        with self.assertRaises(AgentsServiceException):
+            client.get_strategies()
+
+    def test_retries(self):
+        # Getting an action commits the agent to it, so it shouldn't be repeated after a read timeout, while reading
+        # the strategies is safe to repeat
+        service = MockAgentsService(latency=0.3)
+        service.start()
+        client = AgentsClient(service.url, retries=2, read_timeout=0.1, backoff_factor=0)
+        try:
+            with self.assertRaises(AgentsServiceException):
+                client.get_action(0, 0, 0, 0)
+            with self.assertRaises(AgentsServiceException):
+                client.get_strategies()
+            time.sleep(0.5)
+            self.assertEqual(1, service.requests.count('GET action'))
+            self.assertEqual(3, service.requests.count('GET strategy'))
+        finally:
+            client.close()
+            service.stop()
+
+    def test_connections_reused(self):
+        # Simulating a generation should reuse the same keep-alive connection for every request, and a pipelined
+        # generation only one more for the pairs sent from its worker thread
+        for pipelined, connections in [(False, 1), (True, 2)]:
+            with self.subTest(pipelined=pipelined):
+                self.service.connections.clear()
+                community = self.client.create_community()['id']
+                generation = Generation({Strategy("Defector", "Lazy", "Void", []): 5}, 0, community, 0, 10, 2, [],
+                                        batched_steps=False, agents_client=self.client, local_decisions=False,
+                                        pipelined=pipelined)
+                generation.simulate()
+                self.assertGreater(len(self.service.requests), 50)
+                self.assertLessEqual(len(self.service.connections), connections)
+
+
+if __name__ == '__main__':
+    unittest.main()
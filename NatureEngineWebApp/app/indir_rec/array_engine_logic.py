@@ -0,0 +1,1453 @@
+"""array_engine_logic.py: Module for simulating reputation games over large populations with NumPy arrays. The players'
+strategies, fitness and beliefs are held in arrays and each timepoint is advanced with vectorised operations, following
+the rules of the built-in strategies of the agents service, rather than by asking each player's mind for its decision"""
+
+__author__ = "James King"
+
+from typing import Callable, Dict, List, NoReturn, Optional, Tuple, Union
+import numpy as np
+from .action_logic import Action, GossipAction, GossipContent, IdleAction, InteractionAction, InteractionContent
+from .community_logic import CommunityCreationException
+from .facade_logic import ReputationGame
+from .generation_logic import GenerationCreationException, SimulationException
+from .local_agents_logic import STRATEGIES
+from .metrics_logic import ActionMetrics, COUNTS, COOPERATION_RATE, SOCIAL_ACTIVENESS, POSITIVITY_OF_GOSSIP
+from .observation_logic import Observer
+from .seeding_logic import new_seed
+from .strategy_logic import Strategy
+from .agents_client_logic import AsyncAgentsClient
+
+# The kinds of action in the action log
+IDLE = 0
+INTERACTION = 1
+GOSSIP = 2
+# The values of interaction and gossip actions in the action log
+COOPERATE = 0
+DEFECT = 1
+POSITIVE = 0
+NEGATIVE = 1
+
+# The donor strategies
+COOPERATOR = 0
+DEFECTOR = 1
+RANDOM = 2
+STANDING_DISCRIMINATOR = 3
+IMAGE_SCORING_DISCRIMINATOR = 4
+VERITABILITY_DISCERNER = 5
+_DONOR_STRATEGIES = {"Cooperator": COOPERATOR, "Defector": DEFECTOR, "Random": RANDOM,
+                     "Standing Discriminator": STANDING_DISCRIMINATOR,
+                     "Image Scoring Discriminator": IMAGE_SCORING_DISCRIMINATOR,
+                     "Veritability Discerner": VERITABILITY_DISCERNER}
+
+# The non donor strategies
+LAZY = 0
+PROMOTE_SELF = 1
+SPREAD_POSITIVE = 2
+SPREAD_NEGATIVE = 3
+RANDOM_ACTION = 4
+SPREAD_ACCURATE_POSITIVE = 5
+SPREAD_ACCURATE_NEGATIVE = 6
+SPREAD_POSITIVE_TRUSTED = 7
+SPREAD_NEGATIVE_UNTRUSTED = 8
+_NON_DONOR_STRATEGIES = {"Lazy": LAZY, "Promote Self": PROMOTE_SELF, "Spread Positive": SPREAD_POSITIVE,
+                         "Spread Negative": SPREAD_NEGATIVE, "Random": RANDOM_ACTION,
+                         "Spread Accurate Positive": SPREAD_ACCURATE_POSITIVE,
+                         "Spread Accurate Negative": SPREAD_ACCURATE_NEGATIVE,
+                         "Spread Positive Trusted": SPREAD_POSITIVE_TRUSTED,
+                         "Spread Negative Untrusted": SPREAD_NEGATIVE_UNTRUSTED}
+
+# The trust models of the discriminators
+NAIVE_TRUSTING = 0
+TRUSTING = 1
+DISTRUSTING = 2
+_TRUST_MODELS = {"Naive Trusting": NAIVE_TRUSTING, "Trusting": TRUSTING, "Distrusting": DISTRUSTING}
+
+# The number of rounds of rejection sampling before falling back to choosing from the full list of candidates
+_SAMPLING_ROUNDS = 16
+# Image scores are bounded at 5 (6 with a personal grievance), so the lowest int8 marks that there is no image score
+_NO_IMAGE_SCORE = np.iinfo(np.int8).min
+
+_REASONS: List[str] = []
+
+
+def _reason(reason: str) -> int:
+    """
+    Get the code of a reason for the action log, adding it to the reasons if it is new
+    :param reason: The reason an agent gives for an action
+    :type reason: str
+    :return: The code of the reason
+    :rtype: int
+    """
+    if reason not in _REASONS:
+        _REASONS.append(reason)
+    return _REASONS.index(reason)
+
+
+_LAZY = _reason("I only act when I have to")
+_COOPERATOR = _reason("I naively cooperate with everyone out of pure altruism")
+_DEFECTOR = _reason("To protect my interests, and not incur cooperation costs")
+_RANDOM = _reason("I randomly select any action I am capable of")
+_PROMOTE_SELF = {
+    COOPERATOR: _reason("I spread positive gossip about myself to encourage others to cooperate with me"),
+    DEFECTOR: _reason("I spread positive gossip to deceive others and encourage them to cooperate with me"),
+    STANDING_DISCRIMINATOR: _reason("I actively promote myself as I wish to encourage others to cooperate with me"),
+    IMAGE_SCORING_DISCRIMINATOR: _reason("I promote myself because I want to encourage others to cooperate with me"),
+    VERITABILITY_DISCERNER: _reason("I promote myself because I want to encourage others to cooperate with me")}
+_SPREAD_POSITIVE = _reason("I naively spread positive gossip about others to encourage cooperation in the system")
+_SPREAD_NEGATIVE = _reason("I spread negative gossip to deceive others and add fake information to the society")
+_STANDING_COOPERATE = _reason("I am cooperating because I believe the recipient to have a good standing")
+_STANDING_DEFECT = _reason("I am defecting because I believe the recipient to have a bad standing")
+_STANDING_POSITIVE = _reason("I am spreading positive gossip because I believe the recipient and the agent it is about "
+                             "are good")
+_STANDING_NEGATIVE = _reason("I believe the agent this gossip is about to be of bad standing, so I am spreading it to "
+                             "those I believe are of good standing")
+_IMAGE_DEFECT = _reason("I am defecting as I do not believe the recipient's image is worthy of cooperation")
+_IMAGE_COOPERATE = _reason("I am cooperating as I believe the recipient's image is worthy of cooperation")
+_IMAGE_UNKNOWN_DEFECT = _reason("I am defecting as I do not know of the recipient's image so I cannot trust them")
+_IMAGE_UNKNOWN_COOPERATE = _reason("I am cooperating as I do not know the recipient's image, but I think should give "
+                                   "them a chance")
+_IMAGE_POSITIVE = _reason("I believe the agent this gossip is about is good and want to spread that belief to other "
+                          "agents I believe are good")
+_IMAGE_NEGATIVE = _reason("I believe the agent the gossip is about to have a bad image, I am warning those I believe "
+                          "are good")
+_NO_TWO_GOOD = _reason("I know no two good agents to be the recipient and the target of positive gossip")
+_NO_BAD = _reason("I know of no agents with bad standing to warn others about")
+_NO_GOOD = _reason("I know of no agents with good standing to warn of the agents with bad standing")
+_VERITABILITY_COOPERATE = _reason("The recipient has generally acted in a good manner")
+_VERITABILITY_UNKNOWN_COOPERATE = _reason("I don't know anything about the recipient, but I am giving them a chance")
+_VERITABILITY_DEFECT = _reason("The recipient's actions haven't been worthy of cooperation")
+_VERITABILITY_UNKNOWN_DEFECT = _reason("I don't know anything about the recipient, so I will protect myself and "
+                                       "defect")
+_VERITABILITY_POSITIVE = _reason("I believe the agent this gossip is about is trustworthy and want to spread that "
+                                 "belief to other agents I believe are trustworthy")
+_VERITABILITY_NEGATIVE = _reason("I believe the agent this gossip is about is untrustworthy and want to warn agents I "
+                                 "believe are trustworthy")
+_NO_TWO_TRUSTED = _reason("I know no two trustworthy agents to spread positive gossip to and about.")
+_NO_TRUSTED_OR_UNTRUSTED = _reason("I do not know any trustworthy or untrustworthy agents to gossip to or about")
+_NO_TRUSTED = _reason("I do not know any trustworthy agents to warn about untrustworthy agents")
+_NO_UNTRUSTED = _reason("I do not know any untrustworthy agents to warn trustworthy agents about")
+
+
+def _smallest_int_type(bound: int) -> type:
+    """
+    Get the smallest signed integer type that holds values from -bound to bound with a spare value below
+    :param bound: The greatest magnitude of the values to hold
+    :type bound: int
+    :return: The integer type
+    :rtype: type
+    """
+    for int_type in [np.int8, np.int16, np.int32]:
+        if np.iinfo(int_type).max >= bound:
+            return int_type
+    return np.int64
+
+
+class StrategyTable:
+    """The strategies of a community held as arrays of the parts of each strategy, indexed by strategy code"""
+
+    def __init__(self, strategies: List[Strategy]):
+        """
+        Break the strategies down into arrays, checking each is a strategy of the agents service
+        :param strategies: The strategies, their position in the list is their code
+        :type strategies: List[Strategy]
+        """
+        known = [(strategy['donor_strategy'], strategy['non_donor_strategy'], strategy['trust_model'],
+                  strategy['options']) for strategy in STRATEGIES]
+        for strategy in strategies:
+            if (strategy.donor_strategy, strategy.non_donor_strategy, strategy.trust_model,
+                    list(strategy.options)) not in known:
+                raise GenerationCreationException("No such strategy: " + str(strategy))
+        self._strategies: List[Strategy] = list(strategies)
+        self.donor_strategy: np.ndarray = np.array([_DONOR_STRATEGIES[strategy.donor_strategy]
+                                                    for strategy in strategies], dtype=np.int8)
+        self.non_donor_strategy: np.ndarray = np.array([_NON_DONOR_STRATEGIES[strategy.non_donor_strategy]
+                                                        for strategy in strategies], dtype=np.int8)
+        self.trust_model: np.ndarray = np.array([_TRUST_MODELS.get(strategy.trust_model, DISTRUSTING)
+                                                 for strategy in strategies], dtype=np.int8)
+        self.k: np.ndarray = np.array([strategy.options[0] if strategy.options else 0 for strategy in strategies],
+                                      dtype=np.int64)
+        self.personal_grievance: np.ndarray = np.array(["Personal Grievance" in strategy.options[1:]
+                                                        for strategy in strategies], dtype=bool)
+        self.positive_weight: np.ndarray = np.array([2 if strategy.trust_model == "Forgiving Reactor" else 1
+                                                     for strategy in strategies], dtype=np.int64)
+        self.negative_weight: np.ndarray = np.array([2 if strategy.trust_model == "Strong Reactor" else 1
+                                                     for strategy in strategies], dtype=np.int64)
+        # Random agents never promote themselves, so their reason is never used
+        self.promote_self_reason: np.ndarray = np.array([_PROMOTE_SELF.get(code, _RANDOM)
+                                                         for code in self.donor_strategy.tolist()], dtype=np.int16)
+
+    @property
+    def strategies(self) -> List[Strategy]:
+        """
+        Get the strategies in the order of their codes
+        :return: The strategies
+        :rtype: List[Strategy]
+        """
+        return self._strategies
+
+
+class _PerceptBatch:
+    """The action and gossip percepts of a timepoint, one entry per perceiver, each ordered by the id of the player
+    whose action it is a percept of (the order they are executed in)"""
+
+    def __init__(self, perceiver: np.ndarray, subject: np.ndarray, order: np.ndarray, positive: np.ndarray,
+                 interaction: np.ndarray, recipient: np.ndarray, gossiper: np.ndarray):
+        self.perceiver = perceiver
+        self.subject = subject
+        self.order = order
+        self.positive = positive
+        self.interaction = interaction
+        self.recipient = recipient
+        self.gossiper = gossiper
+
+    def for_rows(self, rows_of: np.ndarray) -> '_PerceptBatch':
+        """
+        Get the percepts of the perceivers with a row in a belief matrix, with the perceiver swapped for the row
+        :param rows_of: The row of each player in the belief matrix, or -1 if the player has none
+        :type rows_of: np.ndarray
+        :return: The percepts of the perceivers with rows
+        :rtype: _PerceptBatch
+        """
+        rows = rows_of[self.perceiver]
+        kept = rows >= 0
+        return _PerceptBatch(rows[kept], self.subject[kept], self.order[kept], self.positive[kept],
+                             self.interaction[kept], self.recipient[kept], self.gossiper[kept])
+
+
+def _first_by_order(keys: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """
+    Find the first entry, by order, for each distinct key
+    :param keys: The key of each entry
+    :type keys: np.ndarray
+    :param order: The order of each entry
+    :type order: np.ndarray
+    :return: The indices of the first entry of each key
+    :rtype: np.ndarray
+    """
+    by_key_and_order = np.lexsort((order, keys))
+    _, first = np.unique(keys[by_key_and_order], return_index=True)
+    return by_key_and_order[first]
+
+
+class ArrayGeneration:
+    """A generation simulated with arrays. Each timepoint has a donor-recipient pair, every player commits to an action
+    and the percepts of those actions revise the beliefs of their perceivers for the next timepoint, as with a
+    Generation, but beliefs are held in matrices with a row for each player of a strategy that holds them: whether
+    each agent has a bad standing, image scores and veritability ratings and percept counts. Every action is kept in a
+    compact log of arrays with a row for each timepoint and a column for each player."""
+
+    def __init__(self, strategy_codes: np.ndarray, table: StrategyTable, generation_id: int, start_point: int,
+                 end_point: int, num_of_onlookers: int, rng: np.random.RandomState):
+        """
+        Set up the arrays of the players of the generation and their beliefs
+        :param strategy_codes: The code of each player's strategy, in order of player id
+        :type strategy_codes: np.ndarray
+        :param table: The strategies of the community the codes index
+        :type table: StrategyTable
+        :param generation_id: The id of this generation
+        :type generation_id: int
+        :param start_point: The timepoint at which this generation begins
+        :type start_point: int
+        :param end_point: The timepoint at which this generation ends
+        :type end_point: int
+        :param num_of_onlookers: The number of onlookers for each action in this generation
+        :type num_of_onlookers: int
+        :param rng: The random number generator to make the generation's random choices with
+        :type rng: np.random.RandomState
+        """
+        if start_point >= end_point:
+            raise GenerationCreationException("start point >= end point")
+        if len(strategy_codes) < 2:
+            raise GenerationCreationException("a generation needs at least two players for a donor-recipient pair")
+        self._generation_id: int = generation_id
+        self._start_point: int = start_point
+        self._end_point: int = end_point
+        self._random: np.random.RandomState = rng
+        self._table: StrategyTable = table
+        self._strategy_codes: np.ndarray = np.asarray(strategy_codes, dtype=np.int32)
+        n = len(self._strategy_codes)
+        self._size: int = n
+        length = end_point - start_point
+        self._donor_strategy: np.ndarray = table.donor_strategy[self._strategy_codes]
+        self._non_donor_strategy: np.ndarray = table.non_donor_strategy[self._strategy_codes]
+        self._fitness: np.ndarray = np.zeros(n, dtype=np.int64)
+        # The action log
+        self._kinds: np.ndarray = np.zeros((length, n), dtype=np.int8)
+        self._values: np.ndarray = np.zeros((length, n), dtype=np.int8)
+        self._abouts: np.ndarray = np.full((length, n), -1, dtype=np.int32)
+        self._recipients: np.ndarray = np.full((length, n), -1, dtype=np.int32)
+        self._reasons: np.ndarray = np.zeros((length, n), dtype=np.int16)
+        self._donors: np.ndarray = np.zeros(length, dtype=np.int32)
+        self._onlookers: np.ndarray = np.zeros((length, 2 + min(num_of_onlookers, n - 2)), dtype=np.int32)
+        # The players who use each pair of donor and non donor strategies
+        self._by_strategies: Dict[Tuple[int, int], np.ndarray] = {}
+        for donor_strategy, non_donor_strategy in set(zip(self._donor_strategy.tolist(),
+                                                          self._non_donor_strategy.tolist())):
+            self._by_strategies[(donor_strategy, non_donor_strategy)] = np.flatnonzero(
+                (self._donor_strategy == donor_strategy) & (self._non_donor_strategy == non_donor_strategy))
+        # Beliefs of standing discriminators: whether each agent has a bad standing
+        self._standing_players = np.flatnonzero(self._donor_strategy == STANDING_DISCRIMINATOR)
+        self._standing_rows = self._rows_of(self._standing_players)
+        self._standing_trust = table.trust_model[self._strategy_codes[self._standing_players]]
+        self._bad = np.zeros((len(self._standing_players), n), dtype=bool)
+        self._bad_count = np.zeros(len(self._standing_players), dtype=np.int64)
+        # Beliefs of image scoring discriminators: an image score for each agent, held on 0 until perceived
+        self._image_players = np.flatnonzero(self._donor_strategy == IMAGE_SCORING_DISCRIMINATOR)
+        self._image_rows = self._rows_of(self._image_players)
+        self._image_trust = table.trust_model[self._strategy_codes[self._image_players]]
+        self._image_k = table.k[self._strategy_codes[self._image_players]]
+        self._image_grievance = table.personal_grievance[self._strategy_codes[self._image_players]]
+        self._scores = np.full((len(self._image_players), n), _NO_IMAGE_SCORE, dtype=np.int8)
+        self._image_good_count = np.where(self._image_k <= 0, n - 1, 0).astype(np.int64)
+        # Beliefs of veritability discerners: a rating and count of percepts for each agent, the rating changes by at
+        # most 40 and the count by 1 each timepoint
+        self._veritability_players = np.flatnonzero(self._donor_strategy == VERITABILITY_DISCERNER)
+        self._veritability_rows = self._rows_of(self._veritability_players)
+        self._veritability_k = table.k[self._strategy_codes[self._veritability_players]]
+        self._positive_weight = table.positive_weight[self._strategy_codes[self._veritability_players]]
+        self._negative_weight = table.negative_weight[self._strategy_codes[self._veritability_players]]
+        rating_type = _smallest_int_type(40 * length + 1)
+        self._no_rating = np.iinfo(rating_type).min
+        self._ratings = np.full((len(self._veritability_players), n), self._no_rating, dtype=rating_type)
+        self._counts = np.zeros((len(self._veritability_players), n), dtype=_smallest_int_type(length))
+        self._trusted_count = np.where(self._veritability_k <= 0, n - 1, 0).astype(np.int64)
+
+    def _rows_of(self, players: np.ndarray) -> np.ndarray:
+        """Get the row of each player in a belief matrix with a row for each of the players given, or -1"""
+        rows = np.full(self._size, -1, dtype=np.int64)
+        rows[players] = np.arange(len(players))
+        return rows
+
+    @property
+    def id(self) -> int:
+        """
+        Get the id of this generation
+        :return: The id of this generation
+        :rtype: int
+        """
+        return self._generation_id
+
+    def get_start_point(self) -> int:
+        """
+        Get the start timepoint of this generation
+        :return: The start timepoint of this generation
+        :rtype: int
+        """
+        return self._start_point
+
+    def get_end_point(self) -> int:
+        """
+        Get the end timepoint of this generation
+        :return: The end timepoint of this generation
+        :rtype: int
+        """
+        return self._end_point
+
+    @property
+    def size(self) -> int:
+        """
+        Get the number of players in this generation
+        :return: The number of players
+        :rtype: int
+        """
+        return self._size
+
+    @property
+    def strategy_codes(self) -> np.ndarray:
+        """
+        Get the code of each player's strategy in order of player id
+        :return: The strategy codes
+        :rtype: np.ndarray
+        """
+        return self._strategy_codes
+
+    @property
+    def fitness(self) -> np.ndarray:
+        """
+        Get the fitness of each player in order of player id
+        :return: The fitness of each player
+        :rtype: np.ndarray
+        """
+        return self._fitness
+
+    @property
+    def log(self) -> Dict[str, np.ndarray]:
+        """
+        Get the action log of the generation: the kind, value, reason code, about and recipient of every player's
+        action with a row for each timepoint, and the donor and onlookers of each timepoint's interaction
+        :return: The arrays of the action log
+        :rtype: Dict[str, np.ndarray]
+        """
+        return {'kinds': self._kinds, 'values': self._values, 'reasons': self._reasons, 'abouts': self._abouts,
+                'recipients': self._recipients, 'donors': self._donors, 'onlookers': self._onlookers}
+
+    def reason(self, t: int, player: int) -> str:
+        """
+        Get the reason a player gave for its action at a timepoint
+        :param t: The index of the timepoint within the generation
+        :type t: int
+        :param player: The id of the player
+        :type player: int
+        :return: The reason for the action
+        :rtype: str
+        """
+        return _REASONS[self._reasons[t, player]]
+
+    def standing(self, perceiver: int, about: int) -> str:
+        """
+        Get the standing a standing discriminator believes another agent to have
+        :param perceiver: The id of the standing discriminator
+        :type perceiver: int
+        :param about: The id of the agent the belief is about
+        :type about: int
+        :return: 'good' or 'bad'
+        :rtype: str
+        """
+        return 'bad' if self._bad[self._standing_rows[perceiver], about] else 'good'
+
+    def image_score(self, perceiver: int, about: int) -> Optional[int]:
+        """
+        Get the image score an image scoring discriminator holds for another agent
+        :param perceiver: The id of the image scoring discriminator
+        :type perceiver: int
+        :param about: The id of the agent the belief is about
+        :type about: int
+        :return: The image score, or None if the agent holds no image score for the other agent
+        :rtype: Optional[int]
+        """
+        score = self._scores[self._image_rows[perceiver], about]
+        return None if score == _NO_IMAGE_SCORE else int(score)
+
+    def veritability_rating(self, perceiver: int, about: int) -> Optional[int]:
+        """
+        Get the veritability rating a veritability discerner holds for another agent
+        :param perceiver: The id of the veritability discerner
+        :type perceiver: int
+        :param about: The id of the agent the belief is about
+        :type about: int
+        :return: The veritability rating, or None if the agent holds no rating for the other agent
+        :rtype: Optional[int]
+        """
+        rating = self._ratings[self._veritability_rows[perceiver], about]
+        return None if rating == self._no_rating else int(rating)
+
+    def percept_count(self, perceiver: int, about: int) -> Optional[int]:
+        """
+        Get the number of percepts a veritability discerner has had about another agent
+        :param perceiver: The id of the veritability discerner
+        :type perceiver: int
+        :param about: The id of the agent the belief is about
+        :type about: int
+        :return: The count of percepts, or None if the agent has had no percepts about the other agent
+        :rtype: Optional[int]
+        """
+        count = self._counts[self._veritability_rows[perceiver], about]
+        return None if count == 0 else int(count)
+
+    def simulate(self) -> NoReturn:
+        """
+        Run every timepoint between the start and end points of this generation
+        :return: NoReturn
+        """
+        for timepoint in range(self._start_point, self._end_point):
+            self._step(timepoint - self._start_point)
+
+    def release_beliefs(self) -> NoReturn:
+        """
+        Free the beliefs of the perceivers once the generation has been simulated, they are only needed to decide its
+        actions and hold a row for every perceiver about every player, so the beliefs can't be got after this
+        :return: NoReturn
+        """
+        self._bad = None
+        self._scores = None
+        self._ratings = None
+        self._counts = None
+
+    def _step(self, t: int) -> NoReturn:
+        """
+        Run a timepoint: choose the donor-recipient pair, decide every player's action, then execute the actions,
+        updating fitness and revising the perceivers' beliefs with the percepts of the actions
+        :param t: The index of the timepoint within the generation
+        :type t: int
+        :return: NoReturn
+        """
+        donor = self._random.randint(self._size)
+        recipient = self._random_others(np.array([donor]))[0]
+        self._donors[t] = donor
+        self._decide_as_donor(t, donor, recipient)
+        self._decide_as_non_donors(t, donor)
+        cooperated = self._values[t, donor] == COOPERATE
+        if cooperated:
+            self._fitness[donor] += InteractionContent.COOPERATE.value['donor_cost']
+            self._fitness[recipient] += InteractionContent.COOPERATE.value['recipient_gain']
+        onlookers = self._choose_onlookers(donor, recipient)
+        self._onlookers[t] = onlookers
+        gossipers = np.flatnonzero(self._kinds[t] == GOSSIP)
+        interaction_count = len(onlookers)
+        batch = _PerceptBatch(
+            perceiver=np.concatenate([onlookers, self._recipients[t, gossipers]]).astype(np.int64),
+            subject=np.concatenate([np.full(interaction_count, donor), self._abouts[t, gossipers]]).astype(np.int64),
+            order=np.concatenate([np.full(interaction_count, donor), gossipers]).astype(np.int64),
+            positive=np.concatenate([np.full(interaction_count, cooperated), self._values[t, gossipers] == POSITIVE]),
+            interaction=np.concatenate([np.ones(interaction_count, dtype=bool), np.zeros(len(gossipers), dtype=bool)]),
+            recipient=np.concatenate([np.full(interaction_count, recipient), np.zeros(len(gossipers))]).astype(
+                np.int64),
+            gossiper=np.concatenate([np.zeros(interaction_count), gossipers]).astype(np.int64))
+        self._revise_standing(batch.for_rows(self._standing_rows))
+        self._revise_image_scores(batch.for_rows(self._image_rows))
+        self._revise_veritability(batch.for_rows(self._veritability_rows))
+
+    def _random_others(self, players: np.ndarray) -> np.ndarray:
+        """
+        Choose a random other player for each of the players given
+        :param players: The ids of the players
+        :type players: np.ndarray
+        :return: The ids of the other players chosen
+        :rtype: np.ndarray
+        """
+        others = self._random.randint(self._size - 1, size=len(players))
+        return others + (others >= players)
+
+    def _random_others_of_two(self, firsts: np.ndarray, seconds: np.ndarray) -> np.ndarray:
+        """
+        Choose a random player other than both of two distinct players, for each pair of players given
+        :param firsts: The ids of the first of each pair
+        :type firsts: np.ndarray
+        :param seconds: The ids of the second of each pair
+        :type seconds: np.ndarray
+        :return: The ids of the other players chosen
+        :rtype: np.ndarray
+        """
+        others = self._random.randint(self._size - 2, size=len(firsts))
+        others += others >= np.minimum(firsts, seconds)
+        return others + (others >= np.maximum(firsts, seconds))
+
+    def _choose_onlookers(self, donor: int, recipient: int) -> np.ndarray:
+        """
+        Choose the onlookers of an interaction: the donor, the recipient and a random sample of the other players
+        :param donor: The id of the donor
+        :type donor: int
+        :param recipient: The id of the recipient
+        :type recipient: int
+        :return: The ids of the onlookers, the donor and recipient first
+        :rtype: np.ndarray
+        """
+        if self._onlookers.shape[1] == 2:
+            return np.array([donor, recipient])
+        sampled = self._random.choice(self._size - 2, self._onlookers.shape[1] - 2, replace=False)
+        sampled += sampled >= min(donor, recipient)
+        sampled += sampled >= max(donor, recipient)
+        return np.concatenate([[donor, recipient], sampled])
+
+    def _sample_where(self, count: int, allowed: Callable[[np.ndarray, np.ndarray], np.ndarray]) -> np.ndarray:
+        """
+        Choose a random agent for each of a number of choosers from the agents allowed for that chooser, by rejection
+        sampling uniformly from all the agents and falling back to listing the allowed agents for choosers that few
+        agents are allowed for. Each chooser must have at least one agent allowed.
+        :param count: The number of choosers
+        :type count: int
+        :param allowed: Whether agents are allowed, given the positions of the choosers and the ids of the agents
+        :type allowed: Callable[[np.ndarray, np.ndarray], np.ndarray]
+        :return: The id of the agent chosen for each chooser
+        :rtype: np.ndarray
+        """
+        chosen = np.full(count, -1, dtype=np.int64)
+        pending = np.arange(count)
+        for _ in range(_SAMPLING_ROUNDS):
+            if len(pending) == 0:
+                return chosen
+            candidates = self._random.randint(self._size, size=len(pending))
+            accepted = allowed(pending, candidates)
+            chosen[pending[accepted]] = candidates[accepted]
+            pending = pending[~accepted]
+        everyone = np.arange(self._size)
+        for position in pending:
+            choices = np.flatnonzero(allowed(np.full(self._size, position), everyone))
+            chosen[position] = choices[self._random.randint(len(choices))]
+        return chosen
+
+    def _log_idle(self, t: int, players: np.ndarray, reason: int) -> NoReturn:
+        """Log players committing to idle actions"""
+        self._kinds[t, players] = IDLE
+        self._reasons[t, players] = reason
+
+    def _log_gossip(self, t: int, players: np.ndarray, value: int, abouts: np.ndarray, recipients: np.ndarray,
+                    reasons: Union[int, np.ndarray]) -> NoReturn:
+        """Log players committing to gossip actions"""
+        self._kinds[t, players] = GOSSIP
+        self._values[t, players] = value
+        self._abouts[t, players] = abouts
+        self._recipients[t, players] = recipients
+        self._reasons[t, players] = reasons
+
+    def _decide_as_donor(self, t: int, donor: int, recipient: int) -> NoReturn:
+        """
+        Decide the donor's action for the timepoint and log it
+        :param t: The index of the timepoint within the generation
+        :type t: int
+        :param donor: The id of the donor
+        :type donor: int
+        :param recipient: The id of the recipient
+        :type recipient: int
+        :return: NoReturn
+        """
+        strategy = self._donor_strategy[donor]
+        if strategy == COOPERATOR:
+            value, reason = COOPERATE, _COOPERATOR
+        elif strategy == DEFECTOR:
+            value, reason = DEFECT, _DEFECTOR
+        elif strategy == RANDOM:
+            value, reason = (DEFECT, COOPERATE)[self._random.randint(2)], _RANDOM
+        elif strategy == STANDING_DISCRIMINATOR:
+            if self._bad[self._standing_rows[donor], recipient]:
+                value, reason = DEFECT, _STANDING_DEFECT
+            else:
+                value, reason = COOPERATE, _STANDING_COOPERATE
+        elif strategy == IMAGE_SCORING_DISCRIMINATOR:
+            row = self._image_rows[donor]
+            score = self._scores[row, recipient]
+            if score != _NO_IMAGE_SCORE:
+                value, reason = (DEFECT, _IMAGE_DEFECT) if self._image_k[row] > score else \
+                    (COOPERATE, _IMAGE_COOPERATE)
+            else:
+                value, reason = (DEFECT, _IMAGE_UNKNOWN_DEFECT) if self._image_k[row] > 0 else \
+                    (COOPERATE, _IMAGE_UNKNOWN_COOPERATE)
+        else:
+            row = self._veritability_rows[donor]
+            known = self._counts[row, recipient] > 0
+            if self._trusts(np.array([row]), np.array([recipient]))[0]:
+                value, reason = COOPERATE, _VERITABILITY_COOPERATE if known else _VERITABILITY_UNKNOWN_COOPERATE
+            else:
+                value, reason = DEFECT, _VERITABILITY_DEFECT if known else _VERITABILITY_UNKNOWN_DEFECT
+        self._kinds[t, donor] = INTERACTION
+        self._values[t, donor] = value
+        self._recipients[t, donor] = recipient
+        self._reasons[t, donor] = reason
+
+    def _decide_as_non_donors(self, t: int, donor: int) -> NoReturn:
+        """
+        Decide the actions of every player but the donor for the timepoint, a strategy at a time, and log them
+        :param t: The index of the timepoint within the generation
+        :type t: int
+        :param donor: The id of the donor
+        :type donor: int
+        :return: NoReturn
+        """
+        for (donor_strategy, code), players in sorted(self._by_strategies.items()):
+            players = players[players != donor]
+            if len(players) == 0:
+                continue
+            if code == LAZY:
+                self._log_idle(t, players, _LAZY)
+            elif code == PROMOTE_SELF:
+                self._log_gossip(t, players, POSITIVE, players, self._random_others(players),
+                                 self._table.promote_self_reason[self._strategy_codes[players]])
+            elif code == SPREAD_POSITIVE:
+                # Any agent may be gossiped about, so choose the recipient first to keep the choice of pair uniform
+                recipients = self._random_others(players)
+                self._log_gossip(t, players, POSITIVE, self._random_others(recipients), recipients, _SPREAD_POSITIVE)
+            elif code == SPREAD_NEGATIVE:
+                if self._size < 3:
+                    raise SimulationException("Error in player decision: Failed to find an action for this agent")
+                abouts = self._random_others(players)
+                self._log_gossip(t, players, NEGATIVE, abouts, self._random_others_of_two(players, abouts),
+                                 _SPREAD_NEGATIVE)
+            elif code == RANDOM_ACTION:
+                self._decide_random(t, players)
+            elif donor_strategy == STANDING_DISCRIMINATOR:
+                self._decide_standing(t, players, code)
+            elif donor_strategy == IMAGE_SCORING_DISCRIMINATOR:
+                self._decide_image_scoring(t, players, code)
+            else:
+                self._decide_veritability(t, players, code)
+
+    def _decide_random(self, t: int, players: np.ndarray) -> NoReturn:
+        """Decide the actions of random players, each uniformly from idling or either gossip about any agent to any
+        other agent"""
+        n = self._size
+        choices = self._random.randint(1 + 2 * n * (n - 1), size=len(players)).astype(np.int64)
+        idle = choices == 0
+        self._log_idle(t, players[idle], _RANDOM)
+        pairs, values = np.divmod(choices[~idle] - 1, 2)
+        abouts, recipients = np.divmod(pairs, n - 1)
+        recipients += recipients >= abouts
+        gossipers = players[~idle]
+        self._log_gossip(t, gossipers, values, abouts, recipients, _RANDOM)
+
+    def _gossip_among(self, t: int, players: np.ndarray, value: int, about_allowed: Callable,
+                      recipient_allowed: Callable, reason: int) -> NoReturn:
+        """
+        Log gossip about a random allowed agent to a random allowed agent other than the one it is about
+        :param t: The index of the timepoint within the generation
+        :type t: int
+        :param players: The ids of the gossipers
+        :type players: np.ndarray
+        :param value: POSITIVE or NEGATIVE
+        :type value: int
+        :param about_allowed: Whether agents may be gossiped about, given the positions of the gossipers and the ids
+        :type about_allowed: Callable
+        :param recipient_allowed: Whether agents may receive the gossip, given the positions of the gossipers and ids
+        :type recipient_allowed: Callable
+        :param reason: The code of the reason for the gossip
+        :type reason: int
+        :return: NoReturn
+        """
+        abouts = self._sample_where(len(players), about_allowed)
+        recipients = self._sample_where(len(players), lambda positions, agents: recipient_allowed(positions, agents) &
+                                        (agents != abouts[positions]))
+        self._log_gossip(t, players, value, abouts, recipients, reason)
+
+    def _decide_standing(self, t: int, players: np.ndarray, code: int) -> NoReturn:
+        """Decide the actions of standing discriminators that spread accurate gossip"""
+        rows = self._standing_rows[players]
+        good_others = self._size - 1 - (self._bad_count[rows] - self._bad[rows, players])
+
+        def good(positions, agents):
+            return ~self._bad[chosen_rows[positions], agents] & (agents != chosen[positions])
+
+        if code == SPREAD_ACCURATE_POSITIVE:
+            able = good_others >= 2
+            self._log_idle(t, players[~able], _NO_TWO_GOOD)
+            chosen, chosen_rows = players[able], rows[able]
+            self._gossip_among(t, chosen, POSITIVE, good, good, _STANDING_POSITIVE)
+        else:
+            no_bad = self._bad_count[rows] == 0
+            no_good = ~no_bad & (good_others == 0)
+            self._log_idle(t, players[no_bad], _NO_BAD)
+            self._log_idle(t, players[no_good], _NO_GOOD)
+            able = ~no_bad & ~no_good
+            chosen, chosen_rows = players[able], rows[able]
+            self._gossip_among(t, chosen, NEGATIVE, lambda positions, agents: self._bad[chosen_rows[positions], agents],
+                               good, _STANDING_NEGATIVE)
+
+    def _decide_image_scoring(self, t: int, players: np.ndarray, code: int) -> NoReturn:
+        """Decide the actions of image scoring discriminators that spread accurate gossip"""
+        rows = self._image_rows[players]
+        good_others = self._image_good_count[rows]
+
+        def good(positions, agents):
+            return self._image_trusts(chosen_rows[positions], agents) & (agents != chosen[positions])
+
+        def bad(positions, agents):
+            return ~self._image_trusts(chosen_rows[positions], agents) & (agents != chosen[positions])
+
+        if code == SPREAD_ACCURATE_POSITIVE:
+            able = good_others >= 2
+            self._log_idle(t, players[~able], _NO_TWO_GOOD)
+            chosen, chosen_rows = players[able], rows[able]
+            self._gossip_among(t, chosen, POSITIVE, good, good, _IMAGE_POSITIVE)
+        else:
+            no_good = good_others == 0
+            no_bad = ~no_good & (good_others == self._size - 1)
+            self._log_idle(t, players[no_good], _NO_GOOD)
+            self._log_idle(t, players[no_bad], _NO_BAD)
+            able = ~no_good & ~no_bad
+            chosen, chosen_rows = players[able], rows[able]
+            self._gossip_among(t, chosen, NEGATIVE, bad, good, _IMAGE_NEGATIVE)
+
+    def _decide_veritability(self, t: int, players: np.ndarray, code: int) -> NoReturn:
+        """Decide the actions of veritability discerners that spread gossip about trusted or untrusted agents"""
+        rows = self._veritability_rows[players]
+        trusted_others = self._trusted_count[rows]
+
+        def trusted(positions, agents):
+            return self._trusts(chosen_rows[positions], agents) & (agents != chosen[positions])
+
+        def untrusted(positions, agents):
+            return ~self._trusts(chosen_rows[positions], agents) & (agents != chosen[positions])
+
+        if code == SPREAD_POSITIVE_TRUSTED:
+            able = trusted_others >= 2
+            self._log_idle(t, players[~able], _NO_TWO_TRUSTED)
+            chosen, chosen_rows = players[able], rows[able]
+            self._gossip_among(t, chosen, POSITIVE, trusted, trusted, _VERITABILITY_POSITIVE)
+        else:
+            untrusted_others = self._size - 1 - trusted_others
+            neither = (trusted_others == 0) & (untrusted_others == 0)
+            no_trusted = ~neither & (trusted_others == 0)
+            no_untrusted = ~neither & ~no_trusted & (untrusted_others == 0)
+            self._log_idle(t, players[neither], _NO_TRUSTED_OR_UNTRUSTED)
+            self._log_idle(t, players[no_trusted], _NO_TRUSTED)
+            self._log_idle(t, players[no_untrusted], _NO_UNTRUSTED)
+            able = ~neither & ~no_trusted & ~no_untrusted
+            chosen, chosen_rows = players[able], rows[able]
+            recipients = self._sample_where(len(chosen), trusted)
+            self._log_gossip(t, chosen, NEGATIVE, self._sample_where(len(chosen), untrusted), recipients,
+                             _VERITABILITY_NEGATIVE)
+
+    def _image_trusts(self, rows: np.ndarray, agents: np.ndarray) -> np.ndarray:
+        """Check whether image scoring discriminators trust agents, those with no image score are held on 0"""
+        scores = self._scores[rows, agents]
+        return np.where(scores == _NO_IMAGE_SCORE, 0, scores) >= self._image_k[rows]
+
+    def _trusts(self, rows: np.ndarray, agents: np.ndarray) -> np.ndarray:
+        """Check whether veritability discerners trust agents, by rating per percept, those with no rating are held
+        on 0"""
+        ratings = self._ratings[rows, agents].astype(np.int64)
+        k = self._veritability_k[rows]
+        return np.where(ratings == self._no_rating, 0 >= k, ratings >= k * self._counts[rows, agents])
+
+    def _revise_standing(self, batch: _PerceptBatch) -> NoReturn:
+        """
+        Revise the standing discriminators' beliefs with the percepts of a timepoint. A bad standing is given to a
+        donor seen defecting against an agent of good standing or gossiped about negatively by a trusted agent, and
+        taken away by seeing them cooperate or by positive gossip from a trusted agent. Each percept is judged against
+        the beliefs held before the timepoint and the first change to a belief stands, so an agent held bad is only
+        bad after the timepoint if nothing says they are good, or something says they are bad after something first
+        says they are good.
+        :param batch: The percepts of the standing discriminators, with their rows as the perceivers
+        :type batch: _PerceptBatch
+        :return: NoReturn
+        """
+        if len(batch.perceiver) == 0:
+            return
+        rows = batch.perceiver
+        trust = self._standing_trust[rows]
+        trusted = (trust == NAIVE_TRUSTING) | ((trust == TRUSTING) & ~self._bad[rows, batch.gossiper])
+        gossip = ~batch.interaction & trusted
+        says_good = (batch.interaction | gossip) & batch.positive
+        says_bad = (batch.interaction & ~batch.positive & ~self._bad[rows, batch.recipient]) | \
+            (gossip & ~batch.positive)
+        keys = rows * self._size + batch.subject
+        unique_keys, groups = np.unique(keys, return_inverse=True)
+        never = np.iinfo(np.int64).max
+        first_good = np.full(len(unique_keys), never, dtype=np.int64)
+        np.minimum.at(first_good, groups[says_good], batch.order[says_good])
+        last_bad = np.full(len(unique_keys), -1, dtype=np.int64)
+        np.maximum.at(last_bad, groups[says_bad], batch.order[says_bad])
+        belief_rows, subjects = np.divmod(unique_keys, self._size)
+        before = self._bad[belief_rows, subjects]
+        after = np.where(before, (first_good == never) | (last_bad > first_good), last_bad >= 0)
+        self._bad[belief_rows, subjects] = after
+        np.add.at(self._bad_count, belief_rows, after.astype(np.int64) - before)
+
+    def _revise_image_scores(self, batch: _PerceptBatch) -> NoReturn:
+        """
+        Revise the image scoring discriminators' beliefs with the percepts of a timepoint. Cooperation and positive
+        gossip from a trusted agent raise an image score, defection and negative gossip lower it, by 1 or by 2 for an
+        interaction against a perceiver with a personal grievance, until the score reaches 5 or -5. Each percept is
+        judged against the scores held before the timepoint and the first change to a score stands.
+        :param batch: The percepts of the image scoring discriminators, with their rows as the perceivers
+        :type batch: _PerceptBatch
+        :return: NoReturn
+        """
+        if len(batch.perceiver) == 0:
+            return
+        rows = batch.perceiver
+        trust = self._image_trust[rows]
+        applies = batch.interaction | (trust == NAIVE_TRUSTING) | \
+            ((trust == TRUSTING) & self._image_trusts(rows, batch.gossiper))
+        change = np.where(batch.interaction & self._image_grievance[rows] &
+                          (batch.recipient == self._image_players[rows]), 2, 1)
+        old = self._scores[rows, batch.subject].astype(np.int64)
+        unknown = old == _NO_IMAGE_SCORE
+        new = np.where(batch.positive, np.where(unknown, change, np.where(old >= 5, old, old + change)),
+                       np.where(unknown, -change, np.where(old <= -5, old, old - change)))
+        changes = applies & (new != old)
+        keys = rows[changes] * self._size + batch.subject[changes]
+        first = _first_by_order(keys, batch.order[changes])
+        belief_rows, subjects = rows[changes][first], batch.subject[changes][first]
+        trusted_before = self._image_trusts(belief_rows, subjects)
+        self._scores[belief_rows, subjects] = new[changes][first]
+        self._count_change(self._image_good_count, self._image_players, belief_rows, subjects, trusted_before,
+                           self._image_trusts(belief_rows, subjects))
+
+    def _revise_veritability(self, batch: _PerceptBatch) -> NoReturn:
+        """
+        Revise the veritability discerners' beliefs with the percepts of a timepoint. Each percept about an agent
+        counts once a timepoint, and the first to change the rating stands: +20 for seeing a cooperation, -20 for
+        seeing a defection against a trusted agent, +/-10 for gossip from a trusted agent and +/-1 for gossip from an
+        untrusted agent, weighted by the trust model. Each percept is judged against the beliefs held before the
+        timepoint.
+        :param batch: The percepts of the veritability discerners, with their rows as the perceivers
+        :type batch: _PerceptBatch
+        :return: NoReturn
+        """
+        if len(batch.perceiver) == 0:
+            return
+        rows = batch.perceiver
+        gossip_weight = np.where(self._trusts(rows, batch.gossiper), 10, 1)
+        change = np.where(batch.interaction, 20, gossip_weight) * \
+            np.where(batch.positive, self._positive_weight[rows], -self._negative_weight[rows])
+        rated = ~batch.interaction | batch.positive | self._trusts(rows, batch.recipient)
+        keys = rows * self._size + batch.subject
+        belief_rows, subjects = np.divmod(np.unique(keys), self._size)
+        trusted_before = self._trusts(belief_rows, subjects)
+        self._counts[belief_rows, subjects] += 1
+        first = _first_by_order(keys[rated], batch.order[rated])
+        rating_rows, rating_subjects = rows[rated][first], batch.subject[rated][first]
+        ratings = self._ratings[rating_rows, rating_subjects].astype(np.int64)
+        self._ratings[rating_rows, rating_subjects] = np.where(ratings == self._no_rating, 0, ratings) + \
+            change[rated][first]
+        self._count_change(self._trusted_count, self._veritability_players, belief_rows, subjects, trusted_before,
+                           self._trusts(belief_rows, subjects))
+
+    @staticmethod
+    def _count_change(counts: np.ndarray, players: np.ndarray, rows: np.ndarray, subjects: np.ndarray,
+                      before: np.ndarray, after: np.ndarray) -> NoReturn:
+        """Keep the count of other agents each row of a belief matrix holds to be good up to date with changes"""
+        others = subjects != players[rows]
+        np.add.at(counts, rows[others], after[others].astype(np.int64) - before[others])
+
+
+class ArrayCommunity:
+    """A community simulated with arrays, with the same parameters and reproduction mechanism as a Community"""
+
+    def __init__(self, strategies: Dict[Strategy, int], num_of_onlookers: int = 5, num_of_generations: int = 10,
+                 length_of_generations: int = 30, mutation_chance: float = 0, seed: int = None,
+                 observers: List[Observer] = None):
+        """
+        Set the parameters for the community and the initial set of players to simulate the community with
+        :param strategies: The initial set of players to simulate the community
+        :type strategies: Dict[Strategy, int]
+        :param num_of_onlookers: The number of onlookers for each interaction
+        :type num_of_onlookers: int
+        :param num_of_generations: The number of generations the simulation will run
+        :type num_of_generations: int
+        :param length_of_generations: The number of rounds each generation will run for
+        :type length_of_generations: int
+        :param mutation_chance: The chance for mutation to occur in the reproduction of any one player
+        :type mutation_chance: float
+        :param seed: The seed for the random choices of the simulation, chosen with the random module if not given
+        :type seed: int
+        :param observers: Observers to tell as each generation starts, the generations keep their own results so the
+         observers aren't told of each action (defaults to none)
+        :type observers: List[Observer]
+        """
+        if num_of_onlookers <= 0:
+            raise CommunityCreationException("number of onlookers <= 0")
+        if length_of_generations <= 5:
+            raise CommunityCreationException("length of generations <= 5")
+        if num_of_generations <= 2:
+            raise CommunityCreationException("number of generations <= 2")
+        if mutation_chance > 1 or mutation_chance < 0:
+            raise CommunityCreationException("mutation chance should be a probability between 0 and 1")
+        self._mutation_chance: float = mutation_chance
+        self._num_of_onlookers: int = num_of_onlookers
+        self._num_of_generations: int = num_of_generations
+        self._length_of_generations: int = length_of_generations
+        self._first_strategies: Dict[Strategy, int] = strategies
+        self._table: StrategyTable = StrategyTable(list(strategies))
+        self._seed: int = seed if seed is not None else new_seed()
+        self._random: np.random.RandomState = np.random.RandomState(self._seed)
+        self._generations: List[ArrayGeneration] = []
+        self._strategy_count_by_generation: List[Dict[Strategy, int]] = []
+        self._current_time: int = 0
+        self._observers: List[Observer] = observers if observers is not None else []
+
+    @property
+    def seed(self) -> int:
+        """
+        Get the seed of the random choices of the simulation
+        :return: The seed
+        :rtype: int
+        """
+        return self._seed
+
+    def get_num_of_onlookers(self) -> int:
+        """
+        Get the number of onlookers for each interaction in this community
+        :return: The number of onlooker for each interaction
+        :rtype: int
+        """
+        return self._num_of_onlookers
+
+    def get_length_of_generations(self) -> int:
+        """
+        Get the number of rounds a generation runs for in this community
+        :return: The number of rounds a generation runs for
+        :rtype: int
+        """
+        return self._length_of_generations
+
+    def get_generations(self) -> List[ArrayGeneration]:
+        """
+        Get a list of the generations that this community encompasses
+        :return: A list of the generations that belong to this community
+        :rtype: List[ArrayGeneration]
+        """
+        return self._generations
+
+    def get_strategy_count_by_generation(self) -> List[Dict[Strategy, int]]:
+        """
+        Get the count of each strategy by generation
+        :return: The strategy count for each generation
+        :rtype: List[Dict[Strategy, int]]
+        """
+        return self._strategy_count_by_generation
+
+    @property
+    def strategies(self) -> List[Strategy]:
+        """
+        Get the strategies of the community, in the order of the codes the generations hold them by
+        :return: The strategies
+        :rtype: List[Strategy]
+        """
+        return self._table.strategies
+
+    def simulate(self) -> NoReturn:
+        """
+        Simulate the community, simulating the first generation from the initial set of players and each generation
+        after from the reproduction of the last
+        :return: NoReturn
+        """
+        for i in range(self._num_of_generations):
+            for observer in self._observers:
+                observer.add_generation(i)
+            if len(self._generations) <= 0:
+                strategy_count = self._first_strategies
+                codes = np.repeat(np.arange(len(strategy_count)), [count for count in strategy_count.values()])
+            else:
+                strategy_count, codes = self._reproduce()
+            generation = ArrayGeneration(codes, self._table, i, self._current_time,
+                                         self._current_time + self._length_of_generations, self._num_of_onlookers,
+                                         self._random)
+            generation.simulate()
+            # The results only need the log, fitness and strategies of each generation
+            generation.release_beliefs()
+            self._current_time += self._length_of_generations
+            self._strategy_count_by_generation.append(strategy_count)
+            self._generations.append(generation)
+
+    def _reproduce(self):
+        """
+        Choose the strategies of a new generation from the last generation, with the same distribution as the roulette
+        wheel selection via stochastic acceptance of a Community: each player is chosen in proportion to its fitness
+        over the maximal fitness (never if it is not positive), or uniformly if the maximal fitness is not positive,
+        and may mutate to one of the first generation's strategies
+        :return: The count of each strategy in the new generation, in the order the strategies were first chosen,
+         and the code of each new player's strategy
+        :rtype: Tuple[Dict[Strategy, int], np.ndarray]
+        """
+        last_generation = self._generations[-1]
+        fitness = last_generation.fitness
+        size = len(fitness)
+        if fitness.max() > 0:
+            weights = np.clip(fitness, 0, None).astype(np.float64)
+            parents = self._random.choice(size, size, p=weights / weights.sum())
+        else:
+            parents = self._random.randint(size, size=size)
+        chosen = last_generation.strategy_codes[parents]
+        mutated = self._random.random_sample(size) < self._mutation_chance
+        chosen[mutated] = self._random.randint(len(self._table.strategies), size=int(mutated.sum()))
+        codes, first = np.unique(chosen, return_index=True)
+        in_order = codes[np.argsort(first)]
+        counts = np.bincount(chosen, minlength=len(self._table.strategies))
+        return {self._table.strategies[code]: int(counts[code]) for code in in_order}, \
+            np.repeat(in_order, counts[in_order])
+
+
+class ArrayResults:
+    """The results of a game simulated with arrays, with the same properties as the Results of a game. Statistics are
+    taken from the arrays of each generation, and the actions are only built from the action logs when asked for."""
+
+    def __init__(self, community: ArrayCommunity):
+        """
+        Create the results of a community simulated with arrays
+        :param community: The community to get results and stats about
+        :type community: ArrayCommunity
+        """
+        self._community: ArrayCommunity = community
+        self._actions_by_generation_and_player: Dict[int, Dict[int, Dict[int, Action]]] = None
+        self._metrics: Optional[ActionMetrics] = None
+
+    @property
+    def seed(self) -> int:
+        """
+        Get the seed the community was simulated with, to reproduce the game with
+        :return: The seed of the community
+        :rtype: int
+        """
+        return self._community.seed
+
+    @property
+    def generations(self) -> List[int]:
+        """
+        Get a list of the generation ids for this community
+        :return: generation id list
+        :rtype: List[int]
+        """
+        return [generation.id for generation in self._community.get_generations()]
+
+    @property
+    def players(self) -> Dict[int, List[int]]:
+        """
+        Get a dictionary where the keys are the ids of each generation that point to a list of id's of
+        agents that belong to that generation
+        :return: Lists of players for each generation
+        :rtype: Dict[int, List[int]]
+        """
+        return {generation.id: list(range(generation.size)) for generation in self._community.get_generations()}
+
+    @property
+    def observers(self) -> List[Observer]:
+        """
+        Get a list of observers that need to be attached to the community, there are none as the generations keep
+        their own action logs
+        :return: observers list
+        :rtype: List[Observer]
+        """
+        return []
+
+    def _build_actions(self) -> Dict[int, Dict[int, Dict[int, Action]]]:
+        """
+        Build the actions from the action logs of each generation, once
+        :return: Every action organised by generation, player and timepoint
+        :rtype: Dict[int, Dict[int, Dict[int, Action]]]
+        """
+        if self._actions_by_generation_and_player is not None:
+            return self._actions_by_generation_and_player
+        self._actions_by_generation_and_player = {}
+        for generation in self._community.get_generations():
+            log = generation.log
+            by_player: Dict[int, Dict[int, Action]] = {player: {} for player in range(generation.size)}
+            for t in range(len(log['kinds'])):
+                timepoint = generation.get_start_point() + t
+                kinds, values, reasons = log['kinds'][t].tolist(), log['values'][t].tolist(), log['reasons'][t].tolist()
+                abouts, recipients = log['abouts'][t].tolist(), log['recipients'][t].tolist()
+                for player in range(generation.size):
+                    if kinds[player] == INTERACTION:
+                        action = InteractionAction(timepoint, player, generation.id, generation.reason(t, player),
+                                                   recipients[player], InteractionContent.COOPERATE if
+                                                   values[player] == COOPERATE else InteractionContent.DEFECT,
+                                                   log['onlookers'][t].tolist())
+                    elif kinds[player] == GOSSIP:
+                        action = GossipAction(timepoint, player, generation.id, generation.reason(t, player),
+                                              abouts[player], recipients[player], GossipContent.POSITIVE if
+                                              values[player] == POSITIVE else GossipContent.NEGATIVE)
+                    else:
+                        action = IdleAction(timepoint, player, generation.id, generation.reason(t, player))
+                    by_player[player][timepoint] = action
+            self._actions_by_generation_and_player[generation.id] = by_player
+        return self._actions_by_generation_and_player
+
+    @property
+    def actions(self) -> Dict[int, List[Action]]:
+        """
+        Get a dictionary where the key is the timepoint which points to a list of actions at that timepoint
+        :return: a dictionary of actions
+        :rtype: Dict[int, List[Action]]
+        """
+        actions: Dict[int, List[Action]] = {}
+        for generation_actions in self.actions_by_generation.values():
+            actions.update(generation_actions)
+        return actions
+
+    @property
+    def actions_by_generation(self) -> Dict[int, Dict[int, List[Action]]]:
+        """
+        Get a dictionary where the keys are generation ids, which point to another dictionary where the keys are
+        timepoints that point to a list of actions at that timepoint
+        :return: organised dictionary of actions
+        :rtype: Dict[int, Dict[int, List[Action]]]
+        """
+        actions_by_generation: Dict[int, Dict[int, List[Action]]] = {}
+        for generation in self._community.get_generations():
+            by_player = self._build_actions()[generation.id]
+            actions_by_generation[generation.id] = {
+                timepoint: [by_player[player][timepoint] for player in range(generation.size)]
+                for timepoint in range(generation.get_start_point(), generation.get_end_point())}
+        return actions_by_generation
+
+    @property
+    def actions_by_generation_and_player(self) -> Dict[int, Dict[int, Dict[int, Action]]]:
+        """
+        Get a dictionary where the keys are generation ids that point to a dictionary where they keys are agent ids
+        This points to a dictionary where the keys are timepoints that point to the agents action at that timepoint
+        :return: organised dictionary of actions
+        :rtype: Dict[int, Dict[int, Dict[int, Action]]]
+        """
+        return self._build_actions()
+
+    @property
+    def interactions(self) -> Dict[int, InteractionAction]:
+        """
+        Get a dictionary of the interactions in the community organised by timepoint (the keys)
+        :return: organised dictionary of interaction actions
+        :rtype: Dict[int, InteractionAction]
+        """
+        interactions: Dict[int, InteractionAction] = {}
+        for generation_interactions in self.interactions_by_generation.values():
+            interactions.update(generation_interactions)
+        return interactions
+
+    @property
+    def interactions_by_generation(self) -> Dict[int, Dict[int, InteractionAction]]:
+        """
+        Get a dictionary of the interactions that occurred where the keys are generation ids that point to a dictionary
+        where the keys are timepoints that point to the interaction action of that timepoint
+        :return: organised dictionary of interaction actions
+        :rtype: Dict[int, Dict[int, InteractionAction]]
+        """
+        interactions_by_generation: Dict[int, Dict[int, InteractionAction]] = {}
+        for generation in self._community.get_generations():
+            by_player = self._build_actions()[generation.id]
+            donors = generation.log['donors'].tolist()
+            interactions_by_generation[generation.id] = {
+                generation.get_start_point() + t: by_player[donor][generation.get_start_point() + t]
+                for t, donor in enumerate(donors)}
+        return interactions_by_generation
+
+    @property
+    def interactions_by_generation_and_player(self) -> Dict[int, Dict[int, Dict[int, InteractionAction]]]:
+        """
+        Get a dictionary of interactions organised with keys that are generations that point to a dictionary where
+        the keys are agent ids which point to a dictionary where the keys are timepoints that point to the
+        interaction action
+        :return: organised dictionary of interaction actions
+        :rtype: Dict[int, Dict[int, Dict[int, InteractionAction]]]
+        """
+        interactions_by_generation_and_player: Dict[int, Dict[int, Dict[int, InteractionAction]]] = {}
+        for generation_id, interactions in self.interactions_by_generation.items():
+            by_player: Dict[int, Dict[int, InteractionAction]] = {player: {} for player in self.players[generation_id]}
+            for timepoint, interaction in interactions.items():
+                by_player[interaction.donor][timepoint] = interaction
+            interactions_by_generation_and_player[generation_id] = by_player
+        return interactions_by_generation_and_player
+
+    def _counts(self, generation: ArrayGeneration) -> Dict[str, np.ndarray]:
+        """
+        Count each player's cooperations, defections, positive and negative gossip and non donor actions from the
+        action log of a generation
+        :param generation: The generation to count the actions of
+        :type generation: ArrayGeneration
+        :return: The counts for each player
+        :rtype: Dict[str, np.ndarray]
+        """
+        kinds, values = generation.log['kinds'], generation.log['values']
+        interaction, gossip = kinds == INTERACTION, kinds == GOSSIP
+        return {'cooperation': (interaction & (values == COOPERATE)).sum(axis=0),
+                'defection': (interaction & (values == DEFECT)).sum(axis=0),
+                'positive': (gossip & (values == POSITIVE)).sum(axis=0),
+                'negative': (gossip & (values == NEGATIVE)).sum(axis=0),
+                'non_donor': (~interaction).sum(axis=0)}
+
+    @property
+    def metrics(self) -> ActionMetrics:
+        """
+        Get the counts of each player's actions, to work out rates from or export as arrays, counted once
+        :return: The counts of the actions of every generation
+        :rtype: ActionMetrics
+        """
+        if self._metrics is None:
+            self._metrics = ActionMetrics()
+            for generation in self._community.get_generations():
+                counts = self._counts(generation)
+                self._metrics.add_generation(generation.id)
+                self._metrics.add_counts(generation.id, list(range(generation.size)),
+                                         np.stack([counts[name] for name in COUNTS], axis=1))
+        return self._metrics
+
+    @property
+    def cooperation_rate(self) -> Union[int, None]:
+        """
+        Get the cooperation rate (percentage of interaction actions that are cooperations) of the community or None
+        if there has been no interactions
+        :return: community's cooperation rate
+        :rtype: Union[int, None]
+        """
+        return self.metrics.rate(COOPERATION_RATE)
+
+    @property
+    def cooperation_rate_by_generation(self) -> Dict[int, Union[int, None]]:
+        """
+        Get the cooperation rate of each generation of the community, the keys of the dictionary are generation ids
+        and the values None if there has been no interactions
+        :return: each generation's cooperation rate
+        :rtype: Dict[int, Union[int, None]]
+        """
+        return self.metrics.rate_by_generation(COOPERATION_RATE)
+
+    @property
+    def cooperation_rate_by_generation_and_player(self) -> Dict[int, Dict[int, Union[int, None]]]:
+        """
+        Get the cooperation rate of each player in a dictionary with keys that are the generations, that point
+        to a dictionary where for each agent in that generation that agent's id is a key, the value None if the
+        player has not been a donor
+        :return: each player's cooperation rate
+        :rtype: Dict[int, Dict[int, Union[int, None]]]
+        """
+        return self.metrics.rate_by_generation_and_player(COOPERATION_RATE)
+
+    @property
+    def social_activeness(self) -> Union[int, None]:
+        """
+        Get the social activeness (percentage of non-donor actions that are gossip actions) of the whole community or
+        None if there has been no non-donor actions
+        :return: social activeness of the community as a whole
+        :rtype: Union[int, None]
+        """
+        return self.metrics.rate(SOCIAL_ACTIVENESS)
+
+    @property
+    def social_activeness_by_generation(self) -> Dict[int, Union[int, None]]:
+        """
+        Get the social activeness of each generation of the community as a dictionary where the keys are the
+        generation ids
+        :return: social activeness of each generation
+        :rtype: Dict[int, Union[int, None]]
+        """
+        return self.metrics.rate_by_generation(SOCIAL_ACTIVENESS)
+
+    @property
+    def social_activeness_by_generation_and_player(self) -> Dict[int, Dict[int, Union[int, None]]]:
+        """
+        Get the social activeness of each player, organised with keys that are each generation id pointing to
+        a dictionary where for each player of that generation the key is that player's id
+        :return: the social activeness of each player
+        :rtype: Dict[int, Dict[int, Union[int, None]]]
+        """
+        return self.metrics.rate_by_generation_and_player(SOCIAL_ACTIVENESS)
+
+    @property
+    def positivity_of_gossip_percentage(self) -> Union[int, None]:
+        """
+        Get the positivity of the gossip (percentage of gossip actions where the content was positive) for the whole
+        community or None if there has been no gossip
+        :return: positivity of gossip of the community
+        :rtype: Union[int, None]
+        """
+        return self.metrics.rate(POSITIVITY_OF_GOSSIP)
+
+    @property
+    def positivity_of_gossip_percentage_by_generation(self) -> Dict[int, Union[int, None]]:
+        """
+        Get the positivity of the gossip for each generation of the community
+        :return: positivity of gossip of the each generation
+        :rtype: Dict[int, Union[int, None]]
+        """
+        return self.metrics.rate_by_generation(POSITIVITY_OF_GOSSIP)
+
+    @property
+    def positivity_of_gossip_percentage_by_generation_and_player(self) -> Dict[int, Dict[int, Union[int, None]]]:
+        """
+        Get the positivity of gossip of each player in the community as a dictionary organised with the keys as each
+        generation's id pointing to a dictionary where the keys are the ids of all the agents
+        :return: the positivity of each players gossip
+        :rtype: Dict[int, Dict[int, Union[int, None]]]
+        """
+        return self.metrics.rate_by_generation_and_player(POSITIVITY_OF_GOSSIP)
+
+    @property
+    def corrupted_observations(self) -> bool:
+        """
+        Have the results been corrupted in any way, they cannot be as the generations record their own actions
+        :return: If the observations have been corrupted
+        :rtype: bool
+        """
+        return False
+
+    @property
+    def community_fitness(self) -> int:
+        """
+        Get the summation of the fitness of all the players in the community
+        :return: fitness of all the community's players
+        :rtype: int
+        """
+        return int(sum(generation.fitness.sum() for generation in self._community.get_generations()))
+
+    @property
+    def fitness_by_generation(self) -> Dict[int, int]:
+        """
+        Get the summation of the fitness of all the player of each generation as a dictionary where the keys are
+        each generations id
+        :return: the summation of each generation's players fitness
+        :rtype: Dict[int, int]
+        """
+        return {generation.id: int(generation.fitness.sum()) for generation in self._community.get_generations()}
+
+    @property
+    def fitness_by_generation_and_player(self) -> Dict[int, Dict[int, int]]:
+        """
+        Get the fitness of each player organised in a dictionary where the keys are generation ids which point to
+        another dictionary in which the keys are player ids that point to the fitness of that player
+        :return: the fitness of each player
+        :rtype: Dict[int, Dict[int, int]]
+        """
+        return {generation.id: dict(enumerate(generation.fitness.tolist()))
+                for generation in self._community.get_generations()}
+
+    @property
+    def populations(self) -> List[Dict[Strategy, int]]:
+        """
+        Get the count of each strategy for each generation to see how the population of strategies fluctuates
+        :return: The population in terms of strategies of each generation
+        :rtype: List[Dict[Strategy, int]]
+        """
+        return self._community.get_strategy_count_by_generation()
+
+    @property
+    def id_to_strategy_map(self) -> Dict[int, Dict[int, Strategy]]:
+        """
+        Get a map which maps the id of each player to it's strategy
+        :return: dictionary which maps players to strategies
+        :rtype: Dict[int, Dict[int, Strategy]]
+        """
+        strategies = self._community.strategies
+        return {generation.id: {player: strategies[code] for player, code in
+                                enumerate(generation.strategy_codes.tolist())}
+                for generation in self._community.get_generations()}
+
+
+class ArrayReputationGame(ReputationGame):
+    """A reputation game simulated with arrays rather than through the agents' minds, so populations of many thousands
+    of players are practical"""
+
+    engine = 'array'
+
+    def __init__(self, initial_strategies: List[Dict], num_of_onlookers: int = 5, num_of_generations: int = 10,
+                 length_of_generations: int = 30, mutation_chance: float = 0, seed: int = None,
+                 observers: List[Observer] = None):
+        """
+        Create a new reputation game with the parameters passed
+        :param initial_strategies: A list of the strategies to use in the first generation of the community
+        :type initial_strategies: List[Dict]
+        :param num_of_onlookers: the number of onlookers for each interaction (defaults to 5)
+        :type num_of_onlookers: int
+        :param num_of_generations: The number of generations that will be part of this community when run (defaults to
+        10)
+        :type num_of_generations: int
+        :param length_of_generations: The number of timepoints in each generation (defaults to 30)
+        :type length_of_generations: int
+        :param mutation_chance: The chance for mutation to occur in the reproduction of any one player
+        :type mutation_chance: float
+        :param seed: The seed for the random choices of the simulation, random if not given
+        :type seed: int
+        :param observers: Observers to tell as each generation starts (defaults to none)
+        :type observers: List[Observer]
+        """
+        super().__init__(initial_strategies, num_of_onlookers, num_of_generations, length_of_generations,
+                         mutation_chance, observers=observers, seed=seed)
+
+    @property
+    def seeded_play(self) -> bool:
+        """
+        Get whether the game's play is wholly determined by its seed, always so with arrays
+        :return: True
+        :rtype: bool
+        """
+        return True
+
+    def _simulate(self) -> ArrayResults:
+        """
+        Simulate the game with arrays
+        :return: the statistics and results of the game
+        :rtype: ArrayResults
+        """
+        community = ArrayCommunity(self._community_strategies(), num_of_onlookers=self._num_of_onlookers,
+                                   num_of_generations=self._num_of_generations,
+                                   length_of_generations=self._length_of_generations,
+                                   mutation_chance=self._mutation_chance, seed=self._seed,
+                                   observers=self._observers)
+        community.simulate()
+        return ArrayResults(community)
+
+    async def run_async(self, async_client: AsyncAgentsClient = None) -> ArrayResults:
+        """
+        Run the game as with run, there are no requests to the agents service to send concurrently
+        :param async_client: Unused, the game makes no requests
+        :type async_client: AsyncAgentsClient
+        :return: the statistics and results of the game
+        :rtype: ArrayResults
+        """
+        return self.run()
@@ -0,0 +1,206 @@
+"""array_engine_tests.py: Tests for the functionality of the array_engine_logic.py module, checking the array engine
+follows the same rules as the agents' minds and gives the same results surface as a reputation game"""
+
+__author__ = "James King"
+
+import unittest
+from typing import Dict, List
+import numpy as np
+from .array_engine_logic import ArrayCommunity, ArrayGeneration, ArrayReputationGame, ArrayResults, StrategyTable, \
+    INTERACTION, GOSSIP, COOPERATE, POSITIVE
+from .community_logic import CommunityCreationException
+from .generation_logic import GenerationCreationException
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .observation_logic import ActionObserver
+from .player_logic import PlayerState
+from .action_logic import ActionType
+from .strategy_logic import Strategy
+
+
+def _strategy(strategy: Dict) -> Strategy:
+    return Strategy(strategy['donor_strategy'], strategy['non_donor_strategy'], strategy['trust_model'],
+                    strategy['options'])
+
+
+class ArrayEngineTest(unittest.TestCase):
+    """Test the ArrayGeneration, ArrayCommunity, ArrayResults and ArrayReputationGame classes"""
+
+    def _percepts(self, generation: ArrayGeneration, t: int) -> List[Dict]:
+        """Build the percepts of a timepoint of an array generation in the order the environment would send them"""
+        log = generation.log
+        percepts = []
+        for player in range(generation.size):
+            common = {'community': 0, 'generation': 0, 'timepoint': t}
+            if log['kinds'][t, player] == INTERACTION:
+                for onlooker in log['onlookers'][t].tolist():
+                    percepts.append(dict(common, type='action/interaction', perceiver=onlooker, donor=player,
+                                         recipient=int(log['recipients'][t, player]),
+                                         action='cooperate' if log['values'][t, player] == COOPERATE else 'defect'))
+            elif log['kinds'][t, player] == GOSSIP:
+                percepts.append(dict(common, type='action/gossip', perceiver=int(log['recipients'][t, player]),
+                                     gossiper=player, about=int(log['abouts'][t, player]),
+                                     gossip='positive' if log['values'][t, player] == POSITIVE else 'negative'))
+        return percepts
+
+    def _check_against_minds(self, strategies: List[Dict], length: int, seed: int):
+        """Simulate a generation with arrays, then replay its interactions and percepts to the agents' minds of the
+        local backend, checking every deterministic decision and the final beliefs are the same"""
+        table = StrategyTable([_strategy(strategy) for strategy in strategies])
+        generation = ArrayGeneration(np.arange(len(strategies)), table, 0, 0, length, 3, np.random.RandomState(seed))
+        generation.simulate()
+        log = generation.log
+        backend = LocalAgentsBackend(seed=0)
+        community = backend.create_community()['id']
+        backend.create_generation(community, 0)
+        for player, strategy in enumerate(strategies):
+            backend.create_agent({'donor_strategy': strategy['donor_strategy'],
+                                  'non_donor_strategy': strategy['non_donor_strategy'],
+                                  'trust_model': strategy['trust_model'], 'options': strategy['options'],
+                                  'community': community, 'generation': 0, 'player': player})
+        for t in range(length):
+            donor = int(log['donors'][t])
+            backend.send_interaction({'community': community, 'generation': 0, 'donor': donor,
+                                      'recipient': int(log['recipients'][t, donor]), 'timepoint': t})
+            if t > 0:
+                backend.send_percepts(self._percepts(generation, t - 1))
+            for player, strategy in enumerate(strategies):
+                action = backend.get_action(community, 0, player, t)['action']
+                if strategy['donor_strategy'] == "Random":
+                    continue
+                with self.subTest(timepoint=t, player=player, strategy=strategy['description']):
+                    kind = {'idle': 0, 'action': INTERACTION, 'gossip': GOSSIP}[action['type']]
+                    self.assertEqual(kind, log['kinds'][t, player])
+                    self.assertEqual(action['reason'], generation.reason(t, player))
+                    if action['type'] == 'action':
+                        self.assertEqual(action['value'] == 'cooperate', log['values'][t, player] == COOPERATE)
+                    elif action['type'] == 'gossip':
+                        self.assertEqual(action['value'] == 'positive', log['values'][t, player] == POSITIVE)
+        backend.send_percepts(self._percepts(generation, length - 1))
+        for player, strategy in enumerate(strategies):
+            mind = backend.get_mind(community, 0, player)
+            beliefs = {"Standing Discriminator": ['standing'], "Image Scoring Discriminator": ['image_score'],
+                       "Veritability Discerner": ['veritability_rating', 'percept_count']}
+            for belief in beliefs.get(strategy['donor_strategy'], []):
+                for about in range(len(strategies)):
+                    with self.subTest(player=player, about=about, belief=belief):
+                        self.assertEqual(getattr(mind, belief)(about, length),
+                                         getattr(generation, belief)(player, about))
+
+    def test_matches_minds(self):
+        # Every decision that is not a random choice, and every belief, should be the same as the agents' minds'
+        for offset in range(6):
+            self._check_against_minds(STRATEGIES[offset::6], 25, offset)
+
+    def test_matches_minds_of_one_kind(self):
+        # Players holding the same kind of beliefs gossip to and about each other, exercising belief revision
+        for donor_strategy in ["Standing Discriminator", "Image Scoring Discriminator", "Veritability Discerner"]:
+            strategies = [strategy for strategy in STRATEGIES if strategy['donor_strategy'] == donor_strategy]
+            self._check_against_minds(strategies[::max(1, len(strategies) // 24)] + STRATEGIES[:6], 30, 3)
+
+    def test_results_match_observers(self):
+        # The statistics of the results should be those the observers would record from the same actions
+        game = ArrayReputationGame([dict(strategy, count=2) for strategy in STRATEGIES[::3]], num_of_onlookers=4,
+                                   num_of_generations=3, length_of_generations=12, mutation_chance=0.1, seed=8)
+        results: ArrayResults = game.run()
+        observer = ActionObserver(0)
+        for generation in results.generations:
+            observer.add_generation(generation)
+            for player in results.players[generation]:
+                observer.add_player(generation, player)
+        for timepoint, actions in sorted(results.actions.items()):
+            for action in actions:
+                PlayerState(action.generation, action.actor, [observer]).new_action = action
+        for statistic in ['cooperation_rate', 'cooperation_rate_by_generation',
+                          'cooperation_rate_by_generation_and_player', 'social_activeness',
+                          'social_activeness_by_generation', 'social_activeness_by_generation_and_player',
+                          'positivity_of_gossip_percentage', 'positivity_of_gossip_percentage_by_generation',
+                          'positivity_of_gossip_percentage_by_generation_and_player', 'interactions',
+                          'interactions_by_generation', 'interactions_by_generation_and_player',
+                          'actions_by_generation_and_player']:
+            with self.subTest(statistic=statistic):
+                self.assertEqual(getattr(observer, statistic), getattr(results, statistic))
+        self.assertFalse(results.corrupted_observations)
+        self.assertEqual([0, 1, 2], results.generations)
+        self.assertEqual(3 * 12, len(results.actions))
+
+    def test_fitness(self):
+        # Each player's fitness should come from the payoffs of the interactions they were part of
+        results = ArrayReputationGame([dict(strategy, count=3) for strategy in STRATEGIES[::5]],
+                                      num_of_generations=3, length_of_generations=20, seed=2).run()
+        for generation in results.generations:
+            fitness = {player: 0 for player in results.players[generation]}
+            for interaction in results.interactions_by_generation[generation].values():
+                fitness[interaction.donor] += interaction.action.value['donor_cost']
+                fitness[interaction.recipient] += interaction.action.value['recipient_gain']
+            self.assertEqual(fitness, results.fitness_by_generation_and_player[generation])
+            self.assertEqual(sum(fitness.values()), results.fitness_by_generation[generation])
+        self.assertEqual(sum(results.fitness_by_generation.values()), results.community_fitness)
+
+    def test_interactions(self):
+        # Each interaction should have the donor and recipient as its first onlookers, with distinct others after
+        results = ArrayReputationGame([dict(strategy, count=1) for strategy in STRATEGIES[:12]], num_of_onlookers=5,
+                                      num_of_generations=3, length_of_generations=15, seed=5).run()
+        for timepoint, interaction in results.interactions.items():
+            self.assertIs(ActionType.INTERACTION, interaction.type)
+            self.assertNotEqual(interaction.donor, interaction.recipient)
+            self.assertEqual([interaction.donor, interaction.recipient], interaction.onlookers[:2])
+            self.assertEqual(7, len(set(interaction.onlookers)))
+            self.assertIn(interaction, results.actions[timepoint])
+
+    def test_cooperators_and_defectors(self):
+        # Cooperators should always cooperate and defectors always defect, so the fittest take over
+        strategies = [dict(STRATEGIES[0], count=10), dict(STRATEGIES[3], count=10)]
+        results = ArrayReputationGame(strategies, num_of_generations=4, length_of_generations=40, seed=1).run()
+        for generation in results.generations:
+            for player, rate in results.cooperation_rate_by_generation_and_player[generation].items():
+                strategy = results.id_to_strategy_map[generation][player]
+                if rate is not None:
+                    self.assertEqual(100 if strategy.donor_strategy == "Cooperator" else 0, rate)
+            self.assertEqual(20, sum(results.populations[generation].values()))
+            self.assertEqual(0, results.social_activeness_by_generation[generation])
+            self.assertIsNone(results.positivity_of_gossip_percentage_by_generation[generation])
+        self.assertEqual({_strategy(STRATEGIES[0]): 10, _strategy(STRATEGIES[3]): 10}, results.populations[0])
+
+    def test_seed(self):
+        # The same seed should give the same game
+        strategies = [dict(strategy, count=1) for strategy in STRATEGIES[::4]]
+        first = ArrayReputationGame(strategies, num_of_generations=3, length_of_generations=10, seed=11).run()
+        second = ArrayReputationGame(strategies, num_of_generations=3, length_of_generations=10, seed=11).run()
+        self.assertEqual(first.fitness_by_generation_and_player, second.fitness_by_generation_and_player)
+        self.assertEqual(first.populations, second.populations)
+
+    def test_large_population(self):
+        # A population of ten thousand players should be simulated without building their actions
+        strategies = [dict(strategy, count=50) for strategy in STRATEGIES] + [dict(STRATEGIES[0], count=50)]
+        results = ArrayReputationGame(strategies, num_of_generations=3, length_of_generations=10, seed=3).run()
+        self.assertEqual(10000, len(results.players[2]))
+        self.assertEqual(10000, sum(results.populations[2].values()))
+        self.assertEqual(3, len(results.cooperation_rate_by_generation))
+        self.assertEqual(10000, len(results.fitness_by_generation_and_player[1]))
+
+    def test_beliefs_released(self):
+        # The beliefs of each generation should be freed once it is simulated, the results not needing them
+        strategies = [dict(strategy, count=2) for strategy in STRATEGIES[::3]]
+        game = ArrayReputationGame(strategies, num_of_generations=3, length_of_generations=10, seed=4)
+        community = ArrayCommunity({_strategy(strategy): 2 for strategy in STRATEGIES[::3]}, num_of_generations=3,
+                                   length_of_generations=10, seed=4)
+        community.simulate()
+        for generation in community.get_generations():
+            self.assertEqual([None] * 4, [generation._bad, generation._scores, generation._ratings,
+                                          generation._counts])
+        self.assertEqual(game.run().fitness_by_generation_and_player,
+                         ArrayResults(community).fitness_by_generation_and_player)
+
+    def test_creation_exceptions(self):
+        # The array engine should refuse the same parameters as a community, and strategies the agents can't use
+        with self.assertRaises(CommunityCreationException):
+            ArrayReputationGame([dict(STRATEGIES[0], count=5)], num_of_generations=2).run()
+        with self.assertRaises(CommunityCreationException):
+            ArrayReputationGame([dict(STRATEGIES[0], count=5)], length_of_generations=5).run()
+        with self.assertRaises(GenerationCreationException):
+            ArrayReputationGame([{'donor_strategy': "Capability", 'non_donor_strategy': "Lazy", 'trust_model': "Void",
+                                  'options': [], 'count': 5}]).run()
+
+
+if __name__ == '__main__':
+    unittest.main()
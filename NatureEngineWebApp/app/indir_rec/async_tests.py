@@ -0,0 +1,154 @@
+"""async_tests.py: Tests for simulating communities and generations with the asynchronous driver"""
+
+__author__ = "James King"
+
+import unittest
+import asyncio
+import random
+from unittest.mock import patch
+from .agents_client_logic import AgentsClient, AsyncAgentsClient
+from .mock_agents_service import MockAgentsService
+from .generation_logic import Generation, SimulationException
+from .observation_logic import ActionObserver
+from .facade_logic import ReputationGame
+from .strategy_logic import Strategy
+
+
+class AsyncSimulationTest(unittest.TestCase):
+    """Test the asynchronous simulation of generations and communities against the mock agents service"""
+
+    def setUp(self):
+        self.service = MockAgentsService(latency=0.01)
+        self.service.start()
+        self.client = AgentsClient(self.service.url)
+        self.strategies = {Strategy("Defector", "Lazy", "Void", []): 4, Strategy("Cooperator", "Lazy", "Void", []): 4}
+
+    def tearDown(self):
+        self.client.close()
+        self.service.stop()
+
+    def _simulate(self, simulate_async: bool, concurrency: int = 20, batched_steps: bool = False,
+                  pipelined: bool = False):
+        community = self.client.create_community()['id']
+        observer = ActionObserver(community)
+        observer.add_generation(0)
+        generation = Generation(self.strategies, 0, community, 0, 8, 3, [observer], batched_steps=batched_steps,
+                                agents_client=self.client, local_decisions=False, pipelined=pipelined)
+        self.generation = generation
+
+        async def simulate():
+            async with AsyncAgentsClient(self.service.url, concurrency=concurrency) as async_client:
+                await generation.simulate_async(async_client)
+
+        if simulate_async:
+            asyncio.get_event_loop().run_until_complete(simulate())
+        else:
+            generation.simulate()
+        return observer
+
+    def test_matches_sync(self):
+        # The same seed should give the same actions in the same order with either driver
+        random.seed(4)
+        sync_observer = self._simulate(False)
+        random.seed(4)
+        async_observer = self._simulate(True)
+        for timepoint in range(8):
+            self.assertEqual([(action.actor, action.type, action.reason)
+                              for action in sync_observer.actions[timepoint]],
+                             [(action.actor, action.type, action.reason)
+                              for action in async_observer.actions[timepoint]])
+            self.assertEqual(sync_observer.interactions[timepoint].onlookers,
+                             async_observer.interactions[timepoint].onlookers)
+
+    def test_pipelined_matches_sequential(self):
+        # Sending the next pair early shouldn't change the actions, with either driver in either step mode
+        for simulate_async, batched_steps in [(True, False), (True, True), (False, False), (False, True)]:
+            with self.subTest(simulate_async=simulate_async, batched_steps=batched_steps):
+                random.seed(5)
+                sequential = self._simulate(simulate_async, batched_steps=batched_steps)
+                requests_before = len(self.service.requests)
+                random.seed(5)
+                pipelined = self._simulate(simulate_async, batched_steps=batched_steps, pipelined=True)
+                for timepoint in range(8):
+                    self.assertEqual([(action.actor, action.type, action.reason)
+                                      for action in sequential.actions[timepoint]],
+                                     [(action.actor, action.type, action.reason)
+                                      for action in pipelined.actions[timepoint]])
+                    self.assertEqual(sequential.interactions[timepoint].onlookers,
+                                     pipelined.interactions[timepoint].onlookers)
+                # Batched steps send each pair along with the step rather than ahead of it
+                self.assertEqual(0 if batched_steps else 8,
+                                 self.service.requests[requests_before:].count('POST percept/interaction'))
+
+    def test_pipeline_overlap(self):
+        # The pair of the next timepoint should be sent while the decisions of the last are in flight, from a worker
+        # thread when simulating synchronously
+        for simulate_async in [True, False]:
+            with self.subTest(simulate_async=simulate_async):
+                self._simulate(simulate_async)
+                self.assertLess(self.generation.timings.overlap, 0.01)
+                self._simulate(simulate_async, pipelined=True)
+                timings = self.generation.timings
+                self.assertGreater(timings.seconds('pair'), 0.07)
+                self.assertGreater(timings.overlap, 0.05)
+                self.assertLess(timings.seconds('overall'), sum(timings.seconds(stage) for stage in timings.STAGES))
+
+    def test_pipeline_failure(self):
+        # A pair the agents service rejects on the worker thread should fail the simulation, without leaving the
+        # worker sending more
+        generation = Generation(self.strategies, 0, self.client.create_community()['id'], 0, 8, 3, [],
+                                batched_steps=False, agents_client=self.client, local_decisions=False, pipelined=True)
+        with patch.object(MockAgentsService, '_new_interaction',
+                          side_effect=[True, True, "No such community, generation or agents"]):
+            with self.assertRaises(SimulationException):
+                generation.simulate()
+        self.assertEqual(3, self.service.request_count('POST percept/interaction'))
+
+    def test_async_pipeline_failure(self):
+        # The pair of the next timepoint should be cancelled and finished with when the decisions fail, before the
+        # simulation fails, rather than left to the client that is about to close
+        generation = Generation(self.strategies, 0, self.client.create_community()['id'], 0, 8, 3, [],
+                                batched_steps=False, agents_client=self.client, local_decisions=False, pipelined=True)
+        send_pair = generation._send_pair_async
+        finished = []
+
+        async def track_pair(timepoint, async_client):
+            try:
+                return await send_pair(timepoint, async_client)
+            finally:
+                finished.append(timepoint)
+
+        async def fail_step(*args):
+            # Let the pair of the next timepoint be sent first
+            await asyncio.sleep(0)
+            raise SimulationException("Error in player decision")
+
+        async def simulate():
+            async with AsyncAgentsClient(self.service.url) as async_client:
+                with self.assertRaises(SimulationException):
+                    await generation.simulate_async(async_client)
+                self.assertEqual([0, 1], finished)
+
+        with patch.object(generation, '_send_pair_async', side_effect=track_pair), \
+                patch.object(generation, '_step_per_player_async', side_effect=fail_step):
+            asyncio.get_event_loop().run_until_complete(simulate())
+
+    def test_concurrency_cap(self):
+        # Requests should be sent concurrently but never more than the cap at once
+        self._simulate(True, concurrency=3)
+        self.assertGreater(self.service.max_in_flight, 1)
+        self.assertLessEqual(self.service.max_in_flight, 3)
+
+    def test_run_async(self):
+        # A whole game should run through the asynchronous entry point
+        game = ReputationGame([{'donor_strategy': "Defector", 'non_donor_strategy': "Lazy", 'trust_model': "Void",
+                                'options': [], 'count': 5}], num_of_onlookers=2, num_of_generations=3,
+                              length_of_generations=6, agents_client=self.client)
+        results = asyncio.get_event_loop().run_until_complete(game.run_async())
+        self.assertEqual([0, 1, 2], results.generations)
+        self.assertEqual(18, len(results.interactions))
+        self.assertEqual(0, results.cooperation_rate)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+"""checkpoint_logic.py: Keeps a checkpoint of a community after each generation it simulates, so a simulation that is
+interrupted, such as by the worker running it dying, can resume from the last generation it finished"""
+
+__author__ = "James King"
+
+import os
+import pickle
+from abc import ABC, abstractmethod
+from typing import Dict, List, NoReturn, Optional
+from redis import Redis, RedisError
+from .strategy_logic import Strategy
+
+CHECKPOINT_KEY = "reputation_checkpoint:{}"
+# Checkpoints left behind by jobs that are never retried expire after a week
+CHECKPOINT_EXPIRY = 7 * 24 * 60 * 60
+
+
+class PlayerRecord:
+    """A player of a finished generation restored from a checkpoint, keeping what reproduction and the results need
+    without an agent in the agents service"""
+
+    def __init__(self, player_id: int, strategy: Strategy, fitness: int):
+        """
+        Set up the record of the player
+        :param player_id: The id of the player
+        :type player_id: int
+        :param strategy: The strategy of the player
+        :type strategy: Strategy
+        :param fitness: The fitness of the player at the end of its generation
+        :type fitness: int
+        """
+        self._player_id: int = player_id
+        self._strategy: Strategy = strategy
+        self._fitness: int = fitness
+
+    @property
+    def id(self) -> int:
+        """
+        Get the id of the player
+        :return: The id of the player
+        :rtype: int
+        """
+        return self._player_id
+
+    @property
+    def strategy(self) -> Strategy:
+        """
+        Get the strategy of the player
+        :return: The strategy of the player
+        :rtype: Strategy
+        """
+        return self._strategy
+
+    @property
+    def fitness(self) -> int:
+        """
+        Get the fitness of the player at the end of its generation
+        :return: The fitness of the player
+        :rtype: int
+        """
+        return self._fitness
+
+
+class GenerationRecord:
+    """A finished generation restored from a checkpoint, standing in for the generation in its community"""
+
+    def __init__(self, generation_id: int, start_point: int, end_point: int, players: List[PlayerRecord],
+                 strategy_count: Dict[Strategy, int]):
+        """
+        Set up the record of the generation
+        :param generation_id: The id of the generation
+        :type generation_id: int
+        :param start_point: The first timepoint of the generation
+        :type start_point: int
+        :param end_point: The timepoint the generation ended at
+        :type end_point: int
+        :param players: The players of the generation
+        :type players: List[PlayerRecord]
+        :param strategy_count: The count of each strategy in the generation
+        :type strategy_count: Dict[Strategy, int]
+        """
+        self._generation_id: int = generation_id
+        self._start_point: int = start_point
+        self._end_point: int = end_point
+        self._players: List[PlayerRecord] = players
+        self._strategy_count: Dict[Strategy, int] = strategy_count
+
+    @classmethod
+    def from_generation(cls, generation) -> 'GenerationRecord':
+        """
+        Record a finished generation
+        :param generation: The generation, or the record of one
+        :type generation: Union[Generation, GenerationRecord]
+        :return: The record of the generation
+        :rtype: GenerationRecord
+        """
+        if isinstance(generation, cls):
+            return generation
+        return cls(generation.id, generation.get_start_point(), generation.get_end_point(),
+                   [PlayerRecord(player.id, player.strategy, player.fitness) for player in generation.get_players()],
+                   generation.get_strategy_count())
+
+    @property
+    def id(self) -> int:
+        """
+        Get the id of the generation
+        :return: The id of the generation
+        :rtype: int
+        """
+        return self._generation_id
+
+    def get_start_point(self) -> int:
+        """
+        Get the first timepoint of the generation
+        :return: The start point
+        :rtype: int
+        """
+        return self._start_point
+
+    def get_end_point(self) -> int:
+        """
+        Get the timepoint the generation ended at
+        :return: The end point
+        :rtype: int
+        """
+        return self._end_point
+
+    def get_players(self) -> List[PlayerRecord]:
+        """
+        Get the players of the generation
+        :return: The players
+        :rtype: List[PlayerRecord]
+        """
+        return self._players
+
+    def get_strategy_count(self) -> Dict[Strategy, int]:
+        """
+        Get the count of each strategy in the generation
+        :return: The strategy count
+        :rtype: Dict[Strategy, int]
+        """
+        return self._strategy_count
+
+
+class CheckpointStore(ABC):
+    """Somewhere to keep the checkpoint of a single community"""
+
+    @abstractmethod
+    def save(self, checkpoint: Dict) -> NoReturn:
+        """Replace the checkpoint kept with a new one"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def load(self) -> Optional[Dict]:
+        """The checkpoint kept, or None if there isn't one"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self) -> NoReturn:
+        """Remove the checkpoint kept, once the simulation's results are safely stored"""
+        raise NotImplementedError
+
+
+class RedisCheckpointStore(CheckpointStore):
+    """Keeps the checkpoint of a community in redis, so any worker retrying the job can resume it. The simulation
+    carries on without checkpoints if redis can't be reached."""
+
+    def __init__(self, redis: Redis, community_id: int):
+        """
+        Set up the store of a community's checkpoint
+        :param redis: The redis connection to keep the checkpoint through
+        :type redis: Redis
+        :param community_id: The id of the community in the database
+        :type community_id: int
+        """
+        self._redis: Redis = redis
+        self._key: str = CHECKPOINT_KEY.format(community_id)
+
+    def save(self, checkpoint: Dict) -> NoReturn:
+        try:
+            self._redis.set(self._key, pickle.dumps(checkpoint), ex=CHECKPOINT_EXPIRY)
+        except RedisError:
+            pass
+
+    def load(self) -> Optional[Dict]:
+        try:
+            stored = self._redis.get(self._key)
+        except RedisError:
+            return None
+        return pickle.loads(stored) if stored is not None else None
+
+    def clear(self) -> NoReturn:
+        try:
+            self._redis.delete(self._key)
+        except RedisError:
+            pass
+
+
+class FileCheckpointStore(CheckpointStore):
+    """Keeps the checkpoint of a community in a file, replaced whole so an interrupted save leaves the last
+    checkpoint"""
+
+    def __init__(self, path: str):
+        """
+        Set up the store of a community's checkpoint
+        :param path: The path of the file to keep the checkpoint in
+        :type path: str
+        """
+        self._path: str = path
+
+    def save(self, checkpoint: Dict) -> NoReturn:
+        partial_path = self._path + ".partial"
+        with open(partial_path, 'wb') as checkpoint_file:
+            pickle.dump(checkpoint, checkpoint_file)
+        os.replace(partial_path, self._path)
+
+    def load(self) -> Optional[Dict]:
+        if not os.path.exists(self._path):
+            return None
+        with open(self._path, 'rb') as checkpoint_file:
+            return pickle.load(checkpoint_file)
+
+    def clear(self) -> NoReturn:
+        if os.path.exists(self._path):
+            os.remove(self._path)
@@ -0,0 +1,194 @@
+"""checkpoint_tests.py: Tests for the functionality of the checkpoint_logic.py module, checking an interrupted game
+resumes from the last generation it finished and gives the same results as a game that wasn't interrupted"""
+
+__author__ = "James King"
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from typing import Dict, List, NoReturn, Optional
+from unittest.mock import Mock
+from redis import RedisError
+from .checkpoint_logic import CheckpointStore, FileCheckpointStore, RedisCheckpointStore, GenerationRecord, \
+    CHECKPOINT_KEY
+from .facade_logic import ReputationGame, Results
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .observation_logic import Observer
+from .player_logic import PlayerState
+
+
+class _MemoryCheckpointStore(CheckpointStore):
+    """Keeps a checkpoint in memory, pickled as the other stores do, counting the checkpoints saved"""
+
+    def __init__(self):
+        self.pickled: Optional[bytes] = None
+        self.saves = 0
+
+    @property
+    def checkpoint(self) -> Optional[Dict]:
+        return self.load()
+
+    def save(self, checkpoint: Dict) -> NoReturn:
+        self.pickled = pickle.dumps(checkpoint)
+        self.saves += 1
+
+    def load(self) -> Optional[Dict]:
+        return pickle.loads(self.pickled) if self.pickled is not None else None
+
+    def clear(self) -> NoReturn:
+        self.pickled = None
+
+
+class _Interrupter(Observer):
+    """Records the generations started, raising when told to interrupt a generation as a dying worker would"""
+
+    def __init__(self, interrupt_at: int = None):
+        self.interrupt_at = interrupt_at
+        self.started: List[int] = []
+
+    def update(self, player_state: PlayerState) -> NoReturn:
+        pass
+
+    @property
+    def community(self) -> int:
+        return 0
+
+    @property
+    def generations(self) -> List[int]:
+        return self.started
+
+    def add_generation(self, generation: int) -> NoReturn:
+        if generation == self.interrupt_at:
+            raise KeyboardInterrupt
+        self.started.append(generation)
+
+    def add_player(self, generation: int, player: int) -> NoReturn:
+        pass
+
+    @property
+    def corrupted_observations(self) -> bool:
+        return False
+
+
+class CheckpointTest(unittest.TestCase):
+    """Test resuming games from the checkpoints kept by the Community class in a CheckpointStore"""
+
+    # Strategies that never choose at random, so a resumed game plays exactly as one that wasn't interrupted
+    STRATEGIES = [STRATEGIES[0], STRATEGIES[3], STRATEGIES[6], STRATEGIES[19], STRATEGIES[67]]
+
+    def _game(self, store: CheckpointStore = None, observers: List[Observer] = None, seed=8) -> ReputationGame:
+        return ReputationGame([dict(strategy, count=2) for strategy in self.STRATEGIES], num_of_onlookers=2,
+                              num_of_generations=4, length_of_generations=8, mutation_chance=0.3,
+                              agents_client=LocalAgentsBackend(seed=0), observers=observers, seed=seed,
+                              checkpoint_store=store)
+
+    @staticmethod
+    def _summary(results: Results) -> List:
+        return [results.generations, results.players,
+                [(timepoint, interaction.donor, interaction.recipient, interaction.action, interaction.onlookers)
+                 for timepoint, interaction in sorted(results.interactions.items())],
+                results.cooperation_rate_by_generation, results.social_activeness_by_generation,
+                results.fitness_by_generation_and_player, results.populations, results.id_to_strategy_map,
+                results.seed]
+
+    def test_resume(self):
+        # A game interrupted in its third generation should resume there and give the same results
+        store = _MemoryCheckpointStore()
+        with self.assertRaises(KeyboardInterrupt):
+            self._game(store, [_Interrupter(2)], seed=None).run()
+        self.assertEqual(2, store.saves)
+        self.assertEqual([0, 1], [generation.id for generation in store.checkpoint['generations']])
+        resumed_observer = _Interrupter()
+        resumed = self._game(store, [resumed_observer], seed=None).run()
+        self.assertEqual([2, 3], resumed_observer.started)
+        self.assertEqual(4, store.saves)
+        self.assertFalse(resumed.corrupted_observations)
+        self.assertEqual(self._summary(self._game(seed=resumed.seed).run()), self._summary(resumed))
+
+    def test_finished_checkpoint(self):
+        # A game checkpointed after its last generation should have nothing left to simulate
+        store = _MemoryCheckpointStore()
+        first = self._game(store).run()
+        observer = _Interrupter()
+        self.assertEqual(self._summary(first), self._summary(self._game(store, [observer]).run()))
+        self.assertEqual([], observer.started)
+
+    def test_other_configuration(self):
+        # A checkpoint of a game configured differently should be ignored
+        store = _MemoryCheckpointStore()
+        with self.assertRaises(KeyboardInterrupt):
+            self._game(store, [_Interrupter(2)]).run()
+        observer = _Interrupter()
+        ReputationGame([dict(strategy, count=3) for strategy in self.STRATEGIES], num_of_onlookers=2,
+                       num_of_generations=4, length_of_generations=8, mutation_chance=0.3,
+                       agents_client=LocalAgentsBackend(seed=0), observers=[observer], seed=8,
+                       checkpoint_store=store).run()
+        self.assertEqual([0, 1, 2, 3], observer.started)
+
+    def test_other_seed(self):
+        # A checkpoint of a game with another seed should be ignored rather than replacing the seed passed, while a
+        # game with no seed passed resumes with the checkpoint's seed
+        store = _MemoryCheckpointStore()
+        with self.assertRaises(KeyboardInterrupt):
+            self._game(store, [_Interrupter(2)]).run()
+        observer = _Interrupter()
+        self.assertEqual(9, self._game(store, [observer], seed=9).run().seed)
+        self.assertEqual([0, 1, 2, 3], observer.started)
+        with self.assertRaises(KeyboardInterrupt):
+            self._game(store, [_Interrupter(2)], seed=None).run()
+        seed = store.checkpoint['seed']
+        observer = _Interrupter()
+        self.assertEqual(seed, self._game(store, [observer], seed=None).run().seed)
+        self.assertEqual([2, 3], observer.started)
+
+    def test_generation_record(self):
+        store = _MemoryCheckpointStore()
+        results = self._game(store).run()
+        records = store.checkpoint['generations']
+        self.assertEqual(results.populations, [record.get_strategy_count() for record in records])
+        self.assertEqual(results.id_to_strategy_map, {record.id: {player.id: player.strategy
+                                                                  for player in record.get_players()}
+                                                      for record in records})
+        self.assertIs(records[0], GenerationRecord.from_generation(records[0]))
+
+    def test_file_store(self):
+        directory = tempfile.mkdtemp()
+        try:
+            store = FileCheckpointStore(os.path.join(directory, "community.checkpoint"))
+            self.assertIsNone(store.load())
+            store.save({'seed': 1})
+            store.save({'seed': 2})
+            self.assertEqual({'seed': 2}, store.load())
+            self.assertEqual(["community.checkpoint"], os.listdir(directory))
+            store.clear()
+            self.assertIsNone(store.load())
+            store.clear()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_redis_store(self):
+        # The checkpoint should be kept under the community's key, and redis being unavailable shouldn't stop a game
+        stored: Dict[str, bytes] = {}
+        redis = Mock()
+        redis.set.side_effect = lambda key, value, ex: stored.__setitem__(key, value)
+        redis.get.side_effect = lambda key: stored.get(key)
+        redis.delete.side_effect = lambda key: stored.pop(key, None)
+        store = RedisCheckpointStore(redis, 4)
+        store.save({'seed': 3})
+        self.assertEqual([CHECKPOINT_KEY.format(4)], list(stored))
+        self.assertEqual({'seed': 3}, store.load())
+        store.clear()
+        self.assertIsNone(store.load())
+        redis.set.side_effect = RedisError
+        redis.get.side_effect = RedisError
+        redis.delete.side_effect = RedisError
+        store.save({'seed': 3})
+        self.assertIsNone(store.load())
+        store.clear()
+        self.assertFalse(self._game(store).run().corrupted_observations)
+
+
+if __name__ == '__main__':
+    unittest.main()
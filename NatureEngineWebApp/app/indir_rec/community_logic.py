@@ -1,14 +1,18 @@
 """community_logic.py: the module for functionality surrounding communities: reproduction,
 simulation of a whole tournament,setup of a tournament etc."""
 
-import requests
-from typing import List, Dict, NoReturn
+from typing import Any, List, Dict, NoReturn, Tuple
 from .generation_logic import Generation
-import random
+import asyncio
 from .observation_logic import Observer
-from .player_logic import Player
-from .indir_rec_config import Config
 from .strategy_logic import Strategy
+from .agents_client_logic import AgentsBackend, AgentsClient, AsyncAgentsClient, AgentsServiceException
+from .local_agents_logic import LocalAgentsBackend
+from .indir_rec_config import Config
+from .seeding_logic import RandomStreams
+from .checkpoint_logic import CheckpointStore, GenerationRecord
+from .selection_logic import SelectionScheme, RouletteSelection, reproduce
+from .lifecycle_logic import CommunityLifecycle, LeaseRegistry
 
 
 class CommunityCreationException(Exception):
@@ -23,7 +27,9 @@ class Community:
     generations are then created using a reproduction algorithm"""
 
     def __init__(self, strategies: Dict[Strategy, int], num_of_onlookers: int = 5, num_of_generations: int = 10,
-                 length_of_generations: int = 30, mutation_chance: float = 0, observers: List[Observer] = None):
+                 length_of_generations: int = 30, mutation_chance: float = 0, observers: List[Observer] = None,
+                 agents_client: AgentsBackend = None, seed: int = None, checkpoint_store: CheckpointStore = None,
+                 selection: SelectionScheme = None, leases: LeaseRegistry = None):
         """
         Set the parameters for the community and the initial set of players to simulate the community with
         :param strategies: The initial set of players to simulate the community
@@ -34,12 +40,25 @@ class Community:
         :type num_of_generations: int
         :param length_of_generations: The number of rounds each generation will run for
         :type length_of_generations: int
+        :param agents_client: The agents service client, or other backend running the agents' minds, to use for the
+         whole simulation (defaults to a new backend of the kind set by the AGENTS_BACKEND config)
+        :type agents_client: AgentsBackend
+        :param seed: The seed to derive the random number streams of the pairing, onlookers, reproduction and mutation
+         from (defaults to one chosen with the random module)
+        :type seed: int
+        :param checkpoint_store: Where to keep a checkpoint after each generation, the simulation resuming from the
+         checkpoint kept there if there is one (defaults to no checkpoints)
+        :type checkpoint_store: CheckpointStore
+        :param selection: The scheme to choose the parents of each new generation with (defaults to roulette wheel
+         selection from an alias table)
+        :type selection: SelectionScheme
+        :param leases: Where to keep a lease on the community while it is simulated, so it is swept up from the agents
+         service if the simulation dies without releasing it (defaults to no lease)
+        :type leases: LeaseRegistry
         """
-        # Create the community in the
-        community_response = requests.request("POST", Config.AGENTS_URL + 'community')
-        self._community_id = community_response.json()['id']
-        if community_response.status_code != 200:
-            raise CommunityCreationException("Failed to create community in agents service")
+        if agents_client is None:
+            agents_client = LocalAgentsBackend() if Config.AGENTS_BACKEND == 'local' else AgentsClient()
+        self._agents_client: AgentsBackend = agents_client
         # Ensure the set parameters match the correct conditions, or raise creation exception
         if num_of_onlookers <= 0:
             raise CommunityCreationException("number of onlookers <= 0")
@@ -49,6 +68,18 @@ class Community:
             raise CommunityCreationException("number of generations <= 2")
         if mutation_chance > 1 or mutation_chance < 0:
             raise CommunityCreationException("mutation chance should be a probability between 0 and 1")
+        # The seed passed, a checkpoint's seed is only taken when none was
+        self._given_seed: int = seed
+        try:
+            self._streams: RandomStreams = RandomStreams(seed)
+        except ValueError as e:
+            raise CommunityCreationException(str(e))
+        # Create the community in the agents service, once it is known the community will be simulated
+        try:
+            self._community_id = self._agents_client.create_community()['id']
+        except AgentsServiceException as e:
+            raise CommunityCreationException("Failed to create community in agents service " + str(e))
+        self._lifecycle: CommunityLifecycle = CommunityLifecycle(self._agents_client, self._community_id, leases)
         self._mutation_chance: float = mutation_chance
         self._num_of_onlookers: int = num_of_onlookers
         self._num_of_generations: int = num_of_generations
@@ -62,6 +93,8 @@ class Community:
             self._generation_size += count
         self._strategy_count_by_generation: List[Dict[Strategy, int]] = []
         self._observers: List[Observer] = observers if observers is not None else []
+        self._checkpoint_store: CheckpointStore = checkpoint_store
+        self._selection: SelectionScheme = selection if selection is not None else RouletteSelection()
 
     def get_id(self) -> int:
         """
@@ -71,6 +104,15 @@ class Community:
         """
         return self._community_id
 
+    @property
+    def seed(self) -> int:
+        """
+        Get the seed the community's random number streams are derived from
+        :return: The seed
+        :rtype: int
+        """
+        return self._streams.seed
+
     def get_num_of_onlookers(self) -> int:
         """
         Get the number of onlookers for each interaction in this community
@@ -115,22 +157,106 @@ class Community:
     def simulate(self) -> NoReturn:
         """
         Simulate the community, building an initial generation simulating that generation and then for the specified
-        number of generations running the reproduction mechanism and simulating the next generation
+        number of generations running the reproduction mechanism and simulating the next generation. The community
+        is released from the agents service once the simulation finishes or fails.
+        :return: NoReturn
+        :rtype: NoReturn
+        """
+        try:
+            # For the number of generations specified at the creation, after any finished before a checkpoint
+            for i in range(self._restore_checkpoint(), self._num_of_generations):
+                # Attach observers that record the statistics on the game
+                for observer in self._observers:
+                    observer.add_generation(i)
+                # Create the new generation (the first from the initial set of players, the rest from the reproduciton
+                # mechanism)
+                generation = self._build_generation(i)
+                generation.simulate()
+                self._record_generation(generation)
+        finally:
+            self._lifecycle.release()
+
+    async def simulate_async(self, async_client: AsyncAgentsClient = None) -> NoReturn:
+        """
+        Simulate the community as with simulate, but sending the requests for all the players in each timepoint to the
+        agents service concurrently. Generations are built in an executor so the event loop is not blocked.
+        :param async_client: The asynchronous client to communicate with the agents service through (defaults to a
+         new client for the same agents service as the community's client)
+        :type async_client: AsyncAgentsClient
         :return: NoReturn
         :rtype: NoReturn
         """
-        # For the number of generations specified at the creation
-        for i in range(self._num_of_generations):
-            # Attach observers that record the statistics on the game
-            for observer in self._observers:
-                observer.add_generation(i)
-            # Create the new generation (the first from the initial set of players, the rest from the reproduciton
-            # mechanism)
-            generation = self._build_generation(i)
-            generation.simulate()
-            self._current_time += self._length_of_generations
-            self._strategy_count_by_generation.append(generation.get_strategy_count())
-            self._generations.append(generation)
+        if async_client is None and not isinstance(self._agents_client, AgentsClient):
+            # A backend that runs the minds in process has no requests to overlap
+            self.simulate()
+            return
+        if async_client is None:
+            async with AsyncAgentsClient(self._agents_client.agents_url) as new_async_client:
+                await self.simulate_async(new_async_client)
+            return
+        loop = asyncio.get_event_loop()
+        try:
+            for i in range(self._restore_checkpoint(), self._num_of_generations):
+                for observer in self._observers:
+                    observer.add_generation(i)
+                generation = await loop.run_in_executor(None, self._build_generation, i)
+                await generation.simulate_async(async_client)
+                self._record_generation(generation)
+        finally:
+            self._lifecycle.release()
+
+    def _record_generation(self, generation: Generation) -> NoReturn:
+        """
+        Record a generation that has been simulated, moving the current time on to the end of it
+        :param generation: The simulated generation
+        :type generation: Generation
+        :return: NoReturn
+        """
+        self._current_time += self._length_of_generations
+        self._strategy_count_by_generation.append(generation.get_strategy_count())
+        self._generations.append(generation)
+        if self._checkpoint_store is not None:
+            self._checkpoint_store.save({
+                'config': self._checkpoint_config(),
+                'seed': self._streams.seed,
+                'current_time': self._current_time,
+                'generations': [GenerationRecord.from_generation(generation) for generation in self._generations],
+                'observers': [observer.checkpoint_state() for observer in self._observers]})
+
+    def _restore_checkpoint(self) -> int:
+        """
+        Restore the generations finished, the random number streams and the observers' observations from the
+        checkpoint kept for this community, if there is one for the same configuration
+        :return: The id of the first generation left to simulate
+        :rtype: int
+        """
+        if self._checkpoint_store is None:
+            return 0
+        checkpoint = self._checkpoint_store.load()
+        if checkpoint is None or checkpoint['config'] != self._checkpoint_config():
+            return 0
+        # The streams of each generation are derived from the seed, so the seed is all the random state to restore, a
+        # seed passed is part of the configuration so is already the checkpoint's
+        if self._given_seed is None:
+            self._streams = RandomStreams(checkpoint['seed'])
+        self._current_time = checkpoint['current_time']
+        self._generations = checkpoint['generations']
+        self._strategy_count_by_generation = [generation.get_strategy_count() for generation in self._generations]
+        for observer, state in zip(self._observers, checkpoint['observers']):
+            if state is not None:
+                observer.restore_state(state)
+        return len(self._generations)
+
+    def _checkpoint_config(self) -> Tuple[Any, ...]:
+        """
+        The configuration of the community, a checkpoint is only resumed from by a community configured the same,
+        including its seed if one was passed
+        :return: The configuration
+        :rtype: Tuple[Any, ...]
+        """
+        config = (list(self._first_strategies.items()), self._num_of_onlookers, self._num_of_generations,
+                  self._length_of_generations, self._mutation_chance)
+        return config + (self._given_seed,) if self._given_seed is not None else config
 
     def _build_generation(self, gen_id: int) -> Generation:
         """
@@ -142,44 +268,31 @@ class Community:
         print("New generation: " + str(gen_id))
         if len(self._generations) <= 0:
             # Use the first selected generation of players
-            return Generation(self._first_strategies, gen_id, self._community_id, 0,
-                              self._length_of_generations, self._num_of_onlookers, self._observers)
+            generation = Generation(self._first_strategies, gen_id, self._community_id, 0,
+                                    self._length_of_generations, self._num_of_onlookers, self._observers,
+                                    agents_client=self._agents_client, streams=self._streams,
+                                    heartbeat=self._lifecycle.heartbeat)
         else:
             # Use the reproduction mechanism to build a new generation from the last
-            return self._reproduce(gen_id)
+            generation = self._reproduce(gen_id)
+        self._lifecycle.hold_generation(gen_id)
+        return generation
 
     def _reproduce(self, gen_id: int) -> Generation:
         """
-        Use the last generation of players to build a new generation of players
-        Uses the roulette wheel selection via stochastic acceptance outline by Lipowski et al. referenced in my report
+        Use the last generation of players to build a new generation of players, selecting parents by the community's
+        selection scheme and mutating some to one of the first generation's strategies
         :return: The new generation
         :rtype: Generation
         """
-        # Find last generation of players details
         last_gen_players = self._generations[-1].get_players()
-        maximal_fitness = 0
-        for player in last_gen_players:
-            if player.fitness > maximal_fitness:
-                maximal_fitness = player.fitness
-        # Form new generation
-        new_gen_strategies: Dict[Strategy, int] = {}
-        new_gen_size = 0
-        mutation_strategies = [strategy for strategy in self._first_strategies]
-        while new_gen_size < self._generation_size:
-            # use stochastic acceptance
-            selected_player: Player = random.choice(last_gen_players)
-            chance_of_reproduction = 1 if maximal_fitness == 0 else selected_player.fitness/maximal_fitness
-            if random.random() <= chance_of_reproduction:
-                # Randomly mutate some based on a chosen probability
-                if random.random() < self._mutation_chance:
-                    selected_strategy = random.choice(mutation_strategies)
-                else:
-                    selected_strategy = selected_player.strategy
-                # Count the strategies as they go in
-                if selected_strategy in new_gen_strategies:
-                    new_gen_strategies[selected_strategy] += 1
-                else:
-                    new_gen_strategies[selected_strategy] = 1
-                new_gen_size += 1
+        new_gen_strategies = reproduce(self._selection, [player.strategy for player in last_gen_players],
+                                       [player.fitness for player in last_gen_players], self._generation_size,
+                                       self._mutation_chance, list(self._first_strategies),
+                                       self._streams.reproduction(gen_id), self._streams.mutation(gen_id))
+        # The fitness has been read, so the agents of the old generations are no longer needed in the agents service
+        self._lifecycle.release_generations()
         return Generation(new_gen_strategies, gen_id, self._community_id, self._current_time,
-                          self._current_time+self._length_of_generations, self._num_of_onlookers, self._observers)
+                          self._current_time+self._length_of_generations, self._num_of_onlookers, self._observers,
+                          agents_client=self._agents_client, streams=self._streams,
+                          heartbeat=self._lifecycle.heartbeat)
@@ -0,0 +1,143 @@
+"""database_test_case.py: A base for the tests that store the results of games in an in memory sqlite database, and the
+per row writer the bulk path of persistence_logic.py is checked and measured against"""
+
+__author__ = "James King"
+
+import json
+import unittest
+from collections import Counter
+from typing import Callable, Tuple
+from flask import Flask
+from app import db
+from ..models import ReputationAction, ReputationActionOnlookers, ReputationCommunity, ReputationGeneration, \
+    ReputationPlayer, ReputationStrategy
+from .action_logic import ActionType
+from .facade_logic import ReputationGame, Results
+from .historical_logic import record_historical_aggregates
+from .persistence_logic import commit_results_game_to_database, strategy_registry, _action_row, \
+    _clear_stored_generations, _commit_community, _statistics
+
+
+def create_tables():
+    """
+    Create the tables of the app's models in the database of the current app context
+    """
+    # The experiment table's full text index is MySQL only, so it isn't created in sqlite
+    db.metadata.create_all(bind=db.engine, tables=[table for table in db.metadata.sorted_tables
+                                                   if table.name != 'experiment'])
+
+
+def commit_results_game_to_database_per_row(game: ReputationGame, game_results: Results, database_community_id,
+                                            user_id, label):
+    """
+    Store the results of a reputation game in the database one row at a time, flushing each row to get its key, as
+    the reference the bulk path has to match
+    :param game: The game that was run
+    :type game: ReputationGame
+    :param game_results: The results of the game
+    :type game_results: Results
+    :param database_community_id: The id of the community in the database to store the results of
+    :type database_community_id: int
+    :param user_id: The id of the user to record an experiment for, if any
+    :type user_id: int
+    :param label: The label of the experiment to record, if any
+    :type label: str
+    """
+    community = _commit_community(game, game_results, database_community_id, user_id, label)
+    _clear_stored_generations(community.id)
+    if not game_results.corrupted_observations:
+        generation_stats, player_stats = _statistics(game_results)
+        actions_by_generation_and_player = game_results.actions_by_generation_and_player
+        id_to_strat_map = game_results.id_to_strategy_map
+        generation_ids = {}
+        strategy_counts = {}
+        for generation in game_results.generations:
+            new_gen = ReputationGeneration(community_id=community.id, generation_id=generation,
+                                           **generation_stats[generation])
+            db.session.add(new_gen)
+            db.session.flush()
+            generation_ids[generation] = new_gen.id
+            strategy_counts[generation] = Counter()
+            db_players = {}
+            for player in game_results.players[generation]:
+                player_strat = id_to_strat_map[generation][player]
+                strategy_options_string = json.dumps(player_strat.options)
+                strategy_filter = {'donor_strategy': player_strat.donor_strategy,
+                                   'non_donor_strategy': player_strat.non_donor_strategy,
+                                   'trust_model': player_strat.trust_model, 'options': strategy_options_string}
+                if ReputationStrategy.query.filter_by(**strategy_filter).count() <= 0:
+                    db.session.add(ReputationStrategy(**strategy_filter))
+                    db.session.flush()
+                player_strategy = ReputationStrategy.query.filter_by(**strategy_filter).first()
+                new_player = ReputationPlayer(generation_id=new_gen.id, community_id=community.id, player_id=player,
+                                              strategy=player_strategy.id,
+                                              **player_stats[generation][player])
+                db.session.add(new_player)
+                db.session.flush()
+                db_players[player] = new_player.id
+                strategy_counts[generation][player_strategy.id] += 1
+            for player in game_results.players[generation]:
+                for timepoint, action in actions_by_generation_and_player[generation][player].items():
+                    new_action = ReputationAction(**_action_row(action, new_gen.id, community.id, db_players[player],
+                                                                timepoint, db_players))
+                    db.session.add(new_action)
+                    db.session.flush()
+                    if action.type is ActionType.INTERACTION:
+                        for onlooker in action.onlookers:
+                            db.session.add(ReputationActionOnlookers(community_id=community.id,
+                                                                     generation_id=new_gen.id,
+                                                                     actor_id=db_players[player],
+                                                                     onlooker_id=db_players[onlooker],
+                                                                     action_id=new_action.id))
+                            db.session.flush()
+        record_historical_aggregates(community, generation_stats, generation_ids, strategy_counts)
+    community.simulated = True
+    db.session.commit()
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Gives each test a new in memory sqlite database in the app context, and a way to store the results of a game
+    in it"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        create_tables()
+        # Every test has a new in memory database so the ids of the last test's strategies are no longer there
+        strategy_registry.clear()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _reset_database(self):
+        """Empty the database, dropping and creating its tables again"""
+        db.drop_all()
+        create_tables()
+        strategy_registry.clear()
+
+    def _store_game(self, game: ReputationGame, results: Results = None,
+                    commit: Callable = commit_results_game_to_database, **kwargs) -> Tuple[ReputationCommunity, Results]:
+        """
+        Store the results of a game for a new community
+        :param game: The game the results are of
+        :type game: ReputationGame
+        :param results: The results to store (defaults to the results of running the game)
+        :type results: Results
+        :param commit: The function to store the results with (defaults to the bulk path)
+        :type commit: Callable
+        :param kwargs: Any other arguments to store the results with
+        :return: The community the results were stored for and the results
+        :rtype: Tuple[ReputationCommunity, Results]
+        """
+        results = results if results is not None else game.run()
+        community = ReputationCommunity(simulated=False)
+        db.session.add(community)
+        db.session.commit()
+        commit(game, results, community.id, None, None, **kwargs)
+        return community, results
@@ -1,81 +1,272 @@
-"""run_experiments.py: A script to run experiments with the game"""
+"""run_experiments.py: A script to run experiments with the game, either one run at a time or spread over a pool of
+worker processes, keeping a manifest of the finished runs so an interrupted sweep can be picked up where it stopped"""
 
 __author__ = "James King"
 
+import argparse
+import hashlib
 import json
-import time
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NoReturn, Optional
 from app.indir_rec.facade_logic import *
+from app.indir_rec.agents_client_logic import AgentsBackend, AgentsClient
+from app.indir_rec.checkpoint_logic import FileCheckpointStore
+from app.indir_rec.indir_rec_config import Config
+from app.indir_rec.local_agents_logic import LocalAgentsBackend
 
+# The backend of the agents' minds used by the runs of this process, set up once per worker
+_backend: AgentsBackend = None
 
-def run_stability_experiments(experiments_json_filename, strategies_json_filename, output_file_path):
+MANIFEST_FILENAME = "finished_experiments.json"
+
+
+def config_id(population: List[Dict], experiment: Dict) -> str:
+    """
+    Get the id of the configuration of a run, a hash of its first generation's population and its experiment that
+    stays the same however many times the run is set up
+    :param population: The strategies, with a count of each, of the first generation
+    :type population: List[Dict]
+    :param experiment: The experiment's number of onlookers, number of generations and length of generations
+    :type experiment: Dict
+    :return: The id of the run's configuration
+    :rtype: str
+    """
+    configuration = json.dumps({'population': population, 'experiment': experiment}, sort_keys=True,
+                               separators=(',', ':'))
+    return hashlib.sha256(configuration.encode('utf-8')).hexdigest()[:16]
+
+
+def _load_manifest(manifest_filename: str, legacy_population: Optional[List[Dict]] = None) -> Dict[str, Dict]:
+    """
+    Load the finished runs of a sweep from its manifest, converting a manifest kept as a list of the finished
+    experiments into finished runs of the population given. A manifest kept as a list can't be converted without the
+    population, so the sweep refuses to start rather than overwrite the record of those runs.
+    :param manifest_filename: The path of the manifest
+    :type manifest_filename: str
+    :param legacy_population: The population the experiments of a manifest kept as a list were run with, if any
+    :type legacy_population: Optional[List[Dict]]
+    :return: The experiment and results file of each finished run by the id of its configuration
+    :rtype: Dict[str, Dict]
+    :raises ValueError: If the manifest is kept as a list and no population is given to convert it with
+    """
+    if not os.path.exists(manifest_filename):
+        return {}
+    with open(manifest_filename) as manifest_file:
+        manifest = json.load(manifest_file)
+    if isinstance(manifest, dict):
+        return manifest['finished']
+    if legacy_population is None:
+        raise ValueError("The manifest " + manifest_filename + " is a list of finished experiments without their "
+                         "populations, so can't be converted. Move it aside or give another manifest to run with.")
+    return {config_id(legacy_population, experiment): {'experiment': experiment, 'results': None}
+            for experiment in manifest if experiment}
+
+
+def _init_worker(slots: multiprocessing.Queue, agents_urls: List[str] = None, local: bool = False) -> NoReturn:
+    """
+    Set up the agents backend of a worker process, each worker taking its own slot so that it has its own agents
+    service endpoint (when there are more than one) or its own in-process backend
+    :param slots: The queue of worker slots to take this worker's slot from
+    :type slots: multiprocessing.Queue
+    :param agents_urls: The urls of the agents services to share out between the workers (defaults to the configured
+     AGENTS_URL, which may list several)
+    :type agents_urls: List[str]
+    :param local: Whether to run the agents' minds in each worker's process rather than through an agents service
+    :type local: bool
+    """
+    global _backend
+    slot = slots.get()
+    if local:
+        _backend = LocalAgentsBackend()
+    else:
+        agents_urls = agents_urls if agents_urls else Config.AGENTS_URLS
+        _backend = AgentsClient(agents_urls[slot % len(agents_urls)])
+
+
+def _write_atomically(output_filename: str, json_write_data: Dict) -> NoReturn:
+    """
+    Write the results of a run, or a manifest, to a temporary file in the same directory then move it into place, so a
+    crashed or interrupted run never leaves a half written file behind
+    :param output_filename: The path of the file to write
+    :type output_filename: str
+    :param json_write_data: The data to write
+    :type json_write_data: Dict
+    """
+    directory = os.path.dirname(output_filename) or '.'
+    file_descriptor, temp_filename = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, "w") as output_file:
+            json.dump(json_write_data, output_file, indent=4)
+            output_file.flush()
+            os.fsync(output_file.fileno())
+        os.replace(temp_filename, output_filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+
+def _run(population: List[Dict], experiment: Dict, output_filename: str, checkpoint_filename: str = None) -> str:
+    """
+    Run a single reputation game of an experiment with the backend of this process and write its results, resuming
+    from the checkpoint of a run that was interrupted part way
+    :param population: The strategies, with a count of each, of the first generation
+    :type population: List[Dict]
+    :param experiment: The experiment's number of onlookers, number of generations and length of generations
+    :type experiment: Dict
+    :param output_filename: The path of the results file to write
+    :type output_filename: str
+    :param checkpoint_filename: The path of the file to keep the run's checkpoint in after each generation (defaults
+     to no checkpoints)
+    :type checkpoint_filename: str
+    :return: The path of the results file written
+    :rtype: str
+    """
+    checkpoint_store = FileCheckpointStore(checkpoint_filename) if checkpoint_filename is not None else None
+    results: Results = ReputationGame(population, experiment['num_of_onlookers'], experiment['gen_num'],
+                                      experiment['gen_length'], 0, agents_client=_backend,
+                                      checkpoint_store=checkpoint_store).run()
+    json_write_data = {'experiment': experiment, 'coop_rate': results.cooperation_rate,
+                       'coop_rate_by_gen': results.cooperation_rate_by_generation,
+                       'social_activeness': results.social_activeness,
+                       'social_activeness_by_gen': results.social_activeness_by_generation,
+                       'positivity_of_gossip_percentage': results.positivity_of_gossip_percentage,
+                       'positivity_of_gossip_percentage_by_gen':
+                           results.positivity_of_gossip_percentage_by_generation,
+                       'corrupted_observations': results.corrupted_observations,
+                       'community_fitness': results.community_fitness,
+                       'fitness_by_generation': results.fitness_by_generation}
+    populations_data = []
+    for generation_population in results.populations:
+        populations_data.append([{'strategy': strategy.to_dict(), 'count': count} for strategy, count
+                                 in generation_population.items()])
+    json_write_data['populations'] = populations_data
+    _write_atomically(output_filename, json_write_data)
+    if checkpoint_store is not None:
+        checkpoint_store.clear()
+    return output_filename
+
+
+def _run_sweep(runs: List[Dict], manifest_filename: str, workers: int = 1, agents_urls: List[str] = None,
+               local: bool = False, legacy_population: Optional[List[Dict]] = None) -> List[str]:
+    """
+    Run each of the runs of a sweep not already in its manifest, in this process when there is only one worker or
+    otherwise over a pool of worker processes each with its own agents backend (every run creates its own community,
+    so runs never share a community id). The manifest is rewritten atomically as each run finishes, and a run whose
+    results were written but not yet added to the manifest is added without being run again.
+    :param runs: The population, experiment, configuration id, output filename and checkpoint filename of each run
+    :type runs: List[Dict]
+    :param manifest_filename: The path of the manifest of finished runs
+    :type manifest_filename: str
+    :param workers: The number of worker processes to run the runs over (defaults to 1)
+    :type workers: int
+    :param agents_urls: The urls of the agents services to share out between the workers (defaults to the configured
+     AGENTS_URL)
+    :type agents_urls: List[str]
+    :param local: Whether to run the agents' minds in each worker's process rather than through an agents service
+    :type local: bool
+    :param legacy_population: The population the experiments of a manifest kept as a list were run with, if any
+    :type legacy_population: Optional[List[Dict]]
+    :return: The paths of the results files written by this sweep, in the order the runs finished
+    :rtype: List[str]
+    """
+    finished = _load_manifest(manifest_filename, legacy_population)
+    pending = []
+    for run in runs:
+        if run['config_id'] in finished:
+            continue
+        if os.path.exists(run['output_filename']):
+            finished[run['config_id']] = {'experiment': run['experiment'], 'results': run['output_filename']}
+            continue
+        pending.append(run)
+    _write_atomically(manifest_filename, {'finished': finished})
+    print("Skipping " + str(len(runs) - len(pending)) + " finished runs, " + str(len(pending)) + " to run")
+    written = []
+
+    def record(run: Dict, output_filename: str):
+        finished[run['config_id']] = {'experiment': run['experiment'], 'results': output_filename}
+        _write_atomically(manifest_filename, {'finished': finished})
+        written.append(output_filename)
+        print("Finished: " + output_filename)
+
+    context = multiprocessing.get_context()
+    slots = context.Queue()
+    for slot in range(max(1, workers)):
+        slots.put(slot)
+    if workers <= 1:
+        _init_worker(slots, agents_urls, local)
+        for run in pending:
+            record(run, _run(run['population'], run['experiment'], run['output_filename'], run['checkpoint_filename']))
+        return written
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(slots, agents_urls, local)) as executor:
+        futures = {executor.submit(_run, run['population'], run['experiment'], run['output_filename'],
+                                   run['checkpoint_filename']): run for run in pending}
+        for future in as_completed(futures):
+            record(futures[future], future.result())
+    return written
+
+
+def run_stability_experiments(experiments_json_filename, strategies_json_filename, output_file_path,
+                              workers: int = 1, agents_urls: List[str] = None, local: bool = False,
+                              manifest_filename: str = None) -> List[str]:
     experiments = json.loads(open(experiments_json_filename).read())
     strategies = json.loads(open(strategies_json_filename).read())
-    strategy_num = 0
-    for strategy in strategies:
-        print("New strategy: " + str(strategy_num))
-        experiment_num = 0
-        for experiment in experiments:
-            print("Experiment: " + str(experiment_num))
-            output_filename = "strat_num=" + str(strategy_num) + ",experiment_num=" + str(experiment_num) + ":" \
-                              + str(time.time()) + ".json"
-            strategy['count'] = 25
-            population = [strategy,
+    runs = []
+    for strategy_num, strategy in enumerate(strategies):
+        for experiment_num, experiment in enumerate(experiments):
+            population = [dict(strategy, count=25),
                           {'donor_strategy': 'Defector', 'non_donor_strategy': 'Lazy', 'trust_model': 'Void',
                            'options': [], 'count': 2},
                           {'donor_strategy': 'Defector', 'non_donor_strategy': 'Promote Self', 'trust_model': 'Void',
                            'options': [], 'count': 2},
                           {'donor_strategy': 'Defector', 'non_donor_strategy': 'Spread Negative', 'trust_model': 'Void',
                            'options': [], 'count': 2}]
-            results: Results = ReputationGame(population, experiment['num_of_onlookers'], experiment['gen_num'],
-                                              experiment['gen_length'], 0).run()
-            json_write_data = {'experiment': experiment, 'coop_rate': results.cooperation_rate,
-                               'coop_rate_by_gen': results.cooperation_rate_by_generation,
-                               'social_activeness': results.social_activeness,
-                               'social_activeness_by_gen': results.social_activeness_by_generation,
-                               'positivity_of_gossip_percentage': results.positivity_of_gossip_percentage,
-                               'positivity_of_gossip_percentage_by_gen':
-                                   results.positivity_of_gossip_percentage_by_generation,
-                               'corrupted_observations': results.corrupted_observations,
-                               'community_fitness': results.community_fitness,
-                               'fitness_by_generation': results.fitness_by_generation}
-            populations_data = []
-            for generation_population in results.populations:
-                populations_data.append([{'strategy': strategy.to_dict(), 'count': count} for strategy, count
-                                         in generation_population.items()])
-            json_write_data['populations'] = populations_data
-            with open(output_file_path + output_filename, "w+") as output_file:
-                json.dump(json_write_data, output_file, indent=4)
-            experiment_num += 1
-        strategy_num += 1
-
-
-def run_robustness_experiments(experiments_json_filename, population_json_filename, output_file_path):
+            run_id = config_id(population, experiment)
+            output_filename = "strat_num=" + str(strategy_num) + ",experiment_num=" + str(experiment_num) + \
+                              ",config=" + run_id + ".json"
+            runs.append({'population': population, 'experiment': experiment, 'config_id': run_id,
+                         'output_filename': output_file_path + output_filename,
+                         'checkpoint_filename': output_file_path + run_id + '.checkpoint'})
+    return _run_sweep(runs, manifest_filename or output_file_path + MANIFEST_FILENAME, workers, agents_urls, local)
+
+
+def run_robustness_experiments(experiments_json_filename, population_json_filename, output_file_path,
+                               workers: int = 1, agents_urls: List[str] = None, local: bool = False,
+                               manifest_filename: str = None) -> List[str]:
     experiments = json.loads(open(experiments_json_filename).read())
     populations = json.loads(open(population_json_filename).read())
-    experiment_num = 1
+    runs = []
     for experiment in experiments:
-        print("Experiment: "+str(experiment_num))
+        run_id = config_id(populations, experiment)
         output_filename = "gen_length="+str(experiment['gen_length'])+",gen_num="+str(experiment['gen_num'])+\
-                          ",num_of_onlookers="+str(experiment['num_of_onlookers'])+":"+str(time.time())+".json"
-        results: Results = ReputationGame(populations, experiment['num_of_onlookers'], experiment['gen_num'],
-                                          experiment['gen_length'], 0).run()
-        json_write_data = {'experiment': experiment, 'coop_rate': results.cooperation_rate,
-                           'coop_rate_by_gen': results.cooperation_rate_by_generation,
-                           'social_activeness': results.social_activeness,
-                           'social_activeness_by_gen': results.social_activeness_by_generation,
-                           'positivity_of_gossip_percentage': results.positivity_of_gossip_percentage,
-                           'positivity_of_gossip_percentage_by_gen':
-                               results.positivity_of_gossip_percentage_by_generation,
-                           'corrupted_observations': results.corrupted_observations,
-                           'community_fitness': results.community_fitness,
-                           'fitness_by_generation': results.fitness_by_generation}
-        populations_data = []
-        for generation_population in results.populations:
-            populations_data.append([{'strategy': strategy.to_dict(), 'count': count} for strategy, count
-                                     in generation_population.items()])
-        json_write_data['populations'] = populations_data
-        with open(output_file_path+output_filename, "w+") as output_file:
-            json.dump(json_write_data, output_file, indent=4)
-        experiment_num += 1
+                          ",num_of_onlookers="+str(experiment['num_of_onlookers'])+",config="+run_id+".json"
+        runs.append({'population': populations, 'experiment': experiment, 'config_id': run_id,
+                     'output_filename': output_file_path + output_filename,
+                     'checkpoint_filename': output_file_path + run_id + '.checkpoint'})
+    return _run_sweep(runs, manifest_filename or output_file_path + MANIFEST_FILENAME, workers, agents_urls, local,
+                      legacy_population=populations)
 
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a sweep of reputation game experiments")
+    parser.add_argument('kind', choices=['robustness', 'stability'], help="The kind of experiments to run")
+    parser.add_argument('experiments', help="The json file of the experiments to run")
+    parser.add_argument('strategies', help="The json file of the population (robustness) or the strategies "
+                                           "(stability) to run the experiments with")
+    parser.add_argument('output_path', help="The path to prefix the results files with")
+    parser.add_argument('--workers', type=int, default=1, help="The number of worker processes to run the runs over")
+    parser.add_argument('--agents-url', action='append', dest='agents_urls',
+                        help="The url of an agents service for the workers to use, given once for each service to "
+                             "share the workers between")
+    parser.add_argument('--local', action='store_true',
+                        help="Run the agents' minds in each worker's process rather than through an agents service")
+    parser.add_argument('--manifest', dest='manifest_filename',
+                        help="The manifest of finished runs to skip and add to (defaults to " + MANIFEST_FILENAME +
+                             " in the output path)")
+    arguments = parser.parse_args()
+    sweep = run_robustness_experiments if arguments.kind == 'robustness' else run_stability_experiments
+    sweep(arguments.experiments, arguments.strategies, arguments.output_path, arguments.workers,
+          arguments.agents_urls, arguments.local, arguments.manifest_filename)
@@ -4,9 +4,15 @@ __author__ = "James King"
 
 from .community_logic import Community
 from .observation_logic import ActionObserver, PlayerObserver, Observer
+from .metrics_logic import ActionMetrics
 from .action_logic import Action, InteractionAction
-from typing import List, Dict, Union, Any
+from typing import List, Dict, Union, Any, Tuple
 from .strategy_logic import Strategy
+from .agents_client_logic import AgentsBackend, AgentsClient, AsyncAgentsClient
+from .result_cache_logic import config_hash
+from .checkpoint_logic import CheckpointStore
+from .selection_logic import SelectionScheme
+from .lifecycle_logic import LeaseRegistry
 
 
 class Results:
@@ -24,6 +30,15 @@ class Results:
         self._observers: List[Observer] = [self._action_observer, self._player_observer]
         self._community = community
 
+    @property
+    def seed(self) -> int:
+        """
+        Get the seed the community's random number streams were derived from, to reproduce the game with
+        :return: The seed of the community
+        :rtype: int
+        """
+        return self._community.seed
+
     @property
     def generations(self) -> List[int]:
         """
@@ -204,6 +219,16 @@ class Results:
         """
         return self._action_observer.positivity_of_gossip_percentage_by_generation_and_player
 
+    @property
+    def metrics(self) -> ActionMetrics:
+        """
+        Get the counts of each player's actions the rates are worked out from, to export as NumPy arrays with
+        to_numpy or as a pandas DataFrame with to_dataframe
+        :return: The counts of the actions observed
+        :rtype: ActionMetrics
+        """
+        return self._action_observer.metrics
+
     @property
     def corrupted_observations(self) -> bool:
         """
@@ -272,8 +297,13 @@ class Results:
 class ReputationGame:
     """The facade for a game of the theoretical framework I have laid out in my report"""
 
+    # The engine the game is simulated with, part of the configuration's hash as each engine plays a seed differently
+    engine = 'agents'
+
     def __init__(self, initial_strategies: List[Dict], num_of_onlookers: int = 5, num_of_generations: int = 10,
-                 length_of_generations: int = 30, mutation_chance: float = 0):
+                 length_of_generations: int = 30, mutation_chance: float = 0, agents_client: AgentsBackend = None,
+                 observers: List[Observer] = None, seed: int = None, checkpoint_store: CheckpointStore = None, selection: SelectionScheme = None,
+                 leases: LeaseRegistry = None):
         """
         Create a new reputation game with the parameters passed
         :param initial_strategies: A list of the strategies to use in the first generation of the community
@@ -287,12 +317,36 @@ class ReputationGame:
         :type length_of_generations: int
         :param mutation_chance: The chance for mutation to occur in the reproduction of any one player
         :type mutation_chance: float
+        :param agents_client: The agents service client, or other backend running the agents' minds, to use (defaults
+         to a new client for each run)
+        :type agents_client: AgentsBackend
+        :param observers: Observers to attach to the community as well as the results' observers, such as one
+         reporting progress (defaults to none)
+        :type observers: List[Observer]
+        :param seed: The seed of the community's random number streams, to reproduce a game with (defaults to a new
+         seed each run)
+        :type seed: int
+        :param checkpoint_store: Where to keep a checkpoint of the community after each generation, a run resuming
+         from the checkpoint kept there (defaults to no checkpoints)
+        :type checkpoint_store: CheckpointStore
+        :param selection: The scheme to choose the parents of each new generation with (defaults to the community's
+         roulette wheel selection)
+        :type selection: SelectionScheme
+        :param leases: Where to keep a lease on the community while it is simulated, so it is swept up from the agents
+         service if the run dies without releasing it (defaults to no lease)
+        :type leases: LeaseRegistry
         """
         self._initial_strategies = initial_strategies
         self._num_of_onlookers = num_of_onlookers
         self._num_of_generations = num_of_generations
         self._length_of_generations = length_of_generations
         self._mutation_chance = mutation_chance
+        self._agents_client = agents_client
+        self._observers: List[Observer] = observers if observers is not None else []
+        self._seed = seed
+        self._checkpoint_store = checkpoint_store
+        self._selection = selection
+        self._leases = leases
 
     @property
     def initial_strategies(self) -> List[Dict]:
@@ -339,14 +393,99 @@ class ReputationGame:
         """
         return self._mutation_chance
 
+    @property
+    def seed(self) -> Union[int, None]:
+        """
+        Get the seed set for the game, the results of a run have the seed used when none is set
+        :return: the seed of the game, or None if each run has a new seed
+        :rtype: Union[int, None]
+        """
+        return self._seed
+
+    @property
+    def seeded_play(self) -> bool:
+        """
+        Get whether the game's play is wholly determined by its seed, only so when the agents' minds make their random
+        choices from a seed too, as with a seeded local backend
+        :return: True if a seeded run of the game plays the same way each time
+        :rtype: bool
+        """
+        return self._agents_client is not None and self._agents_client.seeded
+
+    @property
+    def config_hash(self) -> Union[str, None]:
+        """
+        Get the hash of the game's configuration, the same for any game that would play the same way
+        :return: the hash of the configuration, or None if the game isn't seeded or its agents' choices aren't, so it
+         plays differently each run
+        :rtype: Union[str, None]
+        """
+        if not self.seeded_play:
+            return None
+        # A scheme other than the default plays a seed differently, so is hashed along with the engine
+        engine = self.engine if self._selection is None else self.engine + ':' + self._selection.name
+        return config_hash(self._initial_strategies, self._num_of_onlookers, self._num_of_generations,
+                           self._length_of_generations, self._mutation_chance, self._seed, engine)
+
     def run(self) -> Results:
         """
-        Run the game and observe it, returning the observations and results (the result won't be the same each time)
+        Run the game and observe it, returning the observations and results (the result won't be the same each time
+        unless seeded)
+        :return: the statistics and results of each game
+        :rtype: Results
+        """
+        return self._simulate()
+
+    def _simulate(self) -> Results:
+        """
+        Simulate the game through the agents' minds
+        :return: the statistics and results of the game
+        :rtype: Results
+        """
+        community, results = self._build_community()
+        community.simulate()
+        return results
+
+    async def run_async(self, async_client: AsyncAgentsClient = None) -> Results:
+        """
+        Run the game and observe it as with run, but sending the requests for all the players in each timepoint to the
+        agents service concurrently
+        :param async_client: The asynchronous client to communicate with the agents service through (defaults to a new
+         client for the same agents service)
+        :type async_client: AsyncAgentsClient
         :return: the statistics and results of each game
         :rtype: Results
         """
+        community, results = self._build_community()
+        await community.simulate_async(async_client)
+        return results
+
+    def _build_community(self) -> Tuple[Community, Results]:
+        """
+        Create the community to simulate with observers attached from the results object
+        :return: The community and the results that observe it
+        :rtype: Tuple[Community, Results]
+        """
+        # Create the community to simulate
+        community = Community(self._community_strategies(), num_of_onlookers=self._num_of_onlookers,
+                              num_of_generations=self._num_of_generations,
+                              length_of_generations=self._length_of_generations,
+                              mutation_chance=self._mutation_chance, agents_client=self._agents_client,
+                              seed=self._seed, checkpoint_store=self._checkpoint_store, selection=self._selection,
+                              leases=self._leases)
+        # Create the results object and add the observers to the community
+        results = Results(community)
+        community.extend_observers(results.observers)
+        community.extend_observers(self._observers)
+        return community, results
+
+    def _community_strategies(self) -> Dict[Strategy, int]:
+        """
+        Create the first generation's strategies and the count of each from the initial strategies
+        :return: The count of each strategy of the first generation
+        :rtype: Dict[Strategy, int]
+        """
         community_strategies: Dict[Strategy, int] = {}
-        # Create the first generations strategies from the initial_strategies dictionary
         for strategy in self._initial_strategies:
             generated_strategy: Strategy = Strategy(strategy['donor_strategy'], strategy['non_donor_strategy'],
                                                     strategy['trust_model'], strategy['options'])
@@ -354,14 +493,5 @@ class ReputationGame:
                 community_strategies[generated_strategy] += strategy['count']
             else:
                 community_strategies[generated_strategy] = strategy['count']
-        # Create the community to simulate
-        community = Community(community_strategies, num_of_onlookers=self._num_of_onlookers,
-                              num_of_generations=self._num_of_generations,
-                              length_of_generations=self._length_of_generations,
-                              mutation_chance=self._mutation_chance)
-        # Create the results object and add the observers to the community then simulate
-        results = Results(community)
-        community.extend_observers(results.observers)
-        community.simulate()
-        return results
+        return community_strategies
 
@@ -1,15 +1,19 @@
 """generation_logic.py: Module for the functionality involved in creating generations and
 managing actions, percepts and players"""
 
-import requests
-from typing import Dict, List, NoReturn
-from .player_logic import Player, PlayerCreationException, DecisionException, PerceptionException
+from typing import Callable, Dict, List, NoReturn, Tuple
+from .player_logic import Player, DecisionException, PerceptionException
 from .action_logic import Action, ActionType, GossipAction, InteractionAction
 from .observation_logic import Observer
-import copy
 import random
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from .indir_rec_config import Config
 from .strategy_logic import Strategy
+from .seeding_logic import RandomStreams
+from .agents_client_logic import AgentsBackend, AgentsClient, AsyncAgentsClient, AgentsServiceException
 
 
 class GenerationCreationException(Exception):
@@ -33,11 +37,132 @@ class PlayerNotFoundException(Exception):
         super().__init__(message)
 
 
+class PopulationSampler:
+    """Draws the donor-recipient pair and onlookers of each interaction from the ids of a generation's players, keeping
+    the ids in one list that is shuffled in place as onlookers are drawn, so each draw takes time in proportion to the
+    number of players drawn rather than the size of the generation. Pairs are drawn from the ids in their first order,
+    so the pair of a timepoint can be drawn before the onlookers of the last."""
+
+    def __init__(self, player_ids: List[int], pairing_rng: random.Random, onlooker_rng: random.Random = None):
+        """
+        Set up the sampler over the players of a generation
+        :param player_ids: The ids of the players to draw from
+        :type player_ids: List[int]
+        :param pairing_rng: The random number generator to draw donor-recipient pairs with
+        :type pairing_rng: random.Random
+        :param onlooker_rng: The random number generator to draw onlookers with (defaults to the pairing one)
+        :type onlooker_rng: random.Random
+        """
+        self._pair_ids: Tuple[int, ...] = tuple(player_ids)
+        self._ids: List[int] = list(player_ids)
+        self._positions: Dict[int, int] = {player_id: position for position, player_id in enumerate(self._ids)}
+        self._pairing_random: random.Random = pairing_rng
+        self._onlooker_random: random.Random = onlooker_rng if onlooker_rng is not None else pairing_rng
+
+    def donor_recipient_pair(self) -> Tuple[int, int]:
+        """
+        Draw a donor and a different recipient, each player equally likely
+        :return: The ids of the donor and the recipient
+        :rtype: Tuple[int, int]
+        """
+        donor = self._pairing_random.randrange(len(self._pair_ids))
+        recipient = self._pairing_random.randrange(len(self._pair_ids) - 1)
+        if recipient >= donor:
+            recipient += 1
+        return self._pair_ids[donor], self._pair_ids[recipient]
+
+    def onlookers(self, donor: int, recipient: int, num_of_onlookers: int) -> List[int]:
+        """
+        Draw onlookers of an interaction other than the donor and recipient, by a partial Fisher-Yates shuffle of the
+        ids after the donor and recipient are swapped to the front
+        :param donor: The id of the donor
+        :type donor: int
+        :param recipient: The id of the recipient
+        :type recipient: int
+        :param num_of_onlookers: The number of onlookers to draw, all of the other players if there are fewer
+        :type num_of_onlookers: int
+        :return: The ids of the onlookers drawn
+        :rtype: List[int]
+        """
+        self._swap(0, self._positions[donor])
+        self._swap(1, self._positions[recipient])
+        end = min(2 + num_of_onlookers, len(self._ids))
+        for position in range(2, end):
+            self._swap(position, self._onlooker_random.randrange(position, len(self._ids)))
+        return self._ids[2:end]
+
+    def _swap(self, first: int, second: int) -> NoReturn:
+        self._ids[first], self._ids[second] = self._ids[second], self._ids[first]
+        self._positions[self._ids[first]] = first
+        self._positions[self._ids[second]] = second
+
+
+class StageTimings:
+    """The time a generation has spent in each stage of its timepoints: drawing and sending the donor-recipient pair,
+    getting the players' decisions and executing them. In a pipelined generation the stages overlap, so add up to more
+    than the overall time."""
+
+    STAGES = ('pair', 'decide', 'execute')
+
+    def __init__(self):
+        """Set up the timings with no time spent"""
+        self._seconds: Dict[str, float] = {stage: 0.0 for stage in self.STAGES + ('overall',)}
+
+    def add(self, stage: str, seconds: float) -> NoReturn:
+        """
+        Add time spent in a stage
+        :param stage: The stage, one of STAGES or 'overall'
+        :type stage: str
+        :param seconds: The time spent in seconds
+        :type seconds: float
+        """
+        self._seconds[stage] += seconds
+
+    @contextmanager
+    def stage(self, stage: str):
+        """
+        Time a block of code as part of a stage
+        :param stage: The stage, one of STAGES
+        :type stage: str
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def seconds(self, stage: str) -> float:
+        """
+        Get the time spent in a stage
+        :param stage: The stage, one of STAGES or 'overall'
+        :type stage: str
+        :return: The time spent in seconds
+        :rtype: float
+        """
+        return self._seconds[stage]
+
+    @property
+    def overlap(self) -> float:
+        """
+        Get the time the stages spent running at once
+        :return: The time the stages add up to over the overall time, in seconds
+        :rtype: float
+        """
+        return max(sum(self._seconds[stage] for stage in self.STAGES) - self._seconds['overall'], 0.0)
+
+    def __str__(self):
+        """Return the time spent in each stage and overall"""
+        return ", ".join("{} {:.3f}s".format(stage, self._seconds[stage]) for stage in self.STAGES + ('overall',)) + \
+            ", overlap {:.3f}s".format(self.overlap)
+
+
 class Generation:
     """A generation encompasses a number of timepoints in which members of the generation perceive percepts and act"""
 
     def __init__(self, strategies: Dict[Strategy, int], generation_id: int, community_id: int, start_point: int,
-                 end_point: int, num_of_onlookers: int, observers: List[Observer]):
+                 end_point: int, num_of_onlookers: int, observers: List[Observer], batched_steps: bool = None,
+                 agents_client: AgentsBackend = None, streams: RandomStreams = None, local_decisions: bool = None,
+                 pipelined: bool = None, heartbeat: Callable[[], NoReturn] = None):
         """
         Set up a generation and the players that are part of it in the environment and agent mind service
         :param strategies: A list of strategies (name, description and options) and the amount of them that have been
@@ -53,6 +178,25 @@ class Generation:
         :type end_point: int
         :param num_of_onlookers: The number of onlookers for each action in this generation
         :type num_of_onlookers: int
+        :param batched_steps: Whether to run each timepoint as a single step request to the agents service, or to
+         fall back to requesting each player's perception and decision separately (defaults to the config setting)
+        :type batched_steps: bool
+        :param agents_client: The agents service client, or other backend running the agents' minds, shared with the
+         players of the generation (defaults to a new client)
+        :type agents_client: AgentsBackend
+        :param streams: The random number streams of the community to draw the donor-recipient pairs and onlookers
+         from (defaults to streams from a seed chosen with the random module)
+        :type streams: RandomStreams
+        :param local_decisions: Whether players with stateless strategies decide in the environment rather than the
+         agents service, and players with percept blind strategies go without their percepts (defaults to the config
+         setting)
+        :type local_decisions: bool
+        :param pipelined: Whether simulating without batched steps sends the donor-recipient pair of the next timepoint
+         while the decisions of the current one are in flight (defaults to the config setting)
+        :type pipelined: bool
+        :param heartbeat: Called at the start of each timepoint, such as to renew the community's lease in the agents
+         service (defaults to nothing)
+        :type heartbeat: Callable[[], NoReturn]
         """
         # There should be a positive amount of timepoints in a generation that is greater than 1
         if start_point >= end_point:
@@ -62,37 +206,56 @@ class Generation:
         self._start_point: int = start_point
         self._end_point: int = end_point
         self._num_of_onlookers = num_of_onlookers
+        self._batched_steps: bool = Config.AGENTS_BATCHED_STEPS if batched_steps is None else batched_steps
+        local_decisions = Config.AGENTS_LOCAL_DECISIONS if local_decisions is None else local_decisions
+        self._pipelined: bool = Config.AGENTS_PIPELINED if pipelined is None else pipelined
+        self._heartbeat: Callable[[], NoReturn] = heartbeat if heartbeat is not None else lambda: None
+        self._timings: StageTimings = StageTimings()
         self._strategies: Dict[Strategy, int] = {}
+        self._agents_client: AgentsBackend = agents_client if agents_client is not None else AgentsClient()
         # Create the generation in the agents service, throw exception if fails to
-        creation_response = requests.request("POST", Config.AGENTS_URL + 'generation',
-                                             json={"community": community_id, "generation": generation_id})
-        if creation_response.status_code != 200:
-            raise GenerationCreationException("bad status code: " + str(creation_response.status_code))
-        if not creation_response.json()['success']:
-            raise GenerationCreationException(creation_response.json()['message'])
-        # Create the players for the generation, and attach the relevant observers
+        try:
+            creation_response = self._agents_client.create_generation(community_id, generation_id)
+        except AgentsServiceException as e:
+            raise GenerationCreationException(str(e))
+        if not creation_response['success']:
+            raise GenerationCreationException(creation_response['message'])
+        # Create the players' minds for the generation in a single request, then the players, attaching the relevant
+        # observers
         self._players: List[Player] = []
         self._id_player_map: Dict[int, Player] = {}
-        player_id = 0
         self._observers = observers
         self._strategies = strategies
         try:
-            for strategy in strategies:
-                strat_count = strategies[strategy]
-                if strat_count > 0:
-                    for i in range(strat_count):
-                        try:
-                            player = Player(player_id, strategy, self._community_id,
-                                            self._generation_id, self._observers)
-                            for observer in self._observers:
-                                observer.add_player(self._generation_id, player_id)
-                            self._players.append(player)
-                            self._id_player_map[player.id] = player
-                            player_id += 1
-                        except PlayerCreationException as e:
-                            raise GenerationCreationException(str(e))
-        except KeyError:
-            raise GenerationCreationException("Incorrect strategies dictionary keys")
+            strategy_counts = [(strategy, count) for strategy, count in strategies.items() if count > 0]
+            creation_response = self._agents_client.create_agents(self._community_id, self._generation_id, [
+                {"donor_strategy": strategy.donor_strategy, "non_donor_strategy": strategy.non_donor_strategy,
+                 "trust_model": strategy.trust_model, "options": strategy.options, "count": count}
+                for strategy, count in strategy_counts])
+        except AgentsServiceException as e:
+            raise GenerationCreationException(str(e))
+        player_results: Dict[int, Dict] = {result['player']: result for result in creation_response['players']}
+        errors = ["player " + str(player_id) + ": " + str(result['message'])
+                  for player_id, result in sorted(player_results.items()) if not result['success']]
+        if errors:
+            raise GenerationCreationException("Failed to create players in agents service, " + ", ".join(errors))
+        player_id = 0
+        for strategy, count in strategy_counts:
+            for _ in range(count):
+                if player_id not in player_results:
+                    raise GenerationCreationException("No player " + str(player_id) + " created in agents service")
+                player = Player(player_id, strategy, self._community_id, self._generation_id, self._observers,
+                                self._agents_client, created=True, local_decisions=local_decisions)
+                for observer in self._observers:
+                    observer.add_player(self._generation_id, player_id)
+                self._players.append(player)
+                self._id_player_map[player.id] = player
+                player_id += 1
+        # A generation of players that all decide locally needs nothing from the agents service once created
+        self._all_local: bool = all(player.decides_locally for player in self._players)
+        streams = streams if streams is not None else RandomStreams()
+        self._sampler = PopulationSampler([player.id for player in self._players], streams.pairing(generation_id),
+                                          streams.onlookers(generation_id))
 
     @property
     def id(self) -> int:
@@ -127,6 +290,15 @@ class Generation:
         """
         return self._players
 
+    @property
+    def timings(self) -> StageTimings:
+        """
+        Get the time the generation has spent in each stage of its timepoints
+        :return: The time spent in each stage
+        :rtype: StageTimings
+        """
+        return self._timings
+
     def get_strategy_count(self) -> Dict[Strategy, int]:
         """
         Get the count of each strategy in the generation
@@ -137,50 +309,291 @@ class Generation:
 
     def simulate(self) -> NoReturn:
         """
-        Run the cycle steps: perceive, decide, execute between the start and end points of this generation
+        Run the cycle steps: perceive, decide, execute between the start and end points of this generation. A
+        pipelined generation requesting each player's decision separately sends the donor-recipient pair of the next
+        timepoint from a worker thread while the decisions of the current one are requested, as with simulate_async.
         :return: NoReturn
         """
-        for timepoint in range(self._start_point, self._end_point):
-            # Send percepts to the donor and recipient of this timepoint
+        started = time.perf_counter()
+        pipeline: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1) \
+            if self._pipelined and not self._batched_steps and not self._all_local else None
+        next_pair: Future = None
+        try:
+            for timepoint in range(self._start_point, self._end_point):
+                self._heartbeat()
+                if self._batched_steps:
+                    self._step(timepoint)
+                    continue
+                if next_pair is not None:
+                    interaction_payload = next_pair.result()
+                else:
+                    interaction_payload = self._send_pair(timepoint)
+                next_pair = None
+                if pipeline is not None and timepoint + 1 < self._end_point:
+                    next_pair = pipeline.submit(self._send_pair, timepoint + 1)
+                self._step_per_player(timepoint, interaction_payload)
+        finally:
+            if pipeline is not None:
+                if next_pair is not None:
+                    next_pair.cancel()
+                pipeline.shutdown(wait=True)
+            self._timings.add('overall', time.perf_counter() - started)
+
+    def _send_pair(self, timepoint: int) -> Dict:
+        """
+        Decide on and send the donor-recipient pair for a timepoint, timed as the pair stage
+        :param timepoint: The timepoint to set the pair for
+        :type timepoint: int
+        :return: The interaction percept for the pair
+        :rtype: Dict
+        """
+        with self._timings.stage('pair'):
+            return self._set_and_send_donor_recipient_pair(timepoint)
+
+    def _step_per_player(self, timepoint: int, interaction_payload: Dict) -> NoReturn:
+        """
+        Run a timepoint of the generation requesting the perception and decision of each player separately
+        :param timepoint: The timepoint to run
+        :type timepoint: int
+        :param interaction_payload: The interaction percept of the timepoint, already sent
+        :type interaction_payload: Dict
+        :return: NoReturn
+        """
+        # Run a synchronised version of the perceive, decide, execute cycle
+        # Synchronised due to the way percepts are created from actions for the next timepoint
+        for player in self._players:
             try:
-                self._set_and_send_donor_recipient_pair(timepoint)
-            except SimulationException as e:
-                raise e
-            # Run a synchronised version of the perceive, decide, execute cycle
-            # Synchronised due to the way percepts are created from actions for the next timepoint
-            for player in self._players:
-                try:
+                with self._timings.stage('decide'):
                     player.perceive(timepoint)
-                except PerceptionException as e:
-                    raise SimulationException("Error in player perception: " + str(e))
-                try:
-                    decision: Action = player.decide(timepoint)
+            except PerceptionException as e:
+                raise SimulationException("Error in player perception: " + str(e))
+            try:
+                with self._timings.stage('decide'):
+                    decision: Action = player.decide(timepoint, interaction_payload)
+                with self._timings.stage('execute'):
                     self._execute(decision, timepoint)
+            except DecisionException as e:
+                raise SimulationException("Error in player decision: " + str(e))
+
+    def _step(self, timepoint: int) -> NoReturn:
+        """
+        Run a timepoint of the generation in one request to the agents service, sending the donor-recipient pair and
+        all the players' percepts from the previous timepoint and getting back every player's decision
+        :param timepoint: The timepoint to run
+        :type timepoint: int
+        :return: NoReturn
+        """
+        with self._timings.stage('pair'):
+            interaction_payload = self._choose_donor_recipient_pair(timepoint)
+        step = self._build_step(timepoint, interaction_payload)
+        step_response: Dict = None
+        if not self._all_local:
+            with self._timings.stage('decide'):
+                try:
+                    step_response = self._agents_client.step(step)
+                except AgentsServiceException as e:
+                    raise SimulationException("Failed to step " + str(e))
+        with self._timings.stage('execute'):
+            self._apply_step(timepoint, interaction_payload, step_response)
+
+    def _build_step(self, timepoint: int, interaction_payload: Dict) -> Dict:
+        """
+        Build the step request for a timepoint, gathering the percepts the players are yet to perceive and leaving out
+        the players that decide locally
+        :param timepoint: The timepoint to build the step for
+        :type timepoint: int
+        :param interaction_payload: The interaction percept of the donor-recipient pair chosen for the timepoint
+        :type interaction_payload: Dict
+        :return: The body of the step request
+        :rtype: Dict
+        """
+        percepts: List[Dict] = []
+        for player in self._players:
+            percepts.extend(player.percepts_to_perceive(timepoint))
+        return {'community': self._community_id, 'generation': self._generation_id, 'timepoint': timepoint,
+                'interaction': interaction_payload, 'percepts': percepts,
+                'players': [player.id for player in self._players if not player.decides_locally]}
+
+    def _apply_step(self, timepoint: int, interaction: Dict, step_response: Dict = None) -> NoReturn:
+        """
+        Check the response to a step request and commit the players to their decisions, executing them in player
+        order as with the per player cycle
+        :param timepoint: The timepoint the step was for
+        :type timepoint: int
+        :param interaction: The interaction percept of the step, from which the players that decide locally decide
+        :type interaction: Dict
+        :param step_response: The response of the agents service to the step request (defaults to None, for when
+         every player decides locally and no request was sent)
+        :type step_response: Dict
+        :return: NoReturn
+        """
+        decisions: Dict[int, Dict] = {}
+        if step_response is not None:
+            if step_response['interaction'] is not True:
+                raise SimulationException(step_response['interaction'])
+            for percept_response in step_response['percepts']:
+                # A failed percept's success is the error message the agents service replied with
+                if percept_response['success'] is not True:
+                    raise SimulationException("Error in player perception: " + percept_response['success'])
+            decisions = {decision['player']: decision for decision in step_response['actions']}
+        for player in self._players:
+            try:
+                if player.decides_locally:
+                    self._execute(player.commit_to_decision(timepoint, player.local_decision(interaction)), timepoint)
+                    continue
+                if player.id not in decisions:
+                    raise DecisionException("no decision returned for player " + str(player.id))
+                if not decisions[player.id]['success']:
+                    raise DecisionException(decisions[player.id]['message'])
+                self._execute(player.commit_to_decision(timepoint, decisions[player.id]['action']), timepoint)
+            except DecisionException as e:
+                raise SimulationException("Error in player decision: " + str(e))
+
+    async def simulate_async(self, async_client: AsyncAgentsClient) -> NoReturn:
+        """
+        Run the cycle steps between the start and end points of this generation, sending all the requests for the
+        players in a timepoint concurrently. The players are committed to their decisions and the decisions executed
+        in player order once all are in, so the simulation plays out the same as the synchronous one. A pipelined
+        generation requesting each player's decision separately draws and sends the donor-recipient pair of the next
+        timepoint while the decisions of the current one are in flight, as the pair doesn't depend on them. Batched
+        steps already send the pair along with the decisions, so aren't pipelined.
+        :param async_client: The asynchronous client to communicate with the agents service through
+        :type async_client: AsyncAgentsClient
+        :return: NoReturn
+        """
+        started = time.perf_counter()
+        next_pair: asyncio.Future = None
+        try:
+            for timepoint in range(self._start_point, self._end_point):
+                self._heartbeat()
+                if self._batched_steps:
+                    await self._step_async(timepoint, async_client)
+                    continue
+                if next_pair is not None:
+                    interaction_payload = await next_pair
+                else:
+                    interaction_payload = await self._send_pair_async(timepoint, async_client)
+                next_pair = None
+                if self._pipelined and timepoint + 1 < self._end_point:
+                    next_pair = asyncio.ensure_future(self._send_pair_async(timepoint + 1, async_client))
+                await self._step_per_player_async(timepoint, interaction_payload, async_client)
+        finally:
+            if next_pair is not None:
+                # Wait for the pair to finish cancelling, before the client closes, retrieving its exception if it had
+                # already failed so it isn't logged as never retrieved
+                next_pair.cancel()
+                await asyncio.gather(next_pair, return_exceptions=True)
+            self._timings.add('overall', time.perf_counter() - started)
+
+    async def _send_pair_async(self, timepoint: int, async_client: AsyncAgentsClient) -> Dict:
+        """
+        Decide on a donor-recipient pair for a timepoint and send the percept to the agents service, unless every player
+        decides locally
+        :param timepoint: The timepoint to set the pair for
+        :type timepoint: int
+        :param async_client: The asynchronous client to communicate with the agents service through
+        :type async_client: AsyncAgentsClient
+        :return: The interaction percept for the pair
+        :rtype: Dict
+        """
+        with self._timings.stage('pair'):
+            interaction_payload = self._choose_donor_recipient_pair(timepoint)
+            if self._all_local:
+                return interaction_payload
+            try:
+                interaction_response = await async_client.send_interaction(interaction_payload)
+            except AgentsServiceException as e:
+                raise SimulationException("Failed to create interaction pair " + str(e))
+            if not interaction_response['success']:
+                raise SimulationException(interaction_response['message'])
+            return interaction_payload
+
+    async def _step_async(self, timepoint: int, async_client: AsyncAgentsClient) -> NoReturn:
+        """
+        Run a timepoint of the generation in one request to the agents service
+        :param timepoint: The timepoint to run
+        :type timepoint: int
+        :param async_client: The asynchronous client to communicate with the agents service through
+        :type async_client: AsyncAgentsClient
+        :return: NoReturn
+        """
+        with self._timings.stage('pair'):
+            interaction_payload = self._choose_donor_recipient_pair(timepoint)
+        step = self._build_step(timepoint, interaction_payload)
+        step_response: Dict = None
+        if not self._all_local:
+            with self._timings.stage('decide'):
+                try:
+                    step_response = await async_client.step(step)
+                except AgentsServiceException as e:
+                    raise SimulationException("Failed to step " + str(e))
+        with self._timings.stage('execute'):
+            self._apply_step(timepoint, interaction_payload, step_response)
+
+    async def _step_per_player_async(self, timepoint: int, interaction_payload: Dict,
+                                     async_client: AsyncAgentsClient) -> NoReturn:
+        """
+        Run a timepoint of the generation requesting the perception and decision of each player concurrently
+        :param timepoint: The timepoint to run
+        :type timepoint: int
+        :param interaction_payload: The interaction percept of the timepoint, already sent
+        :type interaction_payload: Dict
+        :param async_client: The asynchronous client to communicate with the agents service through
+        :type async_client: AsyncAgentsClient
+        :return: NoReturn
+        """
+        async def perceive_and_decide(player: Player) -> Dict:
+            try:
+                await player.perceive_async(timepoint, async_client)
+            except PerceptionException as e:
+                raise SimulationException("Error in player perception: " + str(e))
+            try:
+                return await player.request_decision_async(timepoint, async_client, interaction_payload)
+            except DecisionException as e:
+                raise SimulationException("Error in player decision: " + str(e))
+
+        with self._timings.stage('decide'):
+            decisions: List[Dict] = await asyncio.gather(*[perceive_and_decide(player) for player in self._players])
+        with self._timings.stage('execute'):
+            for player, action_representation in zip(self._players, decisions):
+                try:
+                    self._execute(player.commit_to_decision(timepoint, action_representation), timepoint)
                 except DecisionException as e:
                     raise SimulationException("Error in player decision: " + str(e))
 
-    def _set_and_send_donor_recipient_pair(self, timepoint: int) -> NoReturn:
+    def _choose_donor_recipient_pair(self, timepoint: int) -> Dict:
         """
-        Decides on a donor-recipient pair for this timepoint and sends the percept to the agents service
+        Decide on a donor-recipient pair for this timepoint
         :param timepoint: The timepoint to set the pair for
         :type timepoint: int
-        :return: NoReturn
+        :return: The interaction percept for the pair
+        :rtype: Dict
+        """
+        donor, recipient = self._sampler.donor_recipient_pair()
+        return {'donor': donor, 'recipient': recipient, 'timepoint': timepoint,
+                'community': self._community_id, 'generation': self._generation_id}
+
+    def _set_and_send_donor_recipient_pair(self, timepoint: int) -> Dict:
+        """
+        Decides on a donor-recipient pair for this timepoint and sends the percept to the agents service, unless every
+        player decides locally
+        :param timepoint: The timepoint to set the pair for
+        :type timepoint: int
+        :return: The interaction percept for the pair
+        :rtype: Dict
         """
         # Generate the percepts
-        players = copy.deepcopy(self._players)
-        donor: Player = random.choice(players)
-        players.remove(donor)
-        recipient: Player = random.choice(players)
-        interaction_payload = {'donor': donor.id, 'recipient': recipient.id, 'timepoint': timepoint,
-                               'community': self._community_id, 'generation': self._generation_id}
+        interaction_payload = self._choose_donor_recipient_pair(timepoint)
+        if self._all_local:
+            return interaction_payload
         # Send them
-        interaction_response = requests.request("POST", Config.AGENTS_URL + 'percept/interaction',
-                                                json=interaction_payload)
-        if interaction_response.status_code != 200:
-            raise SimulationException("Failed to create interaction pair bad status code: " +
-                                      interaction_response.status_code)
-        if not interaction_response.json()['success']:
-            raise SimulationException(interaction_response.json()['message'])
+        try:
+            interaction_response = self._agents_client.send_interaction(interaction_payload)
+        except AgentsServiceException as e:
+            raise SimulationException("Failed to create interaction pair " + str(e))
+        if not interaction_response['success']:
+            raise SimulationException(interaction_response['message'])
+        return interaction_payload
 
     def _execute(self, action: Action, timepoint: int) -> NoReturn:
         """
@@ -194,7 +607,8 @@ class Generation:
         if action.type is ActionType.GOSSIP:
             gossip_action: GossipAction = action
             gossip_percept = {'type': gossip_action.type.value['percept_link'], 'gossip': gossip_action.gossip.value,
-                              'perceiver': gossip_action.recipient, 'community': self._community_id,
+                              'perceiver': gossip_action.recipient, 'gossiper': gossip_action.gossiper,
+                              'about': gossip_action.about, 'community': self._community_id,
                               'generation': self._generation_id, 'timepoint': timepoint}
             self._id_player_map[gossip_percept['perceiver']].set_perception(gossip_percept)
         elif action.type is ActionType.INTERACTION:
@@ -207,6 +621,7 @@ class Generation:
             for onlooker in onlookers:
                 action_percept = {'type': interaction_action.type.value['percept_link'],
                                   'action': interaction_action.action.value['string'], 'perceiver': onlooker,
+                                  'donor': interaction_action.donor, 'recipient': interaction_action.recipient,
                                   'community': self._community_id, 'generation': self._generation_id,
                                   'timepoint': timepoint}
                 self._id_player_map[action_percept['perceiver']].set_perception(action_percept)
@@ -219,20 +634,5 @@ class Generation:
         :return: A list of onlooker ids including the donor and recipient
         :rtype: List[int]
         """
-        onlookers: List[int] = []
-        possible_onlookers = copy.deepcopy(self._players)
-        # Add donor and recipient to the onlookers and remove them from being added again
-        onlookers.extend([action.donor, action.recipient])
-        for onlooker_choice in possible_onlookers:
-            if onlooker_choice.id == action.donor or onlooker_choice.id == action.recipient:
-                possible_onlookers.remove(onlooker_choice)
-        # Add a random sample of other onlookers
-        deep_copy_onlookers = []
-        if self._num_of_onlookers <= len(possible_onlookers):
-            deep_copy_onlookers.extend(random.sample(possible_onlookers, self._num_of_onlookers))
-        else:
-            deep_copy_onlookers.extend(random.sample(possible_onlookers, len(possible_onlookers)))
-        for onlooker in deep_copy_onlookers:
-            onlookers.append(onlooker.id)
-        return onlookers
-
+        return [action.donor, action.recipient] + self._sampler.onlookers(action.donor, action.recipient,
+                                                                             self._num_of_onlookers)
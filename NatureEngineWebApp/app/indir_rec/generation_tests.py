@@ -4,7 +4,7 @@ from app import create_app
 from tests.test_config import TestConfig
 import unittest
 import requests
-from .generation_logic import Generation, GenerationCreationException, SimulationException
+from .generation_logic import Generation, GenerationCreationException, SimulationException, PopulationSampler
 from .action_logic import InteractionAction, InteractionContent, ActionType
 from .observation_logic import ActionObserver
 import random
@@ -153,3 +153,45 @@ class GenerationTest(unittest.TestCase):
             self.fail("Should not have failed to create generation")
         except SimulationException:
             self.fail("Should not fail to simulate")
+
+
+class PopulationSamplerTest(unittest.TestCase):
+    """Test the PopulationSampler class"""
+
+    def test_donor_recipient_pair(self):
+        # The donor and recipient should be different players, with every ordered pair drawn
+        sampler = PopulationSampler([3, 5, 7, 9], random.Random(1))
+        pairs = [sampler.donor_recipient_pair() for _ in range(2000)]
+        self.assertTrue(all(donor != recipient for donor, recipient in pairs))
+        self.assertEqual({(donor, recipient) for donor in [3, 5, 7, 9] for recipient in [3, 5, 7, 9]
+                          if donor != recipient}, set(pairs))
+
+    def test_onlookers(self):
+        # Onlookers should be distinct and never the donor or recipient, every other player being drawn evenly
+        sampler = PopulationSampler(list(range(10)), random.Random(2))
+        counts = {player: 0 for player in range(10)}
+        for _ in range(4000):
+            donor, recipient = sampler.donor_recipient_pair()
+            onlookers = sampler.onlookers(donor, recipient, 3)
+            self.assertEqual(3, len(set(onlookers)))
+            self.assertNotIn(donor, onlookers)
+            self.assertNotIn(recipient, onlookers)
+            for onlooker in onlookers:
+                counts[onlooker] += 1
+        # Each player is an onlooker 3 times in 10 on average
+        for count in counts.values():
+            self.assertAlmostEqual(1200, count, delta=150)
+
+    def test_too_few_players(self):
+        # When there are fewer other players than onlookers asked for, every other player onlooks
+        sampler = PopulationSampler([0, 1, 2, 3], random.Random(3))
+        self.assertEqual({0, 3}, set(sampler.onlookers(2, 1, 5)))
+
+    def test_seeded(self):
+        # The same seed should draw the same players
+        first = PopulationSampler(list(range(50)), random.Random(4))
+        second = PopulationSampler(list(range(50)), random.Random(4))
+        for _ in range(100):
+            pair = first.donor_recipient_pair()
+            self.assertEqual(pair, second.donor_recipient_pair())
+            self.assertEqual(first.onlookers(*pair, 5), second.onlookers(*pair, 5))
@@ -0,0 +1,233 @@
+"""historical_logic.py: Keeps aggregates of every simulated reputation game up to date as each is stored, and builds the
+charts of the historical data page from them, so the page costs the same however many games have been run"""
+
+__author__ = "James King"
+
+import random
+from typing import Dict, List, Tuple
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from ..models import ReputationCommunity, ReputationStrategy, ReputationGenLengthAggregate, \
+    ReputationStrategyCountAggregate, ReputationHistoricalPoint
+
+
+def record_historical_aggregates(community: ReputationCommunity, generation_stats: Dict[int, Dict],
+                                 generation_ids: Dict[int, int], strategy_counts: Dict[int, Dict[int, int]]):
+    """
+    Add a community that has just been stored to the historical aggregates, in the current transaction so that it is
+    counted exactly when it is marked as simulated
+    :param community: The community stored, with its measurements set
+    :type community: ReputationCommunity
+    :param generation_stats: The columns of each generation stored, indexed by the generation's id in the game
+    :type generation_stats: Dict[int, Dict]
+    :param generation_ids: The database id of each generation, indexed by the generation's id in the game
+    :type generation_ids: Dict[int, int]
+    :param strategy_counts: The number of players of each strategy (by its database id) in each generation
+    :type strategy_counts: Dict[int, Dict[int, int]]
+    """
+    gen_lengths: Dict[int, Dict[str, int]] = {community.length_of_generations: {
+        'community_cooperation_rate_sum': community.cooperation_rate, 'community_count': 1}}
+    strategies: Dict[Tuple[int, int], Dict[str, int]] = {}
+    points = [{'community_id': community.id, 'generation_id': None,
+               'cooperation_rate': community.cooperation_rate, 'social_activeness': community.social_activeness,
+               'positivity_of_gossip': community.positivity_of_gossip, 'fitness': community.fitness}]
+    for generation, stats in generation_stats.items():
+        sums = gen_lengths.setdefault(stats['end_point'] - stats['start_point'], {})
+        sums['generation_cooperation_rate_sum'] = sums.get('generation_cooperation_rate_sum', 0) + \
+            stats['cooperation_rate']
+        sums['generation_count'] = sums.get('generation_count', 0) + 1
+        for strategy_id, count in strategy_counts[generation].items():
+            sums = strategies.setdefault((strategy_id, count), {'cooperation_rate_sum': 0, 'generation_count': 0})
+            sums['cooperation_rate_sum'] += stats['cooperation_rate']
+            sums['generation_count'] += 1
+        points.append({'community_id': community.id, 'generation_id': generation_ids[generation],
+                       'cooperation_rate': stats['cooperation_rate'], 'social_activeness': stats['social_activeness'],
+                       'positivity_of_gossip': stats['positivity_of_gossip'], 'fitness': stats['fitness']})
+    for length, sums in gen_lengths.items():
+        _add(ReputationGenLengthAggregate, {'length': length}, sums)
+    for (strategy_id, count), sums in strategies.items():
+        _add(ReputationStrategyCountAggregate, {'strategy_id': strategy_id, 'strategy_count': count}, sums)
+    db.session.execute(ReputationHistoricalPoint.__table__.insert(), points)
+
+
+def _add(model, key: Dict[str, int], sums: Dict[str, int]):
+    """
+    Add to the sums of an aggregate row, creating the row if this is the first time its key is seen (if another worker
+    creates it first the primary key stops a second copy and the sums are added to the other worker's)
+    :param model: The model of the aggregate table
+    :param key: The primary key of the row
+    :type key: Dict[str, int]
+    :param sums: The amount to add to each column of the row
+    :type sums: Dict[str, int]
+    """
+    table = model.__table__
+    update = table.update().where(and_(*[table.c[column] == value for column, value in key.items()]))\
+        .values({column: table.c[column] + value for column, value in sums.items()})
+    if db.session.execute(update).rowcount == 0:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(**key, **sums))
+        except IntegrityError:
+            db.session.execute(update)
+
+
+def get_social_vs_cooperation_rate_chart_data():
+    """
+    Get the data for the chart on the historical reputation game data page, that compares the social activeness and
+    positivity of gossip of a community to the cooperation rate of that community
+    :return: The chart data
+    """
+    chart_data = {'type': 'scatter',
+                  'data': {'datasets': [
+                      {
+                          'label': "Social Activeness vs. Cooperation Rate",
+                          'data': [],
+                          'backgroundColor': "#B10DC9", 'borderColor': "#0074D9"
+                      },
+                      {
+                          'label': "Positivity Of Gossip vs. Cooperation Rate",
+                          'data': [],
+                          'backgroundColor': "#39CCCC", 'borderColor': "#0074D9"
+                      }
+                  ]
+                           },
+                  'options': {
+                      'title': {'display': True,
+                                'text': "A scatter of the social measurements vs the cooperation rate of each community"},
+                      'scales': {'yAxes': [{'ticks': {'max': 100, 'min': 0},
+                                            'scaleLabel': {'display': True, 'labelString': "Cooperation Rate"}}],
+                                 'xAxes': [{'ticks': {'max': 100, 'min': 0},
+                                            'scaleLabel': {'display': True, 'labelString': "Social Measurement"}}]}
+                  }
+                  }
+    for point in ReputationHistoricalPoint.query.filter_by(generation_id=None)\
+            .order_by(ReputationHistoricalPoint.community_id):
+        chart_data['data']['datasets'][0]['data'].append({'x': point.social_activeness, 'y': point.cooperation_rate})
+        chart_data['data']['datasets'][1]['data'].append({'x': point.positivity_of_gossip,
+                                                          'y': point.cooperation_rate})
+    return chart_data
+
+
+def get_gen_length_vs_cooperation_rate_chart_data():
+    """
+    Get data for the chart on the historical reputation game data page that compares the length of generations in a
+    community to the cooperation rate of that community
+    :return: The chart data
+    """
+    chart_data = {'type': 'line',
+                  'data': {'labels': [],
+                           'datasets': [
+                      {
+                          'label': "Length of generations of the community vs cooperation rate of community",
+                          'data': [],
+                          'backgroundColor': "#2ECC40", 'borderColor': "#0074D9", 'fill': False
+                      },
+                      {
+                          'label': "Length of generation vs cooperation rate of generation",
+                          'data': [],
+                          'backgroundColor': "#FF4136", 'borderColor': "#0074D9", 'fill': False
+                      }
+                  ]},
+                  'options': {
+                      'title': {'display': True,
+                                'text': "A scatter of the length of the generation vs "
+                                        "the cooperation rate of each generation"},
+                      'scales': {'yAxes': [{'ticks': {'max': 100, 'min': 0},
+                                            'scaleLabel': {'display': True, 'labelString': "Cooperation Rate"}}],
+                                 'xAxes': [{'scaleLabel': {'display': True, 'labelString': "Generation Length"}}]}
+                  }
+                  }
+    aggregates: List[ReputationGenLengthAggregate] = ReputationGenLengthAggregate.query\
+        .order_by(ReputationGenLengthAggregate.length).all()
+    max_length = max([aggregate.length for aggregate in aggregates], default=0)
+    # Only lengths with both communities and generations of that length are shown, below the longest length
+    for aggregate in aggregates:
+        if aggregate.length < max_length and aggregate.community_count > 0 and aggregate.generation_count > 0:
+            chart_data['data']['labels'].append(aggregate.length)
+            chart_data['data']['datasets'][0]['data'].append(aggregate.community_cooperation_rate_sum /
+                                                             aggregate.community_count)
+            chart_data['data']['datasets'][1]['data'].append(aggregate.generation_cooperation_rate_sum /
+                                                             aggregate.generation_count)
+    return chart_data
+
+
+def get_cooperation_rate_vs_social_welfare_chart_data():
+    """
+    Get the chart data that compares the social welfare of a community to the cooperation rate of that community
+    :return: the chart data
+    """
+    chart_data = {'type': 'scatter',
+                  'data': {'datasets': [
+                      {
+                          'label': "Cooperation rate of community vs social welfare of community",
+                          'data': [],
+                          'backgroundColor': "#3D9970", 'borderColor': "#0074D9"
+                      },
+                      {
+                          'label': "Cooperation rate of generation vs social welfare of generation",
+                          'data': [],
+                          'backgroundColor': "#FF851B", 'borderColor': "#0074D9"
+                      }
+                  ]},
+                  'options': {
+                      'title': {'display': True,
+                                'text': "A scatter of the cooperation rate in comparison to the social welfare"},
+                      'scales': {'xAxes': [{'ticks': {'max': 100, 'min': 0},
+                                            'scaleLabel': {'display': True, 'labelString': "Cooperation Rate"}}],
+                                 'yAxes': [{'scaleLabel': {'display': True, 'labelString': "Social Welfare"}}]}
+                  }
+                  }
+    for point in ReputationHistoricalPoint.query.order_by(ReputationHistoricalPoint.id):
+        dataset = 0 if point.generation_id is None else 1
+        chart_data['data']['datasets'][dataset]['data'].append({'x': point.cooperation_rate, 'y': point.fitness})
+    return chart_data
+
+
+def get_strategies_vs_cooperation_rate_chart_data():
+    """
+    Get the chart data for the reputation game historical data page chart that concerns itself with comparing the
+    concentration of each strategy in each community to the cooperation rate of that community
+    :return: The chart data
+    """
+    # A dataset for each strategy, a datapoint for each count of the strategy in a generation, y is the average
+    # cooperation rate of the generations with that count
+    chart_data = {'type': 'line',
+                  'data': {'datasets': []},
+                  'options': {
+                      'title': {'display': True,
+                                'text': "A line chart comparing the counts of strategies in"
+                                        " generations and the avergae of those generations cooperation rate"},
+                      'scales': {'xAxes': [{'scaleLabel': {'display': True, 'labelString': "Strategy Count"}}],
+                                 'yAxes': [{'ticks': {'max': 100, 'min': 0},
+                                            'scaleLabel': {'display': True, 'labelString': "Cooperation Rate"}}]},
+                      'aspectRatio': 1,
+                      'legend': {'position': 'bottom'}
+                  }
+                  }
+    created_datasets: Dict[str, Dict[int, Dict[str, int]]] = {}
+    hex_digits = list("0123456789ABCDEF")
+    max_strat_count = 0
+    for aggregate, strategy in db.session.query(ReputationStrategyCountAggregate, ReputationStrategy)\
+            .join(ReputationStrategy, ReputationStrategy.id == ReputationStrategyCountAggregate.strategy_id)\
+            .order_by(ReputationStrategyCountAggregate.strategy_id, ReputationStrategyCountAggregate.strategy_count):
+        label = strategy.donor_strategy + " " + strategy.non_donor_strategy + " " + strategy.trust_model + " " + \
+            strategy.options
+        max_strat_count = max(max_strat_count, aggregate.strategy_count)
+        sums = created_datasets.setdefault(label, {}).setdefault(aggregate.strategy_count,
+                                                                 {'coop_rate_sum': 0, 'gen_count': 0})
+        sums['coop_rate_sum'] += aggregate.cooperation_rate_sum
+        sums['gen_count'] += aggregate.generation_count
+    chart_data['data']['labels'] = [i for i in range(max_strat_count)]
+    for dataset in created_datasets:
+        hex_colour = "#" + ''.join([hex_digits[random.randint(0, len(hex_digits) - 1)] for _ in range(6)])
+        chart_data['data']['datasets'].append({'label': dataset, 'data': [],
+                                               'borderColor': hex_colour, 'backgroundColor': hex_colour, 'fill': False})
+        index = len(chart_data['data']['datasets'])-1
+        for i in range(max_strat_count):
+            if i in created_datasets[dataset]:
+                chart_data['data']['datasets'][index]['data'].append(created_datasets[dataset][i]['coop_rate_sum'] /
+                                                                     created_datasets[dataset][i]['gen_count'])
+            else:
+                chart_data['data']['datasets'][index]['data'].append(None)
+    return chart_data
@@ -0,0 +1,119 @@
+"""historical_tests.py: Tests for the functionality of the historical_logic.py module, checking the aggregates kept as
+each community is stored give the same charts as scanning every community"""
+
+__author__ = "James King"
+
+import unittest
+from typing import Dict, Tuple
+from sqlalchemy import event, func
+from app import db
+from ..models import ReputationCommunity, ReputationGenLengthAggregate, ReputationPlayer, \
+    ReputationStrategyCountAggregate
+from .database_test_case import DatabaseTestCase, commit_results_game_to_database_per_row
+from .facade_logic import ReputationGame
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .persistence_logic import commit_results_game_to_database
+from .historical_logic import get_social_vs_cooperation_rate_chart_data, \
+    get_gen_length_vs_cooperation_rate_chart_data, get_cooperation_rate_vs_social_welfare_chart_data, \
+    get_strategies_vs_cooperation_rate_chart_data
+
+
+class HistoricalAggregatesTest(DatabaseTestCase):
+    """Test the historical data page's charts are built from the aggregates kept by the historical_logic module"""
+
+    def _store(self, count: int, length_of_generations: int, seed: int, commit=commit_results_game_to_database):
+        game = ReputationGame([dict(strategy, count=count) for strategy in STRATEGIES[::10]], num_of_onlookers=2,
+                              num_of_generations=3, length_of_generations=length_of_generations,
+                              mutation_chance=0.3, agents_client=LocalAgentsBackend(seed=seed))
+        self._store_game(game, commit=commit)
+
+    def _store_several(self):
+        self._store(1, 6, 1)
+        self._store(2, 6, 2)
+        self._store(1, 9, 3, commit_results_game_to_database_per_row)
+        self._store(2, 12, 4)
+
+    def test_scatter_points(self):
+        # There should be a point for every community and every generation stored, in the order they were stored
+        self._store_several()
+        communities = ReputationCommunity.query.filter_by(corrupted_observations=False, simulated=True)\
+            .order_by(ReputationCommunity.id).all()
+        social_chart = get_social_vs_cooperation_rate_chart_data()
+        self.assertEqual([{'x': community.social_activeness, 'y': community.cooperation_rate}
+                          for community in communities], social_chart['data']['datasets'][0]['data'])
+        self.assertEqual([{'x': community.positivity_of_gossip, 'y': community.cooperation_rate}
+                          for community in communities], social_chart['data']['datasets'][1]['data'])
+        welfare_chart = get_cooperation_rate_vs_social_welfare_chart_data()
+        self.assertEqual([{'x': community.cooperation_rate, 'y': community.fitness} for community in communities],
+                         welfare_chart['data']['datasets'][0]['data'])
+        self.assertEqual([{'x': generation.cooperation_rate, 'y': generation.fitness} for community in communities
+                          for generation in community.generations], welfare_chart['data']['datasets'][1]['data'])
+
+    def test_gen_length_aggregates(self):
+        # The sums for each length should be those of every community and generation of that length
+        self._store_several()
+        expected: Dict[int, Dict[str, int]] = {}
+        for community in ReputationCommunity.query.filter_by(corrupted_observations=False, simulated=True):
+            sums = expected.setdefault(community.length_of_generations, {'community': [0, 0], 'generation': [0, 0]})
+            sums['community'][0] += community.cooperation_rate
+            sums['community'][1] += 1
+            for generation in community.generations:
+                sums = expected.setdefault(generation.get_length(), {'community': [0, 0], 'generation': [0, 0]})
+                sums['generation'][0] += generation.cooperation_rate
+                sums['generation'][1] += 1
+        self.assertEqual(expected, {aggregate.length: {
+            'community': [aggregate.community_cooperation_rate_sum, aggregate.community_count],
+            'generation': [aggregate.generation_cooperation_rate_sum, aggregate.generation_count]}
+            for aggregate in ReputationGenLengthAggregate.query})
+        chart = get_gen_length_vs_cooperation_rate_chart_data()
+        labels = sorted(length for length, sums in expected.items() if length < max(expected)
+                        and sums['community'][1] > 0 and sums['generation'][1] > 0)
+        self.assertEqual(labels, chart['data']['labels'])
+        self.assertEqual([expected[length]['community'][0] / expected[length]['community'][1] for length in labels],
+                         chart['data']['datasets'][0]['data'])
+
+    def test_strategy_count_aggregates(self):
+        # The sums for each strategy and count should match grouping the players of every generation stored
+        self._store_several()
+        expected: Dict[Tuple[int, int], list] = {}
+        for community in ReputationCommunity.query.filter_by(corrupted_observations=False, simulated=True):
+            for generation in community.generations:
+                for strategy_id, count in db.session.query(ReputationPlayer.strategy, func.count('*'))\
+                        .filter_by(community_id=community.id, generation_id=generation.id)\
+                        .group_by(ReputationPlayer.strategy):
+                    sums = expected.setdefault((strategy_id, count), [0, 0])
+                    sums[0] += generation.cooperation_rate
+                    sums[1] += 1
+        self.assertEqual(expected, {(aggregate.strategy_id, aggregate.strategy_count):
+                                    [aggregate.cooperation_rate_sum, aggregate.generation_count]
+                                    for aggregate in ReputationStrategyCountAggregate.query})
+        chart = get_strategies_vs_cooperation_rate_chart_data()
+        self.assertEqual(len({strategy_id for strategy_id, _ in expected}), len(chart['data']['datasets']))
+
+    def test_query_count(self):
+        # The charts should take the same number of queries however many games have been stored
+        def page_queries():
+            statements = []
+
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                get_social_vs_cooperation_rate_chart_data()
+                get_gen_length_vs_cooperation_rate_chart_data()
+                get_cooperation_rate_vs_social_welfare_chart_data()
+                get_strategies_vs_cooperation_rate_chart_data()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+            return len(statements)
+
+        self._store(1, 6, 1)
+        few = page_queries()
+        self._store_several()
+        self.assertEqual(4, few)
+        self.assertEqual(few, page_queries())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,4 +2,23 @@ import os
 
 
 class Config:
-    AGENTS_URL = os.environ.get('AGENTS_URL') or 'http://127.0.0.1:8080/'
+    # AGENTS_URL may list several agents services separated by commas, to share communities out between
+    AGENTS_URLS = [url.strip() for url in (os.environ.get('AGENTS_URL') or 'http://127.0.0.1:8080/').split(',')
+                   if url.strip()]
+    AGENTS_URL = AGENTS_URLS[0]
+    AGENTS_DRAINING = [url.strip() for url in (os.environ.get('AGENTS_DRAINING') or '').split(',') if url.strip()]
+    AGENTS_HEALTH_INTERVAL = float(os.environ.get('AGENTS_HEALTH_INTERVAL') or 30)
+    AGENTS_BACKEND = os.environ.get('AGENTS_BACKEND') or 'service'
+    AGENTS_BATCHED_STEPS = (os.environ.get('AGENTS_BATCHED_STEPS') or 'true').lower() != 'false'
+    AGENTS_LOCAL_DECISIONS = (os.environ.get('AGENTS_LOCAL_DECISIONS') or 'true').lower() != 'false'
+    # Without batched steps, send the next timepoint's donor-recipient pair while the current decisions are in flight,
+    # from a worker thread when simulating synchronously as run_game does, or concurrently when asynchronously
+    AGENTS_PIPELINED = (os.environ.get('AGENTS_PIPELINED') or 'true').lower() != 'false'
+    AGENTS_POOL_SIZE = int(os.environ.get('AGENTS_POOL_SIZE') or 10)
+    AGENTS_CONNECT_TIMEOUT = float(os.environ.get('AGENTS_CONNECT_TIMEOUT') or 5)
+    AGENTS_READ_TIMEOUT = float(os.environ.get('AGENTS_READ_TIMEOUT') or 300)
+    AGENTS_RETRIES = int(os.environ.get('AGENTS_RETRIES') or 3)
+    AGENTS_BACKOFF_FACTOR = float(os.environ.get('AGENTS_BACKOFF_FACTOR') or 0.5)
+    AGENTS_CONCURRENCY = int(os.environ.get('AGENTS_CONCURRENCY') or 20)
+    # A community left in the agents service without its lease renewed for this many seconds is swept up
+    AGENTS_LEASE_TTL = float(os.environ.get('AGENTS_LEASE_TTL') or 1800)
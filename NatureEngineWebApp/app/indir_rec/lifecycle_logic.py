@@ -0,0 +1,265 @@
+"""lifecycle_logic.py: Releases the agent state a community holds in the agents service, each generation once the next
+has been reproduced from its fitness and the whole community once its simulation finishes or fails, and sweeps up the
+communities left behind by workers that died part way through a simulation"""
+
+__author__ = "James King"
+
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, NoReturn, Optional, Tuple
+from redis import Redis, RedisError
+from .agents_client_logic import AgentsBackend, AgentsClient, AgentsServiceException
+from .indir_rec_config import Config
+from .sharding_logic import ShardedAgentsClient
+
+LEASES_KEY = "agents_community_leases"
+
+
+class LeaseRegistry(ABC):
+    """Somewhere to keep a lease on each community held in an agents service, renewed while the community is being
+    simulated, so a community whose lease has expired is known to have been left behind"""
+
+    @abstractmethod
+    def hold(self, agents_url: str, community: int, expires_at: float) -> NoReturn:
+        """Take out or renew the lease on a community until the time given"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def drop(self, agents_url: str, community: int) -> NoReturn:
+        """Drop the lease on a community that has been released"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def expired(self, now: float) -> List[Tuple[str, int]]:
+        """The agents service url and id of each community whose lease expired before the time given"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, agents_url: str, community: int, now: float) -> bool:
+        """Drop the lease on a community to sweep it up, only if it still hasn't been renewed, returning whether it was
+        claimed"""
+        raise NotImplementedError
+
+
+class RedisLeaseRegistry(LeaseRegistry):
+    """Keeps the leases in a redis sorted set scored by expiry, shared by every worker so any of them can sweep up the
+    communities of one that died. Communities are simulated without leases if redis can't be reached."""
+
+    def __init__(self, redis: Redis):
+        """
+        Set up the registry
+        :param redis: The redis connection to keep the leases through
+        :type redis: Redis
+        """
+        self._redis: Redis = redis
+
+    @staticmethod
+    def _member(agents_url: str, community: int) -> str:
+        """The member of the sorted set standing for a community"""
+        return json.dumps([agents_url, community])
+
+    def hold(self, agents_url: str, community: int, expires_at: float) -> NoReturn:
+        try:
+            self._redis.zadd(LEASES_KEY, {self._member(agents_url, community): expires_at})
+        except RedisError:
+            pass
+
+    def drop(self, agents_url: str, community: int) -> NoReturn:
+        try:
+            self._redis.zrem(LEASES_KEY, self._member(agents_url, community))
+        except RedisError:
+            pass
+
+    def expired(self, now: float) -> List[Tuple[str, int]]:
+        try:
+            members = self._redis.zrangebyscore(LEASES_KEY, '-inf', now)
+        except RedisError:
+            return []
+        return [tuple(json.loads(member.decode('utf-8') if isinstance(member, bytes) else member))
+                for member in members]
+
+    def claim(self, agents_url: str, community: int, now: float) -> bool:
+        member = self._member(agents_url, community)
+        try:
+            expires_at = self._redis.zscore(LEASES_KEY, member)
+            # Only one sweeper removes the member, so only one deletes the community
+            return expires_at is not None and expires_at <= now and self._redis.zrem(LEASES_KEY, member) == 1
+        except RedisError:
+            return False
+
+
+def service_community_of(agents_client: AgentsBackend, community: int) -> Optional[Tuple[str, int]]:
+    """
+    Find where a community is held, for a lease on it to name
+    :param agents_client: The backend the community was created through
+    :type agents_client: AgentsBackend
+    :param community: The id of the community given by the backend
+    :type community: int
+    :return: The url of the agents service and the service's id for the community, or None if the backend holds its
+     communities in process, where they go with a worker that dies
+    :rtype: Optional[Tuple[str, int]]
+    """
+    if isinstance(agents_client, ShardedAgentsClient):
+        return agents_client.service_community_of(community)
+    if isinstance(agents_client, AgentsClient):
+        return agents_client.agents_url, community
+    return None
+
+
+class CommunityLifecycle:
+    """Tracks the agent state a community holds in its backend and releases it: the generations held once the next
+    generation has been reproduced from their fitness, and the whole community once it is done with. While the
+    community is held its lease is renewed with each generation, and from each timepoint once a third of the lease has
+    gone, so a long generation doesn't outlast it."""
+
+    def __init__(self, agents_client: AgentsBackend, community: int, leases: LeaseRegistry = None,
+                 lease_ttl: float = None, clock: Callable[[], float] = time.time):
+        """
+        Start tracking a community that has just been created, taking out a lease on it
+        :param agents_client: The backend the community was created through
+        :type agents_client: AgentsBackend
+        :param community: The id of the community
+        :type community: int
+        :param leases: Where to keep the lease on the community (defaults to no lease)
+        :type leases: LeaseRegistry
+        :param lease_ttl: The number of seconds a lease lasts without being renewed, longer than any generation takes
+         to simulate (defaults to the AGENTS_LEASE_TTL config)
+        :type lease_ttl: float
+        :param clock: The clock leases are timed by, shared by every worker
+        :type clock: Callable[[], float]
+        """
+        self._agents_client: AgentsBackend = agents_client
+        self._community: int = community
+        self._leases: Optional[LeaseRegistry] = leases
+        self._lease_ttl: float = lease_ttl if lease_ttl is not None else Config.AGENTS_LEASE_TTL
+        self._clock: Callable[[], float] = clock
+        self._location: Optional[Tuple[str, int]] = service_community_of(agents_client, community) \
+            if leases is not None else None
+        self._generations: List[int] = []
+        self._released: bool = False
+        self._renewed_at: Optional[float] = None
+        self.renew()
+
+    @property
+    def released(self) -> bool:
+        """
+        Get whether the community has been released
+        :return: True if the community has been released
+        :rtype: bool
+        """
+        return self._released
+
+    @property
+    def generations(self) -> List[int]:
+        """
+        Get the generations held that haven't been released
+        :return: The ids of the generations
+        :rtype: List[int]
+        """
+        return self._generations
+
+    def renew(self) -> NoReturn:
+        """
+        Renew the lease on the community, so it isn't swept up while it is still being simulated
+        :return: NoReturn
+        """
+        if self._location is not None and not self._released:
+            self._renewed_at = self._clock()
+            self._leases.hold(*self._location, self._renewed_at + self._lease_ttl)
+
+    def heartbeat(self) -> NoReturn:
+        """
+        Renew the lease if a third of it has gone since it was last renewed, cheap enough to call each timepoint
+        :return: NoReturn
+        """
+        if self._renewed_at is not None and self._clock() - self._renewed_at >= self._lease_ttl / 3:
+            self.renew()
+
+    def hold_generation(self, generation: int) -> NoReturn:
+        """
+        Track a generation that has been created in the community, renewing the lease
+        :param generation: The id of the generation
+        :type generation: int
+        :return: NoReturn
+        """
+        self._generations.append(generation)
+        self.renew()
+
+    def release_generations(self) -> NoReturn:
+        """
+        Release the generations held, once reproduction has read their players' fitness. A generation that fails to
+        be released is left to be released with the community.
+        :return: NoReturn
+        """
+        generations, self._generations = self._generations, []
+        for generation in generations:
+            try:
+                self._agents_client.delete_generation(self._community, generation)
+            except AgentsServiceException:
+                pass
+
+    def release(self) -> NoReturn:
+        """
+        Release the community and everything in it. If the backend can't be reached the lease is left to expire, for
+        the community to be swept up later, and the error isn't raised so it doesn't hide why a simulation failed.
+        :return: NoReturn
+        """
+        if self._released:
+            return
+        try:
+            self._agents_client.delete_community(self._community)
+        except AgentsServiceException as e:
+            if e.status is None:
+                return
+        self._released = True
+        self._generations = []
+        if self._location is not None:
+            self._leases.drop(*self._location)
+
+
+class CommunitySweeper:
+    """Sweeps up the communities whose leases have expired, those left in the agents services by workers that died
+    part way through simulating them"""
+
+    def __init__(self, leases: LeaseRegistry, clock: Callable[[], float] = time.time, **client_settings):
+        """
+        Set up the sweeper
+        :param leases: Where the leases on communities are kept
+        :type leases: LeaseRegistry
+        :param clock: The clock leases are timed by, shared by every worker
+        :type clock: Callable[[], float]
+        :param client_settings: The settings of the client of each agents service, as taken by AgentsClient
+        """
+        self._leases: LeaseRegistry = leases
+        self._clock: Callable[[], float] = clock
+        self._client_settings: Dict = client_settings
+
+    def sweep(self) -> List[Tuple[str, int]]:
+        """
+        Delete each community whose lease has expired from its agents service. A community in a service that can't be
+        reached is given a new lease, to be swept up once the service is back.
+        :return: The agents service url and id of each community swept up
+        :rtype: List[Tuple[str, int]]
+        """
+        now = self._clock()
+        clients: Dict[str, AgentsClient] = {}
+        swept: List[Tuple[str, int]] = []
+        try:
+            for agents_url, community in self._leases.expired(now):
+                if not self._leases.claim(agents_url, community, now):
+                    continue
+                if agents_url not in clients:
+                    clients[agents_url] = AgentsClient(agents_url, **self._client_settings)
+                try:
+                    clients[agents_url].delete_community(community)
+                except AgentsServiceException as e:
+                    if e.status is None:
+                        self._leases.hold(agents_url, community, now + Config.AGENTS_LEASE_TTL)
+                        continue
+                # A community the service no longer has, such as after it restarted, is swept up all the same
+                swept.append((agents_url, community))
+        finally:
+            for client in clients.values():
+                client.close()
+        return swept
@@ -0,0 +1,251 @@
+"""lifecycle_tests.py: Tests for the functionality of the lifecycle_logic.py module, checking a community's agent state
+is released from the agents service as it is simulated and once it finishes or fails, and that communities left behind
+by dead workers are swept up"""
+
+__author__ = "James King"
+
+import asyncio
+import unittest
+from typing import Dict, List, NoReturn, Tuple
+from unittest.mock import Mock, patch
+from redis import RedisError
+from .agents_client_logic import AgentsClient
+from .community_logic import Community
+from .facade_logic import ReputationGame
+from .generation_logic import Generation
+from .lifecycle_logic import CommunityLifecycle, CommunitySweeper, LeaseRegistry, RedisLeaseRegistry, LEASES_KEY
+from .local_agents_logic import LocalAgentsBackend
+from .mock_agents_service import MockAgentsService
+from .strategy_logic import Strategy
+
+
+class _MemoryLeaseRegistry(LeaseRegistry):
+    """Keeps the leases in a dictionary"""
+
+    def __init__(self):
+        self.leases: Dict[Tuple[str, int], float] = {}
+
+    def hold(self, agents_url: str, community: int, expires_at: float) -> NoReturn:
+        self.leases[(agents_url, community)] = expires_at
+
+    def drop(self, agents_url: str, community: int) -> NoReturn:
+        self.leases.pop((agents_url, community), None)
+
+    def expired(self, now: float) -> List[Tuple[str, int]]:
+        return [lease for lease, expires_at in self.leases.items() if expires_at <= now]
+
+    def claim(self, agents_url: str, community: int, now: float) -> bool:
+        if self.leases.get((agents_url, community), now + 1) > now:
+            return False
+        del self.leases[(agents_url, community)]
+        return True
+
+
+class _Clock:
+    """A clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class LifecycleTest(unittest.TestCase):
+    """Test releasing communities and generations from the mock agents service, and sweeping up those left behind"""
+
+    def setUp(self):
+        self.service = MockAgentsService()
+        self.service.start()
+        self.client = AgentsClient(self.service.url)
+        self.leases = _MemoryLeaseRegistry()
+        self.strategies = {Strategy("Defector", "Lazy", "Void", []): 3,
+                           Strategy("Standing Discriminator", "Lazy", "Trusting", []): 3}
+
+    def tearDown(self):
+        self.client.close()
+        self.service.stop()
+
+    def _community(self, agents_client=None, num_of_generations: int = 4) -> Community:
+        return Community(self.strategies, num_of_onlookers=2, num_of_generations=num_of_generations,
+                         length_of_generations=6, agents_client=agents_client or self.client, seed=3,
+                         leases=self.leases)
+
+    def test_released_when_finished(self):
+        # Each generation should be released once the next is reproduced from it, then the community once finished
+        community = self._community()
+        self.assertEqual([(self.service.url, community.get_id())], list(self.leases.leases))
+        community.simulate()
+        self.assertEqual(3, self.service.request_count('DELETE generation'))
+        self.assertEqual(1, self.service.request_count('DELETE community'))
+        self.assertEqual({}, self.service.communities)
+        self.assertEqual({}, self.leases.leases)
+        # Reproduction read each old generation's fitness before it was released
+        self.assertEqual(4, len(community.get_strategy_count_by_generation()))
+        lifecycle = [request for request in self.service.requests
+                     if request in ('POST generation', 'DELETE generation', 'DELETE community')]
+        self.assertEqual(['POST generation'] + ['DELETE generation', 'POST generation'] * 3 + ['DELETE community'],
+                         lifecycle)
+
+    def test_generations_released_as_simulated(self):
+        # Only the generation being simulated should be held, the one it was reproduced from already released
+        held = []
+        simulate = Generation.simulate
+
+        def record_held(generation):
+            held.append(self.service.communities)
+            return simulate(generation)
+
+        with patch.object(Generation, 'simulate', record_held):
+            self._community().simulate()
+        self.assertEqual([{0: [0]}, {0: [1]}, {0: [2]}, {0: [3]}], held)
+
+    def test_released_when_failed(self):
+        # A simulation that fails part way should still release the community
+        community = self._community()
+
+        def fail(generation):
+            raise RuntimeError("worker interrupted")
+
+        with patch.object(Generation, 'simulate', fail):
+            with self.assertRaises(RuntimeError):
+                community.simulate()
+        self.assertEqual({}, self.service.communities)
+        self.assertEqual({}, self.leases.leases)
+
+    def test_released_async(self):
+        # A game simulated asynchronously should release its community in the same way
+        game = ReputationGame([{'donor_strategy': "Defector", 'non_donor_strategy': "Lazy", 'trust_model': "Void",
+                                'options': [], 'count': 6}], num_of_onlookers=2, num_of_generations=3,
+                              length_of_generations=6, agents_client=self.client, leases=self.leases)
+        asyncio.get_event_loop().run_until_complete(game.run_async())
+        self.assertEqual(2, self.service.request_count('DELETE generation'))
+        self.assertEqual({}, self.service.communities)
+        self.assertEqual({}, self.leases.leases)
+
+    def test_invalid_community_not_created(self):
+        # A community that fails its checks shouldn't be created in the agents service to be left behind
+        with self.assertRaises(Exception):
+            Community(self.strategies, num_of_onlookers=0, agents_client=self.client)
+        self.assertEqual(0, self.service.request_count('POST community'))
+
+    def test_local_backend_released(self):
+        # A backend running the minds in process should have its communities released too, without leases
+        backend = LocalAgentsBackend(seed=1)
+        community = self._community(backend)
+        self.assertEqual({}, self.leases.leases)
+        community.simulate()
+        with self.assertRaises(KeyError):
+            backend.get_mind(community.get_id(), 3, 0)
+
+    def test_unreachable_release_left_to_sweep(self):
+        # If the service can't be reached on release the lease should be left for the community to be swept up
+        clock = _Clock()
+        lifecycle = CommunityLifecycle(self.client, self.client.create_community()['id'], self.leases, lease_ttl=60,
+                                       clock=clock)
+        self.assertEqual({(self.service.url, 0): 1060.0}, self.leases.leases)
+        unreachable = AgentsClient('http://127.0.0.1:1/', retries=0)
+        lifecycle._agents_client = unreachable
+        lifecycle.release()
+        self.assertFalse(lifecycle.released)
+        self.assertEqual({(self.service.url, 0): 1060.0}, self.leases.leases)
+        unreachable.close()
+
+    def test_renewed_through_long_generation(self):
+        # A generation taking longer than the lease should keep renewing it each third of the lease, not each timepoint
+        clock = _Clock()
+        community = self.client.create_community()['id']
+        lifecycle = CommunityLifecycle(self.client, community, self.leases, lease_ttl=60, clock=clock)
+        renewals = []
+        hold = self.leases.hold
+
+        def record_hold(agents_url, community, expires_at):
+            renewals.append(expires_at)
+            hold(agents_url, community, expires_at)
+
+        def tick():
+            # Each timepoint takes 10 seconds
+            clock.now += 10
+            lifecycle.heartbeat()
+
+        self.leases.hold = record_hold
+        Generation(self.strategies, 0, community, 0, 8, 2, [], agents_client=self.client, heartbeat=tick).simulate()
+        self.assertEqual([1080.0, 1100.0, 1120.0, 1140.0], renewals)
+        self.assertEqual([], CommunitySweeper(self.leases, clock=clock).sweep())
+        self.assertIn(community, self.service.communities)
+
+    def test_sweep_expired(self):
+        # Only communities whose leases have expired should be swept up
+        clock = _Clock()
+        orphan = CommunityLifecycle(self.client, self.client.create_community()['id'], self.leases, lease_ttl=60,
+                                    clock=clock)
+        live = CommunityLifecycle(self.client, self.client.create_community()['id'], self.leases, lease_ttl=60,
+                                  clock=clock)
+        clock.now += 50
+        live.renew()
+        clock.now += 20
+        sweeper = CommunitySweeper(self.leases, clock=clock)
+        self.assertEqual([(self.service.url, 0)], sweeper.sweep())
+        self.assertEqual([1], list(self.service.communities))
+        self.assertEqual([(self.service.url, 1)], list(self.leases.leases))
+        # A community the service no longer holds is swept up without error
+        self.leases.hold(self.service.url, 5, clock.now)
+        self.assertEqual([(self.service.url, 5)], sweeper.sweep())
+        self.assertEqual([], sweeper.sweep())
+        self.assertFalse(orphan.released)
+
+    def test_sweep_unreachable(self):
+        # A community in a service that can't be reached should be leased again to be swept up later
+        clock = _Clock()
+        self.leases.hold('http://127.0.0.1:1/', 0, clock.now)
+        self.assertEqual([], CommunitySweeper(self.leases, clock=clock, retries=0).sweep())
+        self.assertIn(('http://127.0.0.1:1/', 0), self.leases.leases)
+        self.assertGreater(self.leases.leases[('http://127.0.0.1:1/', 0)], clock.now)
+
+
+class RedisLeaseRegistryTest(unittest.TestCase):
+    """Test keeping the leases in a redis sorted set"""
+
+    def setUp(self):
+        # A redis keeping a single sorted set in a dictionary
+        self.scores: Dict[bytes, float] = {}
+        self.redis = Mock()
+
+        def zadd(key, mapping):
+            self.scores.update({member.encode('utf-8'): score for member, score in mapping.items()})
+
+        def zrem(key, member):
+            return 1 if self.scores.pop(member.encode('utf-8'), None) is not None else 0
+
+        self.redis.zadd.side_effect = zadd
+        self.redis.zrem.side_effect = zrem
+        self.redis.zscore.side_effect = lambda key, member: self.scores.get(member.encode('utf-8'))
+        self.redis.zrangebyscore.side_effect = lambda key, low, high: [member for member, score in
+                                                                       self.scores.items() if score <= high]
+        self.registry = RedisLeaseRegistry(self.redis)
+
+    def test_leases(self):
+        self.registry.hold('http://a/', 1, 10)
+        self.registry.hold('http://b/', 1, 20)
+        self.assertEqual(LEASES_KEY, self.redis.zadd.call_args[0][0])
+        self.assertEqual([('http://a/', 1)], self.registry.expired(15))
+        # A lease renewed since it was found expired shouldn't be claimed
+        self.registry.hold('http://a/', 1, 30)
+        self.assertFalse(self.registry.claim('http://a/', 1, 15))
+        self.assertTrue(self.registry.claim('http://a/', 1, 30))
+        self.assertFalse(self.registry.claim('http://a/', 1, 30))
+        self.registry.drop('http://b/', 1)
+        self.assertEqual({}, self.scores)
+
+    def test_redis_down(self):
+        # Communities should be simulated and released without leases when redis can't be reached
+        for method in [self.redis.zadd, self.redis.zrem, self.redis.zscore, self.redis.zrangebyscore]:
+            method.side_effect = RedisError()
+        self.registry.hold('http://a/', 1, 10)
+        self.registry.drop('http://a/', 1)
+        self.assertEqual([], self.registry.expired(15))
+        self.assertFalse(self.registry.claim('http://a/', 1, 15))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,1030 @@
+"""local_agents_logic.py: Module for running the agents' minds in the same process as the environment, following the
+rules of the built-in strategies of the agents service, so a game can be simulated without any network calls"""
+
+__author__ = "James King"
+
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, List, NoReturn, Optional, Set, Tuple
+from .agents_client_logic import AgentsBackend, AgentsServiceException
+
+
+def _build_strategies() -> List[Dict]:
+    """
+    Build the strategies of the agents service, in the order and with the descriptions the service gives them
+    :return: The strategies, each with a donor strategy, non donor strategy, trust model, description and options
+    :rtype: List[Dict]
+    """
+    strategies: List[Dict] = []
+
+    def add(donor_strategy: str, non_donor_strategy: str, trust_model: str, description: str, options: List):
+        strategies.append({'donor_strategy': donor_strategy, 'non_donor_strategy': non_donor_strategy,
+                           'trust_model': trust_model, 'description': description, 'options': options})
+
+    add("Cooperator", "Lazy", "Void", "Cooperates every time, does not bother to actively gossip", [])
+    add("Cooperator", "Promote Self", "Void",
+        "Cooperates every time, actively gossips and promotes positive information on self", [])
+    add("Cooperator", "Spread Positive", "Void",
+        "Cooperates every time, actively gossips and promotes positive information on any random agent", [])
+    add("Defector", "Lazy", "Void", "Defects every time, does not bother to actively gossip", [])
+    add("Defector", "Promote Self", "Void",
+        "Defects every time, actively gossips and promotes positive information about self", [])
+    add("Defector", "Spread Negative", "Void",
+        "Defects every time, actively gossips and spreads negative information about others", [])
+    standing = "Considers every other agent to start on a good standing, if they observe a defection towards an " \
+               "agent with good standing the donor that defected is given a bad standing. Cooperates with agents " \
+               "they deem to have good standing, defects against those with bad standing. "
+    standing_non_donor = [("Lazy", "does not actively gossip"),
+                          ("Promote Self", "actively promotes own image with gossip"),
+                          ("Spread Accurate Positive", "actively promotes positive image of good agents"),
+                          ("Spread Accurate Negative", "actively promotes negative image of bad agents")]
+    for trust_model, trust_description in [("Trusting", "Trusts gossip from agents with a good standing, "),
+                                           ("Distrusting", "Doesn't trust other agents gossip, ")]:
+        for non_donor_strategy, non_donor_description in standing_non_donor:
+            add("Standing Discriminator", non_donor_strategy, trust_model,
+                standing + trust_description + non_donor_description, [])
+    add("Random", "Random", "Void", "Randomly selects from actions it is capable of at each timepoint", [])
+    for non_donor_strategy, non_donor_description in standing_non_donor:
+        add("Standing Discriminator", non_donor_strategy, "Naive Trusting",
+            standing + "Trusts other agents gossip, " + non_donor_description, [])
+    image_score_options = [
+        ("Lazy", "Trusting",
+         "Agent never spreads gossip, but trusts others gossip (if the gossiper is of a value greater than K)"),
+        ("Lazy", "Distrusting", "Agent never spreads gossip and never trusts gossip"),
+        ("Lazy", "Naive Trusting",
+         "Agent never spreads gossip, but always trusts gossip no matter who is gossiping."),
+        ("Spread Accurate Negative", "Trusting",
+         "Agent spreads negative gossip about those it distrusts (value < K) and trusts other trusted agents gossip"),
+        ("Spread Accurate Negative", "Distrusting",
+         "Agent spreads negative gossip about those it distrusts (value < K) but never trusts others gossip"),
+        ("Spread Accurate Negative", "Naive Trusting",
+         "Agent spreads negative gossip about those it distrusts (value < K). Always trusts gossip no matter who is "
+         "gossiping."),
+        ("Spread Accurate Positive", "Trusting",
+         "Agent spreads positive gossip about those it trusts (value >= K) and trusts others trusted agents gossip"),
+        ("Spread Accurate Positive", "Distrusting",
+         "Agent spreads positive gossip about those it trusts (value >= K), but never trusts others gossip"),
+        ("Spread Accurate Positive", "Naive Trusting",
+         "Agent spreads positive gossip about those it trusts (value >= K). Always trusts gossip no matter who is "
+         "gossiping."),
+        ("Promote Self", "Trusting",
+         "Agent spreads positive gossip to promote themself, trusts gossip from agents it trusts (value >= K)"),
+        ("Promote Self", "Distrusting",
+         "Agent spreads positive gossip to promote themself, doesn't trust other agents gossip"),
+        ("Promote Self", "Naive Trusting",
+         "Agent spreads positive gossip to promote themself. Always trusts gossip no matter who is gossiping.")]
+    for k in range(-2, 3):
+        for other_options, grievance_description in [
+                ([], ""),
+                (["Personal Grievance"], "Cooperation and defection against an agent using this strategy have a "
+                                         "doubly large effect on the donors image score.")]:
+            for non_donor_strategy, trust_model, options_description in image_score_options:
+                add("Image Scoring Discriminator", non_donor_strategy, trust_model,
+                    "Holds a value for each player starting on 0, when interacting if the agent holds a value of "
+                    "greater than or equal to K=" + str(k) + " for the recipient they cooperate, else they defect. " +
+                    options_description + " " + grievance_description, [k] + other_options)
+    veritability_trust_models = [
+        ("Strong Reactor", "Weights for negative percepts are 2, no weight for positive percepts."),
+        ("Balanced Reactor", "No weights for either positive or negative percepts."),
+        ("Forgiving Reactor", "Weights for positive percepts are 2, no weight for negative percepts.")]
+    veritability_non_donor = [
+        ("Lazy", "Always commits to idle actions when not a donor."),
+        ("Promote Self", "Spreads positive gossip about itself when not a donor."),
+        ("Spread Positive Trusted", "Spreads positive gossip to trusted agents about trusted agents."),
+        ("Spread Negative Untrusted", "Spreads negative gossip to trusted agents about untrusted agents.")]
+    for k in [-10, -5, 0, 5, 10]:
+        for trust_model, trust_description in veritability_trust_models:
+            for non_donor_strategy, non_donor_description in veritability_non_donor:
+                add("Veritability Discerner", non_donor_strategy, trust_model,
+                    "Holds a veritability rating v for each other agent which is affected by percepts when that "
+                    "agent is a donor or gossip about that agent (+20*weight when viewing a cooperation, -20*weight "
+                    "when viewing a defecting against a trusted agent, +10*weight for positive gossip from a "
+                    "trusted source, -10*weight for negative gossip from a trusted source, +1*weight for positive "
+                    "gossip from an untrusted source and -1* weight for negative gossip from an untrusted source). "
+                    "Keeps a count of the percepts received about that agent n. If the v/n>" + str(k) +
+                    " the agent the beliefs are about is trusted. Will cooperate with trusted agents. " +
+                    non_donor_description + " " + trust_description, [k])
+    return strategies
+
+
+STRATEGIES: List[Dict] = _build_strategies()
+
+_AGENT_FIELDS = ['donor_strategy', 'non_donor_strategy', 'trust_model', 'options', 'community', 'generation',
+                 'player']
+_INTERACTION_FIELDS = ['community', 'generation', 'donor', 'recipient', 'timepoint']
+_ACTION_PERCEPT_FIELDS = ['community', 'generation', 'perceiver', 'donor', 'recipient', 'timepoint', 'action']
+_GOSSIP_PERCEPT_FIELDS = ['community', 'generation', 'perceiver', 'about', 'gossiper', 'timepoint', 'gossip']
+
+
+def _idle(reason: str) -> Dict:
+    """Build an idle action"""
+    return {'type': 'idle', 'reason': reason}
+
+
+def _interaction(value: str, recipient: int, reason: str) -> Dict:
+    """Build a cooperate or defect action"""
+    return {'type': 'action', 'value': value, 'recipient': recipient, 'reason': reason}
+
+
+def _gossip(value: str, about: int, recipient: int, reason: str) -> Dict:
+    """Build a positive or negative gossip action"""
+    return {'type': 'gossip', 'value': value, 'about': about, 'recipient': recipient, 'reason': reason}
+
+
+def _missing_agents_message(roles: List[str]) -> str:
+    """Build the message for agents of a percept that do not exist e.g. 'No such agent for: perceiver or donor'"""
+    if len(roles) == 1:
+        return "No such agent for: " + roles[0]
+    return "No such agent for: " + ", ".join(roles[:-1]) + " or " + roles[-1]
+
+
+class LocalGeneration:
+    """The agents of a generation in the local backend, and the donor-recipient pairs and action commitments made in
+    it"""
+
+    def __init__(self):
+        self._minds: Dict[int, 'AgentMind'] = {}
+        self._agent_ids: List[int] = []
+        self._recipients: Dict[int, Dict[int, int]] = {}
+        self._commitments: Set[Tuple[int, int]] = set()
+
+    @property
+    def minds(self) -> Dict[int, 'AgentMind']:
+        """
+        Get the minds of the agents in the generation by their ids
+        :return: The minds of the agents
+        :rtype: Dict[int, AgentMind]
+        """
+        return self._minds
+
+    @property
+    def agent_ids(self) -> List[int]:
+        """
+        Get the ids of the agents in the generation in the order they were created
+        :return: The ids of the agents
+        :rtype: List[int]
+        """
+        return self._agent_ids
+
+    def add_mind(self, agent_id: int, mind: 'AgentMind') -> NoReturn:
+        """
+        Add an agent to the generation
+        :param agent_id: The id of the agent
+        :type agent_id: int
+        :param mind: The mind of the agent
+        :type mind: AgentMind
+        :return: NoReturn
+        """
+        self._minds[agent_id] = mind
+        self._agent_ids.append(agent_id)
+
+    def add_interaction(self, timepoint: int, donor: int, recipient: int) -> NoReturn:
+        """
+        Set a donor-recipient pair for a timepoint, a donor keeps the first recipient it is paired with
+        :param timepoint: The timepoint of the interaction
+        :type timepoint: int
+        :param donor: The id of the donor
+        :type donor: int
+        :param recipient: The id of the recipient
+        :type recipient: int
+        :return: NoReturn
+        """
+        self._recipients.setdefault(timepoint, {}).setdefault(donor, recipient)
+
+    def recipient_of(self, donor: int, timepoint: int) -> Optional[int]:
+        """
+        Get the recipient an agent is the donor to at a timepoint
+        :param donor: The id of the agent
+        :type donor: int
+        :param timepoint: The timepoint of the interaction
+        :type timepoint: int
+        :return: The id of the recipient, or None if the agent is not a donor at the timepoint
+        :rtype: Optional[int]
+        """
+        return self._recipients.get(timepoint, {}).get(donor)
+
+    def has_committed(self, agent_id: int, timepoint: int) -> bool:
+        """
+        Check whether an agent has committed to an action at a timepoint
+        :param agent_id: The id of the agent
+        :type agent_id: int
+        :param timepoint: The timepoint of the commitment
+        :type timepoint: int
+        :return: True if the agent has committed to an action at the timepoint, else False
+        :rtype: bool
+        """
+        return (agent_id, timepoint) in self._commitments
+
+    def commit(self, agent_id: int, timepoint: int) -> NoReturn:
+        """
+        Record that an agent has committed to an action at a timepoint
+        :param agent_id: The id of the agent
+        :type agent_id: int
+        :param timepoint: The timepoint of the commitment
+        :type timepoint: int
+        :return: NoReturn
+        """
+        self._commitments.add((agent_id, timepoint))
+
+
+class AgentMind(ABC):
+    """The beliefs and decision making of an agent. Percepts are kept by the timepoint they occurred at and beliefs are
+    revised with them in timepoint order, as the agents service's event calculus does: a belief at a timepoint holds
+    the effects of every percept from before it, and within a timepoint each percept is judged against the beliefs held
+    before that timepoint with the first change to a belief standing. Beliefs are revised incrementally and replayed
+    from the start only when a query or percept reaches back before the latest revision."""
+
+    def __init__(self, agent_id: int, strategy: Dict, generation: LocalGeneration, rng: random.Random):
+        """
+        Set up the mind of an agent with no percepts
+        :param agent_id: The id of the agent
+        :type agent_id: int
+        :param strategy: The agent's strategy, with its non donor strategy, trust model and options
+        :type strategy: Dict
+        :param generation: The generation the agent belongs to
+        :type generation: LocalGeneration
+        :param rng: The random number generator to make random choices with
+        :type rng: random.Random
+        """
+        self._id: int = agent_id
+        self._non_donor_strategy: str = strategy['non_donor_strategy']
+        self._trust_model: str = strategy['trust_model']
+        self._options: List = list(strategy['options'])
+        self._generation: LocalGeneration = generation
+        self._random: random.Random = rng
+        self._percepts: Dict[int, List[Dict]] = {}
+        self._revised_until: Optional[int] = None
+        self._reset_beliefs()
+
+    def perceive(self, percept: Dict) -> NoReturn:
+        """
+        Give the agent an action or gossip percept
+        :param percept: The percept
+        :type percept: Dict
+        :return: NoReturn
+        """
+        timepoint = percept['timepoint']
+        self._percepts.setdefault(timepoint, []).append(percept)
+        if self._revised_until is not None and timepoint < self._revised_until:
+            self._revised_until = None
+            self._reset_beliefs()
+
+    def _revise_before(self, timepoint: int) -> NoReturn:
+        """
+        Revise the agent's beliefs with every percept from before a timepoint
+        :param timepoint: The timepoint to hold the beliefs at
+        :type timepoint: int
+        :return: NoReturn
+        """
+        if self._revised_until is not None and timepoint < self._revised_until:
+            self._revised_until = None
+            self._reset_beliefs()
+        for percept_timepoint in sorted(self._percepts):
+            if percept_timepoint >= timepoint:
+                break
+            if self._revised_until is None or percept_timepoint >= self._revised_until:
+                self._revise(self._percepts[percept_timepoint])
+                self._revised_until = percept_timepoint + 1
+
+    def _reset_beliefs(self) -> NoReturn:
+        """
+        Forget all beliefs, ready to revise them from the first percept
+        :return: NoReturn
+        """
+        pass
+
+    def _revise(self, percepts: List[Dict]) -> NoReturn:
+        """
+        Revise beliefs with the percepts from a timepoint
+        :param percepts: The percepts from the timepoint in the order they were received
+        :type percepts: List[Dict]
+        :return: NoReturn
+        """
+        pass
+
+    def decide(self, timepoint: int) -> Optional[Dict]:
+        """
+        Decide on the action the agent commits to at a timepoint
+        :param timepoint: The timepoint to decide at
+        :type timepoint: int
+        :return: The action, or None if the agent is capable of no action its strategy allows
+        :rtype: Optional[Dict]
+        """
+        recipient = self._generation.recipient_of(self._id, timepoint)
+        if recipient is not None:
+            return self._donor_action(timepoint, recipient)
+        if self._non_donor_strategy == "Lazy":
+            return _idle("I only act when I have to")
+        return self._non_donor_action(timepoint)
+
+    @abstractmethod
+    def _donor_action(self, timepoint: int, recipient: int) -> Optional[Dict]:
+        """
+        Decide on the action to take as a donor
+        :param timepoint: The timepoint to decide at
+        :type timepoint: int
+        :param recipient: The id of the recipient
+        :type recipient: int
+        :return: The action
+        :rtype: Optional[Dict]
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _non_donor_action(self, timepoint: int) -> Optional[Dict]:
+        """
+        Decide on the action to take when not a donor, for any non donor strategy but Lazy
+        :param timepoint: The timepoint to decide at
+        :type timepoint: int
+        :return: The action, or None if the agent is capable of no action its strategy allows
+        :rtype: Optional[Dict]
+        """
+        raise NotImplementedError
+
+    def _others(self) -> List[int]:
+        """Get the ids of the other agents in the generation"""
+        return [agent_id for agent_id in self._generation.agent_ids if agent_id != self._id]
+
+    def _promote_self(self, reason: str) -> Optional[Dict]:
+        """Spread positive gossip about self to a random other agent"""
+        others = self._others()
+        if not others:
+            return None
+        return _gossip('positive', self._id, self._random.choice(others), reason)
+
+    def _gossip_among(self, value: str, abouts: List[int], recipients: List[int], reason: str) -> Dict:
+        """Gossip about a random agent to a random other agent, from lists of candidates that may overlap"""
+        about = self._random.choice(abouts)
+        return _gossip(value, about, self._random.choice([agent_id for agent_id in recipients if agent_id != about]),
+                       reason)
+
+
+class CooperatorMind(AgentMind):
+    """An agent that cooperates every time"""
+
+    def _donor_action(self, timepoint: int, recipient: int) -> Optional[Dict]:
+        return _interaction('cooperate', recipient, "I naively cooperate with everyone out of pure altruism")
+
+    def _non_donor_action(self, timepoint: int) -> Optional[Dict]:
+        if self._non_donor_strategy == "Promote Self":
+            return self._promote_self("I spread positive gossip about myself to encourage others to cooperate with me")
+        if self._non_donor_strategy == "Spread Positive":
+            others = self._others()
+            if not others:
+                return None
+            # Any agent may be gossiped about, so choose the recipient first to keep the choice of pair uniform
+            recipient = self._random.choice(others)
+            about = self._random.choice([agent_id for agent_id in self._generation.agent_ids if agent_id != recipient])
+            return _gossip('positive', about, recipient, "I naively spread positive gossip about others to encourage "
+                                                         "cooperation in the system")
+        return None
+
+
+class DefectorMind(AgentMind):
+    """An agent that defects every time"""
+
+    def _donor_action(self, timepoint: int, recipient: int) -> Optional[Dict]:
+        return _interaction('defect', recipient, "To protect my interests, and not incur cooperation costs")
+
+    def _non_donor_action(self, timepoint: int) -> Optional[Dict]:
+        if self._non_donor_strategy == "Promote Self":
+            return self._promote_self("I spread positive gossip to deceive others and encourage them to cooperate "
+                                      "with me")
+        if self._non_donor_strategy == "Spread Negative":
+            others = self._others()
+            if len(others) < 2:
+                return None
+            return self._gossip_among('negative', others, others, "I spread negative gossip to deceive others and "
+                                                                  "add fake information to the society")
+        return None
+
+
+class RandomMind(AgentMind):
+    """An agent that selects any action it is capable of at random"""
+
+    _REASON = "I randomly select any action I am capable of"
+
+    def _donor_action(self, timepoint: int, recipient: int) -> Optional[Dict]:
+        return _interaction(self._random.choice(['defect', 'cooperate']), recipient, self._REASON)
+
+    def _non_donor_action(self, timepoint: int) -> Optional[Dict]:
+        # Capable of being idle, or of either gossip about any agent to any other agent
+        agent_ids = self._generation.agent_ids
+        choice = self._random.randrange(1 + 2 * len(agent_ids) * (len(agent_ids) - 1))
+        if choice == 0:
+            return _idle(self._REASON)
+        pair, value = divmod(choice - 1, 2)
+        about_index, recipient_index = divmod(pair, len(agent_ids) - 1)
+        if recipient_index >= about_index:
+            recipient_index += 1
+        return _gossip('positive' if value == 0 else 'negative', agent_ids[about_index], agent_ids[recipient_index],
+                       self._REASON)
+
+
+class StandingDiscriminatorMind(AgentMind):
+    """An agent that holds every other agent to have a good standing until it sees them defect against an agent of good
+    standing, cooperating only with those of good standing"""
+
+    def _reset_beliefs(self) -> NoReturn:
+        self._bad: Set[int] = set()
+
+    def _trusts_gossip_from(self, gossiper: int, bad: Set[int]) -> bool:
+        """Check whether gossip from an agent is trusted, given the agents held to have a bad standing"""
+        if self._trust_model == "Naive Trusting":
+            return True
+        if self._trust_model == "Trusting":
+            return gossiper not in bad
+        return False
+
+    def _revise(self, percepts: List[Dict]) -> NoReturn:
+        before = set(self._bad)
+        broken: Set[int] = set()
+        created: Set[int] = set()
+        for percept in percepts:
+            if percept['type'] == 'action/interaction':
+                if percept['action'] == 'cooperate':
+                    subject, bad = percept['donor'], False
+                elif percept['recipient'] not in before:
+                    subject, bad = percept['donor'], True
+                else:
+                    continue
+            elif self._trusts_gossip_from(percept['gossiper'], before):
+                subject, bad = percept['about'], percept['gossip'] == 'negative'
+            else:
+                continue
+            if bad and (subject not in before or subject in broken):
+                created.add(subject)
+            elif not bad and subject in before:
+                broken.add(subject)
+        self._bad = (before - broken) | created
+
+    def standing(self, about: int, timepoint: int) -> str:
+        """
+        Get the standing the agent believes another agent to have at a timepoint
+        :param about: The id of the agent the belief is about
+        :type about: int
+        :param timepoint: The timepoint to get the belief at
+        :type timepoint: int
+        :return: 'good' or 'bad'
+        :rtype: str
+        """
+        self._revise_before(timepoint)
+        return 'bad' if about in self._bad else 'good'
+
+    def _donor_action(self, timepoint: int, recipient: int) -> Optional[Dict]:
+        if self.standing(recipient, timepoint + 1) == 'good':
+            return _interaction('cooperate', recipient,
+                                "I am cooperating because I believe the recipient to have a good standing")
+        return _interaction('defect', recipient, "I am defecting because I believe the recipient to have a bad standing")
+
+    def _non_donor_action(self, timepoint: int) -> Optional[Dict]:
+        if self._non_donor_strategy == "Promote Self":
+            return self._promote_self("I actively promote myself as I wish to encourage others to cooperate with me")
+        if self._non_donor_strategy not in ["Spread Accurate Positive", "Spread Accurate Negative"]:
+            return None
+        self._revise_before(timepoint + 1)
+        good = [agent_id for agent_id in self._others() if agent_id not in self._bad]
+        if self._non_donor_strategy == "Spread Accurate Positive":
+            if len(good) < 2:
+                return _idle("I know no two good agents to be the recipient and the target of positive gossip")
+            return self._gossip_among('positive', good, good, "I am spreading positive gossip because I believe the "
+                                                              "recipient and the agent it is about are good")
+        bad = [agent_id for agent_id in self._generation.agent_ids if agent_id in self._bad]
+        if not bad:
+            return _idle("I know of no agents with bad standing to warn others about")
+        if not good:
+            return _idle("I know of no agents with good standing to warn of the agents with bad standing")
+        return self._gossip_among('negative', bad, good, "I believe the agent this gossip is about to be of bad "
+                                                         "standing, so I am spreading it to those I believe are of "
+                                                         "good standing")
+
+
+class ImageScoringDiscriminatorMind(AgentMind):
+    """An agent that holds an image score for other agents, cooperating with those with a score of at least K"""
+
+    def __init__(self, agent_id: int, strategy: Dict, generation: LocalGeneration, rng: random.Random):
+        super().__init__(agent_id, strategy, generation, rng)
+        self._k: int = self._options[0]
+        self._personal_grievance: bool = "Personal Grievance" in self._options[1:]
+
+    def _reset_beliefs(self) -> NoReturn:
+        self._scores: Dict[int, int] = {}
+
+    def _trusts(self, agent_id: int, scores: Dict[int, int]) -> bool:
+        """Check whether an agent is trusted, those with no image score are held on 0"""
+        return scores.get(agent_id, 0) >= self._k
+
+    def _revise(self, percepts: List[Dict]) -> NoReturn:
+        before = dict(self._scores)
+        changed: Set[int] = set()
+        for percept in percepts:
+            if percept['type'] == 'action/interaction':
+                subject, positive = percept['donor'], percept['action'] == 'cooperate'
+                change = 2 if self._personal_grievance and percept['recipient'] == self._id else 1
+            elif self._trust_model == "Naive Trusting" or \
+                    (self._trust_model == "Trusting" and self._trusts(percept['gossiper'], before)):
+                subject, positive, change = percept['about'], percept['gossip'] == 'positive', 1
+            else:
+                continue
+            old = before.get(subject)
+            if old is None:
+                new = change if positive else -change
+            elif positive:
+                new = old if old >= 5 else old + change
+            else:
+                new = old if old <= -5 else old - change
+            if new != old and subject not in changed:
+                self._scores[subject] = new
+                changed.add(subject)
+
+    def image_score(self, about: int, timepoint: int) -> Optional[int]:
+        """
+        Get the image score the agent holds for another agent at a timepoint
+        :param about: The id of the agent the belief is about
+        :type about: int
+        :param timepoint: The timepoint to get the belief at
+        :type timepoint: int
+        :return: The image score, or None if the agent holds no image score for the other agent
+        :rtype: Optional[int]
+        """
+        self._revise_before(timepoint)
+        return self._scores.get(about)
+
+    def _donor_action(self, timepoint: int, recipient: int) -> Optional[Dict]:
+        score = self.image_score(recipient, timepoint)
+        if score is not None:
+            if self._k > score:
+                return _interaction('defect', recipient, "I am defecting as I do not believe the recipient's image "
+                                                         "is worthy of cooperation")
+            return _interaction('cooperate', recipient, "I am cooperating as I believe the recipient's image is "
+                                                        "worthy of cooperation")
+        if self._k > 0:
+            return _interaction('defect', recipient, "I am defecting as I do not know of the recipient's image so I "
+                                                     "cannot trust them")
+        return _interaction('cooperate', recipient, "I am cooperating as I do not know the recipient's image, but I "
+                                                    "think should give them a chance")
+
+    def _non_donor_action(self, timepoint: int) -> Optional[Dict]:
+        if self._non_donor_strategy == "Promote Self":
+            return self._promote_self("I promote myself because I want to encourage others to cooperate with me")
+        if self._non_donor_strategy not in ["Spread Accurate Positive", "Spread Accurate Negative"]:
+            return None
+        self._revise_before(timepoint + 1)
+        others = self._others()
+        good = [agent_id for agent_id in others if self._trusts(agent_id, self._scores)]
+        if self._non_donor_strategy == "Spread Accurate Positive":
+            if len(good) < 2:
+                return _idle("I know no two good agents to be the recipient and the target of positive gossip")
+            return self._gossip_among('positive', good, good, "I believe the agent this gossip is about is good and "
+                                                              "want to spread that belief to other agents I believe "
+                                                              "are good")
+        bad = [agent_id for agent_id in others if not self._trusts(agent_id, self._scores)]
+        if not good:
+            return _idle("I know of no agents with good standing to warn of the agents with bad standing")
+        if not bad:
+            return _idle("I know of no agents with bad standing to warn others about")
+        return self._gossip_among('negative', bad, good, "I believe the agent the gossip is about to have a bad image, "
+                                                         "I am warning those I believe are good")
+
+
+class VeritabilityDiscernerMind(AgentMind):
+    """An agent that holds a veritability rating and a count of percepts for other agents, trusting and cooperating
+    with those whose rating per percept is at least K"""
+
+    def __init__(self, agent_id: int, strategy: Dict, generation: LocalGeneration, rng: random.Random):
+        super().__init__(agent_id, strategy, generation, rng)
+        self._k: int = self._options[0]
+        self._positive_weight: int = 2 if self._trust_model == "Forgiving Reactor" else 1
+        self._negative_weight: int = 2 if self._trust_model == "Strong Reactor" else 1
+
+    def _reset_beliefs(self) -> NoReturn:
+        self._ratings: Dict[int, int] = {}
+        self._counts: Dict[int, int] = {}
+
+    def _trusts(self, agent_id: int, ratings: Dict[int, int], counts: Dict[int, int]) -> bool:
+        """Check whether an agent is trusted, those with no rating or count are held on 0"""
+        if agent_id in ratings and agent_id in counts:
+            return ratings[agent_id] / counts[agent_id] >= self._k
+        return 0 >= self._k
+
+    def _revise(self, percepts: List[Dict]) -> NoReturn:
+        ratings_before = dict(self._ratings)
+        counts_before = dict(self._counts)
+        rated: Set[int] = set()
+        counted: Set[int] = set()
+        for percept in percepts:
+            change: Optional[int] = None
+            if percept['type'] == 'action/interaction':
+                subject = percept['donor']
+                if percept['action'] == 'cooperate':
+                    change = 20 * self._positive_weight
+                elif self._trusts(percept['recipient'], ratings_before, counts_before):
+                    change = -20 * self._negative_weight
+            else:
+                subject = percept['about']
+                trusted = self._trusts(percept['gossiper'], ratings_before, counts_before)
+                if percept['gossip'] == 'positive':
+                    change = (10 if trusted else 1) * self._positive_weight
+                else:
+                    change = -(10 if trusted else 1) * self._negative_weight
+            if subject not in counted:
+                self._counts[subject] = counts_before.get(subject, 0) + 1
+                counted.add(subject)
+            if change is not None and subject not in rated:
+                self._ratings[subject] = ratings_before.get(subject, 0) + change
+                rated.add(subject)
+
+    def veritability_rating(self, about: int, timepoint: int) -> Optional[int]:
+        """
+        Get the veritability rating the agent holds for another agent at a timepoint
+        :param about: The id of the agent the belief is about
+        :type about: int
+        :param timepoint: The timepoint to get the belief at
+        :type timepoint: int
+        :return: The veritability rating, or None if the agent holds no rating for the other agent
+        :rtype: Optional[int]
+        """
+        self._revise_before(timepoint)
+        return self._ratings.get(about)
+
+    def percept_count(self, about: int, timepoint: int) -> Optional[int]:
+        """
+        Get the number of percepts the agent has had about another agent at a timepoint
+        :param about: The id of the agent the belief is about
+        :type about: int
+        :param timepoint: The timepoint to get the belief at
+        :type timepoint: int
+        :return: The count of percepts, or None if the agent has had no percepts about the other agent
+        :rtype: Optional[int]
+        """
+        self._revise_before(timepoint)
+        return self._counts.get(about)
+
+    def _donor_action(self, timepoint: int, recipient: int) -> Optional[Dict]:
+        self._revise_before(timepoint)
+        known = recipient in self._counts
+        if self._trusts(recipient, self._ratings, self._counts):
+            return _interaction('cooperate', recipient,
+                                "The recipient has generally acted in a good manner" if known else
+                                "I don't know anything about the recipient, but I am giving them a chance")
+        return _interaction('defect', recipient,
+                            "The recipient's actions haven't been worthy of cooperation" if known else
+                            "I don't know anything about the recipient, so I will protect myself and defect")
+
+    def _non_donor_action(self, timepoint: int) -> Optional[Dict]:
+        if self._non_donor_strategy == "Promote Self":
+            return self._promote_self("I promote myself because I want to encourage others to cooperate with me")
+        if self._non_donor_strategy not in ["Spread Positive Trusted", "Spread Negative Untrusted"]:
+            return None
+        self._revise_before(timepoint)
+        others = self._others()
+        trusted = [agent_id for agent_id in others if self._trusts(agent_id, self._ratings, self._counts)]
+        if self._non_donor_strategy == "Spread Positive Trusted":
+            if len(trusted) < 2:
+                return _idle("I know no two trustworthy agents to spread positive gossip to and about.")
+            return self._gossip_among('positive', trusted, trusted,
+                                      "I believe the agent this gossip is about is trustworthy and want to spread "
+                                      "that belief to other agents I believe are trustworthy")
+        untrusted = [agent_id for agent_id in others if not self._trusts(agent_id, self._ratings, self._counts)]
+        if not trusted and not untrusted:
+            return _idle("I do not know any trustworthy or untrustworthy agents to gossip to or about")
+        if not trusted:
+            return _idle("I do not know any trustworthy agents to warn about untrustworthy agents")
+        if not untrusted:
+            return _idle("I do not know any untrustworthy agents to warn trustworthy agents about")
+        recipient = self._random.choice(trusted)
+        return _gossip('negative', self._random.choice(untrusted), recipient,
+                       "I believe the agent this gossip is about is untrustworthy and want to warn agents I believe "
+                       "are trustworthy")
+
+
+_MINDS = {"Cooperator": CooperatorMind, "Defector": DefectorMind, "Random": RandomMind,
+          "Standing Discriminator": StandingDiscriminatorMind,
+          "Image Scoring Discriminator": ImageScoringDiscriminatorMind,
+          "Veritability Discerner": VeritabilityDiscernerMind}
+
+
+class LocalAgentsBackend(AgentsBackend):
+    """A backend that runs the agents' minds in memory in the same process as the environment. It follows the agents
+    service api and the rules of its built-in strategies, replying in the same form as the service, so a game can be
+    simulated against it without any network calls."""
+
+    def __init__(self, seed: int = None):
+        """
+        Set up the empty state of the backend
+        :param seed: The seed for the random choices the agents make, random if not given
+        :type seed: int
+        """
+        self._random = random.Random(seed)
+        self._seeded: bool = seed is not None
+        self._next_community = 0
+        self._communities: Dict[int, Dict[int, LocalGeneration]] = {}
+        self._strategies: Dict[Tuple, Dict] = {(strategy['donor_strategy'], strategy['non_donor_strategy'],
+                                                strategy['trust_model'], tuple(strategy['options'])): strategy
+                                               for strategy in STRATEGIES}
+
+    @property
+    def seeded(self) -> bool:
+        """
+        Get whether the agents' random choices are determined by the seed the backend was given, so a seeded game
+        given a backend of its own plays the same way each run
+        :return: True if the backend was given a seed
+        :rtype: bool
+        """
+        return self._seeded
+
+    def close(self) -> NoReturn:
+        """
+        Nothing to release for an in memory backend
+        :return: NoReturn
+        """
+        pass
+
+    @staticmethod
+    def _reply(data: Dict, success) -> Dict:
+        """
+        Build the reply for a request in the form of the agents service, raising as the client would if the agents
+        service would reply with an error status
+        :param data: The data the request was made with
+        :type data: Dict
+        :param success: True if the request was successful, else an error message
+        :return: The reply
+        :rtype: Dict
+        """
+        if success is not True:
+            raise AgentsServiceException("bad status code 404: " + success, 404)
+        return {'data': data, 'status': 200, 'success': True}
+
+    def _find_generation(self, community: int, generation: int) -> Tuple[Optional[LocalGeneration], Optional[str]]:
+        """
+        Find a generation of a community
+        :return: The generation, or None and the reason it could not be found
+        :rtype: Tuple[Optional[LocalGeneration], Optional[str]]
+        """
+        if community not in self._communities:
+            return None, "No such community"
+        if generation not in self._communities[community]:
+            return None, "No such generation for this community"
+        return self._communities[community][generation], None
+
+    def get_mind(self, community: int, generation: int, player: int) -> 'AgentMind':
+        """
+        Get the mind of an agent, to inspect its beliefs
+        :param community: The id of the community the agent belongs to
+        :type community: int
+        :param generation: The id of the generation the agent belongs to
+        :type generation: int
+        :param player: The id of the agent
+        :type player: int
+        :return: The mind of the agent
+        :rtype: AgentMind
+        """
+        return self._communities[community][generation].minds[player]
+
+    def get_strategies(self) -> List[Dict]:
+        """
+        Get the built-in strategies the backend's minds follow
+        :return: The strategies, each with a donor strategy, non donor strategy, trust model, description and options
+        :rtype: List[Dict]
+        """
+        return [dict(strategy, options=list(strategy['options'])) for strategy in STRATEGIES]
+
+    def create_community(self) -> Dict:
+        """
+        Create a new community in memory
+        :return: The response, including the id of the community
+        :rtype: Dict
+        """
+        community = self._next_community
+        self._next_community += 1
+        self._communities[community] = {}
+        return {'id': community, 'status': 200, 'success': True}
+
+    def create_generation(self, community: int, generation: int) -> Dict:
+        """
+        Create a new generation in a community
+        :param community: The id of the community the generation belongs to
+        :type community: int
+        :param generation: The id of the generation
+        :type generation: int
+        :return: The response, failed if there is no such community or it already has the generation
+        :rtype: Dict
+        """
+        data = {'community': community, 'generation': generation}
+        if community not in self._communities:
+            return self._reply(data, "No such community")
+        if generation in self._communities[community]:
+            return self._reply(data, "This community already has a generation with this id")
+        self._communities[community][generation] = LocalGeneration()
+        return self._reply(data, True)
+
+    def delete_community(self, community: int) -> Dict:
+        """
+        Delete a community, releasing its generations and their agents' minds
+        :param community: The id of the community
+        :type community: int
+        :return: The response
+        :rtype: Dict
+        """
+        if community not in self._communities:
+            return self._reply({'community': community}, "No community with this ID to retract")
+        del self._communities[community]
+        return self._reply({'community': community}, True)
+
+    def delete_generation(self, community: int, generation: int) -> Dict:
+        """
+        Delete a generation of a community, releasing its agents' minds
+        :param community: The id of the community the generation belongs to
+        :type community: int
+        :param generation: The id of the generation
+        :type generation: int
+        :return: The response
+        :rtype: Dict
+        """
+        data = {'community': community, 'generation': generation}
+        if generation not in self._communities.get(community, {}):
+            return self._reply(data, "No generation with this ID in this community to retract")
+        del self._communities[community][generation]
+        return self._reply(data, True)
+
+    def _add_agent(self, agent: Dict):
+        """Create an agent, returning True or an error message"""
+        if any(field not in agent for field in _AGENT_FIELDS):
+            return "Incorrect input, should contain the fields: donor_strategy, non_donor_strategy, trust_model, " \
+                   "options, community, generation and player"
+        strategy = self._strategies.get((agent['donor_strategy'], agent['non_donor_strategy'], agent['trust_model'],
+                                         tuple(agent['options'])))
+        if strategy is None:
+            return "No such strategy"
+        generation, error = self._find_generation(agent['community'], agent['generation'])
+        if error is not None:
+            return error
+        if agent['player'] in generation.minds:
+            return "Player ID already taken for this community and generation"
+        generation.add_mind(agent['player'], _MINDS[strategy['donor_strategy']](agent['player'], strategy, generation,
+                                                                                self._random))
+        return True
+
+    def create_agent(self, agent: Dict) -> Dict:
+        """
+        Create a new agent with a mind following its strategy
+        :param agent: The agent's strategy, community, generation and id
+        :type agent: Dict
+        :return: The response
+        :rtype: Dict
+        """
+        return self._reply(agent, self._add_agent(agent))
+
+    def create_agents(self, community: int, generation: int, strategies: List[Dict]) -> Dict:
+        """
+        Create all the agents of a generation at once, numbered from 0 in the order of the strategies
+        :param community: The id of the community the agents belong to
+        :type community: int
+        :param generation: The id of the generation the agents belong to
+        :type generation: int
+        :param strategies: Each strategy of the generation with the count of agents to create with it
+        :type strategies: List[Dict]
+        :return: The response, with the success (or error message) of creating each agent
+        :rtype: Dict
+        """
+        players = []
+        player = 0
+        for strategy in strategies:
+            agent = {field: value for field, value in strategy.items() if field != 'count'}
+            for _ in range(strategy['count']):
+                success = self._add_agent(dict(agent, community=community, generation=generation, player=player))
+                if success is True:
+                    players.append({'player': player, 'success': True})
+                else:
+                    players.append({'player': player, 'success': False, 'message': success})
+                player += 1
+        return {'data': {'community': community, 'generation': generation}, 'players': players, 'status': 200,
+                'success': True}
+
+    def _add_interaction(self, interaction: Dict):
+        """Set a donor-recipient pair, returning True or an error message"""
+        if any(field not in interaction for field in _INTERACTION_FIELDS):
+            return "Incorrect input, must contain: community, generation, donor, recipient, timepoint"
+        generation, error = self._find_generation(interaction['community'], interaction['generation'])
+        if error is not None:
+            return error
+        donor_exists = interaction['donor'] in generation.minds
+        recipient_exists = interaction['recipient'] in generation.minds
+        if not donor_exists and not recipient_exists:
+            return "No such recipient or donor for this community and generation"
+        if not donor_exists:
+            return "No such donor for this community and generation"
+        if not recipient_exists:
+            return "No such recipient for this community and generation"
+        if interaction['donor'] == interaction['recipient']:
+            return "Donor should not be the same as the recipient"
+        generation.add_interaction(interaction['timepoint'], interaction['donor'], interaction['recipient'])
+        return True
+
+    def send_interaction(self, interaction: Dict) -> Dict:
+        """
+        Set the donor-recipient pair for a timepoint, for the donor to act on
+        :param interaction: The interaction percept
+        :type interaction: Dict
+        :return: The response
+        :rtype: Dict
+        """
+        return self._reply(interaction, self._add_interaction(interaction))
+
+    def _add_percept(self, percept: Dict):
+        """Give an action or gossip percept to its perceiver, returning True or an error message"""
+        if percept.get('type') == 'action/interaction':
+            fields, roles = _ACTION_PERCEPT_FIELDS, ['perceiver', 'donor', 'recipient']
+            if any(field not in percept for field in fields):
+                return "Incorrect input, should include: community, generation, perceiver, donor, recipient, " \
+                       "timepoint, action"
+            if percept['action'] not in ['defect', 'cooperate']:
+                return "Incorrect action must either be defect or cooperate"
+        elif percept.get('type') == 'action/gossip':
+            fields, roles = _GOSSIP_PERCEPT_FIELDS, ['perceiver', 'gossiper', 'about']
+            if any(field not in percept for field in fields):
+                return "Incorrect input must contain: community, generation, perceiver, about, gossiper, timepoint, " \
+                       "gossip"
+            if percept['gossip'] not in ['positive', 'negative']:
+                return "Incorrect gossip action should be either positive or negative"
+        else:
+            return "Percept type incorrect, should be either action/interaction or action/gossip"
+        generation, error = self._find_generation(percept['community'], percept['generation'])
+        if error is not None:
+            return error
+        missing = [role for role in roles if percept[role] not in generation.minds]
+        if missing:
+            return _missing_agents_message(missing)
+        if percept['type'] == 'action/interaction' and percept['donor'] == percept['recipient']:
+            return "Incorrect IDs: Donor and Recipient are the same"
+        generation.minds[percept['perceiver']].perceive(percept)
+        return True
+
+    def send_percepts(self, percepts: List[Dict]) -> Dict:
+        """
+        Give a group of action and/or gossip percepts to their perceivers' minds
+        :param percepts: The percepts to give
+        :type percepts: List[Dict]
+        :return: The response, with the success (or error message) of each percept
+        :rtype: Dict
+        """
+        return {'data': {'percepts': percepts}, 'status': 200,
+                'success': [{'percept': percept, 'success': self._add_percept(percept)} for percept in percepts]}
+
+    def _decide(self, community: int, generation: int, player: int, timepoint: int) -> Tuple[object, Dict]:
+        """Get an agent's action at a timepoint, returning True or an error message and the action"""
+        found, error = self._find_generation(community, generation)
+        if error is not None:
+            return error, None
+        if player not in found.minds:
+            return "No such player for this generation of this community", None
+        if found.has_committed(player, timepoint):
+            return "Agent has already committed to an action at this timepoint", None
+        action = found.minds[player].decide(timepoint)
+        if action is None:
+            return "Failed to find an action for this agent", None
+        found.commit(player, timepoint)
+        return True, action
+
+    def get_action(self, community: int, generation: int, player: int, timepoint: int) -> Dict:
+        """
+        Get the action an agent's mind commits to at a timepoint, an agent only committing once each timepoint
+        :param community: The id of the community the agent belongs to
+        :type community: int
+        :param generation: The id of the generation the agent belongs to
+        :type generation: int
+        :param player: The id of the agent
+        :type player: int
+        :param timepoint: The timepoint at which the agent decides
+        :type timepoint: int
+        :return: The response, with the action
+        :rtype: Dict
+        """
+        data = {'community': community, 'generation': generation, 'player': player, 'timepoint': timepoint}
+        success, action = self._decide(community, generation, player, timepoint)
+        reply = self._reply(data, success)
+        reply['action'] = action
+        return reply
+
+    def step(self, step: Dict) -> Dict:
+        """
+        Run a timepoint of a generation in a single call: set the donor-recipient pair, give the percepts and get the
+        action of each player, in that order as the agents service does
+        :param step: The donor-recipient pair, percepts and players of the step
+        :type step: Dict
+        :return: The response, with the success of the interaction and each percept and each player's action
+        :rtype: Dict
+        """
+        interaction_success = self._add_interaction(step['interaction']) if 'interaction' in step else True
+        percept_successes = [{'percept': percept, 'success': self._add_percept(percept)}
+                             for percept in step['percepts']]
+        actions = []
+        for player in step['players']:
+            success, action = self._decide(step['community'], step['generation'], player, step['timepoint'])
+            if success is True:
+                actions.append({'player': player, 'success': True, 'action': action})
+            else:
+                actions.append({'player': player, 'success': False, 'message': success})
+        return {'actions': actions, 'data': {'community': step['community'], 'generation': step['generation'],
+                                             'timepoint': step['timepoint']},
+                'interaction': interaction_success, 'percepts': percept_successes, 'status': 200, 'success': True}
@@ -0,0 +1,168 @@
+"""local_agents_tests.py: Tests for the functionality of the local_agents_logic.py module, checking the local agents
+backend against the recorded outputs of the agents service"""
+
+__author__ = "James King"
+
+import json
+import os
+import random
+import unittest
+from unittest.mock import patch
+from typing import Dict, List
+import requests
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .agents_client_logic import AgentsServiceException
+from .facade_logic import ReputationGame
+from .generation_logic import Generation
+from .observation_logic import ActionObserver
+from .strategy_logic import Strategy
+
+RECORDED_OUTPUTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recorded_prolog_outputs.json')
+
+
+def _subject_strategies(subject: Dict) -> List[Dict]:
+    """Get the strategies a scenario is run for, mirroring the forall over strategies in the Prolog tests"""
+    strategies = []
+    for strategy in STRATEGIES:
+        if any(key in subject and subject[key] != strategy[key]
+               for key in ['donor_strategy', 'non_donor_strategy', 'trust_model', 'options']):
+            continue
+        if 'options_in' in subject and strategy['options'] not in subject['options_in']:
+            continue
+        if 'options_contain' in subject and subject['options_contain'] not in strategy['options']:
+            continue
+        strategies.append(strategy)
+    return strategies
+
+
+class LocalAgentsTest(unittest.TestCase):
+    """Test the LocalAgentsBackend class against the outputs recorded from the agents service"""
+
+    def setUp(self):
+        with open(RECORDED_OUTPUTS) as recorded_file:
+            self.scenarios = json.load(recorded_file)['scenarios']
+
+    def _check_step(self, backend: LocalAgentsBackend, community: int, step: Dict):
+        defaults = {'community': community, 'generation': 0}
+        if 'percept' in step or 'interaction' in step:
+            request = dict(defaults, **(step['percept'] if 'percept' in step else step['interaction']))
+            for field in step.get('without', []):
+                del request[field]
+            if 'percept' in step:
+                success = backend.send_percepts([request])['success'][0]['success']
+            else:
+                success = backend.step({'community': community, 'generation': 0, 'timepoint': 0, 'players': [],
+                                        'percepts': [], 'interaction': request})['interaction']
+            self.assertEqual(step['success'], success)
+        elif 'belief' in step:
+            mind = backend.get_mind(community, 0, step['perceiver'])
+            belief = getattr(mind, step['belief'])(step['about'], step['timepoint'])
+            self.assertEqual(step['value'], belief)
+        else:
+            if 'message' in step:
+                with self.assertRaises(AgentsServiceException) as context:
+                    backend.get_action(community, 0, step['action']['player'], step['action']['timepoint'])
+                self.assertIn("bad status code 404: " + step['message'], str(context.exception))
+                return
+            action = backend.get_action(community, 0, step['action']['player'], step['action']['timepoint'])['action']
+            self.assertEqual(step['expected'], {key: action[key] for key in step['expected']})
+            if 'one_of' in step:
+                self.assertIn({key: action[key] for key in step['one_of'][0]}, step['one_of'])
+
+    def _run_scenario(self, scenario: Dict, subject: Dict = None):
+        backend = LocalAgentsBackend(seed=0)
+        community = backend.create_community()['id']
+        backend.create_generation(community, 0)
+        agents = [{'player': agent[0], 'donor_strategy': agent[1], 'non_donor_strategy': agent[2],
+                   'trust_model': agent[3], 'options': agent[4]} for agent in scenario['agents']]
+        if subject is not None:
+            agents.append(dict(subject, player=scenario['subject']['player']))
+        for agent in agents:
+            backend.create_agent({'donor_strategy': agent['donor_strategy'],
+                                  'non_donor_strategy': agent['non_donor_strategy'],
+                                  'trust_model': agent['trust_model'], 'options': agent['options'],
+                                  'community': community, 'generation': 0, 'player': agent['player']})
+        for step in scenario['steps']:
+            self._check_step(backend, community, step)
+
+    def test_recorded_outputs(self):
+        # Every scenario recorded from the agents service should give the same outputs locally
+        for scenario in self.scenarios:
+            if 'subject' not in scenario:
+                with self.subTest(scenario=scenario['name']):
+                    self._run_scenario(scenario)
+                continue
+            subjects = _subject_strategies(scenario['subject'])
+            self.assertGreater(len(subjects), 0)
+            for subject in subjects:
+                with self.subTest(scenario=scenario['name'], strategy=subject['description']):
+                    self._run_scenario(scenario, subject)
+
+    def test_strategies(self):
+        # The strategies should be those of the agents service
+        strategies = LocalAgentsBackend().get_strategies()
+        self.assertEqual(199, len(strategies))
+        self.assertEqual({"Cooperator", "Defector", "Random", "Standing Discriminator", "Image Scoring Discriminator",
+                          "Veritability Discerner"}, {strategy['donor_strategy'] for strategy in strategies})
+        self.assertEqual(len(strategies), len({(strategy['donor_strategy'], strategy['non_donor_strategy'],
+                                                strategy['trust_model'], tuple(strategy['options']))
+                                               for strategy in strategies}))
+
+    def test_unknown_strategy(self):
+        # Creating an agent with a strategy the agents service does not have should fail as the service would
+        backend = LocalAgentsBackend()
+        community = backend.create_community()['id']
+        backend.create_generation(community, 0)
+        with self.assertRaises(AgentsServiceException) as context:
+            backend.create_agent({'donor_strategy': "Capability", 'non_donor_strategy': "Lazy", 'trust_model': "Void",
+                                  'options': [], 'community': community, 'generation': 0, 'player': 0})
+        self.assertIn("No such strategy", str(context.exception))
+
+    def test_create_agents(self):
+        # Agents created together should be numbered in the order of the strategies, each failing on its own
+        backend = LocalAgentsBackend()
+        community = backend.create_community()['id']
+        backend.create_generation(community, 0)
+        unknown = {'donor_strategy': "Capability", 'non_donor_strategy': "Lazy", 'trust_model': "Void", 'options': []}
+        response = backend.create_agents(community, 0, [dict(STRATEGIES[0], count=2), dict(unknown, count=1),
+                                                        dict(STRATEGIES[1], count=1)])
+        self.assertEqual([(0, True), (1, True), (2, False), (3, True)],
+                         [(player['player'], player['success']) for player in response['players']])
+        self.assertEqual("No such strategy", response['players'][2]['message'])
+        for player in [0, 1, 3]:
+            self.assertIsNotNone(backend.get_mind(community, 0, player))
+        with self.assertRaises(KeyError):
+            backend.get_mind(community, 0, 2)
+
+    def test_no_network_calls(self):
+        # A reputation game should run with the local backend without any requests being made
+        initial_strategies = [dict(strategy, count=2) for strategy in STRATEGIES[::10]]
+        with patch.object(requests.Session, 'request', side_effect=AssertionError("Request made")):
+            results = ReputationGame(initial_strategies, num_of_generations=3, length_of_generations=10,
+                                     agents_client=LocalAgentsBackend(seed=4)).run()
+        self.assertEqual(3, len(results.generations))
+        self.assertGreater(len(results.actions), 0)
+
+    def _simulate(self, batched_steps: bool) -> ActionObserver:
+        random.seed(10)
+        backend = LocalAgentsBackend(seed=7)
+        community = backend.create_community()['id']
+        observer = ActionObserver(community)
+        observer.add_generation(0)
+        strategies = {Strategy(strategy['donor_strategy'], strategy['non_donor_strategy'], strategy['trust_model'],
+                               strategy['options']): 1 for strategy in STRATEGIES[::6]}
+        Generation(strategies, 0, community, 0, 20, 3, [observer], batched_steps=batched_steps,
+                   agents_client=backend).simulate()
+        return observer
+
+    def test_batched_matches_per_player(self):
+        # The same seed should give the same actions whether the timepoints are batched or not
+        batched = self._simulate(True)
+        per_player = self._simulate(False)
+        for timepoint in range(20):
+            self.assertEqual([(action.actor, action.type, action.reason) for action in batched.actions[timepoint]],
+                             [(action.actor, action.type, action.reason) for action in per_player.actions[timepoint]])
+
+
+if __name__ == '__main__':
+    unittest.main()
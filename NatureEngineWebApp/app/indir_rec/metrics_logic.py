@@ -0,0 +1,235 @@
+"""metrics_logic.py: Counts the actions of each player of a community in arrays, working out the cooperation rate, social
+activeness and positivity of gossip of every player, generation and the community at once"""
+
+__author__ = "James King"
+
+from array import array
+from typing import Dict, List, NoReturn, Tuple, Union
+import numpy as np
+from .action_logic import Action, ActionType, GossipContent, InteractionContent
+
+# The counts kept for each player, in the order of the columns of the counts array
+COUNTS = ('cooperation', 'defection', 'positive', 'negative', 'non_donor')
+_COOPERATION, _DEFECTION, _POSITIVE, _NEGATIVE, _NON_DONOR = range(len(COUNTS))
+# The rates worked out from the counts
+COOPERATION_RATE = 'cooperation_rate'
+SOCIAL_ACTIVENESS = 'social_activeness'
+POSITIVITY_OF_GOSSIP = 'positivity_of_gossip_percentage'
+RATES = (COOPERATION_RATE, SOCIAL_ACTIVENESS, POSITIVITY_OF_GOSSIP)
+# The most increments kept before they are added to the counts, so a long game doesn't hold one for every action
+_MAX_PENDING = 4096
+
+
+def _rates(rate: str, counts: np.ndarray) -> np.ndarray:
+    """
+    Work out a rate for each row of counts, as the observers round them
+    :param rate: The name of the rate
+    :type rate: str
+    :param counts: The counts, a row for each player or generation
+    :type counts: np.ndarray
+    :return: The percentage of each row, NaN where there is nothing to take the percentage of
+    :rtype: np.ndarray
+    """
+    if rate == COOPERATION_RATE:
+        numerator, denominator = counts[:, _COOPERATION], counts[:, _COOPERATION] + counts[:, _DEFECTION]
+    elif rate == SOCIAL_ACTIVENESS:
+        numerator, denominator = counts[:, _POSITIVE] + counts[:, _NEGATIVE], counts[:, _NON_DONOR]
+    elif rate == POSITIVITY_OF_GOSSIP:
+        numerator, denominator = counts[:, _POSITIVE], counts[:, _POSITIVE] + counts[:, _NEGATIVE]
+    else:
+        raise ValueError("No rate named " + rate)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # numpy rounds halves to even as round does
+        return np.where(denominator > 0, np.round(100 * (numerator / denominator)), np.nan)
+
+
+def _percentage(rate: float) -> Union[int, None]:
+    return None if np.isnan(rate) else int(rate)
+
+
+class ActionMetrics:
+    """The counts of the actions of each player, kept in an array with a row for each player of each generation. The
+    actions counted since the rates were last asked for are added to the array together, and the rates are kept until
+    the next action is counted."""
+
+    def __init__(self, generations: List[int] = None):
+        """
+        Set up the counts with no players
+        :param generations: The ids of the generations to count the actions of (defaults to none, add them with
+         add_generation)
+        :type generations: List[int]
+        """
+        self._generations: List[int] = []
+        self._generation_indexes: Dict[int, int] = {}
+        self._rows: Dict[Tuple[int, int], int] = {}
+        self._row_generations: array = array('q')
+        self._row_players: array = array('q')
+        self._counts: np.ndarray = np.zeros((16, len(COUNTS)), dtype=np.int64)
+        # The rows and columns of the counts to add one to, for the actions counted since the counts were last added
+        self._pending_rows: array = array('q')
+        self._pending_columns: array = array('q')
+        self._tables: Dict[Tuple[str, str], object] = {}
+        for generation in generations if generations is not None else []:
+            self.add_generation(generation)
+
+    def add_generation(self, generation: int) -> NoReturn:
+        """
+        Add a generation with no players
+        :param generation: The id of the generation
+        :type generation: int
+        """
+        self._generation_indexes[generation] = len(self._generations)
+        self._generations.append(generation)
+        self._tables.clear()
+
+    def add_player(self, generation: int, player: int) -> NoReturn:
+        """
+        Add a player that has yet to act
+        :param generation: The id of the generation of the player
+        :type generation: int
+        :param player: The id of the player
+        :type player: int
+        """
+        row = len(self._row_players)
+        if row == len(self._counts):
+            self._counts = np.concatenate((self._counts, np.zeros_like(self._counts)))
+        self._rows[(generation, player)] = row
+        self._row_generations.append(self._generation_indexes[generation])
+        self._row_players.append(player)
+        self._tables.clear()
+
+    def add_counts(self, generation: int, players: List[int], counts: np.ndarray) -> NoReturn:
+        """
+        Add the players of a generation along with the counts of the actions they have taken
+        :param generation: The id of the generation, already added
+        :type generation: int
+        :param players: The ids of the players
+        :type players: List[int]
+        :param counts: The counts of each player's actions, a row for each player with a column for each of COUNTS
+        :type counts: np.ndarray
+        """
+        first = len(self._row_players)
+        for player in players:
+            self.add_player(generation, player)
+        self._counts[first:first + len(players)] = counts
+
+    def count(self, action: Action) -> NoReturn:
+        """
+        Count an action of a player that has been added
+        :param action: The action
+        :type action: Action
+        """
+        row = self._rows[(action.generation, action.actor)]
+        if action.type is ActionType.INTERACTION:
+            self._pending_rows.append(row)
+            self._pending_columns.append(_COOPERATION if action.action is InteractionContent.COOPERATE
+                                         else _DEFECTION)
+        else:
+            self._pending_rows.append(row)
+            self._pending_columns.append(_NON_DONOR)
+            if action.type is ActionType.GOSSIP:
+                self._pending_rows.append(row)
+                self._pending_columns.append(_POSITIVE if action.gossip is GossipContent.POSITIVE else _NEGATIVE)
+        if len(self._pending_rows) >= _MAX_PENDING:
+            self._add_pending()
+        self._tables.clear()
+
+    def _add_pending(self) -> NoReturn:
+        """Add the increments of the actions counted since they were last added to the counts"""
+        np.add.at(self._counts, (np.array(self._pending_rows, dtype=np.int64),
+                                 np.array(self._pending_columns, dtype=np.int64)), 1)
+        self._pending_rows = array('q')
+        self._pending_columns = array('q')
+
+    def counts(self) -> np.ndarray:
+        """
+        Get the counts of every player's actions
+        :return: A row for each player in the order they were added, with a column for each of COUNTS
+        :rtype: np.ndarray
+        """
+        if len(self._pending_rows) > 0:
+            self._add_pending()
+        return self._counts[:len(self._row_players)]
+
+    def generation_counts(self) -> np.ndarray:
+        """
+        Get the counts of each generation's actions
+        :return: A row for each generation in the order they were added, with a column for each of COUNTS
+        :rtype: np.ndarray
+        """
+        generation_counts = np.zeros((len(self._generations), len(COUNTS)), dtype=np.int64)
+        np.add.at(generation_counts, np.array(self._row_generations, dtype=np.int64), self.counts())
+        return generation_counts
+
+    def rate(self, rate: str) -> Union[int, None]:
+        """
+        Get a rate of the whole community
+        :param rate: The name of the rate, one of RATES
+        :type rate: str
+        :return: The rate, or None if there is nothing to take the percentage of
+        :rtype: Union[int, None]
+        """
+        key = (rate, 'community')
+        if key not in self._tables:
+            self._tables[key] = _percentage(_rates(rate, self.counts().sum(axis=0, keepdims=True))[0])
+        return self._tables[key]
+
+    def rate_by_generation(self, rate: str) -> Dict[int, Union[int, None]]:
+        """
+        Get a rate of each generation, kept until the next action is counted so shouldn't be changed
+        :param rate: The name of the rate, one of RATES
+        :type rate: str
+        :return: The rate of each generation by generation id, None if there is nothing to take the percentage of
+        :rtype: Dict[int, Union[int, None]]
+        """
+        key = (rate, 'generation')
+        if key not in self._tables:
+            self._tables[key] = {generation: _percentage(generation_rate) for generation, generation_rate in
+                                 zip(self._generations, _rates(rate, self.generation_counts()).tolist())}
+        return self._tables[key]
+
+    def rate_by_generation_and_player(self, rate: str) -> Dict[int, Dict[int, Union[int, None]]]:
+        """
+        Get a rate of each player, kept until the next action is counted so shouldn't be changed
+        :param rate: The name of the rate, one of RATES
+        :type rate: str
+        :return: The rate of each player by generation and player id, None if there is nothing to take the
+         percentage of
+        :rtype: Dict[int, Dict[int, Union[int, None]]]
+        """
+        key = (rate, 'player')
+        if key not in self._tables:
+            table: Dict[int, Dict[int, Union[int, None]]] = {generation: {} for generation in self._generations}
+            for generation_index, player, player_rate in zip(self._row_generations, self._row_players,
+                                                             _rates(rate, self.counts()).tolist()):
+                table[self._generations[generation_index]][player] = _percentage(player_rate)
+            self._tables[key] = table
+        return self._tables[key]
+
+    def to_numpy(self) -> Dict[str, np.ndarray]:
+        """
+        Get the counts and rates of every player as arrays
+        :return: Arrays of the generation and id of each player, each of COUNTS and each of RATES with NaN where there
+         is nothing to take the percentage of, each with an entry for every player in the order they were added
+        :rtype: Dict[str, np.ndarray]
+        """
+        counts = self.counts()
+        columns: Dict[str, np.ndarray] = {
+            'generation': np.array(self._generations, dtype=np.int64)[np.array(self._row_generations,
+                                                                               dtype=np.int64)],
+            'player': np.array(self._row_players, dtype=np.int64)}
+        for column, name in enumerate(COUNTS):
+            columns[name] = counts[:, column].copy()
+        for rate in RATES:
+            columns[rate] = _rates(rate, counts)
+        return columns
+
+    def to_dataframe(self):
+        """
+        Get the counts and rates of every player as a table, with the columns of to_numpy
+        :return: The table, a row for each player
+        :rtype: pandas.DataFrame
+        """
+        # pandas is only needed to export the metrics, so isn't imported until they are
+        import pandas
+        return pandas.DataFrame(self.to_numpy())
@@ -0,0 +1,101 @@
+"""metrics_tests.py: Tests for the functionality of the metrics_logic.py module, checking the rates worked out from the
+arrays of counts are those the actions give and that the counts and rates export as arrays and tables"""
+
+__author__ = "James King"
+
+import unittest
+import numpy as np
+from .action_logic import GossipAction, GossipContent, IdleAction, InteractionAction, InteractionContent
+from .array_engine_logic import ArrayReputationGame
+from .local_agents_logic import STRATEGIES
+from .metrics_logic import ActionMetrics, COUNTS, RATES, COOPERATION_RATE, SOCIAL_ACTIVENESS, \
+    POSITIVITY_OF_GOSSIP
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+class ActionMetricsTest(unittest.TestCase):
+    """Test counting actions and working out rates with the ActionMetrics class"""
+
+    def setUp(self):
+        self.metrics = ActionMetrics([0])
+        self.metrics.add_generation(1)
+        for generation, player in [(0, 0), (0, 1), (1, 2), (1, 3)]:
+            self.metrics.add_player(generation, player)
+        for action in [InteractionAction(0, 0, 0, "", 1, InteractionContent.COOPERATE, [1]),
+                       InteractionAction(1, 0, 0, "", 1, InteractionContent.DEFECT, [1]),
+                       InteractionAction(2, 0, 0, "", 1, InteractionContent.COOPERATE, [1]),
+                       GossipAction(0, 1, 0, "", 0, 0, GossipContent.POSITIVE),
+                       IdleAction(1, 1, 0, ""),
+                       GossipAction(3, 2, 1, "", 3, 3, GossipContent.NEGATIVE),
+                       GossipAction(4, 2, 1, "", 3, 3, GossipContent.POSITIVE)]:
+            self.metrics.count(action)
+
+    def test_counts(self):
+        np.testing.assert_array_equal([[2, 1, 0, 0, 0], [0, 0, 1, 0, 2], [0, 0, 1, 1, 2], [0, 0, 0, 0, 0]],
+                                      self.metrics.counts())
+        np.testing.assert_array_equal([[2, 1, 1, 0, 2], [0, 0, 1, 1, 2]], self.metrics.generation_counts())
+
+    def test_rates(self):
+        # Players and generations with nothing to take the percentage of have no rate
+        self.assertEqual(67, self.metrics.rate(COOPERATION_RATE))
+        self.assertEqual(75, self.metrics.rate(SOCIAL_ACTIVENESS))
+        self.assertEqual(67, self.metrics.rate(POSITIVITY_OF_GOSSIP))
+        self.assertEqual({0: 67, 1: None}, self.metrics.rate_by_generation(COOPERATION_RATE))
+        self.assertEqual({0: 50, 1: 100}, self.metrics.rate_by_generation(SOCIAL_ACTIVENESS))
+        self.assertEqual({0: {0: None, 1: 100}, 1: {2: 50, 3: None}},
+                         self.metrics.rate_by_generation_and_player(POSITIVITY_OF_GOSSIP))
+        with self.assertRaises(ValueError):
+            self.metrics.rate("fitness")
+
+    def test_rates_kept_until_next_count(self):
+        rates = self.metrics.rate_by_generation_and_player(COOPERATION_RATE)
+        self.assertIs(rates, self.metrics.rate_by_generation_and_player(COOPERATION_RATE))
+        self.metrics.count(InteractionAction(5, 3, 1, "", 2, InteractionContent.DEFECT, [2]))
+        self.assertIsNot(rates, self.metrics.rate_by_generation_and_player(COOPERATION_RATE))
+        self.assertEqual({2: None, 3: 0}, self.metrics.rate_by_generation_and_player(COOPERATION_RATE)[1])
+        self.assertEqual(50, self.metrics.rate(COOPERATION_RATE))
+
+    def test_growing(self):
+        # The counts should grow past the rows first set aside, keeping the counts of the players already added
+        metrics = ActionMetrics([0])
+        for player in range(40):
+            metrics.add_player(0, player)
+            metrics.count(IdleAction(player, player, 0, ""))
+        metrics.add_generation(1)
+        metrics.add_counts(1, [0, 1], np.array([[1, 3, 0, 0, 0], [0, 0, 0, 0, 0]]))
+        self.assertEqual([1] * 40 + [0, 0], metrics.counts()[:, COUNTS.index('non_donor')].tolist())
+        self.assertEqual({0: 25, 1: None}, metrics.rate_by_generation_and_player(COOPERATION_RATE)[1])
+
+    def test_to_numpy(self):
+        columns = self.metrics.to_numpy()
+        self.assertEqual(['generation', 'player'] + list(COUNTS) + list(RATES), list(columns))
+        np.testing.assert_array_equal([0, 0, 1, 1], columns['generation'])
+        np.testing.assert_array_equal([0, 1, 2, 3], columns['player'])
+        np.testing.assert_array_equal([2, 0, 0, 0], columns['cooperation'])
+        np.testing.assert_array_equal([67, np.nan, np.nan, np.nan], columns[COOPERATION_RATE])
+
+    @unittest.skipIf(pandas is None, "pandas is not installed")
+    def test_to_dataframe(self):
+        table = self.metrics.to_dataframe()
+        self.assertEqual(4, len(table))
+        self.assertEqual([None, 100, 50, None], [None if np.isnan(rate) else rate
+                                                 for rate in table[POSITIVITY_OF_GOSSIP].tolist()])
+
+    def test_array_results(self):
+        # The results of the array engine should export the same rates they give
+        results = ArrayReputationGame([dict(strategy, count=4) for strategy in STRATEGIES[::20]],
+                                      num_of_generations=3, length_of_generations=6, seed=3).run()
+        columns = results.metrics.to_numpy()
+        self.assertEqual(sum(len(players) for players in results.players.values()), len(columns['player']))
+        by_player = results.social_activeness_by_generation_and_player
+        self.assertEqual([by_player[generation][player] for generation, player in
+                          zip(columns['generation'].tolist(), columns['player'].tolist())],
+                         [None if np.isnan(rate) else int(rate) for rate in columns[SOCIAL_ACTIVENESS].tolist()])
+
+
+if __name__ == '__main__':
+    unittest.main()
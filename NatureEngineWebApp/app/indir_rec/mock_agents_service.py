@@ -0,0 +1,334 @@
+"""mock_agents_service.py: A stand-in for the agents service so the environment can be tested without running the
+Prolog service"""
+
+__author__ = "James King"
+
+import json
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from typing import Dict, List, NoReturn, Set, Tuple
+from urllib.parse import urlparse, parse_qs
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """A HTTP server that handles each request in a new thread"""
+    daemon_threads = True
+
+
+class MockAgentsService:
+    """An in memory stand-in for the agents service served over HTTP on a free local port. It follows the agents
+    service api for the endpoints the environment uses, but the agents minds are simple: donors using the Defector
+    strategy defect, all other donors cooperate and any agent that is not a donor idles."""
+
+    def __init__(self, latency: float = 0):
+        """
+        Set up the empty state of the service and the server to serve it on
+        :param latency: The number of seconds each request takes to be handled, requests wait concurrently
+        :type latency: float
+        """
+        self._latency: float = latency
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._next_community = 0
+        self._communities: Dict[int, Dict[int, Dict[int, Dict]]] = {}
+        self._interactions: Dict[Tuple[int, int, int], Dict] = {}
+        self._percepts: List[Dict] = []
+        self._requests: List[str] = []
+        self._connections: Set[Tuple[str, int]] = set()
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0), self._build_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """
+        Get the url the service is served on, in the same form as the AGENTS_URL config
+        :return: The url of the service
+        :rtype: str
+        """
+        return 'http://127.0.0.1:' + str(self._server.server_address[1]) + '/'
+
+    @property
+    def requests(self) -> List[str]:
+        """
+        Get the requests the service has received in order, each as the method and path e.g. 'POST agent'
+        :return: The requests received
+        :rtype: List[str]
+        """
+        return self._requests
+
+    @property
+    def percepts(self) -> List[Dict]:
+        """
+        Get the action and gossip percepts that the service has received in order
+        :return: The percepts received
+        :rtype: List[Dict]
+        """
+        return self._percepts
+
+    @property
+    def communities(self) -> Dict[int, List[int]]:
+        """
+        Get the communities the service holds, those created and not yet deleted
+        :return: The ids of the generations each community holds, by community id
+        :rtype: Dict[int, List[int]]
+        """
+        with self._lock:
+            return {community: sorted(generations) for community, generations in self._communities.items()}
+
+    @property
+    def connections(self) -> Set[Tuple[str, int]]:
+        """
+        Get the client addresses of the connections the service has received requests over
+        :return: The addresses of the connections
+        :rtype: Set[Tuple[str, int]]
+        """
+        return self._connections
+
+    @property
+    def max_in_flight(self) -> int:
+        """
+        Get the greatest number of requests that have been handled by the service at once
+        :return: The greatest number of requests handled at once
+        :rtype: int
+        """
+        return self._max_in_flight
+
+    def request_count(self, request: str) -> int:
+        """
+        Get the number of times a request has been received
+        :param request: The method and path of the request e.g. 'GET action'
+        :type request: str
+        :return: The number of times the request has been received
+        :rtype: int
+        """
+        return self._requests.count(request)
+
+    def start(self) -> NoReturn:
+        """
+        Start serving the service in a background thread
+        :return: NoReturn
+        """
+        self._thread.start()
+
+    def stop(self) -> NoReturn:
+        """
+        Stop serving the service and close the server
+        :return: NoReturn
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _build_handler(self):
+        """
+        Build the request handler class that passes requests to this service
+        :return: The request handler class
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _reply(self, method: str):
+                service.connections.add(self.client_address)
+                parsed = urlparse(self.path)
+                params = {key: value[0] for key, value in parse_qs(parsed.query).items()}
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length).decode('utf-8')) if length > 0 else {}
+                with service._in_flight_lock:
+                    service._in_flight += 1
+                    service._max_in_flight = max(service._max_in_flight, service._in_flight)
+                time.sleep(service._latency)
+                status, reply = service.handle(method, parsed.path.strip('/'), params, body)
+                with service._in_flight_lock:
+                    service._in_flight -= 1
+                encoded = json.dumps(reply).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def do_GET(self):
+                self._reply('GET')
+
+            def do_POST(self):
+                self._reply('POST')
+
+            def do_DELETE(self):
+                self._reply('DELETE')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, method: str, path: str, params: Dict, body: Dict) -> Tuple[int, Dict]:
+        """
+        Handle a request to the service
+        :param method: The HTTP method of the request
+        :type method: str
+        :param path: The path of the request relative to the service's url
+        :type path: str
+        :param params: The query parameters of the request
+        :type params: Dict
+        :param body: The JSON body of the request
+        :type body: Dict
+        :return: The status code and JSON body to reply with
+        :rtype: Tuple[int, Dict]
+        """
+        with self._lock:
+            self._requests.append(method + ' ' + path)
+            if (method, path) == ('GET', 'strategy'):
+                return 200, {'status': 200, 'success': True, 'strategies': []}
+            if (method, path) == ('POST', 'community'):
+                community = self._next_community
+                self._next_community += 1
+                self._communities[community] = {}
+                return 200, {'id': community, 'status': 200, 'success': True}
+            if (method, path) == ('DELETE', 'community'):
+                return self._reply(params, self._delete_community(int(params['community'])))
+            if (method, path) == ('DELETE', 'generation'):
+                return self._reply(params, self._delete_generation(int(params['community']),
+                                                                   int(params['generation'])))
+            if (method, path) == ('POST', 'generation'):
+                return self._reply(body, self._new_generation(body))
+            if (method, path) == ('POST', 'agent'):
+                return self._reply(body, self._new_agent(body))
+            if (method, path) == ('POST', 'agent/group'):
+                return 200, self._new_agents(body)
+            if (method, path) == ('POST', 'percept/interaction'):
+                return self._reply(body, self._new_interaction(body))
+            if (method, path) == ('POST', 'percept/action/group'):
+                return 200, {'data': body, 'status': 200,
+                             'success': [{'percept': percept, 'success': self._new_percept(percept)}
+                                         for percept in body['percepts']]}
+            if (method, path) == ('GET', 'action'):
+                params = {key: int(value) for key, value in params.items()}
+                success, action = self._decide(params['community'], params['generation'], params['player'],
+                                               params['timepoint'])
+                if success is not True:
+                    return self._reply(params, success)
+                return 200, {'action': action, 'data': params, 'status': 200, 'success': True}
+            if (method, path) == ('POST', 'step'):
+                return 200, self._step(body)
+            return 404, {'status': 404, 'success': False, 'message': 'No such endpoint'}
+
+    @staticmethod
+    def _reply(data: Dict, success) -> Tuple[int, Dict]:
+        """
+        Build the reply for a request in the form used by the agents service
+        :param data: The data the request was made with
+        :type data: Dict
+        :param success: True if the request was successful, else an error message
+        :return: The status code and JSON body to reply with
+        :rtype: Tuple[int, Dict]
+        """
+        if success is True:
+            return 200, {'data': data, 'status': 200, 'success': True}
+        return 404, {'data': data, 'message': success, 'status': 404, 'success': False}
+
+    def _delete_community(self, community: int):
+        """Delete a community, returning True or an error message"""
+        if community not in self._communities:
+            return "No such community"
+        del self._communities[community]
+        return True
+
+    def _delete_generation(self, community: int, generation: int):
+        """Delete a generation of a community, returning True or an error message"""
+        if generation not in self._communities.get(community, {}):
+            return "No such generation for this community"
+        del self._communities[community][generation]
+        return True
+
+    def _new_generation(self, body: Dict):
+        """Create a generation, returning True or an error message"""
+        if body['community'] not in self._communities:
+            return "No such community"
+        if body['generation'] in self._communities[body['community']]:
+            return "Generation already exists for this community"
+        self._communities[body['community']][body['generation']] = {}
+        return True
+
+    def _new_agent(self, body: Dict):
+        """Create an agent, returning True or an error message"""
+        if body['community'] not in self._communities:
+            return "No such community"
+        if body['generation'] not in self._communities[body['community']]:
+            return "No such generation for this community"
+        if body['donor_strategy'] not in ["Cooperator", "Defector", "Standing Discriminator", "Random",
+                                          "Image Scoring Discriminator", "Veritability Discerner"]:
+            return "No such strategy"
+        agents = self._communities[body['community']][body['generation']]
+        if body['player'] in agents:
+            return "Player ID already taken for this community and generation"
+        agents[body['player']] = body
+        return True
+
+    def _new_agents(self, body: Dict) -> Dict:
+        """Create the agents of a generation from the count of each strategy, replying with the success of each"""
+        players = []
+        for strategy in body['strategies']:
+            for _ in range(strategy['count']):
+                player = len(players)
+                agent = {field: value for field, value in strategy.items() if field != 'count'}
+                success = self._new_agent(dict(agent, community=body['community'], generation=body['generation'],
+                                               player=player))
+                players.append({'player': player, 'success': True} if success is True else
+                               {'player': player, 'success': False, 'message': success})
+        return {'data': {'community': body['community'], 'generation': body['generation']}, 'players': players,
+                'status': 200, 'success': True}
+
+    def _agent_exists(self, community: int, generation: int, player: int) -> bool:
+        """Check whether an agent exists in the service"""
+        return community in self._communities and generation in self._communities[community] and \
+            player in self._communities[community][generation]
+
+    def _new_interaction(self, body: Dict):
+        """Set the donor-recipient pair for a timepoint, returning True or an error message"""
+        if not self._agent_exists(body['community'], body['generation'], body['donor']) or \
+                not self._agent_exists(body['community'], body['generation'], body['recipient']):
+            return "No such community, generation or agents"
+        self._interactions[(body['community'], body['generation'], body['timepoint'])] = body
+        return True
+
+    def _new_percept(self, percept: Dict):
+        """Record an action or gossip percept, returning True or an error message"""
+        if not self._agent_exists(percept['community'], percept['generation'], percept['perceiver']):
+            return "No such community, generation or perceiver"
+        self._percepts.append(percept)
+        return True
+
+    def _decide(self, community: int, generation: int, player: int, timepoint: int):
+        """Get an agent's action at a timepoint, returning True or an error message and the action"""
+        if not self._agent_exists(community, generation, player):
+            return "No such community, generation or agent", None
+        interaction = self._interactions.get((community, generation, timepoint))
+        if interaction is None or interaction['donor'] != player:
+            return True, {'type': 'idle', 'reason': "I only act when I have to"}
+        if self._communities[community][generation][player]['donor_strategy'] == "Defector":
+            return True, {'type': 'action', 'value': 'defect', 'recipient': interaction['recipient'],
+                          'reason': "To protect my interests, and not incur cooperation costs"}
+        return True, {'type': 'action', 'value': 'cooperate', 'recipient': interaction['recipient'],
+                      'reason': "I naively cooperate with everyone out of pure altruism"}
+
+    def _step(self, body: Dict) -> Dict:
+        """Run a step request, replying in the form of the agents service step endpoint"""
+        interaction_success = self._new_interaction(body['interaction']) if 'interaction' in body else True
+        percept_successes = [{'percept': percept, 'success': self._new_percept(percept)}
+                             for percept in body['percepts']]
+        actions = []
+        for player in body['players']:
+            success, action = self._decide(body['community'], body['generation'], player, body['timepoint'])
+            if success is True:
+                actions.append({'player': player, 'success': True, 'action': action})
+            else:
+                actions.append({'player': player, 'success': False, 'message': success})
+        return {'actions': actions, 'data': {'community': body['community'], 'generation': body['generation'],
+                                             'timepoint': body['timepoint']},
+                'interaction': interaction_success, 'percepts': percept_successes, 'status': 200, 'success': True}
@@ -2,8 +2,11 @@
 
 __author__ = "James King"
 
-from .action_logic import Action, ActionType, InteractionContent, GossipContent, InteractionAction
-from typing import List, Dict, NoReturn, Union
+from array import array
+from .action_logic import Action, ActionType, InteractionContent, GossipContent, InteractionAction, GossipAction, \
+    IdleAction
+from typing import Any, Iterator, List, Dict, NoReturn, Set, Union
+from .metrics_logic import ActionMetrics, COOPERATION_RATE, SOCIAL_ACTIVENESS, POSITIVITY_OF_GOSSIP
 from .player_logic import PlayerState
 from abc import ABC, abstractmethod
 
@@ -51,9 +54,101 @@ class Observer(ABC):
         """Return if the observations of this observer are corrupted in some way"""
         raise NotImplementedError
 
+    def checkpoint_state(self) -> Any:
+        """The state to restore the observer with when a simulation resumes from a checkpoint, None if the observer
+        keeps nothing that needs restoring"""
+        return None
+
+    def restore_state(self, state: Any) -> NoReturn:
+        """Restore the observer with the state it gave when a checkpoint was taken"""
+        pass
+
+
+# The codes of the types and contents of actions in an action log
+_IDLE, _GOSSIP, _INTERACTION = 0, 1, 2
+_CONTENT_CODES = {InteractionContent.COOPERATE: 0, InteractionContent.DEFECT: 1,
+                  GossipContent.POSITIVE: 0, GossipContent.NEGATIVE: 1}
+_GOSSIP_CONTENTS = [GossipContent.POSITIVE, GossipContent.NEGATIVE]
+
+
+class ActionLog:
+    """A columnar log of actions, each column a typed array with an entry for every action, so an action takes a few
+    dozen bytes rather than an object of its own. The reasons are interned as most actions share a few reasons, and
+    the interactions are kept whole as their onlookers are set once they have been executed."""
+
+    def __init__(self):
+        """Set up the empty columns of the log"""
+        self._timepoints: array = array('q')
+        self._actors: array = array('q')
+        self._generations: array = array('q')
+        self._types: array = array('b')
+        self._contents: array = array('b')
+        self._recipients: array = array('q')
+        self._abouts: array = array('q')
+        self._reasons: array = array('q')
+        self._reason_ids: Dict[str, int] = {}
+        self._reason_texts: List[str] = []
+        self._interactions: Dict[int, InteractionAction] = {}
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __iter__(self) -> Iterator[Action]:
+        """Build each action logged, in the order they were logged"""
+        return (self.action(index) for index in range(len(self._types)))
+
+    def append(self, action: Action) -> NoReturn:
+        """
+        Log an action
+        :param action: The action to log
+        :type action: Action
+        :return: NoReturn
+        """
+        if action.reason not in self._reason_ids:
+            self._reason_ids[action.reason] = len(self._reason_texts)
+            self._reason_texts.append(action.reason)
+        if action.type is ActionType.INTERACTION:
+            self._interactions[len(self._types)] = action
+            kind, content, recipient, about = _INTERACTION, _CONTENT_CODES[action.action], action.recipient, -1
+        elif action.type is ActionType.GOSSIP:
+            kind, content, recipient, about = _GOSSIP, _CONTENT_CODES[action.gossip], action.recipient, action.about
+        else:
+            kind, content, recipient, about = _IDLE, -1, -1, -1
+        self._timepoints.append(action.timepoint)
+        self._actors.append(action.actor)
+        self._generations.append(action.generation)
+        self._types.append(kind)
+        self._contents.append(content)
+        self._recipients.append(recipient)
+        self._abouts.append(about)
+        self._reasons.append(self._reason_ids[action.reason])
+
+    def action(self, index: int) -> Action:
+        """
+        Build an action from the log
+        :param index: The position of the action in the log
+        :type index: int
+        :return: The action
+        :rtype: Action
+        """
+        kind = self._types[index]
+        if kind == _INTERACTION:
+            return self._interactions[index]
+        timepoint, actor, generation = self._timepoints[index], self._actors[index], self._generations[index]
+        reason = self._reason_texts[self._reasons[index]]
+        if kind == _GOSSIP:
+            return GossipAction(timepoint, actor, generation, reason, self._abouts[index], self._recipients[index],
+                                _GOSSIP_CONTENTS[self._contents[index]])
+        return IdleAction(timepoint, actor, generation, reason)
+
+    def interactions(self) -> Iterator[InteractionAction]:
+        """The interactions logged, in the order they were logged"""
+        return (self._interactions[index] for index in sorted(self._interactions))
+
 
 class ActionObserver(Observer):
-    """Observes the actions committed to by players of a community"""
+    """Observes the actions committed to by players of a community, keeping them in an action log and building the
+    views of them by timepoint, generation and player when asked for"""
 
     def __init__(self, community: int, generations: List[int] = None):
         """
@@ -65,14 +160,7 @@ class ActionObserver(Observer):
         # Community level data set up
         self._community: int = community
         self._corrupted_observations: bool = False
-        self._actions: Dict[int, List[Action]] = {}
-        self._interactions: Dict[int, InteractionAction] = {}
-        self._cooperation_count = 0
-        self._defection_count = 0
-        self._positive_social_action_count = 0
-        self._negative_social_action_count = 0
-        self._idle_action_count = 0
-        self._non_donor_action_count = 0
+        self._log: ActionLog = ActionLog()
         # Generational and player level data set up
         if generations is not None:
             for i in range(len(generations)-1):
@@ -82,44 +170,30 @@ class ActionObserver(Observer):
                         raise RecordingError("Identical generation ids in constructor")
             self._players: Dict[int, List[int]] = {generation: [] for generation in generations}
             self._generations: List[int] = generations
-            self._actions_by_generation: Dict[int, Dict[int, List[Action]]] = {generation: {} for generation in generations}
-            self._actions_by_generation_and_player: Dict[int, Dict[int, Dict[int, Action]]] = {generation: {} for generation in generations}
-            self._interactions_by_generation: Dict[int, Dict[int, InteractionAction]] = {generation: {} for generation in generations}
-            self._interactions_by_generation_and_player: Dict[int, Dict[int, Dict[int, InteractionAction]]] = {generation: {} for generation in generations}
-            self._cooperation_count_by_generation: Dict[int, int] = {generation: 0 for generation in generations}
-            self._defection_count_by_generation: Dict[int, int] = {generation: 0 for generation in generations}
-            self._cooperation_count_by_generation_and_player: Dict[int, Dict[int, int]] = {generation: {} for generation in generations}
-            self._defection_count_by_generation_and_player: Dict[int, Dict[int, int]] = {generation: {} for generation in generations}
-            self._positive_social_action_count_by_generation: Dict[int, int] = {generation: 0 for generation in generations}
-            self._negative_social_action_count_by_generation: Dict[int, int] = {generation: 0 for generation in generations}
-            self._idle_action_count_by_generation: Dict[int, int] = {generation: 0 for generation in generations}
-            self._positive_social_action_count_by_generation_and_player: Dict[int, Dict[int, int]] = \
-                {generation: {} for generation in generations}
-            self._negative_social_action_count_by_generation_and_player: Dict[int, Dict[int, int]] = \
-                {generation: {} for generation in generations}
-            self._idle_action_count_by_generation_and_player: Dict[int, Dict[int, int]] = {generation: {} for generation in generations}
-            self._non_donor_action_count_by_generation: Dict[int, int] = {generation: 0 for generation in generations}
-            self._non_donor_action_count_by_generation_and_player: Dict[int, Dict[int, int]] = \
-                {generation: {} for generation in generations}
         else:
             self._generations: List[int] = []
             self._players: Dict[int, List[int]] = {}
-            self._actions_by_generation: Dict[int, Dict[int, List[Action]]] = {}
-            self._actions_by_generation_and_player: Dict[int, Dict[int, Dict[int, Action]]] = {}
-            self._interactions_by_generation: Dict[int, Dict[int, InteractionAction]] = {}
-            self._interactions_by_generation_and_player: Dict[int, Dict[int, Dict[int, InteractionAction]]] = {}
-            self._cooperation_count_by_generation: Dict[int, int] = {}
-            self._defection_count_by_generation: Dict[int, int] = {}
-            self._cooperation_count_by_generation_and_player: Dict[int, Dict[int, int]] = {}
-            self._defection_count_by_generation_and_player: Dict[int, Dict[int, int]] = {}
-            self._positive_social_action_count_by_generation: Dict[int, int] = {}
-            self._negative_social_action_count_by_generation: Dict[int, int] = {}
-            self._idle_action_count_by_generation: Dict[int, int] = {}
-            self._positive_social_action_count_by_generation_and_player: Dict[int, Dict[int, int]] = {}
-            self._negative_social_action_count_by_generation_and_player: Dict[int, Dict[int, int]] = {}
-            self._idle_action_count_by_generation_and_player: Dict[int, Dict[int, int]] = {}
-            self._non_donor_action_count_by_generation: Dict[int, int] = {}
-            self._non_donor_action_count_by_generation_and_player: Dict[int, Dict[int, int]] = {}
+        self._player_sets: Dict[int, Set[int]] = {generation: set() for generation in self._generations}
+        # The counts of each player's actions, kept as the actions are observed to work out the rates from
+        self._metrics: ActionMetrics = ActionMetrics(self._generations)
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """
+        Get the observations made so far, to restore them when resuming the simulation from a checkpoint
+        :return: The observations, by attribute
+        :rtype: Dict[str, Any]
+        """
+        # The community is that of the simulation being resumed, so isn't restored
+        return {name: value for name, value in self.__dict__.items() if name != '_community'}
+
+    def restore_state(self, state: Dict[str, Any]) -> NoReturn:
+        """
+        Restore the observations made before a checkpoint was taken
+        :param state: The observations given by checkpoint_state
+        :type state: Dict[str, Any]
+        :return: NoReturn
+        """
+        self.__dict__.update(state)
 
     @property
     def corrupted_observations(self) -> bool:
@@ -161,22 +235,8 @@ class ActionObserver(Observer):
             raise RecordingError("Attempted to add identical generation id in append")
         self._generations.append(generation)
         self._players[generation] = []
-        self._actions_by_generation[generation] = {}
-        self._actions_by_generation_and_player[generation] = {}
-        self._interactions_by_generation[generation] = {}
-        self._interactions_by_generation_and_player[generation] = {}
-        self._cooperation_count_by_generation[generation] = 0
-        self._defection_count_by_generation[generation] = 0
-        self._cooperation_count_by_generation_and_player[generation] = {}
-        self._defection_count_by_generation_and_player[generation] = {}
-        self._positive_social_action_count_by_generation[generation] = 0
-        self._negative_social_action_count_by_generation[generation] = 0
-        self._idle_action_count_by_generation[generation] = 0
-        self._positive_social_action_count_by_generation_and_player[generation] = {}
-        self._negative_social_action_count_by_generation_and_player[generation] = {}
-        self._idle_action_count_by_generation_and_player[generation] = {}
-        self._non_donor_action_count_by_generation[generation] = 0
-        self._non_donor_action_count_by_generation_and_player[generation] = {}
+        self._player_sets[generation] = set()
+        self._metrics.add_generation(generation)
 
     @property
     def players(self) -> Dict[int, List[int]]:
@@ -199,18 +259,12 @@ class ActionObserver(Observer):
         """
         # Detect if corruption has occurred
         if generation not in self._generations or generation not in self._players or \
-                (generation in self._players and player in self.players[generation]):
+                (generation in self._players and player in self._player_sets[generation]):
             self._corrupted_observations = True
             raise RecordingError("Attempted to add a player to a non-existent generation")
         self._players[generation].append(player)
-        self._actions_by_generation_and_player[generation][player] = {}
-        self._interactions_by_generation_and_player[generation][player] = {}
-        self._cooperation_count_by_generation_and_player[generation][player] = 0
-        self._defection_count_by_generation_and_player[generation][player] = 0
-        self._idle_action_count_by_generation_and_player[generation][player] = 0
-        self._positive_social_action_count_by_generation_and_player[generation][player] = 0
-        self._negative_social_action_count_by_generation_and_player[generation][player] = 0
-        self._non_donor_action_count_by_generation_and_player[generation][player] = 0
+        self._player_sets[generation].add(player)
+        self._metrics.add_player(generation, player)
 
     @property
     def actions(self) -> Dict[int, List[Action]]:
@@ -219,7 +273,10 @@ class ActionObserver(Observer):
         :return: list of actions for each timepoint
         :rtype: Dict[int, List[Action]]
         """
-        return self._actions
+        actions: Dict[int, List[Action]] = {}
+        for action in self._log:
+            actions.setdefault(action.timepoint, []).append(action)
+        return actions
 
     @property
     def actions_by_generation(self) -> Dict[int, Dict[int, List[Action]]]:
@@ -228,7 +285,11 @@ class ActionObserver(Observer):
         :return: List of actions organised by generation and timepoint
         :rtype: Dict[int, Dict[int, List[Action]]]
         """
-        return self._actions_by_generation
+        actions_by_generation: Dict[int, Dict[int, List[Action]]] = {generation: {}
+                                                                     for generation in self._generations}
+        for action in self._log:
+            actions_by_generation[action.generation].setdefault(action.timepoint, []).append(action)
+        return actions_by_generation
 
     @property
     def actions_by_generation_and_player(self) -> Dict[int, Dict[int, Dict[int, Action]]]:
@@ -238,7 +299,11 @@ class ActionObserver(Observer):
         :return: Actions for each player at each timepoint that they acted
         :rtype: Dict[int, Dict[int, Dict[int, Action]]]
         """
-        return self._actions_by_generation_and_player
+        actions_by_generation_and_player: Dict[int, Dict[int, Dict[int, Action]]] = \
+            {generation: {player: {} for player in self._players[generation]} for generation in self._generations}
+        for action in self._log:
+            actions_by_generation_and_player[action.generation][action.actor][action.timepoint] = action
+        return actions_by_generation_and_player
 
     @property
     def interactions(self) -> Dict[int, InteractionAction]:
@@ -248,7 +313,7 @@ class ActionObserver(Observer):
         :return: Interactions in the community indexed by timepoint
         :rtype: Dict[int, InteractionAction]
         """
-        return self._interactions
+        return {interaction.timepoint: interaction for interaction in self._log.interactions()}
 
     @property
     def interactions_by_generation(self) -> Dict[int, Dict[int, InteractionAction]]:
@@ -258,7 +323,11 @@ class ActionObserver(Observer):
         :return: interactions indexed by generation
         :rtype: Dict[int, Dict[int, InteractionAction]]
         """
-        return self._interactions_by_generation
+        interactions_by_generation: Dict[int, Dict[int, InteractionAction]] = {generation: {}
+                                                                               for generation in self._generations}
+        for interaction in self._log.interactions():
+            interactions_by_generation[interaction.generation][interaction.timepoint] = interaction
+        return interactions_by_generation
 
     @property
     def interactions_by_generation_and_player(self) -> Dict[int, Dict[int, Dict[int, InteractionAction]]]:
@@ -267,7 +336,12 @@ class ActionObserver(Observer):
         :return: Interactions indexed by generation and player
         :rtype: Dict[int, Dict[int, Dict[int, InteractionAction]]]
         """
-        return self._interactions_by_generation_and_player
+        interactions_by_generation_and_player: Dict[int, Dict[int, Dict[int, InteractionAction]]] = \
+            {generation: {player: {} for player in self._players[generation]} for generation in self._generations}
+        for interaction in self._log.interactions():
+            interactions_by_generation_and_player[interaction.generation][interaction.actor][interaction.timepoint] = \
+                interaction
+        return interactions_by_generation_and_player
 
     def update(self, player_state: PlayerState) -> NoReturn:
         """
@@ -290,74 +364,24 @@ class ActionObserver(Observer):
         if Action not in action.__class__.__mro__:
             self._corrupted_observations = True
             raise RecordingError("Attempted to add an action that does not subclass from the Action subclass")
-        if action.generation not in self._generations:
+        if action.generation not in self._player_sets:
             self._corrupted_observations = True
             raise RecordingError("Attempted to add an action that cannot be attributed to a generation, or player")
-        if action.actor not in self._players[action.generation]:
+        if action.actor not in self._player_sets[action.generation]:
             self._corrupted_observations = True
             raise RecordingError("Attempted to add an action that cannot be attributed to an existing player")
-        # Add action to action list
-        self._add_action(action)
-        if action.type is ActionType.INTERACTION:
-            # Record relevant data on interactions
-            self._add_interaction(action)
-            if action.action == InteractionContent.COOPERATE:
-                self._cooperation_count += 1
-                self._cooperation_count_by_generation[action.generation] += 1
-                self._cooperation_count_by_generation_and_player[action.generation][action.actor] += 1
-            else:
-                self._defection_count += 1
-                self._defection_count_by_generation[action.generation] += 1
-                self._defection_count_by_generation_and_player[action.generation][action.actor] += 1
-        elif action.type is ActionType.GOSSIP:
-            # Record relevant data on gossip actions
-            self._non_donor_action_count += 1
-            self._non_donor_action_count_by_generation[action.generation] += 1
-            self._non_donor_action_count_by_generation_and_player[action.generation][action.actor] += 1
-            if action.gossip is GossipContent.POSITIVE:
-                self._positive_social_action_count += 1
-                self._positive_social_action_count_by_generation[action.generation] += 1
-                self._positive_social_action_count_by_generation_and_player[action.generation][action.actor] += 1
-            elif action.gossip is GossipContent.NEGATIVE:
-                self._negative_social_action_count += 1
-                self._negative_social_action_count_by_generation[action.generation] += 1
-                self._negative_social_action_count_by_generation_and_player[action.generation][action.actor] += 1
-        else:
-            # Record inactivity
-            self._non_donor_action_count += 1
-            self._non_donor_action_count_by_generation[action.generation] += 1
-            self._non_donor_action_count_by_generation_and_player[action.generation][action.actor] += 1
+        # Add action to action log
+        self._log.append(action)
+        self._metrics.count(action)
 
-    def _add_action(self, action) -> NoReturn:
-        """
-        Add the action to the relevant data structures
-        :param action: The action to record
-        :type action: Action
-        :return: NoReturn
-        """
-        # Add action to relevant timepoint
-        if action.timepoint in self._actions:
-            self._actions[action.timepoint].append(action)
-        else:
-            self._actions[action.timepoint] = [action]
-        # Add to relevant generation timepoint
-        if action.timepoint in self._actions_by_generation[action.generation]:
-            self._actions_by_generation[action.generation][action.timepoint].append(action)
-        else:
-            self._actions_by_generation[action.generation][action.timepoint] = [action]
-        # Set players action for the timepoint
-        self._actions_by_generation_and_player[action.generation][action.actor][action.timepoint] = action
-
-    def _add_interaction(self, action) -> NoReturn:
+    @property
+    def metrics(self) -> ActionMetrics:
         """
-        Add the interaction data to the relevant data structures
-        :param action: the interaction action to add
-        :type action: InteractionAction
-        :return: NoReturn
+        Get the counts of each player's actions, to work out rates from or export as arrays
+        :return: The counts of the actions observed
+        :rtype: ActionMetrics
         """
-        self._interactions[action.timepoint] = action
-        self._interactions_by_generation[action.generation][action.timepoint] = action
-        self._interactions_by_generation_and_player[action.generation][action.actor][action.timepoint] = action
+        return self._metrics
 
     @property
     def cooperation_rate(self) -> Union[int, None]:
@@ -366,9 +390,7 @@ class ActionObserver(Observer):
         :return: The cooperation rate or none
         :rtype: Union[int, None]
         """
-        if self._cooperation_count + self._defection_count != 0:
-            return int(round(100*(self._cooperation_count / (self._cooperation_count + self._defection_count))))
-        return None
+        return self._metrics.rate(COOPERATION_RATE)
 
     @property
     def cooperation_rate_by_generation(self) -> Dict[int, Union[int, None]]:
@@ -377,16 +399,7 @@ class ActionObserver(Observer):
         :return: cooperation rate of each generation
         :rtype: Dict[int, Union[int, None]]
         """
-        cooperation_rate_by_generation: Dict[int, Union[int, None]] = {}
-        for generation in self._generations:
-            if self._cooperation_count_by_generation[generation] + self._defection_count_by_generation[generation] != 0:
-                cooperation_rate_by_generation[generation] = int(round(100*(
-                        self._cooperation_count_by_generation[generation] /
-                        (self._cooperation_count_by_generation[generation] +
-                         self._defection_count_by_generation[generation]))))
-            else:
-                cooperation_rate_by_generation[generation] = None
-        return cooperation_rate_by_generation
+        return self._metrics.rate_by_generation(COOPERATION_RATE)
 
     @property
     def cooperation_rate_by_generation_and_player(self) -> Dict[int, Dict[int, Union[int, None]]]:
@@ -397,19 +410,7 @@ class ActionObserver(Observer):
         :return: The cooperation rate of each player
         :rtype: Dict[int, Dict[int, Union[int, None]]]
         """
-        cooperation_rate_by_generation_and_player: Dict[int, Dict[int, Union[int, None]]] = {}
-        for generation in self._generations:
-            cooperation_rate_by_generation_and_player[generation] = {}
-            for player in self._players[generation]:
-                if self._cooperation_count_by_generation_and_player[generation][player] +\
-                        self._defection_count_by_generation_and_player[generation][player] != 0:
-                    cooperation_rate_by_generation_and_player[generation][player] = int(round(100*(
-                            self._cooperation_count_by_generation_and_player[generation][player] /
-                            (self._cooperation_count_by_generation_and_player[generation][player] +
-                             self._defection_count_by_generation_and_player[generation][player]))))
-                else:
-                    cooperation_rate_by_generation_and_player[generation][player] = None
-        return cooperation_rate_by_generation_and_player
+        return self._metrics.rate_by_generation_and_player(COOPERATION_RATE)
 
     @property
     def social_activeness(self) -> Union[int, None]:
@@ -419,10 +420,7 @@ class ActionObserver(Observer):
         :return: The social activeness of the community
         :rtype: Union[int, None]
         """
-        if self._non_donor_action_count != 0:
-            return int(round(100*((self._positive_social_action_count + self._negative_social_action_count)/
-                                  self._non_donor_action_count)))
-        return None
+        return self._metrics.rate(SOCIAL_ACTIVENESS)
 
     @property
     def social_activeness_by_generation(self) -> Dict[int, Union[int, None]]:
@@ -431,16 +429,7 @@ class ActionObserver(Observer):
         :return: the social activeness of each generation
         :rtype: Dict[int, Union[int, None]]
         """
-        social_activeness_by_generation: Dict[int, Union[int, None]] = {}
-        for generation in self._generations:
-            if self._non_donor_action_count_by_generation[generation] != 0:
-                social_activeness_by_generation[generation] = int(round(100*(
-                        (self._positive_social_action_count_by_generation[generation] +
-                         self._negative_social_action_count_by_generation[generation]) /
-                        self._non_donor_action_count_by_generation[generation])))
-            else:
-                social_activeness_by_generation[generation] = None
-        return social_activeness_by_generation
+        return self._metrics.rate_by_generation(SOCIAL_ACTIVENESS)
 
     @property
     def social_activeness_by_generation_and_player(self) -> Dict[int, Dict[int, Union[int, None]]]:
@@ -451,18 +440,7 @@ class ActionObserver(Observer):
         :return: the social activeness of each player
         :rtype: Dict[int, Dict[int, Union[int, None]]]
         """
-        social_activeness_by_generation_and_player: Dict[int, Dict[int, Union[int, None]]] = {}
-        for generation in self._generations:
-            social_activeness_by_generation_and_player[generation] = {}
-            for player in self._players[generation]:
-                if self._non_donor_action_count_by_generation_and_player[generation][player] != 0:
-                    social_activeness_by_generation_and_player[generation][player] = int(round(100*(
-                            (self._positive_social_action_count_by_generation_and_player[generation][player] +
-                             self._negative_social_action_count_by_generation_and_player[generation][player]) /
-                            (self._non_donor_action_count_by_generation_and_player[generation][player]))))
-                else:
-                    social_activeness_by_generation_and_player[generation][player] = None
-        return social_activeness_by_generation_and_player
+        return self._metrics.rate_by_generation_and_player(SOCIAL_ACTIVENESS)
 
     @property
     def positivity_of_gossip_percentage(self) -> Union[int, None]:
@@ -471,10 +449,7 @@ class ActionObserver(Observer):
         :return: The community's gossip positivity
         :rtype: Union[int, None]
         """
-        if self._positive_social_action_count + self._negative_social_action_count != 0:
-            return int(round(100*(self._positive_social_action_count /
-                                  (self._positive_social_action_count + self._negative_social_action_count))))
-        return None
+        return self._metrics.rate(POSITIVITY_OF_GOSSIP)
 
     @property
     def positivity_of_gossip_percentage_by_generation(self) -> Dict[int, Union[int, None]]:
@@ -484,17 +459,7 @@ class ActionObserver(Observer):
         :return: the postivity of each generations gossip#
         :rtype: Dict[int, Union[int, None]]
         """
-        positivity_of_gossip_percentage_by_generation: Dict[int, Union[int, None]] = {}
-        for generation in self._generations:
-            if (self._positive_social_action_count_by_generation[generation] +
-                    self._negative_social_action_count_by_generation[generation]) != 0:
-                positivity_of_gossip_percentage_by_generation[generation] = int(round(100*(
-                        self._positive_social_action_count_by_generation[generation] /
-                        (self._positive_social_action_count_by_generation[generation] +
-                         self._negative_social_action_count_by_generation[generation]))))
-            else:
-                positivity_of_gossip_percentage_by_generation[generation] = None
-        return positivity_of_gossip_percentage_by_generation
+        return self._metrics.rate_by_generation(POSITIVITY_OF_GOSSIP)
 
     @property
     def positivity_of_gossip_percentage_by_generation_and_player(self) -> Dict[int, Dict[int, Union[int, None]]]:
@@ -505,20 +470,7 @@ class ActionObserver(Observer):
         :return: the positivity of each players gossip
         :rtype: Dict[int, Dict[int, Union[int, None]]]
         """
-        positivity_of_gossip_percentage_by_generation_and_player: Dict[int, Dict[int, Union[int, None]]] = {}
-        for generation in self._generations:
-            positivity_of_gossip_percentage_by_generation_and_player[generation] = {}
-            for player in self._players[generation]:
-                if (self._positive_social_action_count_by_generation_and_player[generation][player] +
-                self._negative_social_action_count_by_generation_and_player[generation][player]) != 0:
-                    positivity_of_gossip_percentage_by_generation_and_player[generation][player] = int(round(100*(
-                        self._positive_social_action_count_by_generation_and_player[generation][player] /
-                        (self._positive_social_action_count_by_generation_and_player[generation][player] +
-                         self._negative_social_action_count_by_generation_and_player[generation][player])
-                    )))
-                else:
-                    positivity_of_gossip_percentage_by_generation_and_player[generation][player] = None
-        return positivity_of_gossip_percentage_by_generation_and_player
+        return self._metrics.rate_by_generation_and_player(POSITIVITY_OF_GOSSIP)
 
 
 class PlayerObserver(Observer):
@@ -554,6 +506,24 @@ class PlayerObserver(Observer):
             self._fitness_by_generation: Dict[int, int] = {}
             self._fitness_by_generation_and_player: Dict[int, Dict[int, int]] = {}
 
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """
+        Get the observations made so far, to restore them when resuming the simulation from a checkpoint
+        :return: The observations, by attribute
+        :rtype: Dict[str, Any]
+        """
+        # The community is that of the simulation being resumed, so isn't restored
+        return {name: value for name, value in self.__dict__.items() if name != '_community'}
+
+    def restore_state(self, state: Dict[str, Any]) -> NoReturn:
+        """
+        Restore the observations made before a checkpoint was taken
+        :param state: The observations given by checkpoint_state
+        :type state: Dict[str, Any]
+        :return: NoReturn
+        """
+        self.__dict__.update(state)
+
     @property
     def corrupted_observations(self) -> bool:
         """
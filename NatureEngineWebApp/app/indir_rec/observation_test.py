@@ -4,7 +4,7 @@ __author__ = "James King"
 
 import unittest
 import random
-from .observation_logic import ActionObserver, RecordingError, PlayerObserver
+from .observation_logic import ActionObserver, ActionLog, RecordingError, PlayerObserver
 from .action_logic import IdleAction, Action, InteractionAction, InteractionContent, GossipAction, GossipContent,\
     ActionType
 from .player_logic import PlayerState, Player
@@ -566,6 +566,52 @@ class ActionObserverTest(unittest.TestCase):
                                                                                                         " and player")
 
 
+class ActionLogTest(unittest.TestCase):
+    """Test the ActionLog class"""
+
+    def setUp(self):
+        self.log = ActionLog()
+        self.actions = [IdleAction(0, 1, 2, "lazy"), GossipAction(0, 3, 2, "gossip", 1, 4, GossipContent.NEGATIVE),
+                        InteractionAction(1, 1, 2, "kind", 3, InteractionContent.COOPERATE),
+                        GossipAction(1, 4, 2, "gossip", 3, 1, GossipContent.POSITIVE), IdleAction(2, 3, 2, "lazy"),
+                        InteractionAction(2, 4, 2, "mean", 1, InteractionContent.DEFECT)]
+        for action in self.actions:
+            self.log.append(action)
+
+    def test_actions(self):
+        # The actions built from the log should be equal to those logged, in the order they were logged
+        self.assertEqual(len(self.actions), len(self.log))
+        self.assertEqual(self.actions, list(self.log))
+        self.assertEqual(self.actions[1], self.log.action(1))
+
+    def test_interactions(self):
+        # Interactions should be kept whole, so the onlookers set once they're executed are kept
+        self.actions[2].onlookers = [1, 3, 4]
+        self.assertIs(self.actions[2], self.log.action(2))
+        self.assertEqual([1, 3, 4], list(self.log.interactions())[0].onlookers)
+        self.assertEqual([self.actions[2], self.actions[5]], list(self.log.interactions()))
+
+    def test_counts_brought_up_to_date(self):
+        # The rates should include actions observed after the rates were last asked for
+        observer = ActionObserver(0)
+        observer.add_generation(2)
+        for player in [1, 3, 4]:
+            observer.add_player(2, player)
+        player_state = MockPlayerState(2, 1, [observer])
+        for action in self.actions[:3]:
+            player_state.new_action = action
+            observer.update(player_state)
+        self.assertEqual(100, observer.cooperation_rate)
+        self.assertEqual({2: {1: 100, 3: None, 4: None}}, observer.cooperation_rate_by_generation_and_player)
+        for action in self.actions[3:]:
+            player_state.new_action = action
+            observer.update(player_state)
+        self.assertEqual(50, observer.cooperation_rate)
+        self.assertEqual({2: {1: 100, 3: None, 4: 0}}, observer.cooperation_rate_by_generation_and_player)
+        self.assertEqual({2: 50}, observer.positivity_of_gossip_percentage_by_generation)
+        self.assertEqual({2: 50}, observer.social_activeness_by_generation)
+
+
 class PlayerObserverTests(unittest.TestCase):
     """Test the PlayerObserver class"""
 
@@ -0,0 +1,58 @@
+"""observer_memory_benchmark.py: A script to measure the memory the action observer takes to observe a long game, and
+the memory taken by the views of the actions built from its action log"""
+
+__author__ = "James King"
+
+import argparse
+import tracemalloc
+from .action_logic import GossipAction, GossipContent, IdleAction, InteractionAction, InteractionContent
+from .observation_logic import ActionObserver
+from .player_logic import PlayerState
+
+
+def run_observer_benchmark(players: int, timepoints: int):
+    """
+    Observe a generation's actions and print the memory the observer takes for each action it observed
+    :param players: The number of players in the generation
+    :type players: int
+    :param timepoints: The number of timepoints each player acts at
+    :type timepoints: int
+    """
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    observer = ActionObserver(0)
+    observer.add_generation(0)
+    for player in range(players):
+        observer.add_player(0, player)
+    player_state = PlayerState(0, 0, [observer])
+    for timepoint in range(timepoints):
+        for player in range(players):
+            if player == timepoint % players:
+                action = InteractionAction(timepoint, player, 0, "I cooperate with those of good standing",
+                                           (player + 1) % players, InteractionContent.COOPERATE,
+                                           [(player + i) % players for i in range(6)])
+            elif player % 3 == 0:
+                action = GossipAction(timepoint, player, 0, "I spread the negative views I hold", (player + 2) % players,
+                                      (player + 1) % players, GossipContent.NEGATIVE)
+            else:
+                action = IdleAction(timepoint, player, 0, "I am lazy")
+            player_state.new_action = action
+            observer.update(player_state)
+    observed, _ = tracemalloc.get_traced_memory()
+    print("{} actions observed: {:.1f} bytes an action".format(players * timepoints,
+                                                               (observed - start) / (players * timepoints)))
+    views = observer.actions_by_generation_and_player
+    with_views, _ = tracemalloc.get_traced_memory()
+    print("Actions by generation and player built: {:.1f} bytes an action".format(
+        (with_views - observed) / (players * timepoints)))
+    print("Cooperation rate: {}, social activeness: {}".format(observer.cooperation_rate, observer.social_activeness))
+    del views
+    tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the memory the action observer takes to observe a long game")
+    parser.add_argument('--players', type=int, default=50, help="The number of players in the generation")
+    parser.add_argument('--timepoints', type=int, default=2000, help="The number of timepoints in the generation")
+    arguments = parser.parse_args()
+    run_observer_benchmark(arguments.players, arguments.timepoints)
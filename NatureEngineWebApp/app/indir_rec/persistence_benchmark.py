@@ -0,0 +1,89 @@
+"""persistence_benchmark.py: A script to measure how many rows a second the results of a reputation game are stored at,
+one row at a time and in bulk"""
+
+__author__ = "James King"
+
+import argparse
+import time
+from typing import Callable
+from flask import Flask
+from app import db
+from ..models import ReputationAction, ReputationActionOnlookers, ReputationCommunity, ReputationGeneration, \
+    ReputationPlayer
+from .array_engine_logic import ArrayReputationGame
+from .database_test_case import create_tables, commit_results_game_to_database_per_row
+from .facade_logic import ReputationGame, Results
+from .local_agents_logic import STRATEGIES
+from .persistence_logic import commit_results_game_to_database
+
+
+def _rows() -> int:
+    return sum(model.query.count() for model in [ReputationGeneration, ReputationPlayer, ReputationAction,
+                                                 ReputationActionOnlookers])
+
+
+def _measure(commit: Callable, game: ReputationGame, results: Results) -> float:
+    """
+    Store the results of a game in an empty database and get the number of rows stored a second
+    :param commit: The function to store the results with
+    :type commit: Callable
+    :param game: The game that was run
+    :type game: ReputationGame
+    :param results: The results of the game
+    :type results: Results
+    :return: The number of rows stored a second
+    :rtype: float
+    """
+    db.drop_all()
+    create_tables()
+    community = ReputationCommunity(simulated=False)
+    db.session.add(community)
+    db.session.commit()
+    start = time.perf_counter()
+    commit(game, results, community.id, None, None)
+    elapsed = time.perf_counter() - start
+    rows = _rows()
+    print("{}: {} rows in {:.2f}s, {:.0f} rows/sec".format(commit.__name__, rows, elapsed, rows / elapsed))
+    return rows / elapsed
+
+
+def run_benchmark(database_url: str, players: int, num_of_onlookers: int, num_of_generations: int,
+                  length_of_generations: int):
+    """
+    Run a game with the array engine and store its results both ways, printing the rows a second of each
+    :param database_url: The database to store the results in, whose reputation tables are dropped
+    :type database_url: str
+    :param players: The number of players in each generation
+    :type players: int
+    :param num_of_onlookers: The number of onlookers for each interaction
+    :type num_of_onlookers: int
+    :param num_of_generations: The number of generations to run
+    :type num_of_generations: int
+    :param length_of_generations: The number of timepoints in each generation
+    :type length_of_generations: int
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        strategies = [dict(strategy, count=players // len(STRATEGIES)) for strategy in STRATEGIES]
+        strategies[0]['count'] += players % len(STRATEGIES)
+        game = ArrayReputationGame(strategies, num_of_onlookers, num_of_generations, length_of_generations, seed=0)
+        results = game.run()
+        before = _measure(commit_results_game_to_database_per_row, game, results)
+        after = _measure(commit_results_game_to_database, game, results)
+        print("Speed up: {:.1f}x".format(after / before))
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the rows a second reputation game results are stored at")
+    parser.add_argument('--database', default='sqlite://', help="The database url to store the results in")
+    parser.add_argument('--players', type=int, default=400, help="The number of players in each generation")
+    parser.add_argument('--onlookers', type=int, default=10, help="The number of onlookers for each interaction")
+    parser.add_argument('--generations', type=int, default=3, help="The number of generations")
+    parser.add_argument('--length', type=int, default=30, help="The number of timepoints in each generation")
+    arguments = parser.parse_args()
+    run_benchmark(arguments.database, arguments.players, arguments.onlookers, arguments.generations,
+                  arguments.length)
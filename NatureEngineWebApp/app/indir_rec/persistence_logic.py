@@ -0,0 +1,337 @@
+"""persistence_logic.py: Stores the results of a reputation game in the database, inserting the rows of each generation
+in bulk rather than one at a time"""
+
+__author__ = "James King"
+
+import csv
+import io
+import json
+from collections import Counter
+from enum import Enum
+from typing import Dict, List, Tuple
+from sqlalchemy import Table, func, text
+from sqlalchemy.exc import IntegrityError
+from app import db
+from ..models import ReputationAction, ReputationCommunity, ReputationGeneration, ReputationPlayer, ReputationStrategy,\
+    ReputationActionOnlookers, Experiment
+from .facade_logic import ReputationGame, Results
+from .action_logic import Action, ActionType, InteractionAction, GossipAction
+from .strategy_logic import Strategy
+from .historical_logic import record_historical_aggregates
+from .result_cache_logic import config_hash
+
+# The number of rows to send to the database in each executemany
+BATCH_SIZE = 10000
+# The number of times to try inserting a generation whose reserved keys another writer took first
+GENERATION_ATTEMPTS = 5
+
+
+class StrategyRegistry:
+    """Resolves strategies to their ids in the database by their fingerprints, remembering each id for the life of
+    the process, so a strategy costs one query however many games (or jobs of the same worker) it is part of"""
+
+    def __init__(self):
+        self._ids: Dict[Tuple[str, Strategy], int] = {}
+
+    def clear(self):
+        """Forget the ids of all the strategies resolved so far"""
+        self._ids.clear()
+
+    def resolve(self, strategy: Strategy) -> int:
+        """
+        Get the id of a strategy in the database, adding the strategy if the database doesn't have it yet (if another
+        worker adds it first the unique fingerprint stops a second copy and the other worker's is used)
+        :param strategy: The strategy to get the id of
+        :type strategy: Strategy
+        :return: The id of the strategy in the database
+        :rtype: int
+        """
+        key = (str(db.engine.url), strategy)
+        if key not in self._ids:
+            fingerprint = strategy.fingerprint
+            record = ReputationStrategy.query.filter_by(fingerprint=fingerprint).first()
+            if record is None:
+                try:
+                    with db.session.begin_nested():
+                        # Having to use a string representation as sqlite doesn't support arrays
+                        record = ReputationStrategy(donor_strategy=strategy.donor_strategy,
+                                                    non_donor_strategy=strategy.non_donor_strategy,
+                                                    trust_model=strategy.trust_model,
+                                                    options=json.dumps(strategy.options), fingerprint=fingerprint)
+                        db.session.add(record)
+                except IntegrityError:
+                    record = ReputationStrategy.query.filter_by(fingerprint=fingerprint).first()
+            self._ids[key] = record.id
+        return self._ids[key]
+
+
+# The registry shared by every game stored by this process
+strategy_registry = StrategyRegistry()
+
+
+def commit_results_game_to_database(game: ReputationGame, game_results: Results, database_community_id, user_id,
+                                    label, batch_size: int = BATCH_SIZE):
+    """
+    Store the results of a reputation game in the database, with the keys of each generation's rows assigned up front
+    so the players, actions and onlookers of a generation can each be inserted in batches, in one transaction per
+    generation (through COPY when the database is PostgreSQL)
+    :param game: The game that was run
+    :type game: ReputationGame
+    :param game_results: The results of the game
+    :type game_results: Results
+    :param database_community_id: The id of the community in the database to store the results of
+    :type database_community_id: int
+    :param user_id: The id of the user to record an experiment for, if any
+    :type user_id: int
+    :param label: The label of the experiment to record, if any
+    :type label: str
+    :param batch_size: The number of rows to send to the database at once (defaults to BATCH_SIZE)
+    :type batch_size: int
+    """
+    community = _commit_community(game, game_results, database_community_id, user_id, label)
+    _clear_stored_generations(community.id)
+    if not game_results.corrupted_observations:
+        strategy_ids = _strategy_ids(game_results)
+        generation_stats, player_stats = _statistics(game_results)
+        actions_by_generation_and_player = game_results.actions_by_generation_and_player
+        id_to_strat_map = game_results.id_to_strategy_map
+        generation_ids = {}
+        strategy_counts = {}
+        for generation in game_results.generations:
+            for attempt in range(GENERATION_ATTEMPTS):
+                try:
+                    generation_ids[generation] = _insert_generation(
+                        community.id, generation, game_results.players[generation],
+                        actions_by_generation_and_player[generation], id_to_strat_map[generation],
+                        generation_stats[generation], player_stats[generation], strategy_ids, batch_size)
+                    db.session.commit()
+                    break
+                except IntegrityError:
+                    # Another writer took some of the keys reserved, so reserve new ones and insert the generation
+                    # again, the generations already committed are kept
+                    db.session.rollback()
+                    if attempt == GENERATION_ATTEMPTS - 1:
+                        raise
+            strategy_counts[generation] = Counter(strategy_ids[id_to_strat_map[generation][player]]
+                                                  for player in game_results.players[generation])
+        record_historical_aggregates(community, generation_stats, generation_ids, strategy_counts)
+    community.simulated = True
+    db.session.commit()
+
+
+def _commit_community(game: ReputationGame, game_results: Results, database_community_id, user_id,
+                      label) -> ReputationCommunity:
+    """
+    Record the experiment of a game, if it has a user and label, and update the community with the game's parameters
+    and statistics, or mark it as corrupted
+    :return: The community in the database
+    :rtype: ReputationCommunity
+    """
+    community: ReputationCommunity = ReputationCommunity.query.filter_by(id=database_community_id).first()
+    # A retried job may have recorded the experiment already
+    if user_id is not None and label is not None and \
+            Experiment.query.filter_by(community_id=database_community_id, user_id=user_id, label=label).first() is None:
+        experiment: Experiment = Experiment(community_id=database_community_id, user_id=user_id, label=label)
+        db.session.add(experiment)
+        db.session.commit()
+    # The seed reproduces the game whether or not its observations were corrupted, and with the configuration lets a
+    # repeat of the game be answered from this community, if the agents' choices were seeded too
+    community.seed = game_results.seed
+    community.config_hash = config_hash(game.initial_strategies, game.num_of_onlookers, game.num_of_generations,
+                                        game.length_of_generations, game.mutation_chance, game_results.seed,
+                                        game.engine) if game.seeded_play else None
+    if game_results.corrupted_observations:
+        # If the results are corrupted don't add them to the database, just note that the observations were corrupted
+        community.set_corrupted()
+    else:
+        community.set_not_corrupted(number_of_onlookers=game.num_of_onlookers,
+                                    length_of_generations=game.length_of_generations,
+                                    mutation_chance=game.mutation_chance,
+                                    cooperation_rate=game_results.cooperation_rate,
+                                    social_activeness=game_results.social_activeness,
+                                    positivity_of_gossip=game_results.positivity_of_gossip_percentage,
+                                    fitness=game_results.community_fitness)
+    return community
+
+
+def _clear_stored_generations(community_id: int):
+    """
+    Delete the generations, and their players, actions and onlookers, stored for a community by an attempt that failed
+    part way, as each generation is committed as it is stored, so a retried job doesn't store them twice
+    :param community_id: The id of the community in the database
+    :type community_id: int
+    """
+    for model in [ReputationActionOnlookers, ReputationAction, ReputationPlayer, ReputationGeneration]:
+        db.session.execute(model.__table__.delete().where(model.__table__.c.community_id == community_id))
+    db.session.commit()
+
+
+def _statistics(game_results: Results) -> Tuple[Dict[int, Dict], Dict[int, Dict[int, Dict]]]:
+    """
+    Get all the statistics of the generations and of their players in one go as it is more efficient
+    :return: The columns of the statistics of each generation, and of each player by generation
+    :rtype: Tuple[Dict[int, Dict], Dict[int, Dict[int, Dict]]]
+    """
+    actions_by_generation = game_results.actions_by_generation
+    cooperation_by_gen = game_results.cooperation_rate_by_generation
+    social_activeness_by_gen = game_results.social_activeness_by_generation
+    positivity_of_gossip_by_gen = game_results.positivity_of_gossip_percentage_by_generation
+    fitness_by_gen = game_results.fitness_by_generation
+    cooperation_by_gen_and_player = game_results.cooperation_rate_by_generation_and_player
+    social_activeness_by_gen_and_player = game_results.social_activeness_by_generation_and_player
+    positivity_of_gossip_by_gen_and_player = game_results.positivity_of_gossip_percentage_by_generation_and_player
+    fitness_by_gen_and_player = game_results.fitness_by_generation_and_player
+    generation_stats = {}
+    player_stats = {}
+    for generation in game_results.generations:
+        generation_stats[generation] = {'start_point': min(actions_by_generation[generation]),
+                                        'end_point': max(actions_by_generation[generation]),
+                                        'cooperation_rate': cooperation_by_gen[generation],
+                                        'social_activeness': social_activeness_by_gen[generation],
+                                        'positivity_of_gossip': positivity_of_gossip_by_gen[generation],
+                                        'fitness': fitness_by_gen[generation]}
+        player_stats[generation] = {
+            player: {'cooperation_rate': cooperation_by_gen_and_player[generation][player],
+                     'social_activeness': social_activeness_by_gen_and_player[generation][player],
+                     'positivity_of_gossip': positivity_of_gossip_by_gen_and_player[generation][player],
+                     'fitness': fitness_by_gen_and_player[generation][player]}
+            for player in game_results.players[generation]}
+    return generation_stats, player_stats
+
+
+def _action_row(action, generation_id: int, community_id: int, player_id: int, timepoint: int,
+                db_players: Dict[int, int]) -> Dict:
+    """
+    Build the row of an action, with every column of the action table so that rows of all types can be inserted in
+    the same batch
+    :return: The row of the action, without its key
+    :rtype: Dict
+    """
+    row = {'generation_id': generation_id, 'community_id': community_id, 'player_id': player_id,
+           'timepoint': timepoint, 'type': action.type, 'gossiper': None, 'about': None, 'recipient': None,
+           'gossip': None, 'donor': None, 'action': None, 'reason': action.reason}
+    if action.type is ActionType.INTERACTION:
+        interaction: InteractionAction = action
+        row.update(donor=db_players[interaction.donor], recipient=db_players[interaction.recipient],
+                   action=interaction.action)
+    elif action.type is ActionType.GOSSIP:
+        gossip: GossipAction = action
+        row.update(gossiper=db_players[gossip.gossiper], about=db_players[gossip.about],
+                   recipient=db_players[gossip.recipient], gossip=gossip.gossip)
+    return row
+
+
+def _strategy_ids(game_results: Results) -> Dict[Strategy, int]:
+    """
+    Get the database ids of all the strategies of the game's players from the strategy registry, adding any the
+    database doesn't have yet
+    :return: The id of each strategy
+    :rtype: Dict[Strategy, int]
+    """
+    strategies = set()
+    for generation in game_results.generations:
+        strategies.update(game_results.id_to_strategy_map[generation].values())
+    strategy_ids = {strategy: strategy_registry.resolve(strategy) for strategy in strategies}
+    db.session.commit()
+    return strategy_ids
+
+
+def _insert_generation(community_id: int, generation: int, players: List[int],
+                       actions_by_player: Dict[int, Dict[int, Action]], id_to_strat_map: Dict[int, Strategy],
+                       generation_stats: Dict, player_stats: Dict[int, Dict],
+                       strategy_ids: Dict[Strategy, int], batch_size: int) -> int:
+    """
+    Insert a generation with its players, actions and onlookers, assigning the keys of the generation, players and
+    actions before inserting so that the rows referring to them can be built without a round trip each
+    :return: The database id of the generation
+    :rtype: int
+    """
+    generation_id = _reserve_ids(ReputationGeneration.__table__, 1)[0]
+    _insert(ReputationGeneration.__table__, [dict(id=generation_id, community_id=community_id,
+                                                  generation_id=generation, **generation_stats)], batch_size)
+    db_players = dict(zip(players, _reserve_ids(ReputationPlayer.__table__, len(players))))
+    player_rows = []
+    for player in players:
+        player_rows.append(dict(id=db_players[player], generation_id=generation_id, community_id=community_id,
+                                player_id=player, strategy=strategy_ids[id_to_strat_map[player]],
+                                **player_stats[player]))
+    _insert(ReputationPlayer.__table__, player_rows, batch_size)
+    action_ids = iter(_reserve_ids(ReputationAction.__table__,
+                                   sum(len(actions_by_player[player]) for player in players)))
+    action_rows = []
+    onlooker_rows = []
+    for player in players:
+        for timepoint, action in actions_by_player[player].items():
+            action_id = next(action_ids)
+            action_rows.append(dict(_action_row(action, generation_id, community_id, db_players[player], timepoint,
+                                                db_players), id=action_id))
+            if action.type is ActionType.INTERACTION:
+                onlooker_rows.extend({'community_id': community_id, 'generation_id': generation_id,
+                                      'actor_id': db_players[player], 'onlooker_id': db_players[onlooker],
+                                      'action_id': action_id} for onlooker in action.onlookers)
+    _insert(ReputationAction.__table__, action_rows, batch_size)
+    _insert(ReputationActionOnlookers.__table__, onlooker_rows, batch_size)
+    return generation_id
+
+
+def _is_postgresql() -> bool:
+    dialect = db.session.get_bind().dialect
+    return dialect.name == 'postgresql' and dialect.driver == 'psycopg2'
+
+
+def _reserve_ids(table: Table, count: int) -> List[int]:
+    """
+    Reserve keys for rows about to be inserted into a table, from the table's sequence on PostgreSQL, otherwise the
+    keys after the largest in the table. Those aren't locked, so another writer taking them first is caught by the
+    primary key and the generation is inserted again with new keys.
+    :param table: The table to reserve keys in
+    :type table: Table
+    :param count: The number of keys to reserve
+    :type count: int
+    :return: The keys reserved
+    :rtype: List[int]
+    """
+    if count <= 0:
+        return []
+    if _is_postgresql():
+        rows = db.session.execute(text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                                       "FROM generate_series(1, :count)"), {'table': table.name, 'count': count})
+        return [row[0] for row in rows]
+    largest = db.session.query(func.max(table.c.id)).scalar() or 0
+    return list(range(largest + 1, largest + 1 + count))
+
+
+def _insert(table: Table, rows: List[Dict], batch_size: int):
+    """
+    Insert rows into a table in the current transaction, through COPY on PostgreSQL and otherwise with an executemany
+    for each batch of rows
+    :param table: The table to insert into
+    :type table: Table
+    :param rows: The rows to insert, all with the same columns
+    :type rows: List[Dict]
+    :param batch_size: The number of rows to send to the database at once
+    :type batch_size: int
+    """
+    if not rows:
+        return
+    if _is_postgresql():
+        _copy(table, rows)
+        return
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[start:start + batch_size])
+
+
+def _copy(table: Table, rows: List[Dict]):
+    """
+    Insert rows into a PostgreSQL table with COPY, writing enums by name as the Enum columns store them
+    """
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['\\N' if row[column] is None else
+                         row[column].name if isinstance(row[column], Enum) else row[column] for column in columns])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')".format(table.name, ', '.join(columns)),
+                       buffer)
@@ -0,0 +1,167 @@
+"""persistence_tests.py: Tests for the functionality of the persistence_logic.py module, checking the bulk path stores
+the same rows as storing them one at a time"""
+
+__author__ = "James King"
+
+import json
+import unittest
+from unittest.mock import Mock, patch
+from typing import Dict, List
+from sqlalchemy.exc import IntegrityError
+from app import db
+from ..models import ReputationAction, ReputationActionOnlookers, ReputationCommunity, ReputationGeneration, \
+    ReputationPlayer, ReputationStrategy
+from .database_test_case import DatabaseTestCase, commit_results_game_to_database_per_row
+from .facade_logic import ReputationGame
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from . import persistence_logic
+from .persistence_logic import commit_results_game_to_database, StrategyRegistry
+from .strategy_logic import Strategy
+
+
+class PersistenceTest(DatabaseTestCase):
+    """Test storing the results of a game with the persistence_logic module"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.game = ReputationGame([dict(strategy, count=1) for strategy in STRATEGIES[::8]], num_of_onlookers=3,
+                                  num_of_generations=3, length_of_generations=12, mutation_chance=0.2,
+                                  agents_client=LocalAgentsBackend(seed=6))
+        cls.results = cls.game.run()
+
+    def _store(self, commit, **kwargs) -> Dict[str, List]:
+        """Store the results of the game for a new community, returning the rows of each table with the strategies
+        of players in place of their keys"""
+        community, _ = self._store_game(self.game, self.results, commit, **kwargs)
+        strategies = {strategy.id: (strategy.donor_strategy, strategy.non_donor_strategy, strategy.trust_model,
+                                    strategy.options) for strategy in ReputationStrategy.query.all()}
+        rows = {}
+        for model in [ReputationGeneration, ReputationPlayer, ReputationAction, ReputationActionOnlookers]:
+            columns = [column.name for column in model.__table__.columns]
+            rows[model.__tablename__] = sorted(
+                [tuple(strategies[getattr(row, column)] if model is ReputationPlayer and column == 'strategy'
+                       else getattr(row, column) for column in columns) for row in model.query.all()],
+                key=lambda row: row[columns.index('id')])
+        self.assertTrue(ReputationCommunity.query.get(community.id).simulated)
+        return rows
+
+    def test_matches_per_row(self):
+        # The bulk path should store exactly the rows stored one at a time
+        per_row = self._store(commit_results_game_to_database_per_row)
+        self._reset_database()
+        bulk = self._store(commit_results_game_to_database)
+        for table in per_row:
+            with self.subTest(table=table):
+                self.assertEqual(per_row[table], bulk[table])
+        self.assertEqual(sum(len(self.results.players[generation]) for generation in self.results.generations),
+                         len(bulk['reputation_player']))
+        self.assertEqual(5 * 12 * 3, len(bulk['reputation_action_onlookers']))
+
+    def test_small_batches(self):
+        # Splitting the rows into batches shouldn't change what is stored
+        bulk = self._store(commit_results_game_to_database)
+        self._reset_database()
+        self.assertEqual(bulk, self._store(commit_results_game_to_database, batch_size=7))
+
+    def test_keys_taken_by_another_writer(self):
+        # A generation whose reserved keys another writer took first should be inserted again with new keys
+        first = self._store(commit_results_game_to_database)
+        reserve_ids = persistence_logic._reserve_ids
+        taken = []
+
+        def reserve_taken_once(table, count):
+            if table.name == 'reputation_action' and not taken:
+                taken.append(table)
+                return [1] * count
+            return reserve_ids(table, count)
+
+        with patch.object(persistence_logic, '_reserve_ids', side_effect=reserve_taken_once):
+            second = self._store(commit_results_game_to_database)
+        self.assertEqual([ReputationAction.__table__], taken)
+        for table in first:
+            with self.subTest(table=table):
+                self.assertEqual(2 * len(first[table]), len(second[table]))
+        self.assertEqual(len({row[0] for row in second['reputation_action']}), len(second['reputation_action']))
+        # Keys that keep being taken should fail the store rather than retry forever
+        with patch.object(persistence_logic, '_reserve_ids', side_effect=lambda table, count: [1] * count):
+            with self.assertRaises(IntegrityError):
+                self._store(commit_results_game_to_database)
+
+    def test_second_game(self):
+        # Storing another game should give it new keys and reuse the strategies already stored
+        first = self._store(commit_results_game_to_database)
+        strategies = ReputationStrategy.query.count()
+        second = self._store(commit_results_game_to_database)
+        self.assertEqual(strategies, ReputationStrategy.query.count())
+        self.assertEqual(2 * len(first['reputation_action']), len(second['reputation_action']))
+        self.assertEqual(len({row[0] for row in second['reputation_action']}), len(second['reputation_action']))
+        options = {json.dumps(strategy['options']) for strategy in STRATEGIES}
+        self.assertTrue(all(strategy.options in options for strategy in ReputationStrategy.query.all()))
+
+    def test_retry_after_partial_store(self):
+        # Storing again after an attempt failed part way should replace the generations already stored, not repeat them
+        stored = self._store(commit_results_game_to_database)
+        self._reset_database()
+        community = ReputationCommunity(simulated=False)
+        db.session.add(community)
+        db.session.commit()
+        with patch('app.indir_rec.persistence_logic.record_historical_aggregates', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                commit_results_game_to_database(self.game, self.results, community.id, None, None)
+        db.session.rollback()
+        self.assertEqual(len(stored['reputation_action']), ReputationAction.query.count())
+        self.assertFalse(ReputationCommunity.query.get(community.id).simulated)
+        commit_results_game_to_database(self.game, self.results, community.id, None, None)
+        self.assertTrue(ReputationCommunity.query.get(community.id).simulated)
+        for model in [ReputationGeneration, ReputationPlayer, ReputationAction, ReputationActionOnlookers]:
+            with self.subTest(table=model.__tablename__):
+                self.assertEqual(len(stored[model.__tablename__]), model.query.count())
+
+    def test_strategy_registry(self):
+        # Each strategy should be looked up once, added once and given the same id however it was built
+        registry = StrategyRegistry()
+        strategy = Strategy("Standing Discriminator", "Spread Accurate Positive", "Void", [1])
+        self.assertEqual(0, ReputationStrategy.query.count())
+        strategy_id = registry.resolve(strategy)
+        self.assertEqual(1, ReputationStrategy.query.count())
+        self.assertEqual(strategy.fingerprint, ReputationStrategy.query.get(strategy_id).fingerprint)
+        with patch.object(ReputationStrategy, 'query') as query:
+            self.assertEqual(strategy_id, registry.resolve(Strategy("Standing Discriminator",
+                                                                    "Spread Accurate Positive", "Void", [1])))
+        query.filter_by.assert_not_called()
+        # Another process's registry should find the strategy already stored
+        self.assertEqual(strategy_id, StrategyRegistry().resolve(strategy))
+        self.assertNotEqual(strategy_id, registry.resolve(Strategy("Standing Discriminator",
+                                                                   "Spread Accurate Positive", "Void", [2])))
+        self.assertEqual(2, ReputationStrategy.query.count())
+
+    def test_strategy_added_by_another_worker(self):
+        # A strategy another worker stores between the lookup and the insert should be used rather than copied
+        strategy = Strategy("Cooperator", "Lazy", "Void", [])
+        original_query = ReputationStrategy.query
+        db.session.add(ReputationStrategy(donor_strategy="Cooperator", non_donor_strategy="Lazy",
+                                          trust_model="Void", options="[]"))
+        db.session.commit()
+        with patch.object(ReputationStrategy, 'query') as query:
+            query.filter_by.side_effect = [Mock(first=Mock(return_value=None)),
+                                           original_query.filter_by(fingerprint=strategy.fingerprint)]
+            strategy_id = StrategyRegistry().resolve(strategy)
+        self.assertEqual(ReputationStrategy.query.filter_by(fingerprint=strategy.fingerprint).first().id, strategy_id)
+        self.assertEqual(1, ReputationStrategy.query.count())
+
+    def test_strategy_queries(self):
+        # Storing a game should cost one query for each distinct strategy, and none for a second game
+        strategies = set()
+        for generation in self.results.generations:
+            strategies.update(self.results.id_to_strategy_map[generation].values())
+        with patch.object(ReputationStrategy, 'query', wraps=ReputationStrategy.query) as query:
+            self._store(commit_results_game_to_database)
+            lookups = [call for call in query.filter_by.call_args_list if 'fingerprint' in call[1]]
+            self.assertEqual(len(strategies), len(lookups))
+            self._store(commit_results_game_to_database)
+            lookups = [call for call in query.filter_by.call_args_list if 'fingerprint' in call[1]]
+            self.assertEqual(len(strategies), len(lookups))
+
+
+if __name__ == '__main__':
+    unittest.main()
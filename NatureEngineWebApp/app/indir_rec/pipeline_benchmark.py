@@ -0,0 +1,57 @@
+"""pipeline_benchmark.py: A script to measure the time each stage of a generation's timepoints takes against the mock
+agents service, with and without sending the next timepoint's donor-recipient pair while the decisions are in flight"""
+
+__author__ = "James King"
+
+import argparse
+import asyncio
+from .agents_client_logic import AgentsClient, AsyncAgentsClient
+from .generation_logic import Generation
+from .mock_agents_service import MockAgentsService
+from .seeding_logic import RandomStreams
+from .strategy_logic import Strategy
+
+
+def run_pipeline_benchmark(players: int, length_of_generations: int, latency: float):
+    """
+    Simulate a generation asynchronously in each step mode, pipelined and not, printing the time spent in each stage
+    :param players: The number of players in the generation
+    :type players: int
+    :param length_of_generations: The number of timepoints in the generation
+    :type length_of_generations: int
+    :param latency: The number of seconds the mock agents service takes to handle each request
+    :type latency: float
+    """
+    service = MockAgentsService(latency=latency)
+    service.start()
+    client = AgentsClient(service.url)
+    strategies = {Strategy("Standing Discriminator", "Lazy", "Trusting", []): players}
+    try:
+        for batched_steps in [False, True]:
+            for pipelined in [False, True]:
+                community = client.create_community()['id']
+                generation = Generation(strategies, 0, community, 0, length_of_generations, 5, [],
+                                        batched_steps=batched_steps, agents_client=client, streams=RandomStreams(0),
+                                        local_decisions=False, pipelined=pipelined)
+
+                async def simulate():
+                    async with AsyncAgentsClient(service.url) as async_client:
+                        await generation.simulate_async(async_client)
+
+                asyncio.get_event_loop().run_until_complete(simulate())
+                print("{}, {}: {}".format("batched" if batched_steps else "per player",
+                                          "pipelined" if pipelined else "sequential", generation.timings))
+    finally:
+        client.close()
+        service.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the time each stage of a generation's timepoints takes, with "
+                                                 "and without pipelining")
+    parser.add_argument('--players', type=int, default=10, help="The number of players in the generation")
+    parser.add_argument('--length', type=int, default=50, help="The number of timepoints in the generation")
+    parser.add_argument('--latency', type=float, default=0.01, help="The number of seconds the mock agents service "
+                                                                    "takes to handle each request")
+    arguments = parser.parse_args()
+    run_pipeline_benchmark(arguments.players, arguments.length, arguments.latency)
@@ -1,8 +1,7 @@
 
 from typing import Dict, List, NoReturn
-import requests
 from .action_logic import Action, InteractionAction, GossipAction, IdleAction, GossipContent, InteractionContent
-from .indir_rec_config import Config
+from .agents_client_logic import AgentsBackend, AgentsClient, AsyncAgentsClient, AgentsServiceException
 from .strategy_logic import Strategy
 
 
@@ -138,7 +137,8 @@ class Player:
     """The body of a player in the environment"""
 
     def __init__(self, player_id: int, strategy: Strategy, community_id: int, generation_id: int,
-                 observers: List = None):
+                 observers: List = None, agents_client: AgentsBackend = None, created: bool = False,
+                 local_decisions: bool = False):
         """
         Create a player in the environment and their mind in the agent mind service.
         :param player_id: The player's id
@@ -149,6 +149,15 @@ class Player:
         :type community_id: int
         :param generation_id: The id of the generation this player belongs to
         :type generation_id: int
+        :param agents_client: The agents service client, or other backend running the agent's mind (defaults to a new
+         client)
+        :type agents_client: AgentsBackend
+        :param created: Whether the player's mind has already been created in the agents service, such as along with
+         the rest of its generation (defaults to False, creating it)
+        :type created: bool
+        :param local_decisions: Whether to decide in the environment rather than the agents service if the player's
+         strategy is stateless, and not send the player percepts if its strategy is percept blind (defaults to False)
+        :type local_decisions: bool
         """
         # Set up relevant player data
         self._player_id: int = player_id
@@ -157,19 +166,23 @@ class Player:
         self._community_id: int = community_id
         self._generation_id: int = generation_id
         self._percepts: Dict = {}
+        self._agents_client: AgentsBackend = agents_client if agents_client is not None else AgentsClient()
+        self._decides_locally: bool = local_decisions and strategy.stateless
+        self._perceives: bool = not (local_decisions and strategy.percept_blind)
         self.player_state = PlayerState(generation_id, player_id, observers)
+        if created:
+            return
         # Attempt to create the player in the agents service, if failure raise exception
         try:
             creation_payload: Dict = {"donor_strategy": strategy.donor_strategy,
                                       "non_donor_strategy": strategy.non_donor_strategy,
                                       "trust_model": strategy.trust_model, "options": strategy.options,
                                       "community": community_id, "generation": generation_id, "player": player_id}
-            creation_response = requests.request("POST", Config.AGENTS_URL + 'agent',
-                                                 json=creation_payload)
-            if creation_response.status_code != 200:
-                raise PlayerCreationException("bad status code " + str(creation_response.status_code))
-            if not creation_response.json()['success']:
-                raise PlayerCreationException(creation_response.json()['message'])
+            creation_response = self._agents_client.create_agent(creation_payload)
+            if not creation_response['success']:
+                raise PlayerCreationException(creation_response['message'])
+        except AgentsServiceException as e:
+            raise PlayerCreationException(str(e))
         except KeyError:
             raise PlayerCreationException("Incorrect strategy keys")
 
@@ -213,26 +226,93 @@ class Player:
         """
         return self._strategy
 
-    def decide(self, timepoint: int) -> Action:
+    @property
+    def decides_locally(self) -> bool:
+        """
+        Whether the player decides in the environment, given the interaction of the timepoint, rather than asking the
+        agents service
+        :return: Whether the player decides locally
+        :rtype: bool
+        """
+        return self._decides_locally
+
+    def local_decision(self, interaction: Dict) -> Dict:
+        """
+        Decide as the agents service would for a player with a stateless strategy, from whether it is the donor alone
+        :param interaction: The interaction percept of the donor-recipient pair of the timepoint
+        :type interaction: Dict
+        :return: The representation of the action, as the agents service would reply with
+        :rtype: Dict
+        """
+        if interaction['donor'] != self._player_id:
+            return {'type': 'idle', 'reason': "I only act when I have to"}
+        if self._strategy.donor_strategy == "Cooperator":
+            return {'type': 'action', 'value': 'cooperate', 'recipient': interaction['recipient'],
+                    'reason': "I naively cooperate with everyone out of pure altruism"}
+        return {'type': 'action', 'value': 'defect', 'recipient': interaction['recipient'],
+                'reason': "To protect my interests, and not incur cooperation costs"}
+
+    def decide(self, timepoint: int, interaction: Dict = None) -> Action:
         """
         Get the agents decision on an action to commit to in a certain turn.
         :param timepoint: The timepoint at which the agent is deciding
         :type timepoint: int
+        :param interaction: The interaction percept of the timepoint, letting a player that decides locally do so
+         without asking the agents service (defaults to None, asking it)
+        :type interaction: Dict
         :return: A dictionary representation of the data of the action the player has decided on
         :rtype: Dict
         """
-        # Request a decision from the agents mind
-        action_payload: Dict = {"timepoint": timepoint, "community": self._community_id,
-                                "generation": self._generation_id, "player": self._player_id}
-        action_response = requests.request("GET", Config.AGENTS_URL + 'action',
-                                           params=action_payload)
-        # Check if decision failed, throw exception if so
-        if action_response.status_code != 200:
-            raise DecisionException("bad status code " + action_response.status_code)
-        if not action_response.json()['success']:
-            raise DecisionException(action_response.json()['message'])
+        if self._decides_locally and interaction is not None:
+            return self.commit_to_decision(timepoint, self.local_decision(interaction))
+        # Request a decision from the agents mind, throw exception if it failed
+        try:
+            action_response = self._agents_client.get_action(self._community_id, self._generation_id,
+                                                             self._player_id, timepoint)
+        except AgentsServiceException as e:
+            raise DecisionException(str(e))
+        if not action_response['success']:
+            raise DecisionException(action_response['message'])
+        return self.commit_to_decision(timepoint, action_response['action'])
+
+    async def request_decision_async(self, timepoint: int, async_client: AsyncAgentsClient,
+                                     interaction: Dict = None) -> Dict:
+        """
+        Asynchronously request the agents decision on an action to commit to in a certain turn, without committing the
+        player to it so decisions requested concurrently can be committed to in a set order
+        :param timepoint: The timepoint at which the agent is deciding
+        :type timepoint: int
+        :param async_client: The asynchronous client to communicate with the agents service through
+        :type async_client: AsyncAgentsClient
+        :param interaction: The interaction percept of the timepoint, letting a player that decides locally do so
+         without asking the agents service (defaults to None, asking it)
+        :type interaction: Dict
+        :return: The representation of the action the agents service replied with
+        :rtype: Dict
+        """
+        if self._decides_locally and interaction is not None:
+            return self.local_decision(interaction)
+        try:
+            action_response = await async_client.get_action(self._community_id, self._generation_id,
+                                                            self._player_id, timepoint)
+        except AgentsServiceException as e:
+            raise DecisionException(str(e))
+        if not action_response['success']:
+            raise DecisionException(action_response['message'])
+        return action_response['action']
+
+    def commit_to_decision(self, timepoint: int, action_representation: Dict) -> Action:
+        """
+        Build the action from the representation of the decision given by the agents mind and commit the player to it,
+        notifying the player state observers of the new action
+        :param timepoint: The timepoint at which the agent decided
+        :type timepoint: int
+        :param action_representation: The representation of the action the agents service replied with
+        :type action_representation: Dict
+        :return: The action the player has committed to
+        :rtype: Action
+        """
         # Create a representation of the action for the environment to use
-        action_representation = action_response.json()['action']
         if action_representation['type'] == "gossip":
             gossip: GossipContent = GossipContent.POSITIVE if action_representation['value'] == 'positive'\
                 else GossipContent.NEGATIVE
@@ -264,6 +344,20 @@ class Player:
         else:
             self._percepts[perception['timepoint']].append(perception)
 
+    def percepts_to_perceive(self, timepoint: int) -> List[Dict]:
+        """
+        Get the percepts set for the previous timepoint from this one, that the player is yet to perceive
+        :param timepoint: The timepoint we are currently at so is one in front of the percepts to perceive
+        :type timepoint: int
+        :return: The percepts for the previous timepoint, empty if there are none or the player doesn't need them
+        :rtype: List[Dict]
+        """
+        if not self._perceives:
+            return []
+        if timepoint > 0 and timepoint-1 in self._percepts:
+            return self._percepts[timepoint-1]
+        return []
+
     def perceive(self, timepoint: int) -> NoReturn:
         """
         Tell the agent to perceive the percepts set for the previous timepoint from this one
@@ -271,14 +365,32 @@ class Player:
         :type timepoint: int
         :return: NoReturn
         """
-        if timepoint > 0 and timepoint-1 in self._percepts:
+        percepts = self.percepts_to_perceive(timepoint)
+        if len(percepts) > 0:
             # Send all percepts for the relevant timepoint to the agents mind
-            percept_dict = {'percepts': self._percepts[timepoint-1]}
-            percept_response = requests.request("POST", Config.AGENTS_URL + 'percept/action/group',
-                                                json=percept_dict)
-            if percept_response.status_code != 200:
-                raise PerceptionException("Failed to send percept bad status code: " +
-                                          str(percept_response.status_code))
-            for success_response in percept_response.json()['success']:
-                if not success_response['success']:
+            try:
+                percept_response = self._agents_client.send_percepts(percepts)
+            except AgentsServiceException as e:
+                raise PerceptionException("Failed to send percept " + str(e))
+            for success_response in percept_response['success']:
+                if success_response['success'] is not True:
+                    raise PerceptionException(success_response['success'])
+
+    async def perceive_async(self, timepoint: int, async_client: AsyncAgentsClient) -> NoReturn:
+        """
+        Asynchronously tell the agent to perceive the percepts set for the previous timepoint from this one
+        :param timepoint: The timepoint we are currently at so is one in front of the percepts to perceive
+        :type timepoint: int
+        :param async_client: The asynchronous client to communicate with the agents service through
+        :type async_client: AsyncAgentsClient
+        :return: NoReturn
+        """
+        percepts = self.percepts_to_perceive(timepoint)
+        if len(percepts) > 0:
+            try:
+                percept_response = await async_client.send_percepts(percepts)
+            except AgentsServiceException as e:
+                raise PerceptionException("Failed to send percept " + str(e))
+            for success_response in percept_response['success']:
+                if success_response['success'] is not True:
                     raise PerceptionException(success_response['success'])
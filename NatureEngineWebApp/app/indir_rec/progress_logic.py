@@ -0,0 +1,235 @@
+"""progress_logic.py: Publishes the progress of a running reputation game to a redis channel, and streams it to the
+browser as server-sent events, so the running page doesn't have to poll for when the game has finished"""
+
+__author__ = "James King"
+
+import json
+import time
+from typing import Callable, Dict, Iterator, List, NoReturn, Optional
+from redis import Redis, RedisError
+from .action_logic import ActionType, InteractionContent
+from .observation_logic import Observer
+from .player_logic import PlayerState
+
+PROGRESS_CHANNEL = "reputation_progress:{}"
+LATEST_PROGRESS_KEY = "reputation_progress_latest:{}"
+# How long the latest event of a game is kept for pages opened after it was published
+LATEST_PROGRESS_EXPIRY = 24*60*60
+
+
+class ProgressChannel:
+    """The redis pub/sub channel the progress events of a running community are published to, along with the latest
+    event so a page opened part way through a game starts from the current progress"""
+
+    def __init__(self, redis: Redis, community_id: int):
+        """
+        Set up the channel of a community
+        :param redis: The redis connection to publish and subscribe through
+        :type redis: Redis
+        :param community_id: The database id of the community whose progress is published
+        :type community_id: int
+        """
+        self._redis: Redis = redis
+        self._channel: str = PROGRESS_CHANNEL.format(community_id)
+        self._latest_key: str = LATEST_PROGRESS_KEY.format(community_id)
+
+    def publish(self, event: Dict) -> NoReturn:
+        """
+        Publish an event to the channel and keep it as the latest event
+        :param event: The event to publish
+        :type event: Dict
+        :return: NoReturn
+        """
+        encoded = json.dumps(event)
+        # A game carries on without reporting progress when redis can't be reached
+        try:
+            pipeline = self._redis.pipeline()
+            pipeline.set(self._latest_key, encoded, ex=LATEST_PROGRESS_EXPIRY)
+            pipeline.publish(self._channel, encoded)
+            pipeline.execute()
+        except RedisError:
+            pass
+
+    def latest(self) -> Optional[Dict]:
+        """
+        Get the latest event published to the channel
+        :return: The latest event, or None if there hasn't been one
+        :rtype: Optional[Dict]
+        """
+        try:
+            latest = self._redis.get(self._latest_key)
+        except RedisError:
+            return None
+        return json.loads(latest.decode('utf-8')) if latest is not None else None
+
+    def listen(self, heartbeat: float, lifetime: float = None,
+               clock: Callable[[], float] = time.monotonic) -> Iterator[Optional[Dict]]:
+        """
+        Listen for the events published to the channel, starting with the latest event published before listening
+        :param heartbeat: The longest time to wait for an event in seconds, before yielding None
+        :type heartbeat: float
+        :param lifetime: The number of seconds to listen for before stopping (defaults to listening until closed)
+        :type lifetime: float
+        :param clock: The clock to time the lifetime with (defaults to time.monotonic)
+        :type clock: Callable[[], float]
+        :return: The events as they are published, with None whenever no event comes within the heartbeat
+        :rtype: Iterator[Optional[Dict]]
+        """
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        # Subscribe before reading the latest event so no event is missed between the two
+        pubsub.subscribe(self._channel)
+        stop_at = clock() + lifetime if lifetime is not None else None
+        try:
+            latest = self.latest()
+            if latest is not None:
+                yield latest
+            while stop_at is None or clock() < stop_at:
+                timeout = heartbeat if stop_at is None else max(0.0, min(heartbeat, stop_at - clock()))
+                message = pubsub.get_message(timeout=timeout)
+                if message is not None and message['type'] == 'message':
+                    yield json.loads(message['data'].decode('utf-8'))
+                elif message is None:
+                    yield None
+        finally:
+            pubsub.close()
+
+
+class ProgressObserver(Observer):
+    """Observes the actions of a running community, publishing the progress through the game, the interim cooperation
+    rates and an estimate of the time left each time the game reaches a new timepoint"""
+
+    def __init__(self, community: int, channel: ProgressChannel, num_of_generations: int, length_of_generations: int,
+                 min_interval: float = 0.5, clock: Callable[[], float] = time.time):
+        """
+        Set up the observer to publish the progress of a community
+        :param community: The database id of the community to observe
+        :type community: int
+        :param channel: The channel to publish the progress to
+        :type channel: ProgressChannel
+        :param num_of_generations: The number of generations the community will simulate
+        :type num_of_generations: int
+        :param length_of_generations: The number of timepoints in each generation
+        :type length_of_generations: int
+        :param min_interval: The least time in seconds between events in the same generation (defaults to 0.5)
+        :type min_interval: float
+        :param clock: The clock to time the game with (defaults to time.time)
+        :type clock: Callable[[], float]
+        """
+        self._community: int = community
+        self._channel: ProgressChannel = channel
+        self._total_timepoints: int = num_of_generations*length_of_generations
+        self._length_of_generations: int = length_of_generations
+        self._min_interval: float = min_interval
+        self._clock: Callable[[], float] = clock
+        self._started: Optional[float] = None
+        self._last_published: Optional[float] = None
+        self._timepoints_done: int = 0
+        self._generations: List[int] = []
+        self._cooperation_count: int = 0
+        self._defection_count: int = 0
+        self._cooperation_count_by_generation: Dict[int, int] = {}
+        self._defection_count_by_generation: Dict[int, int] = {}
+
+    @property
+    def community(self) -> int:
+        """
+        Get the database id of the community this observer is publishing the progress of
+        :return: id of community observing
+        :rtype: int
+        """
+        return self._community
+
+    @property
+    def generations(self) -> List[int]:
+        """
+        Get the ids of the generations that have been started
+        :return: The generation ids
+        :rtype: List[int]
+        """
+        return self._generations
+
+    @property
+    def corrupted_observations(self) -> bool:
+        """
+        The progress isn't part of the results, so it never corrupts them
+        :return: False
+        :rtype: bool
+        """
+        return False
+
+    def add_generation(self, generation: int) -> NoReturn:
+        """
+        A new generation has started, publish the progress up to its first timepoint
+        :param generation: The id of the generation
+        :type generation: int
+        :return: NoReturn
+        """
+        if self._started is None:
+            self._started = self._clock()
+        self._generations.append(generation)
+        self._cooperation_count_by_generation[generation] = 0
+        self._defection_count_by_generation[generation] = 0
+        self._timepoints_done = max(self._timepoints_done, generation*self._length_of_generations)
+        self._publish(generation)
+
+    def add_player(self, generation: int, player: int) -> NoReturn:
+        """Players aren't part of the progress"""
+        pass
+
+    def update(self, player_state: PlayerState) -> NoReturn:
+        """
+        Count the cooperation or defection of a new action, publishing the progress once the game reaches a timepoint
+        it hasn't published yet (no more often than the minimum interval)
+        :param player_state: The state of the player containing the new action
+        :type player_state: PlayerState
+        :return: NoReturn
+        """
+        action = player_state.new_action
+        if action is None:
+            return
+        if action.type is ActionType.INTERACTION:
+            if action.action is InteractionContent.COOPERATE:
+                self._cooperation_count += 1
+                self._cooperation_count_by_generation[action.generation] += 1
+            else:
+                self._defection_count += 1
+                self._defection_count_by_generation[action.generation] += 1
+        # An action at a timepoint means every timepoint before it is done
+        if action.timepoint > self._timepoints_done:
+            self._timepoints_done = action.timepoint
+            if self._clock() - self._last_published >= self._min_interval:
+                self._publish(action.generation)
+
+    def _publish(self, generation: int) -> NoReturn:
+        now = self._clock()
+        self._last_published = now
+        elapsed = now - self._started
+        eta = None
+        if self._timepoints_done > 0:
+            eta = round(elapsed*(self._total_timepoints - self._timepoints_done)/self._timepoints_done)
+        self._channel.publish({
+            'event': 'progress', 'generation': generation, 'timepoints_done': self._timepoints_done,
+            'total_timepoints': self._total_timepoints,
+            'percentage': int(100*self._timepoints_done/self._total_timepoints),
+            'cooperation_rate': _rate(self._cooperation_count, self._defection_count),
+            'generation_cooperation_rate': _rate(self._cooperation_count_by_generation[generation],
+                                                 self._defection_count_by_generation[generation]),
+            'elapsed': round(elapsed), 'eta': eta})
+
+
+def _rate(cooperation_count: int, defection_count: int) -> Optional[int]:
+    """The cooperation rate as the ActionObserver rounds it, or None if there have been no interactions"""
+    if cooperation_count + defection_count == 0:
+        return None
+    return int(round(100*cooperation_count/(cooperation_count + defection_count)))
+
+
+def server_sent_event(event: Dict) -> str:
+    """
+    Format an event to send in a server-sent events stream
+    :param event: The event to send, the type of which is its 'event' entry
+    :type event: Dict
+    :return: The event as it is sent in the stream
+    :rtype: str
+    """
+    return "event: {}\ndata: {}\n\n".format(event['event'], json.dumps(event))
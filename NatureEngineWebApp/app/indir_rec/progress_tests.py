@@ -0,0 +1,116 @@
+"""progress_tests.py: Tests for the functionality of the progress_logic.py module, checking the progress of a running game
+is published to redis and read back as server-sent events"""
+
+__author__ = "James King"
+
+import json
+import unittest
+from itertools import count
+from typing import Dict, List
+from unittest.mock import Mock
+from redis import RedisError
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .facade_logic import ReputationGame
+from .array_engine_logic import ArrayReputationGame
+from .progress_logic import ProgressChannel, ProgressObserver, server_sent_event, PROGRESS_CHANNEL, \
+    LATEST_PROGRESS_KEY
+
+
+class ProgressTest(unittest.TestCase):
+    """Test publishing the progress of a game with the ProgressObserver and ProgressChannel classes"""
+
+    def setUp(self):
+        # A redis keeping its values in a dictionary and recording what is published to each channel
+        self.stored: Dict[str, bytes] = {}
+        self.published: Dict[str, List[Dict]] = {}
+        pipeline = Mock()
+        pipeline.set.side_effect = lambda key, value, ex: self.stored.__setitem__(key, value.encode('utf-8'))
+        pipeline.publish.side_effect = lambda channel, value: \
+            self.published.setdefault(channel, []).append(json.loads(value))
+        self.redis = Mock()
+        self.redis.pipeline.return_value = pipeline
+        self.redis.get.side_effect = lambda key: self.stored.get(key)
+        # A clock moving on a second each time it is read
+        self.clock = count().__next__
+
+    def _events(self, community_id: int) -> List[Dict]:
+        return self.published[PROGRESS_CHANNEL.format(community_id)]
+
+    def test_progress_of_game(self):
+        # A game should publish an event at the start of each generation and at each new timepoint after
+        channel = ProgressChannel(self.redis, 3)
+        observer = ProgressObserver(3, channel, 3, 8, min_interval=0, clock=self.clock)
+        game = ReputationGame([dict(strategy, count=2) for strategy in STRATEGIES[::20]], num_of_onlookers=2,
+                              num_of_generations=3, length_of_generations=8, mutation_chance=0.2,
+                              agents_client=LocalAgentsBackend(seed=4), observers=[observer])
+        results = game.run()
+        events = self._events(3)
+        self.assertEqual(24, len(events))
+        self.assertEqual(list(range(24)), [event['timepoints_done'] for event in events])
+        self.assertEqual([generation for generation in range(3) for _ in range(8)],
+                         [event['generation'] for event in events])
+        self.assertEqual(sorted(event['percentage'] for event in events), [event['percentage'] for event in events])
+        self.assertTrue(all(event['total_timepoints'] == 24 for event in events))
+        self.assertIsNone(events[0]['eta'])
+        self.assertTrue(all(event['eta'] >= 0 for event in events[1:]))
+        self.assertEqual(events[-1], channel.latest())
+        self.assertFalse(results.corrupted_observations)
+        self.assertEqual([0, 1, 2], observer.generations)
+
+    def test_min_interval(self):
+        # Within a generation events should be no more frequent than the minimum interval
+        observer = ProgressObserver(5, ProgressChannel(self.redis, 5), 3, 10, min_interval=1000, clock=self.clock)
+        ReputationGame([dict(strategy, count=2) for strategy in STRATEGIES[::20]], num_of_onlookers=2,
+                       num_of_generations=3, length_of_generations=10, agents_client=LocalAgentsBackend(seed=1),
+                       observers=[observer]).run()
+        self.assertEqual([0, 10, 20], [event['timepoints_done'] for event in self._events(5)])
+
+    def test_array_game(self):
+        # A game simulated with arrays should publish the start of each generation
+        observer = ProgressObserver(7, ProgressChannel(self.redis, 7), 4, 10, clock=self.clock)
+        ArrayReputationGame([dict(strategy, count=3) for strategy in STRATEGIES[::10]], num_of_generations=4,
+                            length_of_generations=10, seed=2, observers=[observer]).run()
+        self.assertEqual([0, 25, 50, 75], [event['percentage'] for event in self._events(7)])
+
+    def test_listen(self):
+        # Listening should start with the latest event, then give each event published or None at a heartbeat
+        channel = ProgressChannel(self.redis, 9)
+        channel.publish({'event': 'progress', 'percentage': 40})
+        pubsub = Mock()
+        pubsub.get_message.side_effect = [None, {'type': 'message', 'data': b'{"event": "finished"}'}]
+        self.redis.pubsub.return_value = pubsub
+        events = channel.listen(15)
+        self.assertEqual({'event': 'progress', 'percentage': 40}, next(events))
+        self.assertIsNone(next(events))
+        self.assertEqual({'event': 'finished'}, next(events))
+        events.close()
+        pubsub.subscribe.assert_called_once_with(PROGRESS_CHANNEL.format(9))
+        pubsub.close.assert_called_once_with()
+        self.assertIn(LATEST_PROGRESS_KEY.format(9), self.stored)
+
+    def test_listen_lifetime(self):
+        # Listening should stop once its lifetime is up, so a stream doesn't hold a worker for the whole game
+        channel = ProgressChannel(self.redis, 9)
+        pubsub = Mock()
+        pubsub.get_message.return_value = None
+        self.redis.pubsub.return_value = pubsub
+        events = list(channel.listen(15, lifetime=40, clock=iter([0, 0, 0, 20, 20, 40]).__next__))
+        self.assertEqual([None, None], events)
+        self.assertEqual([15, 15], [call[1]['timeout'] for call in pubsub.get_message.call_args_list])
+        pubsub.close.assert_called_once_with()
+
+    def test_redis_unavailable(self):
+        # The game should carry on without its progress when redis can't be reached
+        self.redis.pipeline.return_value.execute.side_effect = RedisError
+        self.redis.get.side_effect = RedisError
+        channel = ProgressChannel(self.redis, 1)
+        channel.publish({'event': 'progress'})
+        self.assertIsNone(channel.latest())
+
+    def test_server_sent_event(self):
+        self.assertEqual('event: finished\ndata: {"event": "finished", "url": "/x"}\n\n',
+                         server_sent_event({'event': 'finished', 'url': "/x"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
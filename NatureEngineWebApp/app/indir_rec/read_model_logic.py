@@ -0,0 +1,295 @@
+"""read_model_logic.py: Loads everything stored about a finished reputation game in a handful of queries, so the pages
+showing it can be built in memory"""
+
+__author__ = "James King"
+
+import hashlib
+from typing import Any, Dict, List, Tuple, TYPE_CHECKING
+from .action_logic import ActionType
+from ..models import ReputationCommunity, ReputationGeneration, ReputationPlayer, ReputationStrategy, \
+    ReputationActionOnlookers
+
+if TYPE_CHECKING:
+    from ..models import ReputationAction
+
+
+class CommunityReadModel:
+    """The generations, players, strategies, actions and onlookers of a community in the database, each loaded with a
+    single query"""
+
+    def __init__(self, community: ReputationCommunity):
+        """
+        Load the community's rows from the database
+        :param community: The community to load
+        :type community: ReputationCommunity
+        """
+        self._community: ReputationCommunity = community
+        self._generations: List[ReputationGeneration] = ReputationGeneration.query\
+            .filter_by(community_id=community.id).order_by(ReputationGeneration.id).all()
+        self._players_by_generation: Dict[int, List[ReputationPlayer]] = {generation.id: []
+                                                                          for generation in self._generations}
+        self._player_ids: Dict[int, int] = {}
+        for player in ReputationPlayer.query.filter_by(community_id=community.id).order_by(ReputationPlayer.id):
+            self._players_by_generation[player.generation_id].append(player)
+            self._player_ids[player.id] = player.player_id
+        strategy_ids = {player.strategy for players in self._players_by_generation.values() for player in players}
+        self._strategies: Dict[int, ReputationStrategy] = {
+            strategy.id: strategy for strategy in
+            (ReputationStrategy.query.filter(ReputationStrategy.id.in_(strategy_ids)) if strategy_ids else [])}
+        # The models module imports this package before it defines ReputationAction, so it can only be imported here
+        from ..models import ReputationAction
+        self._actions_by_player: Dict[int, List[ReputationAction]] = {player_id: [] for player_id in self._player_ids}
+        for action in ReputationAction.query.filter_by(community_id=community.id).order_by(ReputationAction.id):
+            self._actions_by_player[action.player_id].append(action)
+        self._onlookers_by_action: Dict[int, List[int]] = {}
+        for onlooker in ReputationActionOnlookers.query.filter_by(community_id=community.id)\
+                .order_by(ReputationActionOnlookers.id):
+            self._onlookers_by_action.setdefault(onlooker.action_id, []).append(self._player_ids[onlooker.onlooker_id])
+
+    @property
+    def community(self) -> ReputationCommunity:
+        """
+        Get the community the read model was loaded for
+        :return: The community
+        :rtype: ReputationCommunity
+        """
+        return self._community
+
+    @property
+    def generations(self) -> List[ReputationGeneration]:
+        """
+        Get the generations of the community in the order they were stored
+        :return: The generations of the community
+        :rtype: List[ReputationGeneration]
+        """
+        return self._generations
+
+    def players(self, generation: ReputationGeneration) -> List[ReputationPlayer]:
+        """
+        Get the players of a generation in the order they were stored
+        :param generation: The generation to get the players of
+        :type generation: ReputationGeneration
+        :return: The players of the generation
+        :rtype: List[ReputationPlayer]
+        """
+        return self._players_by_generation[generation.id]
+
+    def actions(self, player: ReputationPlayer) -> List['ReputationAction']:
+        """
+        Get the actions of a player in the order they were stored
+        :param player: The player to get the actions of
+        :type player: ReputationPlayer
+        :return: The actions of the player
+        :rtype: List[ReputationAction]
+        """
+        return self._actions_by_player[player.id]
+
+    def strategy(self, player: ReputationPlayer) -> ReputationStrategy:
+        """
+        Get the strategy of a player
+        :param player: The player to get the strategy of
+        :type player: ReputationPlayer
+        :return: The strategy of the player
+        :rtype: ReputationStrategy
+        """
+        return self._strategies[player.strategy]
+
+    def player_id(self, database_id: int) -> int:
+        """
+        Get the id a player has in its generation from its id in the database
+        :param database_id: The id of the player in the database
+        :type database_id: int
+        :return: The id of the player in its generation
+        :rtype: int
+        """
+        return self._player_ids[database_id]
+
+    def onlookers(self, action: 'ReputationAction') -> List[int]:
+        """
+        Get the ids of the onlookers of an interaction in their generation
+        :param action: The interaction to get the onlookers of
+        :type action: ReputationAction
+        :return: The ids of the onlookers
+        :rtype: List[int]
+        """
+        return self._onlookers_by_action.get(action.id, [])
+
+
+def get_players_and_actions(read_model: CommunityReadModel) \
+        -> Tuple[Dict[int, Dict[int, Dict[str, int]]], Dict[int, Dict[int, List[Dict]]]]:
+    """
+    Get the players and their stats (indexed by generation) and
+    actions of each player (indexed by generation) in format that is javascript readable (json-convertible).
+    First layer of dictionary keys is the generation ids, second is the player ids.
+    :param read_model: the loaded community to get the players and actions from
+    :type read_model: CommunityReadModel
+    :return: the players and their stats, and the players actions
+    :rtype: Tuple[Dict[int, Dict[int, Dict[str, int]]], Dict[int, Dict[int, List[Dict]]]]
+    """
+    players: Dict[int, Dict[int, Dict[str, int]]] = {}
+    actions: Dict[int, Dict[int, List[Dict]]] = {}
+    length_of_generations = read_model.community.length_of_generations
+    player_id = read_model.player_id
+    for generation in read_model.generations:
+        gen_players: Dict[int, Dict[str, int]] = {}
+        gen_actions: Dict[int, List[Dict]] = {}
+        for player in read_model.players(generation):
+            # add the players stats in the players dictionary
+            gen_players[player.player_id] = {'cooperation_rate': player.cooperation_rate,
+                                             'social_activeness': player.social_activeness,
+                                             'positivity_of_gossip': player.positivity_of_gossip,
+                                             'fitness': player.fitness, 'strategy': player.strategy}
+            # make action data json-convertible and add it to the actions dictionary
+            for action in read_model.actions(player):
+                if action.type is ActionType.INTERACTION:
+                    gen_actions.setdefault(action.timepoint % length_of_generations, []).append(
+                        {'type': 'interaction', 'donor': player_id(action.donor),
+                         'recipient': player_id(action.recipient), 'action': str(action.action),
+                         'reason': action.reason, 'onlookers': read_model.onlookers(action)})
+                elif action.type is ActionType.GOSSIP:
+                    gen_actions.setdefault(action.timepoint % length_of_generations, []).append(
+                        {'type': 'gossip', 'gossiper': player_id(action.gossiper), 'about': player_id(action.about),
+                         'recipient': player_id(action.recipient), 'gossip': str(action.gossip),
+                         'reason': action.reason})
+        players[generation.generation_id] = gen_players
+        actions[generation.generation_id] = gen_actions
+    return players, actions
+
+
+def get_population_chart_data_and_strategy_colours(read_model: CommunityReadModel):
+    """
+    Get the data in the correct format for graph.js to create the population line chart on the reputation finished
+    page and also the colours for each strategy
+    :param read_model: The loaded community to build the graph data for and get the strategy colours for
+    :type read_model: CommunityReadModel
+    :return: The chart data for the population chart and the strategy colours
+    """
+    # Create the dictionary for the chart data to populate
+    chart_data = {'type': 'line', 'data': {'datasets': [], 'labels': []},
+                  'options': {'title': {'display': True, 'text': "Population fluctuation across the generations"},
+                              'scales': {'yAxes': [{'scaleLabel': {'display': True, 'labelString': "Strategy Count"}}],
+                                         'xAxes': [{'scaleLabel': {'display': True, 'labelString': "Generation"}}]}}}
+    strategy_colours: Dict[int, Dict[str, Any]] = {}
+    datasets_by_label: Dict[str, Dict] = {}
+    for gen in read_model.generations:
+        chart_data['data']['labels'].append(gen.generation_id)
+        for player in read_model.players(gen):
+            strategy = read_model.strategy(player)
+            label = strategy.donor_strategy + " " + strategy.non_donor_strategy + " " + strategy.trust_model + " " +\
+                strategy.options
+            if label not in datasets_by_label:
+                # Add to strategy colours, picked from the strategy so the page's data is the same each time it is built
+                hex_colour = "#" + hashlib.md5(label.encode('utf-8')).hexdigest()[:6].upper()
+                # Add to chart data
+                datasets_by_label[label] = {'label': label,
+                                            'data': [0 for _ in range(len(read_model.generations))], 'fill': False,
+                                            'borderColor': hex_colour, 'backgroundColor': hex_colour}
+                chart_data['data']['datasets'].append(datasets_by_label[label])
+                strategy_colours[player.strategy] = {'colour': hex_colour, 'strategy': strategy.donor_strategy,
+                                                     'non_donor_strategy': strategy.non_donor_strategy,
+                                                     'trust_model': strategy.trust_model,
+                                                     'options': strategy.options}
+            datasets_by_label[label]['data'][gen.generation_id] += 1
+    return chart_data, strategy_colours
+
+
+def get_measurements_chart_data(read_model: CommunityReadModel):
+    """
+    Get the chart data for the cooperation rate, social activeness and positivity of gossip chart
+    :param read_model: The loaded community to build the chart data for
+    :type read_model: CommunityReadModel
+    :return: The chart data for the cooperation rate, social activeness and positivity of gossip chart
+    """
+    generations = read_model.generations
+    # Set up chart data outline to add to
+    chart_data = {'type': 'bar', 'data': {'datasets': [
+        {'label': "Cooperation rate", 'data': [0 for _ in range(len(generations))], 'fill': False,
+         'backgroundColor': "#0074D9",
+         'id': "cooperation_rate"},
+        {'label': "Social activeness", 'data': [0 for _ in range(len(generations))], 'fill': False,
+         'backgroundColor': "#B10DC9",
+         'id': "social_activeness"},
+        {'label': "Positivity of gossip", 'data': [0 for _ in range(len(generations))], 'fill': False,
+         'backgroundColor': "#39CCCC",
+         'id': "positivity_of_gossip"}
+    ], 'labels': []},
+                  'options': {'title': {'display': True,
+                                        'text': "Measurements over the generations"},
+                              'scales': {'yAxes': [{'ticks': {'max': 100, 'min': 0},
+                                                    'scaleLabel': {'display': True,
+                                                                   'labelString': "Measurement value"}}],
+                                         'xAxes': [{'scaleLabel': {'display': True,
+                                                                   'labelString': "Generation"}}]}}}
+    # Add data to chart data for measurements
+    for gen in generations:
+        chart_data['data']['labels'].append(gen.generation_id)
+        for dataset in chart_data['data']['datasets']:
+            if dataset['label'] == "Cooperation rate":
+                dataset['data'][gen.generation_id] = gen.cooperation_rate
+            elif dataset['label'] == "Social activeness":
+                dataset['data'][gen.generation_id] = gen.social_activeness
+            elif dataset['label'] == "Positivity of gossip":
+                dataset['data'][gen.generation_id] = gen.positivity_of_gossip
+    return chart_data
+
+
+def get_fitness_chart_data(read_model: CommunityReadModel):
+    """
+    Get the data for graph.js for the fitness chart of this community and how it fluctuates over the generations
+    :param read_model: The loaded community to get the chart data for
+    :return: The chart data for the fitness of each generation
+    """
+    return {'type': 'bar', 'data': {'labels': [gen.generation_id for gen in read_model.generations],
+                                    'datasets': [{'label': "Fitness",
+                                                  'data': [gen.fitness for gen in read_model.generations],
+                                                  'backgroundColor': "#85144b"}],
+                                    'options': {'title': {'display': True,
+                                                          'text': "Fitness over the generations"},
+                                                'scales': {'yAxes': [{'scaleLabel': {'display': True,
+                                                                                     'labelString': "Fitness"}}],
+                                                           'xAxes': [{'scaleLabel': {'display': True,
+                                                                                     'labelString': "Generation"}}]}}}}
+
+
+def get_generation_tables(read_model: CommunityReadModel) -> List[Dict]:
+    """
+    Get the rows of the table of each generation on the reputation finished page, a row for each player with their
+    strategy, the table representation of each of their actions and their measurements
+    :param read_model: The loaded community to get the tables of
+    :type read_model: CommunityReadModel
+    :return: The table of each generation
+    :rtype: List[Dict]
+    """
+    tables = []
+    for generation in read_model.generations:
+        rows = []
+        for player in read_model.players(generation):
+            strategy = read_model.strategy(player)
+            rows.append({'player_id': player.player_id,
+                         'strategy': {'donor_strategy': strategy.donor_strategy,
+                                      'non_donor_strategy': strategy.non_donor_strategy,
+                                      'trust_model': strategy.trust_model, 'options': strategy.options},
+                         'actions': [action.to_table_representation() for action in read_model.actions(player)],
+                         'cooperation_rate': player.cooperation_rate, 'social_activeness': player.social_activeness,
+                         'positivity_of_gossip': player.positivity_of_gossip, 'fitness': player.fitness})
+        tables.append({'generation_id': generation.generation_id, 'players': rows})
+    return tables
+
+
+def get_finished_page_data(community: ReputationCommunity) -> Dict:
+    """
+    Get all the data of a finished community shown on the reputation finished page, in a json-convertible format
+    :param community: The finished community to get the data of
+    :type community: ReputationCommunity
+    :return: The page's data by the name the template gives it
+    :rtype: Dict
+    """
+    read_model = CommunityReadModel(community)
+    population_chart_data, strategy_colours = get_population_chart_data_and_strategy_colours(read_model)
+    players, actions = get_players_and_actions(read_model)
+    return {'population_chart_data': population_chart_data, 'strategy_colours': strategy_colours,
+            'measurement_chart_data': get_measurements_chart_data(read_model),
+            'fitness_chart_data': get_fitness_chart_data(read_model),
+            'timepoints': [timepoint for timepoint in range(community.length_of_generations)],
+            'num_of_players_per_gen': len(players[0]) if players else 0, 'players': players, 'actions': actions,
+            'generation_tables': get_generation_tables(read_model)}
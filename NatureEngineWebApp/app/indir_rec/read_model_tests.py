@@ -0,0 +1,97 @@
+"""read_model_tests.py: Tests for the functionality of the read_model_logic.py module, checking the finished reputation
+page's data is built from a fixed number of queries"""
+
+__author__ = "James King"
+
+import json
+import unittest
+from typing import Dict, List
+from sqlalchemy import event
+from app import db
+from ..models import ReputationCommunity
+from .action_logic import ActionType
+from .database_test_case import DatabaseTestCase
+from .facade_logic import ReputationGame, Results
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .read_model_logic import CommunityReadModel, get_players_and_actions, \
+    get_population_chart_data_and_strategy_colours, get_measurements_chart_data, get_fitness_chart_data
+
+
+class CommunityReadModelTest(DatabaseTestCase):
+    """Test building the finished reputation page's data with the CommunityReadModel class"""
+
+    def _store(self, count: int, length_of_generations: int) -> (ReputationCommunity, Results):
+        game = ReputationGame([dict(strategy, count=count) for strategy in STRATEGIES[::10]], num_of_onlookers=3,
+                              num_of_generations=3, length_of_generations=length_of_generations,
+                              mutation_chance=0.3, agents_client=LocalAgentsBackend(seed=2))
+        return self._store_game(game)
+
+    def _page_data(self, community: ReputationCommunity) -> (List, int):
+        """Build all the data of the finished reputation page, counting the queries made"""
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        db.session.expire_all()
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            read_model = CommunityReadModel(community)
+            data = [get_players_and_actions(read_model), get_population_chart_data_and_strategy_colours(read_model),
+                    get_measurements_chart_data(read_model), get_fitness_chart_data(read_model)]
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        return data, len(statements)
+
+    def test_query_count(self):
+        # The page should take the same handful of queries however many players and actions the game has
+        small, _ = self._store(1, 6)
+        large, _ = self._store(4, 20)
+        _, small_queries = self._page_data(small)
+        _, large_queries = self._page_data(large)
+        # Reloading the community, then one query each for generations, players, strategies, actions and onlookers
+        self.assertEqual(6, small_queries)
+        self.assertEqual(small_queries, large_queries)
+
+    def test_players_and_actions(self):
+        # The players and actions should be those of the game stored
+        community, results = self._store(2, 8)
+        players, actions = self._page_data(community)[0][0]
+        for generation in results.generations:
+            self.assertEqual(results.players[generation], list(players[generation]))
+            expected_actions: Dict[int, List[Dict]] = {}
+            for player in results.players[generation]:
+                self.assertEqual(results.fitness_by_generation_and_player[generation][player],
+                                 players[generation][player]['fitness'])
+                self.assertEqual(results.cooperation_rate_by_generation_and_player[generation][player],
+                                 players[generation][player]['cooperation_rate'])
+                for timepoint, action in results.actions_by_generation_and_player[generation][player].items():
+                    if action.type is ActionType.INTERACTION:
+                        expected_actions.setdefault(timepoint % 8, []).append(
+                            {'type': 'interaction', 'donor': action.donor, 'recipient': action.recipient,
+                             'action': str(action.action), 'reason': action.reason, 'onlookers': action.onlookers})
+                    elif action.type is ActionType.GOSSIP:
+                        expected_actions.setdefault(timepoint % 8, []).append(
+                            {'type': 'gossip', 'gossiper': action.gossiper, 'about': action.about,
+                             'recipient': action.recipient, 'gossip': str(action.gossip), 'reason': action.reason})
+            self.assertEqual(expected_actions, actions[generation])
+
+    def test_charts(self):
+        # The charts should show the population, measurements and fitness of each generation stored
+        community, results = self._store(2, 8)
+        _, (population_chart, strategy_colours), measurement_chart, fitness_chart = self._page_data(community)[0]
+        datasets = {dataset['label']: dataset['data'] for dataset in population_chart['data']['datasets']}
+        for generation in results.generations:
+            for strategy, count in results.populations[generation].items():
+                label = " ".join([strategy.donor_strategy, strategy.non_donor_strategy, strategy.trust_model,
+                                  json.dumps(strategy.options)])
+                self.assertEqual(count, datasets[label][generation])
+        self.assertEqual(len(datasets), len(strategy_colours))
+        self.assertEqual([results.cooperation_rate_by_generation[generation] for generation in results.generations],
+                         measurement_chart['data']['datasets'][0]['data'])
+        self.assertEqual([results.fitness_by_generation[generation] for generation in results.generations],
+                         fitness_chart['data']['datasets'][0]['data'])
+
+
+if __name__ == '__main__':
+    unittest.main()
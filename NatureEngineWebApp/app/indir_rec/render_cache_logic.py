@@ -0,0 +1,101 @@
+"""render_cache_logic.py: Caches the data of the reputation finished page in redis, as a finished community's data never
+changes, along with the fitness statistics of all the communities which only change when another community finishes"""
+
+__author__ = "James King"
+
+import hashlib
+import json
+import time
+from typing import Dict, Optional
+from redis import Redis, RedisError
+from sqlalchemy.sql import func
+from app import db
+from ..models import ReputationCommunity
+from .read_model_logic import get_finished_page_data
+
+FINISHED_PAGE_KEY = "reputation_finished:{}"
+FITNESS_STATS_KEY = "reputation_fitness_stats"
+
+
+class RenderCache:
+    """A cache of the data behind the reputation finished page, each entry stored with an ETag and the time it was
+    stored to validate the pages built from it"""
+
+    def __init__(self, redis: Redis):
+        """
+        Set up the cache in a redis instance
+        :param redis: The redis connection to store the cache's entries through
+        :type redis: Redis
+        """
+        self._redis: Redis = redis
+
+    def finished_page(self, community: ReputationCommunity) -> Dict:
+        """
+        Get the data of a finished community's page, building and storing it if it isn't in the cache
+        :param community: The finished community to get the page data of
+        :type community: ReputationCommunity
+        :return: The entry with the page's data, its ETag and the time it was stored
+        :rtype: Dict
+        """
+        entry = self._get(FINISHED_PAGE_KEY.format(community.id))
+        if entry is None:
+            entry = self.fill_finished_page(community)
+        return entry
+
+    def fill_finished_page(self, community: ReputationCommunity) -> Dict:
+        """
+        Build the data of a finished community's page and store it in the cache
+        :param community: The finished community to store the page data of
+        :type community: ReputationCommunity
+        :return: The entry with the page's data, its ETag and the time it was stored
+        :rtype: Dict
+        """
+        entry = self._entry(get_finished_page_data(community))
+        self._set(FINISHED_PAGE_KEY.format(community.id), entry)
+        return entry
+
+    def fitness_stats(self) -> Dict:
+        """
+        Get the lowest, highest and average fitness of all the communities, working them out and storing them if they
+        aren't in the cache
+        :return: The entry with the fitness statistics, their ETag and the time they were stored
+        :rtype: Dict
+        """
+        entry = self._get(FITNESS_STATS_KEY)
+        if entry is None:
+            community_fitness_stats = db.session.query(func.max(ReputationCommunity.fitness).label("max_fit"),
+                                                       func.min(ReputationCommunity.fitness).label("min_fit"),
+                                                       func.avg(ReputationCommunity.fitness).label("avg_fit")).one()
+            entry = self._entry({'lowest_fitness': community_fitness_stats.min_fit,
+                                 'highest_fitness': community_fitness_stats.max_fit,
+                                 'average_fitness': round(community_fitness_stats.avg_fit)
+                                 if community_fitness_stats.avg_fit is not None else None})
+            self._set(FITNESS_STATS_KEY, entry)
+        return entry
+
+    def invalidate_fitness_stats(self):
+        """Remove the fitness statistics from the cache, for when another community has finished"""
+        try:
+            self._redis.delete(FITNESS_STATS_KEY)
+        except RedisError:
+            pass
+
+    @staticmethod
+    def _entry(data: Dict) -> Dict:
+        encoded = json.dumps(data, sort_keys=True)
+        return {'data': json.loads(encoded), 'etag': hashlib.sha1(encoded.encode('utf-8')).hexdigest(),
+                'stored': int(time.time())}
+
+    def _get(self, key: str) -> Optional[Dict]:
+        try:
+            cached = self._redis.get(key)
+        except RedisError:
+            return None
+        return json.loads(cached.decode('utf-8')) if cached is not None else None
+
+    def _set(self, key: str, entry: Dict):
+        # The page can still be built from the database when redis can't be reached
+        try:
+            self._redis.set(key, json.dumps(entry))
+        except RedisError:
+            pass
@@ -0,0 +1,108 @@
+"""render_cache_tests.py: Tests for the functionality of the render_cache_logic.py module, checking the finished
+reputation page's data is served from redis and only the fitness stats are invalidated"""
+
+__author__ = "James King"
+
+import unittest
+from typing import Dict, List
+from unittest.mock import Mock
+from redis import RedisError
+from sqlalchemy import event
+from app import db
+from ..models import ReputationCommunity
+from .database_test_case import DatabaseTestCase
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .facade_logic import ReputationGame
+from .read_model_logic import get_finished_page_data
+from .render_cache_logic import RenderCache, FINISHED_PAGE_KEY, FITNESS_STATS_KEY
+
+
+class RenderCacheTest(DatabaseTestCase):
+    """Test storing the finished reputation page's data in redis with the RenderCache class"""
+
+    def setUp(self):
+        super().setUp()
+        # A redis holding its values in a dictionary, as redis returns them in bytes
+        self.stored: Dict[str, bytes] = {}
+        self.redis = Mock()
+        self.redis.get.side_effect = lambda key: self.stored.get(key)
+        self.redis.set.side_effect = lambda key, value: self.stored.__setitem__(key, value.encode('utf-8'))
+        self.redis.delete.side_effect = lambda key: self.stored.pop(key, None)
+
+    def _store(self, seed: int) -> ReputationCommunity:
+        game = ReputationGame([dict(strategy, count=2) for strategy in STRATEGIES[::20]], num_of_onlookers=2,
+                              num_of_generations=3, length_of_generations=6, mutation_chance=0.2,
+                              agents_client=LocalAgentsBackend(seed=seed))
+        return self._store_game(game)[0]
+
+    def _queries(self, call) -> (object, List[str]):
+        """Call a function, getting what it returns and the queries it made"""
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            returned = call()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        return returned, statements
+
+    def test_finished_page(self):
+        # The page's data should be stored the first time and then served from the cache without any queries
+        community = self._store(0)
+        render_cache = RenderCache(self.redis)
+        self.assertNotIn(FINISHED_PAGE_KEY.format(community.id), self.stored)
+        built = render_cache.finished_page(community)
+        self.assertIn(FINISHED_PAGE_KEY.format(community.id), self.stored)
+        cached, statements = self._queries(lambda: render_cache.finished_page(community))
+        self.assertEqual([], statements)
+        self.assertEqual(built, cached)
+        self.assertEqual(len(get_finished_page_data(community)['generation_tables']),
+                         len(cached['data']['generation_tables']))
+
+    def test_etag(self):
+        # The ETag should only depend on the page's data, so it is the same when the page is built again
+        community = self._store(0)
+        other = self._store(1)
+        render_cache = RenderCache(self.redis)
+        etag = render_cache.fill_finished_page(community)['etag']
+        self.assertEqual(etag, render_cache.fill_finished_page(community)['etag'])
+        self.assertNotEqual(etag, render_cache.fill_finished_page(other)['etag'])
+
+    def test_fitness_stats(self):
+        # The fitness stats should be stored until they are invalidated by another community finishing
+        first = self._store(0)
+        render_cache = RenderCache(self.redis)
+        page = render_cache.finished_page(first)
+        stats = render_cache.fitness_stats()
+        self.assertEqual(first.fitness, stats['data']['highest_fitness'])
+        self.assertEqual(first.fitness, stats['data']['lowest_fitness'])
+        _, statements = self._queries(render_cache.fitness_stats)
+        self.assertEqual([], statements)
+        second = self._store(1)
+        render_cache.fill_finished_page(second)
+        render_cache.invalidate_fitness_stats()
+        self.assertNotIn(FITNESS_STATS_KEY, self.stored)
+        stats = render_cache.fitness_stats()
+        self.assertEqual(max(first.fitness, second.fitness), stats['data']['highest_fitness'])
+        self.assertEqual(min(first.fitness, second.fitness), stats['data']['lowest_fitness'])
+        # The first community's page is left alone
+        self.assertEqual(page, render_cache.finished_page(first))
+
+    def test_redis_unavailable(self):
+        # The page's data should still be built from the database when redis can't be reached
+        community = self._store(0)
+        self.redis.get.side_effect = RedisError()
+        self.redis.set.side_effect = RedisError()
+        self.redis.delete.side_effect = RedisError()
+        render_cache = RenderCache(self.redis)
+        self.assertEqual(len(get_finished_page_data(community)['generation_tables']),
+                         len(render_cache.finished_page(community)['data']['generation_tables']))
+        self.assertEqual(community.fitness, render_cache.fitness_stats()['data']['highest_fitness'])
+        render_cache.invalidate_fitness_stats()
+
+
+if __name__ == '__main__':
+    unittest.main()
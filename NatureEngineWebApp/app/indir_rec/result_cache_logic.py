@@ -0,0 +1,69 @@
+"""result_cache_logic.py: Identifies repeated configurations of reputation games by a hash of their canonical form, so a
+seeded game that has already been run can be answered from its stored results rather than simulated again"""
+
+__author__ = "James King"
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from redis import Redis, RedisError
+from .strategy_logic import strategy_fingerprint
+
+RESULT_CACHE_HITS_KEY = "reputation_result_cache:hits"
+RESULT_CACHE_MISSES_KEY = "reputation_result_cache:misses"
+# Bumped whenever an engine changes the order it draws from a seed's random number streams, so communities stored
+# before the change aren't matched with games that would now play differently
+CONFIG_HASH_VERSION = 2
+
+
+def config_hash(initial_strategies: List[Dict], num_of_onlookers: int, num_of_generations: int,
+                length_of_generations: int, mutation_chance: float, seed: Optional[int], engine: str) -> Optional[str]:
+    """
+    Get the hash identifying the configuration of a game, the same for any two games that would play the same way.
+    Only to be used for games whose play is wholly determined by the seed, not those through the agents service's
+    minds as they make their own random choices.
+    :param initial_strategies: The strategies of the first generation, each with its count
+    :type initial_strategies: List[Dict]
+    :param num_of_onlookers: The number of onlookers for each interaction
+    :type num_of_onlookers: int
+    :param num_of_generations: The number of generations in the game
+    :type num_of_generations: int
+    :param length_of_generations: The number of timepoints in each generation
+    :type length_of_generations: int
+    :param mutation_chance: The chance for mutation in the reproduction of any one player
+    :type mutation_chance: float
+    :param seed: The seed of the game's random number streams
+    :type seed: Optional[int]
+    :param engine: The engine the game is simulated with, as each engine plays a seed differently
+    :type engine: str
+    :return: The hex digest of the configuration, or None if the game has no seed, as it then plays differently each
+     run
+    :rtype: Optional[str]
+    """
+    if seed is None:
+        return None
+    # Equal strategies are merged as the game merges them, keeping the order they first appear in as players are
+    # numbered in that order
+    counts: Dict[str, int] = OrderedDict()
+    for strategy in initial_strategies:
+        fingerprint = strategy_fingerprint(strategy['donor_strategy'], strategy['non_donor_strategy'],
+                                           strategy['trust_model'], strategy['options'])
+        counts[fingerprint] = counts.get(fingerprint, 0) + int(strategy['count'])
+    canonical: List[Any] = [CONFIG_HASH_VERSION, engine, list(counts.items()), int(num_of_onlookers), int(num_of_generations),
+                            int(length_of_generations), float(mutation_chance), int(seed)]
+    return hashlib.sha256(json.dumps(canonical, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def count_lookup(redis: Redis, hit: bool):
+    """
+    Count a lookup of the stored communities by configuration in redis, skipped if redis can't be reached
+    :param redis: The redis connection to count through
+    :type redis: Redis
+    :param hit: Whether a stored community answered the lookup
+    :type hit: bool
+    """
+    try:
+        redis.incr(RESULT_CACHE_HITS_KEY if hit else RESULT_CACHE_MISSES_KEY)
+    except RedisError:
+        pass
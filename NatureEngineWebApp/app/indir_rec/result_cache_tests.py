@@ -0,0 +1,101 @@
+"""result_cache_tests.py: Tests for the functionality of the result_cache_logic.py module, checking repeated seeded games
+are identified by their configuration so they can be answered from the community stored for the first run"""
+
+__author__ = "James King"
+
+import unittest
+from unittest.mock import Mock, patch
+from redis import RedisError
+from ..models import ReputationCommunity
+from .array_engine_logic import ArrayReputationGame
+from .database_test_case import DatabaseTestCase
+from .facade_logic import ReputationGame
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .result_cache_logic import config_hash, count_lookup, RESULT_CACHE_HITS_KEY, RESULT_CACHE_MISSES_KEY
+
+
+class ResultCacheTest(unittest.TestCase):
+    """Test identifying configurations with config_hash and counting the lookups of them"""
+
+    def _hash(self, strategies=None, mutation_chance=0.1, seed=3, engine='agents'):
+        strategies = strategies if strategies is not None else [dict(STRATEGIES[0], count=3),
+                                                                dict(STRATEGIES[5], count=2)]
+        return config_hash(strategies, 2, 3, 8, mutation_chance, seed, engine)
+
+    def _game(self, seed=5) -> ReputationGame:
+        return ReputationGame([dict(strategy, count=2) for strategy in STRATEGIES[::15]], num_of_onlookers=2,
+                              num_of_generations=3, length_of_generations=8, mutation_chance=0.2,
+                              agents_client=LocalAgentsBackend(seed=0), seed=seed)
+
+    def test_config_hash(self):
+        # Games that would play the same way should have the same hash, and any other change should change it
+        self.assertEqual(self._hash(), self._hash())
+        self.assertEqual(self._hash(), self._hash([dict(STRATEGIES[0], count=1), dict(STRATEGIES[5], count=2),
+                                                   dict(STRATEGIES[0], count=2)]))
+        self.assertNotEqual(self._hash(), self._hash([dict(STRATEGIES[5], count=2), dict(STRATEGIES[0], count=3)]))
+        self.assertNotEqual(self._hash(), self._hash(mutation_chance=0.2))
+        self.assertNotEqual(self._hash(), self._hash(seed=4))
+        self.assertNotEqual(self._hash(), self._hash(engine='array'))
+        self.assertIsNone(self._hash(seed=None))
+        self.assertEqual(self._hash(), config_hash([dict(STRATEGIES[0], count=3), dict(STRATEGIES[5], count=2)],
+                                                   2, 3, 8, 0.1, 3, 'agents'))
+        self.assertEqual(self._game().config_hash, self._game().config_hash)
+        self.assertIsNone(self._game(seed=None).config_hash)
+        # Communities stored before the engines changed how they draw from a seed shouldn't be matched
+        current = self._hash()
+        with patch('app.indir_rec.result_cache_logic.CONFIG_HASH_VERSION', 1):
+            self.assertNotEqual(current, self._hash())
+
+    def test_unseeded_minds(self):
+        # A game whose agents make their own random choices plays differently each run even when seeded, so it has no
+        # hash to be matched by
+        game = ReputationGame([dict(strategy, count=2) for strategy in STRATEGIES[::15]], num_of_onlookers=2,
+                              num_of_generations=3, length_of_generations=8, agents_client=LocalAgentsBackend(),
+                              seed=5)
+        self.assertFalse(game.seeded_play)
+        self.assertIsNone(game.config_hash)
+        self.assertTrue(self._game().seeded_play)
+
+    def test_array_game(self):
+        # The array engine's play is wholly determined by the seed, but differs from the agents engine's
+        game = ArrayReputationGame([dict(STRATEGIES[0], count=5)], num_of_generations=3, length_of_generations=6,
+                                   seed=7)
+        self.assertTrue(game.seeded_play)
+        self.assertEqual(game.config_hash, ArrayReputationGame([dict(STRATEGIES[0], count=5)], num_of_generations=3,
+                                                               length_of_generations=6, seed=7).config_hash)
+        self.assertNotEqual(game.config_hash, ReputationGame([dict(STRATEGIES[0], count=5)], num_of_generations=3,
+                                                             length_of_generations=6, seed=7).config_hash)
+
+    def test_count_lookup(self):
+        redis = Mock()
+        count_lookup(redis, True)
+        count_lookup(redis, False)
+        self.assertEqual([((RESULT_CACHE_HITS_KEY,),), ((RESULT_CACHE_MISSES_KEY,),)], redis.incr.call_args_list)
+        redis.incr.side_effect = RedisError
+        count_lookup(redis, True)
+
+
+
+class StoredConfigHashTest(DatabaseTestCase):
+    """Test the hash of the configuration stored with each community, for repeats to be answered from"""
+
+    def test_stored_config_hash(self):
+        # A stored community should have the hash of the game with the seed it was run with, so repeats can find it
+        game = ReputationGame([dict(strategy, count=2) for strategy in STRATEGIES[::15]], num_of_onlookers=2,
+                              num_of_generations=3, length_of_generations=8, mutation_chance=0.2,
+                              agents_client=LocalAgentsBackend(seed=0))
+        community, results = self._store_game(game)
+        repeat = ReputationGame([dict(strategy, count=2) for strategy in STRATEGIES[::15]], num_of_onlookers=2,
+                                num_of_generations=3, length_of_generations=8, mutation_chance=0.2,
+                                agents_client=LocalAgentsBackend(seed=0), seed=results.seed)
+        stored = ReputationCommunity.query.filter_by(config_hash=repeat.config_hash, simulated=True).first()
+        self.assertEqual(community.id, stored.id)
+        # Nor is a community of a game through unseeded minds stored with a hash
+        unseeded = ReputationGame([dict(STRATEGIES[0], count=5)], num_of_generations=3, length_of_generations=6,
+                                  agents_client=LocalAgentsBackend(), seed=3)
+        community, _ = self._store_game(unseeded)
+        self.assertIsNone(ReputationCommunity.query.filter_by(id=community.id).first().config_hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
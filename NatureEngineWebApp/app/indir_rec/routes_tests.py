@@ -0,0 +1,76 @@
+"""routes_tests.py: Tests for the reputation routes of the routes.py module, checking a repeated seeded game is answered
+from the community already stored for its configuration"""
+
+__author__ = "James King"
+
+import unittest
+from unittest.mock import Mock
+from config import Config
+from app import db, login
+from app.indir_rec import bp
+from ..models import ReputationCommunity
+from .array_engine_logic import ArrayReputationGame
+from .database_test_case import DatabaseTestCase
+from .local_agents_logic import STRATEGIES
+from .result_cache_logic import config_hash, RESULT_CACHE_HITS_KEY, RESULT_CACHE_MISSES_KEY
+
+
+class ReputationRouteTest(DatabaseTestCase):
+    """Test setting up reputation games through the reputation route with the default config"""
+
+    def setUp(self):
+        super().setUp()
+        for key in ['REPUTATION_MAX_PLAYERS', 'ARRAY_ENGINE_MIN_PLAYERS']:
+            self.app.config[key] = getattr(Config, key)
+        self.app.register_blueprint(bp)
+        login.init_app(self.app)
+        self.app.agents_client = Mock()
+        self.app.agents_client.get_strategies.return_value = STRATEGIES
+        self.app.redis = Mock()
+        self.app.task_queue = Mock()
+        self.app.task_queue.enqueue.return_value.get_id.return_value = 'job'
+        self.client = self.app.test_client()
+
+    def _form(self, count: int, seed: int = 4) -> dict:
+        return {'strategy_counts': [dict(STRATEGIES[0], count=count)], 'num_of_onlookers': 2,
+                'num_of_generations': 3, 'length_of_generations': 6, 'mutation_chance': 0.1, 'seed': seed,
+                'label': 'repeat'}
+
+    def _store(self, form: dict, engine: str) -> ReputationCommunity:
+        community = ReputationCommunity(simulated=True, timed_out=False, corrupted_observations=False,
+                                        seed=form['seed'], config_hash=config_hash(
+            form['strategy_counts'], form['num_of_onlookers'], form['num_of_generations'],
+            form['length_of_generations'], form['mutation_chance'], form['seed'], engine))
+        db.session.add(community)
+        db.session.commit()
+        return community
+
+    def test_array_game_answered_from_stored(self):
+        # A seeded game large enough for the array engine should be sent the community stored for its configuration
+        form = self._form(Config.ARRAY_ENGINE_MIN_PLAYERS)
+        stored, _ = self._store_game(ArrayReputationGame(form['strategy_counts'], form['num_of_onlookers'],
+                                                         form['num_of_generations'], form['length_of_generations'],
+                                                         form['mutation_chance'], seed=form['seed']))
+        response = self.client.post('/reputation', json=form)
+        self.assertEqual('/reputation_finished/' + str(stored.id) + '/', response.get_json()['url'])
+        self.app.task_queue.enqueue.assert_not_called()
+        self.app.redis.incr.assert_called_once_with(RESULT_CACHE_HITS_KEY)
+        self.assertEqual(1, ReputationCommunity.query.count())
+        self.assertLessEqual(Config.ARRAY_ENGINE_MIN_PLAYERS, Config.REPUTATION_MAX_PLAYERS)
+        # Another seed hasn't been run, so is queued
+        response = self.client.post('/reputation', json=self._form(Config.ARRAY_ENGINE_MIN_PLAYERS, seed=5))
+        self.assertEqual('/reputation_finished/' + str(stored.id + 1) + '/job', response.get_json()['url'])
+        self.app.task_queue.enqueue.assert_called_once()
+        self.app.redis.incr.assert_called_with(RESULT_CACHE_MISSES_KEY)
+
+    def test_agents_game_run_again(self):
+        # A game through the agents' minds plays differently each run, so is queued whatever is stored
+        form = self._form(10)
+        self._store(form, 'agents')
+        self.client.post('/reputation', json=form)
+        self.app.task_queue.enqueue.assert_called_once()
+        self.app.redis.incr.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+"""run_experiments_tests.py: Tests for the functionality of the experiments/run_experiments.py module, checking sweeps
+of experiments run over a pool of workers and picked up again from their manifest"""
+
+__author__ = "James King"
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from .experiments import run_experiments
+from .community_logic import Community
+from .local_agents_logic import STRATEGIES
+
+
+class RunExperimentsTest(unittest.TestCase):
+    """Test running sweeps of experiments with the run_experiments module"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output_path = self.directory.name + os.sep
+        self.experiments = [{'gen_length': 6, 'gen_num': 3, 'num_of_onlookers': 2},
+                            {'gen_length': 8, 'gen_num': 3, 'num_of_onlookers': 3},
+                            {'gen_length': 7, 'gen_num': 3, 'num_of_onlookers': 4}]
+        self.experiments_filename = self._write_json('experiments.json', self.experiments)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write_json(self, filename: str, data) -> str:
+        path = os.path.join(self.directory.name, filename)
+        with open(path, "w") as json_file:
+            json.dump(data, json_file)
+        return path
+
+    def _results(self, finished):
+        self.assertEqual(sorted(os.path.join(self.directory.name, filename) for filename
+                                in os.listdir(self.directory.name) if filename.endswith('.json') and
+                                filename not in ['experiments.json', 'population.json', 'strategies.json',
+                                                 run_experiments.MANIFEST_FILENAME]),
+                         sorted(finished))
+        self.assertFalse([filename for filename in os.listdir(self.directory.name) if filename.endswith('.tmp')])
+        results = []
+        for filename in finished:
+            with open(filename) as results_file:
+                results.append(json.load(results_file))
+        return results
+
+    def test_robustness_workers(self):
+        # Each experiment should be run once by the workers, with a results file written for each
+        population = [dict(strategy, count=1) for strategy in STRATEGIES[::20]]
+        population_filename = self._write_json('population.json', population)
+        finished = run_experiments.run_robustness_experiments(self.experiments_filename, population_filename,
+                                                              self.output_path, workers=3, local=True)
+        results = self._results(finished)
+        self.assertEqual(sorted(self.experiments, key=lambda experiment: experiment['gen_length']),
+                         sorted([result['experiment'] for result in results],
+                                key=lambda experiment: experiment['gen_length']))
+        for result in results:
+            self.assertEqual(3, len(result['populations']))
+            self.assertEqual(len(population), sum(strategy['count'] for strategy in result['populations'][-1]))
+            self.assertFalse(result['corrupted_observations'])
+
+    def test_stability_one_worker(self):
+        # A single worker should run every strategy against every experiment in this process
+        strategies = [strategy for strategy in STRATEGIES if strategy['donor_strategy'] == "Standing Discriminator"][:2]
+        strategies_filename = self._write_json('strategies.json', strategies)
+        finished = run_experiments.run_stability_experiments(self.experiments_filename, strategies_filename,
+                                                             self.output_path, workers=1, local=True)
+        results = self._results(finished)
+        self.assertEqual(len(strategies) * len(self.experiments), len(results))
+        for result in results:
+            self.assertEqual(31, sum(strategy['count'] for strategy in result['populations'][0]))
+
+    def _manifest(self):
+        with open(self.output_path + run_experiments.MANIFEST_FILENAME) as manifest_file:
+            return json.load(manifest_file)['finished']
+
+    def _run_robustness(self, population):
+        population_filename = self._write_json('population.json', population)
+        with patch.object(run_experiments, '_run', side_effect=run_experiments._run) as run:
+            finished = run_experiments.run_robustness_experiments(self.experiments_filename, population_filename,
+                                                                  self.output_path, local=True)
+        return finished, run.call_count
+
+    def test_resume(self):
+        # Runs in the manifest should be skipped, and only the runs that didn't finish run again
+        population = [dict(strategy, count=1) for strategy in STRATEGIES[::25]]
+        finished, calls = self._run_robustness(population)
+        self.assertEqual(3, calls)
+        manifest = self._manifest()
+        self.assertEqual({run_experiments.config_id(population, experiment) for experiment in self.experiments},
+                         set(manifest))
+        self.assertEqual(sorted(finished), sorted(run['results'] for run in manifest.values()))
+        # Interrupt the last run before it was written
+        interrupted = run_experiments.config_id(population, self.experiments[2])
+        os.remove(manifest[interrupted]['results'])
+        del manifest[interrupted]
+        self._write_json(run_experiments.MANIFEST_FILENAME, {'finished': manifest})
+        finished, calls = self._run_robustness(population)
+        self.assertEqual(1, calls)
+        self.assertEqual(1, len(finished))
+        self.assertIn(interrupted, finished[0])
+        self.assertEqual(3, len(self._manifest()))
+        # Nothing should be run once everything is finished
+        self.assertEqual(([], 0), self._run_robustness(population))
+
+    def test_results_without_manifest_entry(self):
+        # Results written before the manifest was updated should be added to it without being run again
+        population = [dict(strategy, count=1) for strategy in STRATEGIES[::25]]
+        finished, _ = self._run_robustness(population)
+        os.remove(self.output_path + run_experiments.MANIFEST_FILENAME)
+        self.assertEqual(([], 0), self._run_robustness(population))
+        self.assertEqual(sorted(finished), sorted(run['results'] for run in self._manifest().values()))
+
+    def test_legacy_manifest(self):
+        # A manifest kept as a list of finished experiments should skip those experiments of the population
+        population = [dict(strategy, count=1) for strategy in STRATEGIES[::25]]
+        self._write_json(run_experiments.MANIFEST_FILENAME, self.experiments[:2] + [{}])
+        finished, calls = self._run_robustness(population)
+        self.assertEqual(1, calls)
+        self.assertIn(run_experiments.config_id(population, self.experiments[2]), finished[0])
+        self.assertEqual(3, len(self._manifest()))
+
+    def test_unconvertible_legacy_manifest(self):
+        # A manifest kept as a list can't be converted without the population, so shouldn't be overwritten
+        strategies_filename = self._write_json('strategies.json', STRATEGIES[:1])
+        manifest_filename = self._write_json(run_experiments.MANIFEST_FILENAME, self.experiments[:2])
+        with patch.object(run_experiments, '_run') as run:
+            with self.assertRaises(ValueError):
+                run_experiments.run_stability_experiments(self.experiments_filename, strategies_filename,
+                                                          self.output_path, local=True)
+        run.assert_not_called()
+        with open(manifest_filename) as manifest_file:
+            self.assertEqual(self.experiments[:2], json.load(manifest_file))
+
+    def test_interrupted_run_resumed(self):
+        # A run interrupted part way should resume from its checkpoint, which is removed once its results are written
+        population = [dict(strategy, count=1) for strategy in STRATEGIES[::25]]
+        self.experiments = [self.experiments[0]]
+        self.experiments_filename = self._write_json('experiments.json', self.experiments)
+        record = Community._record_generation
+
+        def interrupt(community, generation):
+            record(community, generation)
+            if generation.id == 1:
+                raise RuntimeError("worker died")
+
+        with patch.object(Community, '_record_generation', interrupt):
+            with self.assertRaises(RuntimeError):
+                self._run_robustness(population)
+        checkpoint = self.output_path + run_experiments.config_id(population, self.experiments[0]) + '.checkpoint'
+        self.assertTrue(os.path.exists(checkpoint))
+        build = Community._build_generation
+        built = []
+
+        def record_built(community, gen_id):
+            built.append(gen_id)
+            return build(community, gen_id)
+
+        with patch.object(Community, '_build_generation', record_built):
+            finished, calls = self._run_robustness(population)
+        self.assertEqual([2], built)
+        self.assertEqual(1, len(finished))
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_config_id(self):
+        # The id of a configuration should depend on its contents alone
+        population = [dict(STRATEGIES[0], count=4)]
+        experiment = {'gen_length': 6, 'gen_num': 3, 'num_of_onlookers': 2}
+        reordered = {'num_of_onlookers': 2, 'gen_num': 3, 'gen_length': 6}
+        self.assertEqual(run_experiments.config_id(population, experiment),
+                         run_experiments.config_id(population, reordered))
+        self.assertNotEqual(run_experiments.config_id(population, experiment),
+                            run_experiments.config_id(population, dict(experiment, gen_num=4)))
+        self.assertNotEqual(run_experiments.config_id(population, experiment),
+                            run_experiments.config_id([dict(STRATEGIES[0], count=5)], experiment))
+
+    def test_agents_urls_shared_out(self):
+        # Each worker should take its own agents service url from those given
+        slots = Mock()
+        slots.get.side_effect = [0, 1, 2]
+        urls = ["http://agents-0:8080/", "http://agents-1:8080/"]
+        with patch.object(run_experiments, '_backend', None):
+            taken = []
+            for _ in range(3):
+                run_experiments._init_worker(slots, urls)
+                taken.append(run_experiments._backend.agents_url)
+                run_experiments._backend.close()
+        self.assertEqual([urls[0], urls[1], urls[0]], taken)
+
+    def test_write_atomically(self):
+        # A failed write should leave neither the results file nor a temporary file behind
+        output_filename = os.path.join(self.directory.name, "results.json")
+        with self.assertRaises(TypeError):
+            run_experiments._write_atomically(output_filename, {'unserialisable': object()})
+        self.assertEqual(['experiments.json'], os.listdir(self.directory.name))
+        run_experiments._write_atomically(output_filename, {'coop_rate': 50})
+        with open(output_filename) as results_file:
+            self.assertEqual({'coop_rate': 50}, json.load(results_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
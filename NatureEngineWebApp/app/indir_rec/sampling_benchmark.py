@@ -0,0 +1,108 @@
+"""sampling_benchmark.py: A script to measure how the time taken by each timepoint of a generation changes as the
+generation's history grows, and how the time to draw an interaction's players changes with the size of the generation"""
+
+__author__ = "James King"
+
+import argparse
+import random
+import time
+from typing import Dict, List, NoReturn
+from .generation_logic import Generation, PopulationSampler
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .observation_logic import Observer
+from .player_logic import PlayerState
+from .seeding_logic import RandomStreams
+from .strategy_logic import Strategy
+
+
+class _TimepointTimer(Observer):
+    """Records the time each timepoint of a generation was first acted in"""
+
+    def __init__(self):
+        self.started: Dict[int, float] = {}
+
+    def update(self, player_state: PlayerState) -> NoReturn:
+        if player_state.new_action is not None and player_state.new_action.timepoint not in self.started:
+            self.started[player_state.new_action.timepoint] = time.perf_counter()
+
+    @property
+    def community(self) -> int:
+        return 0
+
+    @property
+    def generations(self) -> List[int]:
+        return [0]
+
+    def add_generation(self, generation: int) -> NoReturn:
+        pass
+
+    def add_player(self, generation: int, player: int) -> NoReturn:
+        pass
+
+    @property
+    def corrupted_observations(self) -> bool:
+        return False
+
+
+def run_history_benchmark(players: int, num_of_onlookers: int, length_of_generations: int, windows: int):
+    """
+    Simulate a long generation in process and print the average time of the timepoints in each window of it
+    :param players: The number of players in the generation
+    :type players: int
+    :param num_of_onlookers: The number of onlookers for each interaction
+    :type num_of_onlookers: int
+    :param length_of_generations: The number of timepoints in the generation
+    :type length_of_generations: int
+    :param windows: The number of windows to split the timepoints into
+    :type windows: int
+    """
+    agents_client = LocalAgentsBackend(seed=0)
+    strategies: Dict[Strategy, int] = {}
+    for i in range(players):
+        strategy = STRATEGIES[i % len(STRATEGIES)]
+        key = Strategy(strategy['donor_strategy'], strategy['non_donor_strategy'], strategy['trust_model'],
+                       strategy['options'])
+        strategies[key] = strategies.get(key, 0) + 1
+    timer = _TimepointTimer()
+    generation = Generation(strategies, 0, agents_client.create_community()['id'], 0, length_of_generations,
+                            num_of_onlookers, [timer], agents_client=agents_client, streams=RandomStreams(0))
+    generation.simulate()
+    timepoints = sorted(timer.started)
+    window = len(timepoints) // windows
+    for start in range(0, window * windows, window):
+        elapsed = timer.started[timepoints[start + window - 1]] - timer.started[timepoints[start]]
+        print("Timepoints {}-{}: {:.3f}ms a timepoint".format(timepoints[start], timepoints[start + window - 1],
+                                                               1000 * elapsed / (window - 1)))
+
+
+def run_draw_benchmark(sizes: List[int], num_of_onlookers: int, draws: int):
+    """
+    Print the time to draw a donor-recipient pair and its onlookers for generations of each size
+    :param sizes: The numbers of players to draw from
+    :type sizes: List[int]
+    :param num_of_onlookers: The number of onlookers for each interaction
+    :type num_of_onlookers: int
+    :param draws: The number of interactions to draw for each size
+    :type draws: int
+    """
+    for size in sizes:
+        sampler = PopulationSampler(list(range(size)), random.Random(0))
+        start = time.perf_counter()
+        for _ in range(draws):
+            donor, recipient = sampler.donor_recipient_pair()
+            sampler.onlookers(donor, recipient, num_of_onlookers)
+        elapsed = time.perf_counter() - start
+        print("{} players: {:.2f}us a draw".format(size, 1000000 * elapsed / draws))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the time of each timepoint of a generation as its history "
+                                                 "grows, and of drawing the players of an interaction")
+    parser.add_argument('--players', type=int, default=50, help="The number of players in the generation")
+    parser.add_argument('--onlookers', type=int, default=5, help="The number of onlookers for each interaction")
+    parser.add_argument('--length', type=int, default=2000, help="The number of timepoints in the generation")
+    parser.add_argument('--windows', type=int, default=5, help="The number of windows to report the timepoints in")
+    parser.add_argument('--draws', type=int, default=100000, help="The number of draws for each generation size")
+    arguments = parser.parse_args()
+    run_history_benchmark(arguments.players, arguments.onlookers, arguments.length, arguments.windows)
+    run_draw_benchmark([10, 100, 1000, 10000, 100000], arguments.onlookers, arguments.draws)
@@ -0,0 +1,88 @@
+"""seeding_logic.py: Derives independent random number streams from the seed of a community, so a simulation can be
+reproduced from its seed and each part of it draws from its own stream"""
+
+__author__ = "James King"
+
+import hashlib
+import random
+
+# Seeds are kept to 32 bits so that the same seed can also seed the array engine
+MAX_SEED = 2**32 - 1
+
+
+def new_seed() -> int:
+    """
+    Choose a seed for a community that wasn't given one, from the random module so seeding the random module still
+    reproduces a simulation
+    :return: The seed
+    :rtype: int
+    """
+    return random.randint(0, MAX_SEED)
+
+
+class RandomStreams:
+    """The random number streams of a community, one for each of pairing, onlookers, reproduction and mutation in each
+    generation, each derived from the community's seed by hashing so no stream depends on how many draws another made"""
+
+    def __init__(self, seed: int = None):
+        """
+        Set up the streams of a community
+        :param seed: The seed of the community, chosen with new_seed if not given
+        :type seed: int
+        """
+        if seed is not None and not 0 <= seed <= MAX_SEED:
+            raise ValueError("seed should be between 0 and " + str(MAX_SEED))
+        self._seed: int = seed if seed is not None else new_seed()
+
+    @property
+    def seed(self) -> int:
+        """
+        Get the seed the streams are derived from
+        :return: The seed
+        :rtype: int
+        """
+        return self._seed
+
+    def pairing(self, generation: int) -> random.Random:
+        """
+        Get the stream to draw a generation's donor-recipient pairs from
+        :param generation: The id of the generation
+        :type generation: int
+        :return: The stream
+        :rtype: random.Random
+        """
+        return self._stream('pairing', generation)
+
+    def onlookers(self, generation: int) -> random.Random:
+        """
+        Get the stream to draw the onlookers of a generation's interactions from
+        :param generation: The id of the generation
+        :type generation: int
+        :return: The stream
+        :rtype: random.Random
+        """
+        return self._stream('onlookers', generation)
+
+    def reproduction(self, generation: int) -> random.Random:
+        """
+        Get the stream to select the parents of a generation's players from
+        :param generation: The id of the generation being reproduced
+        :type generation: int
+        :return: The stream
+        :rtype: random.Random
+        """
+        return self._stream('reproduction', generation)
+
+    def mutation(self, generation: int) -> random.Random:
+        """
+        Get the stream to decide the mutations of a generation's players from
+        :param generation: The id of the generation being reproduced
+        :type generation: int
+        :return: The stream
+        :rtype: random.Random
+        """
+        return self._stream('mutation', generation)
+
+    def _stream(self, name: str, generation: int) -> random.Random:
+        digest = hashlib.sha256("{}:{}:{}".format(self._seed, name, generation).encode('utf-8')).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
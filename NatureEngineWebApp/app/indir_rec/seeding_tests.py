@@ -0,0 +1,90 @@
+"""seeding_tests.py: Tests for the functionality of the seeding_logic.py module, checking a game is reproduced from the
+seed of its community"""
+
+__author__ = "James King"
+
+import random
+import unittest
+from typing import List, Tuple
+from .array_engine_logic import ArrayReputationGame
+from .community_logic import Community, CommunityCreationException
+from .facade_logic import ReputationGame, Results
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .seeding_logic import RandomStreams, MAX_SEED
+from .strategy_logic import Strategy
+
+
+class SeedingTest(unittest.TestCase):
+    """Test reproducing games with the RandomStreams class"""
+
+    def _run(self, seed: int, backend_seed: int = 0) -> Results:
+        return ReputationGame([dict(strategy, count=2) for strategy in STRATEGIES[::12]], num_of_onlookers=3,
+                              num_of_generations=3, length_of_generations=8, mutation_chance=0.3,
+                              agents_client=LocalAgentsBackend(seed=backend_seed), seed=seed).run()
+
+    @staticmethod
+    def _played(results: Results) -> List[Tuple]:
+        """The interactions and onlookers of a game, and the populations of its generations"""
+        return [(timepoint, interaction.donor, interaction.recipient, interaction.onlookers)
+                for timepoint, interaction in sorted(results.interactions.items())] + \
+            [tuple(sorted((str(strategy), count) for strategy, count in population.items()))
+             for population in results.populations]
+
+    def test_streams(self):
+        # Each stream should be the same for the same seed and generation, and differ between streams and generations
+        first, second = RandomStreams(5), RandomStreams(5)
+        self.assertEqual(first.pairing(1).random(), second.pairing(1).random())
+        self.assertEqual(first.mutation(2).random(), second.mutation(2).random())
+        draws = {first.pairing(1).random(), first.onlookers(1).random(), first.reproduction(1).random(),
+                 first.mutation(1).random(), first.pairing(2).random(), RandomStreams(6).pairing(1).random()}
+        self.assertEqual(6, len(draws))
+
+    def test_chosen_seed(self):
+        # A seed should be chosen with the random module when none is given
+        random.seed(3)
+        chosen = RandomStreams().seed
+        random.seed(3)
+        self.assertEqual(chosen, RandomStreams().seed)
+        self.assertTrue(0 <= chosen <= MAX_SEED)
+        with self.assertRaises(ValueError):
+            RandomStreams(MAX_SEED + 1)
+        with self.assertRaises(CommunityCreationException):
+            Community({Strategy("Defector", "Lazy", "Void", []): 5}, agents_client=LocalAgentsBackend(), seed=-1)
+
+    def test_reproduced(self):
+        # The same seed should play the same game, and the results should give the seed
+        first = self._run(11)
+        second = self._run(11)
+        self.assertEqual(11, first.seed)
+        self.assertEqual(self._played(first), self._played(second))
+        self.assertNotEqual(self._played(first), self._played(self._run(12)))
+
+    def test_streams_independent(self):
+        # The pairing and onlookers of the first generation shouldn't depend on the decisions of the agents
+        first = self._run(11, backend_seed=1)
+        second = self._run(11, backend_seed=2)
+        first_length = 8
+        self.assertEqual([(interaction.donor, interaction.recipient, interaction.onlookers)
+                          for timepoint, interaction in sorted(first.interactions.items()) if timepoint < first_length],
+                         [(interaction.donor, interaction.recipient, interaction.onlookers)
+                          for timepoint, interaction in sorted(second.interactions.items())
+                          if timepoint < first_length])
+
+    def test_unseeded_game(self):
+        # A game with no seed should have a new seed each run, recorded in its results
+        game = ReputationGame([dict(STRATEGIES[0], count=5)], num_of_generations=3, length_of_generations=6,
+                              agents_client=LocalAgentsBackend())
+        self.assertIsNone(game.seed)
+        self.assertNotEqual(game.run().seed, game.run().seed)
+
+    def test_array_game(self):
+        # The array engine should record the seed it was simulated with
+        results = ArrayReputationGame([dict(STRATEGIES[0], count=5)], num_of_generations=3,
+                                      length_of_generations=6, seed=7).run()
+        self.assertEqual(7, results.seed)
+        self.assertTrue(0 <= ArrayReputationGame([dict(STRATEGIES[0], count=5)], num_of_generations=3,
+                                                 length_of_generations=6).run().seed <= MAX_SEED)
+
+
+if __name__ == '__main__':
+    unittest.main()
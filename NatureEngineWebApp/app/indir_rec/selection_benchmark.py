@@ -0,0 +1,66 @@
+"""selection_benchmark.py: A script to measure the time each selection scheme takes to reproduce a generation, for
+generations with fitness spread evenly, spread exponentially and with a single outlier"""
+
+__author__ = "James King"
+
+import argparse
+import random
+import time
+from typing import Callable, Dict, List
+from .local_agents_logic import STRATEGIES
+from .selection_logic import MoranSelection, RouletteSelection, SelectionScheme, StochasticAcceptanceSelection, \
+    TournamentSelection, reproduce
+from .strategy_logic import Strategy
+
+# The fitness of each player of a generation of a given size, from a random number generator
+FITNESS_DISTRIBUTIONS: Dict[str, Callable[[int, random.Random], List[int]]] = {
+    'uniform': lambda size, rng: [rng.randint(0, 100) for _ in range(size)],
+    'exponential': lambda size, rng: [int(rng.expovariate(1 / 20)) for _ in range(size)],
+    'outlier': lambda size, rng: [1] * (size - 1) + [100 * size],
+}
+# Stochastic acceptance is skipped once a generation would need more picks than this, as with an outlier it needs about
+# the size of the generation times the outlier's fitness over the mean fitness
+MAX_PICKS = 10000000
+
+
+def run_selection_benchmark(sizes: List[int], repeats: int, mutation_chance: float):
+    """
+    Print the time each selection scheme takes to reproduce a generation of each size and fitness distribution
+    :param sizes: The numbers of players in the generations
+    :type sizes: List[int]
+    :param repeats: The number of generations to reproduce for each scheme, size and distribution
+    :type repeats: int
+    :param mutation_chance: The chance of each new player mutating
+    :type mutation_chance: float
+    """
+    schemes: List[SelectionScheme] = [StochasticAcceptanceSelection(), RouletteSelection('alias'),
+                                      RouletteSelection('cumulative'), TournamentSelection(), MoranSelection()]
+    mutation_strategies = [Strategy(strategy['donor_strategy'], strategy['non_donor_strategy'],
+                                    strategy['trust_model'], strategy['options']) for strategy in STRATEGIES]
+    for size in sizes:
+        strategies = [mutation_strategies[player % len(mutation_strategies)] for player in range(size)]
+        for distribution, fitness_of in FITNESS_DISTRIBUTIONS.items():
+            fitness = fitness_of(size, random.Random(0))
+            timings = []
+            for scheme in schemes:
+                picks = size * max(fitness) / max(sum(fitness) / size, 1)
+                if isinstance(scheme, StochasticAcceptanceSelection) and picks > MAX_PICKS:
+                    timings.append("{} skipped (~{:.0e} picks)".format(scheme.name, picks))
+                    continue
+                start = time.perf_counter()
+                for repeat in range(repeats):
+                    reproduce(scheme, strategies, fitness, size, mutation_chance, mutation_strategies,
+                              random.Random(repeat), random.Random(-repeat))
+                timings.append("{} {:.2f}ms".format(scheme.name,
+                                                    1000 * (time.perf_counter() - start) / repeats))
+            print("{} players, {} fitness: {}".format(size, distribution, ", ".join(timings)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the time each selection scheme takes to reproduce a "
+                                                 "generation")
+    parser.add_argument('--repeats', type=int, default=20, help="The number of generations to reproduce for each "
+                                                                "scheme, size and fitness distribution")
+    parser.add_argument('--mutation', type=float, default=0.1, help="The chance of each new player mutating")
+    arguments = parser.parse_args()
+    run_selection_benchmark([100, 1000, 10000], arguments.repeats, arguments.mutation)
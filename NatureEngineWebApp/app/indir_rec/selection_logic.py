@@ -0,0 +1,235 @@
+"""selection_logic.py: The selection schemes a community can reproduce its generations with, each choosing the parents
+of a new generation from the fitness of the last one, using sampling tables built once for each generation"""
+
+__author__ = "James King"
+
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, List
+import numpy as np
+from .strategy_logic import Strategy
+
+
+class SelectionScheme(ABC):
+    """A way of choosing the parents of a new generation from the fitness of the players of the last generation"""
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """The name of the scheme and its settings, part of a game's configuration as each scheme plays a seed
+        differently"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def select(self, fitness: List[int], count: int, reproduction_random: random.Random) -> List[int]:
+        """
+        Choose the parents of the players of a new generation
+        :param fitness: The fitness of each player of the last generation
+        :type fitness: List[int]
+        :param count: The number of players in the new generation
+        :type count: int
+        :param reproduction_random: The random number generator to choose the parents with
+        :type reproduction_random: random.Random
+        :return: The position in the last generation of the parent of each new player
+        :rtype: List[int]
+        """
+        raise NotImplementedError
+
+
+def _weights(fitness: List[int]) -> List[float]:
+    """
+    Get the weight of each player in fitness proportional selection, players without positive fitness never being
+    chosen unless no player has positive fitness, when every player is as likely
+    :param fitness: The fitness of each player
+    :type fitness: List[int]
+    :return: The weight of each player
+    :rtype: List[float]
+    """
+    weights = [float(max(player_fitness, 0)) for player_fitness in fitness]
+    return weights if sum(weights) > 0 else [1.0] * len(fitness)
+
+
+class AliasTable:
+    """A table to draw from a discrete distribution with a single random number a draw, built in linear time by Vose's
+    alias method"""
+
+    def __init__(self, weights: List[float]):
+        """
+        Build the table
+        :param weights: The non-negative weight of each outcome, at least one positive
+        :type weights: List[float]
+        """
+        size = len(weights)
+        total = sum(weights)
+        scaled = [weight * size / total for weight in weights]
+        self._size: int = size
+        self._accept: List[float] = [1.0] * size
+        self._alias: List[int] = list(range(size))
+        small = [outcome for outcome, weight in enumerate(scaled) if weight < 1]
+        large = [outcome for outcome, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._accept[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] += scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+        # What is left over is only short of 1 by rounding, so is always accepted
+
+    def draw(self, rng: random.Random) -> int:
+        """
+        Draw an outcome, the whole part of one random number choosing a column and the fractional part whether to take
+        the column's outcome or its alias
+        :param rng: The random number generator to draw with
+        :type rng: random.Random
+        :return: The outcome drawn
+        :rtype: int
+        """
+        point = rng.random() * self._size
+        column = min(int(point), self._size - 1)
+        return column if point - column < self._accept[column] else self._alias[column]
+
+
+class StochasticAcceptanceSelection(SelectionScheme):
+    """Roulette wheel selection via stochastic acceptance, outlined by Lipowski et al. and referenced in my report:
+    players are picked at random and accepted with the chance of their fitness over the greatest fitness, so an outlier
+    makes many picks rejected"""
+
+    @property
+    def name(self) -> str:
+        return 'stochastic_acceptance'
+
+    def select(self, fitness: List[int], count: int, reproduction_random: random.Random) -> List[int]:
+        maximal_fitness = max([0] + fitness)
+        parents: List[int] = []
+        while len(parents) < count:
+            selected = reproduction_random.randrange(len(fitness))
+            chance_of_reproduction = 1 if maximal_fitness == 0 else fitness[selected] / maximal_fitness
+            if reproduction_random.random() <= chance_of_reproduction:
+                parents.append(selected)
+        return parents
+
+
+class RouletteSelection(SelectionScheme):
+    """Roulette wheel (fitness proportional) selection from a table built once for the generation, either an alias
+    table taking one random number a parent or a cumulative sum of the fitness searched for all the parents at once"""
+
+    def __init__(self, table: str = 'alias'):
+        """
+        Set up the selection
+        :param table: The table to draw from, 'alias' or 'cumulative' (defaults to 'alias')
+        :type table: str
+        """
+        if table not in ['alias', 'cumulative']:
+            raise ValueError("table should be 'alias' or 'cumulative'")
+        self._table: str = table
+
+    @property
+    def name(self) -> str:
+        return 'roulette_' + self._table
+
+    def select(self, fitness: List[int], count: int, reproduction_random: random.Random) -> List[int]:
+        weights = _weights(fitness)
+        if self._table == 'alias':
+            table = AliasTable(weights)
+            return [table.draw(reproduction_random) for _ in range(count)]
+        cumulative = np.cumsum(weights)
+        points = np.array([reproduction_random.random() for _ in range(count)]) * cumulative[-1]
+        return np.minimum(np.searchsorted(cumulative, points, side='right'), len(weights) - 1).tolist()
+
+
+class TournamentSelection(SelectionScheme):
+    """Tournament selection, each parent the fittest of a few players picked at random, the first picked winning
+    ties"""
+
+    def __init__(self, size: int = 2):
+        """
+        Set up the selection
+        :param size: The number of players in each tournament (defaults to 2)
+        :type size: int
+        """
+        if size < 1:
+            raise ValueError("tournament size should be at least 1")
+        self._size: int = size
+
+    @property
+    def name(self) -> str:
+        return 'tournament_' + str(self._size)
+
+    def select(self, fitness: List[int], count: int, reproduction_random: random.Random) -> List[int]:
+        population = len(fitness)
+        parents: List[int] = []
+        for _ in range(count):
+            winner = int(reproduction_random.random() * population)
+            for _ in range(self._size - 1):
+                contender = int(reproduction_random.random() * population)
+                if fitness[contender] > fitness[winner]:
+                    winner = contender
+            parents.append(winner)
+        return parents
+
+
+class MoranSelection(SelectionScheme):
+    """Moran birth-death selection, the new generation starting as a copy of the last and changed by a number of
+    events in which a player chosen by fitness gives birth to replace a player chosen at random, births drawn from an
+    alias table of the last generation's fitness"""
+
+    def __init__(self, events: int = None):
+        """
+        Set up the selection
+        :param events: The number of birth-death events between generations (defaults to one for each player)
+        :type events: int
+        """
+        if events is not None and events < 0:
+            raise ValueError("the number of birth-death events should not be negative")
+        self._events: int = events
+
+    @property
+    def name(self) -> str:
+        return 'moran' if self._events is None else 'moran_' + str(self._events)
+
+    def select(self, fitness: List[int], count: int, reproduction_random: random.Random) -> List[int]:
+        table = AliasTable(_weights(fitness))
+        parents = [position % len(fitness) for position in range(count)]
+        for _ in range(self._events if self._events is not None else count):
+            death = min(int(reproduction_random.random() * count), count - 1)
+            parents[death] = table.draw(reproduction_random)
+        return parents
+
+
+def reproduce(selection: SelectionScheme, strategies: List[Strategy], fitness: List[int], count: int,
+              mutation_chance: float, mutation_strategies: List[Strategy], reproduction_random: random.Random,
+              mutation_random: random.Random) -> Dict[Strategy, int]:
+    """
+    Choose the strategies of a new generation, selecting the parents of all its players then mutating them with one
+    random number a player, that both decides whether the player mutates and, scaled, which strategy it mutates to
+    :param selection: The scheme to select the parents with
+    :type selection: SelectionScheme
+    :param strategies: The strategy of each player of the last generation
+    :type strategies: List[Strategy]
+    :param fitness: The fitness of each player of the last generation
+    :type fitness: List[int]
+    :param count: The number of players in the new generation
+    :type count: int
+    :param mutation_chance: The chance of each new player mutating
+    :type mutation_chance: float
+    :param mutation_strategies: The strategies a player may mutate to
+    :type mutation_strategies: List[Strategy]
+    :param reproduction_random: The random number generator to select the parents with
+    :type reproduction_random: random.Random
+    :param mutation_random: The random number generator to mutate the players with
+    :type mutation_random: random.Random
+    :return: The count of each strategy in the new generation, in the order they were first chosen
+    :rtype: Dict[Strategy, int]
+    """
+    parents = selection.select(fitness, count, reproduction_random)
+    mutations = [mutation_random.random() for _ in range(count)]
+    new_gen_strategies: Dict[Strategy, int] = {}
+    for parent, mutation in zip(parents, mutations):
+        if mutation < mutation_chance:
+            # A number below the chance is as likely to be anywhere below it, so picks the strategy to mutate to
+            selected_strategy = mutation_strategies[min(int(mutation / mutation_chance * len(mutation_strategies)),
+                                                        len(mutation_strategies) - 1)]
+        else:
+            selected_strategy = strategies[parent]
+        new_gen_strategies[selected_strategy] = new_gen_strategies.get(selected_strategy, 0) + 1
+    return new_gen_strategies
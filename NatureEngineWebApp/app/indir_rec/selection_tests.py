@@ -0,0 +1,104 @@
+"""selection_tests.py: Tests for the functionality of the selection_logic.py module, checking each selection scheme
+chooses parents in proportion to what it should and that reproduction mutates as often as it should"""
+
+__author__ = "James King"
+
+import random
+import unittest
+from collections import Counter
+from .facade_logic import ReputationGame
+from .local_agents_logic import LocalAgentsBackend, STRATEGIES
+from .selection_logic import AliasTable, MoranSelection, RouletteSelection, StochasticAcceptanceSelection, \
+    TournamentSelection, reproduce
+from .strategy_logic import Strategy
+
+
+class SelectionTest(unittest.TestCase):
+    """Test the selection schemes and the reproduce function"""
+
+    FITNESS = [0, 10, 30, -4, 60]
+    DRAWS = 20000
+
+    def _frequencies(self, parents):
+        counts = Counter(parents)
+        return [counts[position] / len(parents) for position in range(len(self.FITNESS))]
+
+    def test_alias_table(self):
+        table = AliasTable([1.0, 0.0, 3.0, 4.0])
+        rng = random.Random(0)
+        frequencies = Counter(table.draw(rng) for _ in range(self.DRAWS))
+        self.assertEqual(0, frequencies[1])
+        for outcome, expected in [(0, 0.125), (2, 0.375), (3, 0.5)]:
+            self.assertAlmostEqual(expected, frequencies[outcome] / self.DRAWS, delta=0.015)
+
+    def test_fitness_proportional(self):
+        # Players without positive fitness are never chosen, the rest in proportion to their fitness
+        for selection in [RouletteSelection('alias'), RouletteSelection('cumulative'), StochasticAcceptanceSelection()]:
+            with self.subTest(selection=selection.name):
+                frequencies = self._frequencies(selection.select(self.FITNESS, self.DRAWS, random.Random(1)))
+                for expected, frequency in zip([0, 0.1, 0.3, 0, 0.6], frequencies):
+                    self.assertAlmostEqual(expected, frequency, delta=0.015)
+
+    def test_no_positive_fitness(self):
+        # With no player of positive fitness every player is as likely to be chosen
+        for selection in [RouletteSelection('alias'), RouletteSelection('cumulative'), MoranSelection()]:
+            with self.subTest(selection=selection.name):
+                self.assertEqual({0, 1, 2}, set(selection.select([0, -2, 0], 200, random.Random(2))))
+
+    def test_tournament(self):
+        self.assertEqual([4] * 50, TournamentSelection(len(self.FITNESS) * 20).select(self.FITNESS, 50,
+                                                                                       random.Random(3)))
+        frequencies = self._frequencies(TournamentSelection(2).select(self.FITNESS, self.DRAWS, random.Random(3)))
+        # The fittest player wins any tournament it's in, 1 - (4/5)^2 of them
+        self.assertAlmostEqual(0.36, frequencies[4], delta=0.015)
+        with self.assertRaises(ValueError):
+            TournamentSelection(0)
+
+    def test_moran(self):
+        self.assertEqual([0, 1, 2, 3, 4, 0], MoranSelection(0).select(self.FITNESS, 6, random.Random(4)))
+        # A single birth-death event replaces at most one player
+        parents = MoranSelection(1).select(self.FITNESS, 5, random.Random(4))
+        self.assertLessEqual(sum(parent != position for position, parent in enumerate(parents)), 1)
+
+    def test_same_draws_from_same_seed(self):
+        for selection in [RouletteSelection('alias'), RouletteSelection('cumulative'), TournamentSelection(3),
+                          MoranSelection(), StochasticAcceptanceSelection()]:
+            with self.subTest(selection=selection.name):
+                self.assertEqual(selection.select(self.FITNESS, 100, random.Random(5)),
+                                 selection.select(self.FITNESS, 100, random.Random(5)))
+
+    def test_reproduce_mutation(self):
+        parents = [Strategy("Defector", "Lazy", "Naive Trust Model", []), Strategy("Cooperator", "Lazy",
+                                                                                  "Naive Trust Model", [])]
+        mutants = [Strategy("Standing Discriminator", "Lazy", "Naive Trust Model", []),
+                   Strategy("Image Scoring Discriminator", "Lazy", "Naive Trust Model", [])]
+        no_mutation = reproduce(RouletteSelection(), parents, [1, 1], 1000, 0, mutants, random.Random(6),
+                                random.Random(7))
+        self.assertEqual(1000, sum(no_mutation.values()))
+        self.assertEqual(set(parents), set(no_mutation))
+        all_mutate = reproduce(RouletteSelection(), parents, [1, 1], 1000, 1, mutants, random.Random(6),
+                               random.Random(7))
+        self.assertEqual(set(mutants), set(all_mutate))
+        self.assertAlmostEqual(500, all_mutate[mutants[0]], delta=60)
+        some_mutate = reproduce(RouletteSelection(), parents, [1, 0], 2000, 0.25, mutants, random.Random(6),
+                                random.Random(7))
+        self.assertAlmostEqual(1500, some_mutate[parents[0]], delta=80)
+        self.assertAlmostEqual(250, some_mutate[mutants[1]], delta=60)
+
+    def test_game_selection(self):
+        # Games reproducing by different schemes play a seed differently, so shouldn't share a configuration hash
+        def game(selection):
+            return ReputationGame([dict(strategy, count=3) for strategy in STRATEGIES[::25]], num_of_onlookers=2,
+                                  num_of_generations=3, length_of_generations=6, mutation_chance=0.1,
+                                  agents_client=LocalAgentsBackend(seed=0), seed=9, selection=selection)
+        hashes = set()
+        for selection in [None, TournamentSelection(), MoranSelection(), StochasticAcceptanceSelection()]:
+            results = game(selection).run()
+            self.assertEqual([3 * len(STRATEGIES[::25])] * 3, [sum(population.values())
+                                                               for population in results.populations])
+            hashes.add(game(selection).config_hash)
+        self.assertEqual(4, len(hashes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,275 @@
+"""sharding_logic.py: Module for sharing communities out between several agents services, each community pinned to one
+service by consistent hashing, so the simulations of many workers aren't all held up by a single agents service"""
+
+__author__ = "James King"
+
+import bisect
+import hashlib
+import time
+import uuid
+from typing import Dict, Iterator, List, NoReturn, Tuple
+from .agents_client_logic import AgentsBackend, AgentsClient, AgentsServiceException
+from .indir_rec_config import Config
+
+
+def _hash(key: str) -> int:
+    """Get the position of a key on the hash ring"""
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """A consistent hash ring of nodes, each placed at many points on the ring so keys are shared out evenly and adding
+    or removing a node only moves the keys that it takes or gave up"""
+
+    def __init__(self, nodes: List[str], replicas: int = 100):
+        """
+        Place the nodes on the ring
+        :param nodes: The names of the nodes
+        :type nodes: List[str]
+        :param replicas: The number of points each node is placed at
+        :type replicas: int
+        """
+        if len(nodes) == 0:
+            raise ValueError("a hash ring needs at least one node")
+        self._nodes: List[str] = list(nodes)
+        points = sorted((_hash(node + '#' + str(replica)), node) for node in self._nodes for replica in range(replicas))
+        self._points: List[int] = [point for point, _ in points]
+        self._point_nodes: List[str] = [node for _, node in points]
+
+    @property
+    def nodes(self) -> List[str]:
+        """
+        Get the nodes on the ring
+        :return: The names of the nodes, in the order they were given
+        :rtype: List[str]
+        """
+        return self._nodes
+
+    def nodes_for(self, key: str) -> Iterator[str]:
+        """
+        Walk the ring from a key, giving each node the first time it is met
+        :param key: The key to start from
+        :type key: str
+        :return: Every node, the one the key belongs to first and then the ones to fall back to in order
+        :rtype: Iterator[str]
+        """
+        start = bisect.bisect(self._points, _hash(key))
+        seen = set()
+        for offset in range(len(self._points)):
+            node = self._point_nodes[(start + offset) % len(self._points)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == len(self._nodes):
+                    return
+
+    def node_for(self, key: str) -> str:
+        """
+        Get the node a key belongs to
+        :param key: The key
+        :type key: str
+        :return: The name of the node
+        :rtype: str
+        """
+        return next(self.nodes_for(key))
+
+
+class ShardedAgentsClient(AgentsBackend):
+    """A backend sharing communities out between several agents services. A new community is created in the service
+    its key hashes to on a ring of the services, skipping any that failed their last health check or are draining, and
+    every request about the community is sent to that service. Each service numbers its own communities, so the
+    communities are given ids of this client's own and the ids are swapped for the service's in each request."""
+
+    def __init__(self, agents_urls: List[str] = None, draining: List[str] = None, health_interval: float = None,
+                 **client_settings):
+        """
+        Set up a client for each agents service, any parameter not passed defaults to the config
+        :param agents_urls: The urls of the agents services
+        :type agents_urls: List[str]
+        :param draining: The urls of the agents services to create no new communities in
+        :type draining: List[str]
+        :param health_interval: The number of seconds after a health check before the services are checked again when
+         a community is created
+        :type health_interval: float
+        :param client_settings: The settings of the client of each service, as taken by AgentsClient
+        """
+        agents_urls = agents_urls if agents_urls is not None else Config.AGENTS_URLS
+        self._ring: HashRing = HashRing(agents_urls)
+        self._clients: Dict[str, AgentsClient] = {url: AgentsClient(url, **client_settings) for url in agents_urls}
+        # Health checks aren't retried, so a service that is down is found out quickly
+        probe_settings = dict(client_settings, pool_size=1, retries=0)
+        self._probes: Dict[str, AgentsClient] = {url: AgentsClient(url, **probe_settings) for url in agents_urls}
+        self._healthy: Dict[str, bool] = {url: True for url in agents_urls}
+        self._draining = set(draining if draining is not None else Config.AGENTS_DRAINING)
+        self._health_interval: float = health_interval if health_interval is not None else \
+            Config.AGENTS_HEALTH_INTERVAL
+        self._last_health_check: float = None
+        # Keys are salted so each client, such as each worker's, shares its communities out differently
+        self._salt: str = uuid.uuid4().hex
+        self._next_community: int = 0
+        self._pins: Dict[int, Tuple[str, int]] = {}
+
+    @property
+    def agents_urls(self) -> List[str]:
+        """
+        Get the urls of the agents services communities are shared out between
+        :return: The urls of the agents services
+        :rtype: List[str]
+        """
+        return self._ring.nodes
+
+    def close(self) -> NoReturn:
+        for client in list(self._clients.values()) + list(self._probes.values()):
+            client.close()
+
+    def check_health(self) -> Dict[str, bool]:
+        """
+        Check whether each agents service can be reached, so no new communities are created in those that can't
+        :return: Whether each agents service is healthy, by url
+        :rtype: Dict[str, bool]
+        """
+        for url, probe in self._probes.items():
+            try:
+                probe.get_strategies()
+                self._healthy[url] = True
+            except AgentsServiceException:
+                self._healthy[url] = False
+        self._last_health_check = time.monotonic()
+        return dict(self._healthy)
+
+    def drain(self, agents_url: str) -> NoReturn:
+        """
+        Create no new communities in an agents service, leaving the communities already in it to finish
+        :param agents_url: The url of the agents service
+        :type agents_url: str
+        """
+        if agents_url not in self._clients:
+            raise ValueError("No agents service at " + agents_url)
+        self._draining.add(agents_url)
+
+    def undrain(self, agents_url: str) -> NoReturn:
+        """
+        Create new communities in an agents service that was draining again
+        :param agents_url: The url of the agents service
+        :type agents_url: str
+        """
+        self._draining.discard(agents_url)
+
+    def communities_in(self, agents_url: str) -> List[int]:
+        """
+        Get the communities pinned to an agents service, which a draining service is waiting on
+        :param agents_url: The url of the agents service
+        :type agents_url: str
+        :return: The ids of the communities
+        :rtype: List[int]
+        """
+        return [community for community, (url, _) in self._pins.items() if url == agents_url]
+
+    def agents_url_of(self, community: int) -> str:
+        """
+        Get the url of the agents service a community is pinned to
+        :param community: The id of the community
+        :type community: int
+        :return: The url of the agents service
+        :rtype: str
+        """
+        return self._pin(community)[0]
+
+    def service_community_of(self, community: int) -> Tuple[str, int]:
+        """
+        Get where a community is held, the url of the agents service it is pinned to and the service's id for it
+        :param community: The id of the community
+        :type community: int
+        :return: The url of the agents service and the id of the community in it
+        :rtype: Tuple[str, int]
+        """
+        return self._pin(community)
+
+    def _pin(self, community: int) -> Tuple[str, int]:
+        try:
+            return self._pins[community]
+        except KeyError:
+            raise AgentsServiceException("No agents service holds community " + str(community))
+
+    def _local(self, payload: Dict) -> Tuple[AgentsClient, Dict]:
+        """Get the client of the service a payload's community is pinned to, and the payload with the service's id"""
+        url, local_community = self._pin(payload['community'])
+        return self._clients[url], dict(payload, community=local_community)
+
+    def get_strategies(self) -> List[Dict]:
+        for url in self._ring.nodes:
+            if self._healthy[url]:
+                try:
+                    return self._clients[url].get_strategies()
+                except AgentsServiceException:
+                    self._healthy[url] = False
+        raise AgentsServiceException("No agents service could be reached")
+
+    def create_community(self) -> Dict:
+        if self._last_health_check is None or time.monotonic() - self._last_health_check >= self._health_interval:
+            self.check_health()
+        community = self._next_community
+        self._next_community += 1
+        for url in self._ring.nodes_for(self._salt + ':' + str(community)):
+            if not self._healthy[url] or url in self._draining:
+                continue
+            try:
+                response = self._clients[url].create_community()
+            except AgentsServiceException:
+                self._healthy[url] = False
+                continue
+            self._pins[community] = (url, response['id'])
+            return dict(response, id=community)
+        raise AgentsServiceException("No healthy agents service to create the community in")
+
+    def create_generation(self, community: int, generation: int) -> Dict:
+        url, local_community = self._pin(community)
+        return self._clients[url].create_generation(local_community, generation)
+
+    def delete_community(self, community: int) -> Dict:
+        url, local_community = self._pin(community)
+        response = self._clients[url].delete_community(local_community)
+        # Once unpinned a draining service is no longer waiting on the community
+        del self._pins[community]
+        return dict(response, data=dict(response.get('data', {}), community=community))
+
+    def delete_generation(self, community: int, generation: int) -> Dict:
+        url, local_community = self._pin(community)
+        return self._clients[url].delete_generation(local_community, generation)
+
+    def create_agent(self, agent: Dict) -> Dict:
+        client, agent = self._local(agent)
+        return client.create_agent(agent)
+
+    def create_agents(self, community: int, generation: int, strategies: List[Dict]) -> Dict:
+        url, local_community = self._pin(community)
+        return self._clients[url].create_agents(local_community, generation, strategies)
+
+    def send_interaction(self, interaction: Dict) -> Dict:
+        client, interaction = self._local(interaction)
+        return client.send_interaction(interaction)
+
+    def send_percepts(self, percepts: List[Dict]) -> Dict:
+        # The percepts are sent to each service in a group, then their successes put back in the order they were given
+        groups: Dict[str, List[Tuple[int, Dict]]] = {}
+        for position, percept in enumerate(percepts):
+            url, local_community = self._pin(percept['community'])
+            groups.setdefault(url, []).append((position, dict(percept, community=local_community)))
+        response: Dict = {'status': 200, 'success': []}
+        successes: List[Dict] = [None] * len(percepts)
+        for url, group in groups.items():
+            response = self._clients[url].send_percepts([percept for _, percept in group])
+            for (position, _), success in zip(group, response['success']):
+                successes[position] = success
+        return dict(response, success=successes)
+
+    def get_action(self, community: int, generation: int, player: int, timepoint: int) -> Dict:
+        url, local_community = self._pin(community)
+        return self._clients[url].get_action(local_community, generation, player, timepoint)
+
+    def step(self, step: Dict) -> Dict:
+        client, step = self._local(step)
+        if 'interaction' in step:
+            step['interaction'] = dict(step['interaction'], community=step['community'])
+        step['percepts'] = [dict(percept, community=step['community']) for percept in step['percepts']]
+        return client.step(step)
@@ -0,0 +1,118 @@
+"""sharding_tests.py: Tests for the functionality of the sharding_logic.py module, checking communities are shared out
+between several mock agents services, each pinned to one, and that unhealthy and draining services are skipped"""
+
+__author__ = "James King"
+
+import unittest
+from collections import Counter
+from .agents_client_logic import AgentsServiceException
+from .facade_logic import ReputationGame
+from .mock_agents_service import MockAgentsService
+from .sharding_logic import HashRing, ShardedAgentsClient
+
+
+class HashRingTest(unittest.TestCase):
+    """Test placing keys on a consistent hash ring"""
+
+    def test_keys_shared_evenly(self):
+        ring = HashRing(['a', 'b', 'c'])
+        counts = Counter(ring.node_for(str(key)) for key in range(3000))
+        for node in ['a', 'b', 'c']:
+            self.assertAlmostEqual(1000, counts[node], delta=250)
+
+    def test_adding_a_node_moves_few_keys(self):
+        # Only the keys the new node takes should move, about a quarter of them
+        before, after = HashRing(['a', 'b', 'c']), HashRing(['a', 'b', 'c', 'd'])
+        moved = [key for key in range(3000) if before.node_for(str(key)) != after.node_for(str(key))]
+        self.assertTrue(all(after.node_for(str(key)) == 'd' for key in moved))
+        self.assertAlmostEqual(750, len(moved), delta=250)
+
+    def test_fall_back_order(self):
+        ring = HashRing(['a', 'b', 'c'])
+        nodes = list(ring.nodes_for('key'))
+        self.assertEqual(['a', 'b', 'c'], sorted(nodes))
+        self.assertEqual(ring.node_for('key'), nodes[0])
+        with self.assertRaises(ValueError):
+            HashRing([])
+
+
+class ShardedAgentsClientTest(unittest.TestCase):
+    """Test sharing communities out between mock agents services"""
+
+    def setUp(self):
+        self.services = [MockAgentsService(), MockAgentsService()]
+        for service in self.services:
+            service.start()
+        self.client = ShardedAgentsClient([service.url for service in self.services], draining=[],
+                                          health_interval=60)
+
+    def tearDown(self):
+        self.client.close()
+        for service in self.services:
+            service.stop()
+
+    def _game(self):
+        return ReputationGame([{'donor_strategy': "Defector", 'non_donor_strategy': "Lazy", 'trust_model': "Void",
+                                'options': [], 'count': 3},
+                               {'donor_strategy': "Standing Discriminator", 'non_donor_strategy': "Lazy",
+                                'trust_model': "Trusting", 'options': [], 'count': 3}],
+                              num_of_onlookers=2, num_of_generations=3, length_of_generations=6,
+                              agents_client=self.client)
+
+    def test_communities_pinned(self):
+        # Communities should be spread over the services, with every request about a community sent to its service
+        communities = [self.client.create_community()['id'] for _ in range(20)]
+        self.assertEqual(list(range(20)), communities)
+        self.assertEqual(20, sum(len(self.client.communities_in(service.url)) for service in self.services))
+        for service in self.services:
+            self.assertGreater(len(self.client.communities_in(service.url)), 0)
+        for community in communities:
+            self.client.create_generation(community, 0)
+        for service in self.services:
+            self.assertEqual(len(self.client.communities_in(service.url)), service.request_count('POST generation'))
+
+    def test_game_on_one_service(self):
+        # A whole game should run against the service its community is pinned to, which is unpinned once released
+        results = self._game().run()
+        self.assertEqual(18, len(results.interactions))
+        served = [service for service in self.services if service.request_count('POST step') > 0]
+        self.assertEqual(1, len(served))
+        self.assertEqual(1, served[0].request_count('DELETE community'))
+        self.assertEqual({}, served[0].communities)
+        self.assertEqual([], self.client.communities_in(served[0].url))
+        with self.assertRaises(AgentsServiceException):
+            self.client.agents_url_of(0)
+
+    def test_unhealthy_skipped(self):
+        # No new communities should be created in a service that can't be reached
+        self.services[1].stop()
+        self.assertEqual({self.services[0].url: True, self.services[1].url: False}, self.client.check_health())
+        for _ in range(10):
+            self.client.create_community()
+        self.assertEqual(10, len(self.client.communities_in(self.services[0].url)))
+        self.services.pop()
+        unreachable = ShardedAgentsClient(['http://127.0.0.1:1/'], draining=[], health_interval=60, retries=0)
+        with self.assertRaises(AgentsServiceException):
+            unreachable.create_community()
+        unreachable.close()
+
+    def test_draining_skipped(self):
+        # A draining service should keep its communities but be given no new ones
+        community = self.client.create_community()['id']
+        url = self.client.agents_url_of(community)
+        self.client.drain(url)
+        for _ in range(10):
+            self.assertNotEqual(url, self.client.agents_url_of(self.client.create_community()['id']))
+        self.assertEqual([community], self.client.communities_in(url))
+        self.client.create_generation(community, 0)
+        self.client.undrain(url)
+        with self.assertRaises(ValueError):
+            self.client.drain('http://127.0.0.1:1/')
+
+    def test_unknown_community(self):
+        with self.assertRaises(AgentsServiceException):
+            self.client.create_generation(5, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""step_tests.py: Tests for running generations in batched steps against the mock agents service"""
+
+__author__ = "James King"
+
+import unittest
+from unittest.mock import patch
+import random
+import requests
+from .generation_logic import Generation, GenerationCreationException, SimulationException
+from .observation_logic import ActionObserver
+from .action_logic import ActionType, InteractionContent
+from .mock_agents_service import MockAgentsService
+from .indir_rec_config import Config
+from .strategy_logic import Strategy
+
+
+class StepTest(unittest.TestCase):
+    """Test simulating a generation with a single step request per timepoint, and the per player fallback"""
+
+    def setUp(self):
+        # Start the mock agents service and point the environment at it
+        self.service = MockAgentsService()
+        self.service.start()
+        self.url_patch = patch.object(Config, 'AGENTS_URL', self.service.url)
+        self.url_patch.start()
+        self.community = requests.request("POST", Config.AGENTS_URL + 'community').json()['id']
+        self.strategies = {Strategy("Defector", "Lazy", "Void", []): 3, Strategy("Cooperator", "Lazy", "Void", []): 3}
+
+    def tearDown(self):
+        self.url_patch.stop()
+        self.service.stop()
+
+    def _simulate(self, generation_id: int, batched_steps: bool, local_decisions: bool = False) -> ActionObserver:
+        observer = ActionObserver(self.community)
+        observer.add_generation(generation_id)
+        generation = Generation(self.strategies, generation_id, self.community, 0, 10, 3, [observer],
+                                batched_steps=batched_steps, local_decisions=local_decisions)
+        generation.simulate()
+        return observer
+
+    def test_one_request_per_timepoint(self):
+        # A batched generation should only use the step endpoint to simulate
+        self._simulate(0, True)
+        self.assertEqual(10, self.service.request_count('POST step'))
+        self.assertEqual(0, self.service.request_count('GET action'))
+        self.assertEqual(0, self.service.request_count('POST percept/interaction'))
+        self.assertEqual(0, self.service.request_count('POST percept/action/group'))
+
+    def test_per_player_fallback(self):
+        # A generation not using batched steps should request each players decision separately
+        self._simulate(0, False)
+        self.assertEqual(0, self.service.request_count('POST step'))
+        self.assertEqual(60, self.service.request_count('GET action'))
+        self.assertEqual(10, self.service.request_count('POST percept/interaction'))
+
+    def test_batched_matches_per_player(self):
+        # The same seed should give the same actions whether batched or not
+        random.seed(10)
+        batched = self._simulate(0, True)
+        batched_percepts = [dict(percept) for percept in self.service.percepts]
+        random.seed(10)
+        # The random streams are drawn for each generation, so the same generation is simulated in a new community
+        self.community = requests.request("POST", Config.AGENTS_URL + 'community').json()['id']
+        per_player = self._simulate(0, False)
+        per_player_percepts = [dict(percept) for percept in self.service.percepts[len(batched_percepts):]]
+        for timepoint in range(10):
+            self.assertEqual([(action.actor, action.type, action.reason) for action in batched.actions[timepoint]],
+                             [(action.actor, action.type, action.reason) for action in per_player.actions[timepoint]])
+            self.assertEqual(batched.interactions[timepoint].onlookers, per_player.interactions[timepoint].onlookers)
+        for percept in batched_percepts + per_player_percepts:
+            del percept['community']
+        self.assertEqual(batched_percepts, per_player_percepts)
+
+    def test_decisions_applied(self):
+        # Decisions from the step should be executed, defectors defect and cooperators cooperate
+        observer = self._simulate(0, True)
+        for timepoint, interaction in observer.interactions.items():
+            self.assertIs(ActionType.INTERACTION, interaction.type)
+            expected = InteractionContent.DEFECT if interaction.donor < 3 else InteractionContent.COOPERATE
+            self.assertEqual(expected, interaction.action)
+        self.assertEqual(len(self.service.percepts), sum(len(interaction.onlookers)
+                                                         for interaction in observer.interactions.values()
+                                                         if interaction.timepoint < 9))
+
+    def test_stateless_players_decide_locally(self):
+        # Stateless players should decide as the agents service would without it being asked, in either mode
+        random.seed(11)
+        served = self._simulate(0, True)
+        for batched_steps in [True, False]:
+            requests_before = len(self.service.requests)
+            random.seed(11)
+            self.community = requests.request("POST", Config.AGENTS_URL + 'community').json()['id']
+            local = self._simulate(0, batched_steps, local_decisions=True)
+            # Only the community, generation and agents are created
+            self.assertEqual(['POST community', 'POST generation', 'POST agent/group'],
+                             self.service.requests[requests_before:])
+            for timepoint in range(10):
+                self.assertEqual([(action.actor, action.type, action.reason) for action in served.actions[timepoint]],
+                                 [(action.actor, action.type, action.reason) for action in local.actions[timepoint]])
+                self.assertEqual(served.interactions[timepoint].action, local.interactions[timepoint].action)
+
+    def test_percept_blind_players_skipped(self):
+        # Only the players that aren't stateless should be asked to decide, and only those that use percepts sent them
+        self.strategies = {Strategy("Defector", "Lazy", "Void", []): 3,
+                           Strategy("Standing Discriminator", "Lazy", "Trusting", []): 3}
+        self._simulate(0, False, local_decisions=True)
+        self.assertEqual(30, self.service.request_count('GET action'))
+        self.assertEqual(10, self.service.request_count('POST percept/interaction'))
+        self._simulate(1, True, local_decisions=True)
+        self.assertEqual(10, self.service.request_count('POST step'))
+        self.assertGreater(len(self.service.percepts), 0)
+        self.assertEqual({3, 4, 5}, {percept['perceiver'] for percept in self.service.percepts})
+
+    def test_failed_percept(self):
+        # A percept the agents service failed to add, replying with an error message, should fail the simulation
+        with patch.object(MockAgentsService, '_new_percept', return_value="No such perceiver"):
+            with self.assertRaises(SimulationException) as context:
+                self._simulate(0, True)
+        self.assertIn("Error in player perception: No such perceiver", str(context.exception))
+
+    def test_agents_created_together(self):
+        # A generation's agents should be created in a single request rather than a request for each player
+        generation = Generation(self.strategies, 0, self.community, 0, 10, 3, [])
+        self.assertEqual(1, self.service.request_count('POST agent/group'))
+        self.assertEqual(0, self.service.request_count('POST agent'))
+        self.assertEqual([0, 1, 2, 3, 4, 5], [player.id for player in generation.get_players()])
+        self.assertEqual(["Defector"] * 3 + ["Cooperator"] * 3,
+                         [player.strategy.donor_strategy for player in generation.get_players()])
+
+    def test_failed_agent_creation(self):
+        # The players that failed to be created should be reported together
+        strategies = dict(self.strategies)
+        strategies[Strategy("Capability", "Lazy", "Void", [])] = 2
+        with self.assertRaises(GenerationCreationException) as context:
+            Generation(strategies, 0, self.community, 0, 10, 3, [])
+        self.assertIn("player 6: No such strategy, player 7: No such strategy", str(context.exception))
+
+    def test_failed_decision(self):
+        # A failed decision for a player in the step should fail the simulation
+        generation = Generation(self.strategies, 0, self.community, 0, 10, 3, [], batched_steps=True,
+                                local_decisions=False)
+        generation._players[0]._player_id = 100
+        with self.assertRaises(SimulationException):
+            generation.simulate()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,42 @@
 """strategy_logic.py: Contains the logic surrounding the assigning of strategies to players"""
 
-from typing import List, Any, Dict
+import hashlib
+import json
+from typing import List, Any, Dict, FrozenSet, Tuple
+
+# What the agents service's minds make of the environment, for the strategies that need less of the service than the
+# rest, keyed by donor strategy, non donor strategy and trust model. A stateless mind's decision follows from whether
+# it is the donor alone, so can be made by the environment, and a percept blind mind never uses what it perceives, so
+# needn't be sent percepts.
+STATELESS = 'stateless'
+PERCEPT_BLIND = 'percept_blind'
+STRATEGY_CAPABILITIES: Dict[Tuple[str, str, str], FrozenSet[str]] = {
+    ("Cooperator", "Lazy", "Void"): frozenset([STATELESS, PERCEPT_BLIND]),
+    ("Cooperator", "Promote Self", "Void"): frozenset([PERCEPT_BLIND]),
+    ("Cooperator", "Spread Positive", "Void"): frozenset([PERCEPT_BLIND]),
+    ("Defector", "Lazy", "Void"): frozenset([STATELESS, PERCEPT_BLIND]),
+    ("Defector", "Promote Self", "Void"): frozenset([PERCEPT_BLIND]),
+    ("Defector", "Spread Negative", "Void"): frozenset([PERCEPT_BLIND]),
+    ("Random", "Random", "Void"): frozenset([PERCEPT_BLIND]),
+}
+
+
+def strategy_fingerprint(donor_strategy: str, non_donor_strategy: str, trust_model: str, options: List[Any]) -> str:
+    """
+    Get the canonical fingerprint of a strategy, the same for any two equal strategies however they were built
+    :param donor_strategy: The strategy the player uses when they are a donor
+    :type donor_strategy: str
+    :param non_donor_strategy: The strategy the player uses when they are not a donor
+    :type non_donor_strategy: str
+    :param trust_model: The trust model the player uses to interpret events it perceives
+    :type trust_model: str
+    :param options: The options added to the strategy to augment it's features
+    :type options: List[Any]
+    :return: The hex digest of the strategy's canonical form
+    :rtype: str
+    """
+    canonical = json.dumps([donor_strategy, non_donor_strategy, trust_model, list(options)], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
 
 
 class Strategy:
@@ -59,6 +95,35 @@ class Strategy:
         """
         return self._options
 
+    @property
+    def fingerprint(self) -> str:
+        """
+        Get the canonical fingerprint of the strategy, which identifies it in the database
+        :return: The fingerprint of the strategy
+        :rtype: str
+        """
+        return strategy_fingerprint(self._donor_strategy, self._non_donor_strategy, self._trust_model, self._options)
+
+    @property
+    def stateless(self) -> bool:
+        """
+        Whether the decision of an agent with this strategy follows from whether it is the donor alone
+        :return: Whether the strategy is stateless
+        :rtype: bool
+        """
+        return STATELESS in STRATEGY_CAPABILITIES.get((self._donor_strategy, self._non_donor_strategy,
+                                                       self._trust_model), frozenset())
+
+    @property
+    def percept_blind(self) -> bool:
+        """
+        Whether an agent with this strategy never uses the percepts it is sent
+        :return: Whether the strategy is percept blind
+        :rtype: bool
+        """
+        return PERCEPT_BLIND in STRATEGY_CAPABILITIES.get((self._donor_strategy, self._non_donor_strategy,
+                                                           self._trust_model), frozenset())
+
     def to_dict(self) -> Dict:
         return {'donor_strat': self.donor_strategy, 'non_donor_strat': self.non_donor_strategy,
                 'trust_model': self.trust_model, 'options': self.options}
@@ -4,10 +4,29 @@ __author__ = "James King"
 
 from .action_tests import IdleTests, InteractionTests, GossipTests
 from .community_tests import CommunityTest
-from .generation_tests import GenerationTest
-from .observation_test import ActionObserverTest, PlayerObserverTests
+from .generation_tests import GenerationTest, PopulationSamplerTest
+from .observation_test import ActionObserverTest, ActionLogTest, PlayerObserverTests
 from .player_tests import PlayerStateTests, PlayerTest, PlayerAndStateIntegrationTests
 from .facade_tests import FacadeTests
+from .step_tests import StepTest
+from .agents_client_tests import AgentsClientTest
+from .async_tests import AsyncSimulationTest
+from .local_agents_tests import LocalAgentsTest
+from .array_engine_tests import ArrayEngineTest
+from .run_experiments_tests import RunExperimentsTest
+from .persistence_tests import PersistenceTest
+from .read_model_tests import CommunityReadModelTest
+from .render_cache_tests import RenderCacheTest
+from .historical_tests import HistoricalAggregatesTest
+from .progress_tests import ProgressTest
+from .seeding_tests import SeedingTest
+from .result_cache_tests import ResultCacheTest, StoredConfigHashTest
+from .checkpoint_tests import CheckpointTest
+from .metrics_tests import ActionMetricsTest
+from .selection_tests import SelectionTest
+from .sharding_tests import HashRingTest, ShardedAgentsClientTest
+from .lifecycle_tests import LifecycleTest, RedisLeaseRegistryTest
+from .routes_tests import ReputationRouteTest
 
 import unittest
 
@@ -15,8 +34,15 @@ import unittest
 def indir_rec_suite():
     suite = unittest.TestSuite()
     suite.addTests([IdleTests(), InteractionTests(), GossipTests(), CommunityTest(), GenerationTest(),
-                    ActionObserverTest(), PlayerObserverTests(), PlayerStateTests(), PlayerTest(),
-                    PlayerAndStateIntegrationTests(), FacadeTests()])
+                    PopulationSamplerTest(),
+                    ActionObserverTest(), ActionLogTest(), PlayerObserverTests(), PlayerStateTests(), PlayerTest(),
+                    PlayerAndStateIntegrationTests(), FacadeTests(), StepTest(),
+                    AgentsClientTest(), AsyncSimulationTest(), LocalAgentsTest(),
+                    ArrayEngineTest(), RunExperimentsTest(), PersistenceTest(),
+                    CommunityReadModelTest(), RenderCacheTest(), HistoricalAggregatesTest(),
+                    ProgressTest(), SeedingTest(), ResultCacheTest(), StoredConfigHashTest(), CheckpointTest(),
+                    ActionMetricsTest(), SelectionTest(), HashRingTest(), ShardedAgentsClientTest(),
+                    LifecycleTest(), RedisLeaseRegistryTest(), ReputationRouteTest()])
     return suite
 
 
@@ -5,6 +5,7 @@ __author__ = "James King adapted from Miguel Grinberg"
 from app import db, login
 from datetime import datetime
 from typing import List
+import json
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from sqlalchemy_fulltext import FullText
@@ -127,6 +128,8 @@ class ReputationCommunity(db.Model):
     positivity_of_gossip = db.Column(db.Integer)
     fitness = db.Column(db.Integer)
     timed_out = db.Column(db.Boolean, default=False, nullable=False)
+    seed = db.Column(db.BigInteger)
+    config_hash = db.Column(db.String(64), index=True)
     generations = db.relationship('ReputationGeneration', backref='generation_reputation_community', lazy='dynamic')
 
     def set_corrupted(self):
@@ -185,6 +188,13 @@ class ReputationStrategy(db.Model):
     non_donor_strategy = db.Column(db.String(128))
     trust_model = db.Column(db.String(128))
     options = db.Column(db.String(300))
+    fingerprint = db.Column(db.String(64), index=True, unique=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.fingerprint is None:
+            self.fingerprint = strategy_fingerprint(self.donor_strategy, self.non_donor_strategy, self.trust_model,
+                                                    json.loads(self.options))
 
 
 class ReputationPlayer(db.Model):
@@ -204,7 +214,40 @@ class ReputationPlayer(db.Model):
                                           "ReputationPlayer.generation_id==ReputationAction.generation_id)")
 
 
+class ReputationGenLengthAggregate(db.Model):
+    """The sums of the cooperation rates of the simulated communities and generations of a length, added to as each
+    community is stored"""
+    length = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    community_cooperation_rate_sum = db.Column(db.Integer, default=0, nullable=False)
+    community_count = db.Column(db.Integer, default=0, nullable=False)
+    generation_cooperation_rate_sum = db.Column(db.Integer, default=0, nullable=False)
+    generation_count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class ReputationStrategyCountAggregate(db.Model):
+    """The sum of the cooperation rates of the simulated generations with a count of players of a strategy, added to as
+    each community is stored"""
+    strategy_id = db.Column(db.Integer, db.ForeignKey('reputation_strategy.id'), primary_key=True,
+                            autoincrement=False)
+    strategy_count = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    cooperation_rate_sum = db.Column(db.Integer, default=0, nullable=False)
+    generation_count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class ReputationHistoricalPoint(db.Model):
+    """The measurements of a simulated community (with no generation) or of one of its generations, for the scatter
+    charts of the historical data page"""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    community_id = db.Column(db.Integer, db.ForeignKey('reputation_community.id'), index=True)
+    generation_id = db.Column(db.Integer, db.ForeignKey('reputation_generation.id'), nullable=True)
+    cooperation_rate = db.Column(db.Integer)
+    social_activeness = db.Column(db.Integer)
+    positivity_of_gossip = db.Column(db.Integer)
+    fitness = db.Column(db.Integer)
+
+
 from .indir_rec.action_logic import ActionType, GossipContent, InteractionContent
+from .indir_rec.strategy_logic import strategy_fingerprint
 
 
 class ReputationAction(db.Model):
@@ -17,6 +17,24 @@ class Config(object):
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://'
-    AGENTS_URL = os.environ.get('AGENTS_URL') or 'http://127.0.0.1:8080/'
+    # AGENTS_URL may list several agents services separated by commas, to share communities out between
+    AGENTS_URLS = [url.strip() for url in (os.environ.get('AGENTS_URL') or 'http://127.0.0.1:8080/').split(',')
+                   if url.strip()]
+    AGENTS_URL = AGENTS_URLS[0]
+    AGENTS_DRAINING = [url.strip() for url in (os.environ.get('AGENTS_DRAINING') or '').split(',') if url.strip()]
+    AGENTS_HEALTH_INTERVAL = float(os.environ.get('AGENTS_HEALTH_INTERVAL') or 30)
+    AGENTS_BACKEND = os.environ.get('AGENTS_BACKEND') or 'service'
+    AGENTS_POOL_SIZE = int(os.environ.get('AGENTS_POOL_SIZE') or 10)
+    AGENTS_CONNECT_TIMEOUT = float(os.environ.get('AGENTS_CONNECT_TIMEOUT') or 5)
+    AGENTS_READ_TIMEOUT = float(os.environ.get('AGENTS_READ_TIMEOUT') or 300)
+    AGENTS_RETRIES = int(os.environ.get('AGENTS_RETRIES') or 3)
+    AGENTS_BACKOFF_FACTOR = float(os.environ.get('AGENTS_BACKOFF_FACTOR') or 0.5)
+    # Games of ARRAY_ENGINE_MIN_PLAYERS or more are simulated with the array engine, so the form allows populations
+    # well beyond what the agents' minds can simulate in reasonable time
+    REPUTATION_MAX_PLAYERS = int(os.environ.get('REPUTATION_MAX_PLAYERS') or 20000)
+    ARRAY_ENGINE_MIN_PLAYERS = int(os.environ.get('ARRAY_ENGINE_MIN_PLAYERS') or 200)
+    REPUTATION_PROGRESS_HEARTBEAT = float(os.environ.get('REPUTATION_PROGRESS_HEARTBEAT') or 15)
+    # Progress streams are closed after this many seconds and reconnected, so none holds a worker for a whole game
+    REPUTATION_PROGRESS_LIFETIME = float(os.environ.get('REPUTATION_PROGRESS_LIFETIME') or 60)
     EXPERIMENTS_PER_PAGE = 50
     DEPLOYED = os.environ.get('DEPLOYED') or False
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""reputation strategy fingerprint
+
+Revision ID: 10ee3f40959a
+Revises: 8f5390310c50
+Create Date: 2026-10-16 21:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import hashlib
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = '10ee3f40959a'
+down_revision = '8f5390310c50'
+branch_labels = None
+depends_on = None
+
+
+def strategy_fingerprint(donor_strategy, non_donor_strategy, trust_model, options):
+    # A frozen copy of the fingerprint as it was at this revision, so the migration runs the same whatever the app's
+    # code becomes
+    canonical = json.dumps([donor_strategy, non_donor_strategy, trust_model, list(options)], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    with op.batch_alter_table('reputation_strategy') as batch_op:
+        batch_op.add_column(sa.Column('fingerprint', sa.String(length=64), nullable=True))
+    # Fingerprint the strategies already stored, pointing the players of any duplicates at the first copy
+    connection = op.get_bind()
+    kept = {}
+    for strategy_id, donor_strategy, non_donor_strategy, trust_model, options in connection.execute(sa.text(
+            "SELECT id, donor_strategy, non_donor_strategy, trust_model, options FROM reputation_strategy "
+            "ORDER BY id")):
+        fingerprint = strategy_fingerprint(donor_strategy, non_donor_strategy, trust_model, json.loads(options))
+        if fingerprint in kept:
+            connection.execute(sa.text("UPDATE reputation_player SET strategy = :kept WHERE strategy = :duplicate"),
+                               kept=kept[fingerprint], duplicate=strategy_id)
+            connection.execute(sa.text("DELETE FROM reputation_strategy WHERE id = :duplicate"), duplicate=strategy_id)
+        else:
+            kept[fingerprint] = strategy_id
+            connection.execute(sa.text("UPDATE reputation_strategy SET fingerprint = :fingerprint WHERE id = :id"),
+                               fingerprint=fingerprint, id=strategy_id)
+    op.create_index(op.f('ix_reputation_strategy_fingerprint'), 'reputation_strategy', ['fingerprint'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_reputation_strategy_fingerprint'), table_name='reputation_strategy')
+    with op.batch_alter_table('reputation_strategy') as batch_op:
+        batch_op.drop_column('fingerprint')
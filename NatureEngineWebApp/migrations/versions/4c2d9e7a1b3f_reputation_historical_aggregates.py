@@ -0,0 +1,103 @@
+"""reputation historical aggregates
+
+Revision ID: 4c2d9e7a1b3f
+Revises: 10ee3f40959a
+Create Date: 2026-10-16 23:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c2d9e7a1b3f'
+down_revision = '10ee3f40959a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    gen_length_aggregate = op.create_table('reputation_gen_length_aggregate',
+    sa.Column('length', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('community_cooperation_rate_sum', sa.Integer(), nullable=False),
+    sa.Column('community_count', sa.Integer(), nullable=False),
+    sa.Column('generation_cooperation_rate_sum', sa.Integer(), nullable=False),
+    sa.Column('generation_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('length')
+    )
+    strategy_count_aggregate = op.create_table('reputation_strategy_count_aggregate',
+    sa.Column('strategy_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('strategy_count', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('cooperation_rate_sum', sa.Integer(), nullable=False),
+    sa.Column('generation_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['strategy_id'], ['reputation_strategy.id'], ),
+    sa.PrimaryKeyConstraint('strategy_id', 'strategy_count')
+    )
+    historical_point = op.create_table('reputation_historical_point',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('community_id', sa.Integer(), nullable=True),
+    sa.Column('generation_id', sa.Integer(), nullable=True),
+    sa.Column('cooperation_rate', sa.Integer(), nullable=True),
+    sa.Column('social_activeness', sa.Integer(), nullable=True),
+    sa.Column('positivity_of_gossip', sa.Integer(), nullable=True),
+    sa.Column('fitness', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['community_id'], ['reputation_community.id'], ),
+    sa.ForeignKeyConstraint(['generation_id'], ['reputation_generation.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_reputation_historical_point_community_id'), 'reputation_historical_point',
+                    ['community_id'], unique=False)
+    # Aggregate the communities already simulated, the same way they are added to as each is stored
+    connection = op.get_bind()
+    simulated = "c.corrupted_observations = :false AND c.simulated = :true"
+    flags = {'false': False, 'true': True}
+    gen_lengths = {}
+    points = []
+    for community_id, length, cooperation_rate, social_activeness, positivity_of_gossip, fitness in \
+            connection.execute(sa.text("SELECT c.id, c.length_of_generations, c.cooperation_rate, c.social_activeness, "
+                                       "c.positivity_of_gossip, c.fitness FROM reputation_community c WHERE " +
+                                       simulated + " ORDER BY c.id"), **flags):
+        sums = gen_lengths.setdefault(length, {'length': length, 'community_cooperation_rate_sum': 0,
+                                               'community_count': 0, 'generation_cooperation_rate_sum': 0,
+                                               'generation_count': 0})
+        sums['community_cooperation_rate_sum'] += cooperation_rate
+        sums['community_count'] += 1
+        points.append({'community_id': community_id, 'generation_id': None, 'cooperation_rate': cooperation_rate,
+                       'social_activeness': social_activeness, 'positivity_of_gossip': positivity_of_gossip,
+                       'fitness': fitness})
+    for community_id, generation_id, length, cooperation_rate, social_activeness, positivity_of_gossip, fitness in \
+            connection.execute(sa.text("SELECT g.community_id, g.id, g.end_point - g.start_point, g.cooperation_rate, "
+                                       "g.social_activeness, g.positivity_of_gossip, g.fitness "
+                                       "FROM reputation_generation g JOIN reputation_community c "
+                                       "ON c.id = g.community_id WHERE " + simulated + " ORDER BY g.id"), **flags):
+        sums = gen_lengths.setdefault(length, {'length': length, 'community_cooperation_rate_sum': 0,
+                                               'community_count': 0, 'generation_cooperation_rate_sum': 0,
+                                               'generation_count': 0})
+        sums['generation_cooperation_rate_sum'] += cooperation_rate
+        sums['generation_count'] += 1
+        points.append({'community_id': community_id, 'generation_id': generation_id,
+                       'cooperation_rate': cooperation_rate, 'social_activeness': social_activeness,
+                       'positivity_of_gossip': positivity_of_gossip, 'fitness': fitness})
+    strategy_counts = {}
+    for strategy_id, count, cooperation_rate in connection.execute(sa.text(
+            "SELECT p.strategy, COUNT(*), g.cooperation_rate FROM reputation_player p "
+            "JOIN reputation_generation g ON g.id = p.generation_id JOIN reputation_community c "
+            "ON c.id = g.community_id WHERE " + simulated + " GROUP BY g.id, g.cooperation_rate, p.strategy"),
+            **flags):
+        sums = strategy_counts.setdefault((strategy_id, count), {'strategy_id': strategy_id, 'strategy_count': count,
+                                                                 'cooperation_rate_sum': 0, 'generation_count': 0})
+        sums['cooperation_rate_sum'] += cooperation_rate
+        sums['generation_count'] += 1
+    if gen_lengths:
+        op.bulk_insert(gen_length_aggregate, list(gen_lengths.values()))
+    if strategy_counts:
+        op.bulk_insert(strategy_count_aggregate, list(strategy_counts.values()))
+    if points:
+        op.bulk_insert(historical_point, points)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_reputation_historical_point_community_id'), table_name='reputation_historical_point')
+    op.drop_table('reputation_historical_point')
+    op.drop_table('reputation_strategy_count_aggregate')
+    op.drop_table('reputation_gen_length_aggregate')
@@ -0,0 +1,26 @@
+"""reputation community seed
+
+Revision ID: 7e41b0c95d2a
+Revises: 4c2d9e7a1b3f
+Create Date: 2026-10-16 23:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e41b0c95d2a'
+down_revision = '4c2d9e7a1b3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reputation_community') as batch_op:
+        batch_op.add_column(sa.Column('seed', sa.BigInteger(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('reputation_community') as batch_op:
+        batch_op.drop_column('seed')
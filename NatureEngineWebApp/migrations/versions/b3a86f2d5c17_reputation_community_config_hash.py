@@ -0,0 +1,28 @@
+"""reputation community config hash
+
+Revision ID: b3a86f2d5c17
+Revises: 7e41b0c95d2a
+Create Date: 2026-10-17 09:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3a86f2d5c17'
+down_revision = '7e41b0c95d2a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reputation_community') as batch_op:
+        batch_op.add_column(sa.Column('config_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_reputation_community_config_hash'), ['config_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reputation_community') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reputation_community_config_hash'))
+        batch_op.drop_column('config_hash')